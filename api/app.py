@@ -1,4 +1,4 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
 from flask_cors import CORS
 from dotenv import load_dotenv
@@ -13,6 +13,16 @@ sys.path.append(parent_dir)
 # Imports from your services
 from services.portfolio_service import PortfolioService
 from services.ai_service import DecisionSupportAI
+from services.symbol_catalog import get_symbol_catalog
+from services.alert_engine import get_alert_engine
+from services.precompute_jobs import start_background_jobs
+from services import inference_service
+from services.stress_test import SCENARIOS, StressTester
+from services.market_regime import get_market_regime
+from services.nav_snapshots import NavSnapshotter
+from services.sync import SyncService, changed_quotes, encode_sync
+from api import handlers
+from api.handlers import APIError
 
 # Need to make sure the root directory is in python path to import future_price
 # which is in the root directory
@@ -57,6 +67,33 @@ if GOOGLE_API_KEY:
 
 portfolio_service = PortfolioService()
 
+# Historical scenario replay over cached daily history (shares the AssetManager's FX and caches)
+stress_tester = StressTester(portfolio_service.manager)
+
+# Recorded portfolio values (written by the nav_snapshot job, compacted into hourly/daily/weekly rollups)
+nav_snapshotter = NavSnapshotter()
+
+# Delta sync for offline mobile clients (change_log cursor + NAV bars + changed quotes)
+sync_service = SyncService(snapshotter=nav_snapshotter)
+
+# New or changed quotes from the shared AssetManager are checked against price alerts on a background thread
+alert_engine = get_alert_engine()
+portfolio_service.manager.add_quote_listener(alert_engine.submit_quote)
+
+# Off-peak precompute jobs (only when SCHEDULER_ENABLED); one lease-locked run per slot across workers
+start_background_jobs(portfolio_service)
+
+
+@app.errorhandler(APIError)
+def api_error(e):
+    return jsonify({"msg": e.msg}), e.status
+
+
+def json_body():
+    """Decoded JSON object of the request ({} when missing or not an object)."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else {}
+
 
 # --- AUTHENTICATION ENDPOINTS ---
 
@@ -68,16 +105,7 @@ def login():
     """
     if not request.is_json:
         return jsonify({"msg": "Missing JSON in request"}), 400
-
-    username = request.json.get('username', None)
-    password = request.json.get('password', None)
-
-    # Mock User Check
-    if username != 'admin' or password != 'password':
-        return jsonify({"msg": "Bad username or password"}), 401
-
-    access_token = create_access_token(identity=username)
-    return jsonify(access_token=access_token)
+    return jsonify(access_token=create_access_token(identity=handlers.parse_login(json_body())))
 
 # --- PORTFOLIO ENDPOINTS ---
 
@@ -87,19 +115,9 @@ def calculate_portfolio():
     """
     Calculates portfolio value based on provided holdings.
     """
-    data = request.json
-    holdings = data.get('holdings') # Expected dict structure
-
-    if not holdings:
-         return jsonify({"msg": "Missing holdings data"}), 400
-
-    # The service expects a specific format.
-    # Let's assume the client sends what AssetManager.calculate_portfolio_value expects.
-    # holdings: {'BTC': {'type': 'crypto', 'amount': 0.5}, ...}
-
+    holdings, currency = handlers.parse_holdings(json_body())
     try:
-        result = portfolio_service.manager.calculate_portfolio_value(holdings)
-        return jsonify(result)
+        return jsonify(portfolio_service.manager.calculate_portfolio_value(holdings, currency=currency))
     except Exception as e:
         return jsonify({"msg": str(e)}), 500
 
@@ -109,26 +127,185 @@ def benchmark_portfolio():
     """
     Returns benchmark chart data.
     """
-    data = request.json
-    btc_amount = data.get('btc_amount', 0)
-    usdt_amount = data.get('usdt_amount', 0)
-    initial_usd = data.get('initial_usd', 0)
-    days = data.get('days', 365)
-    start_date_str = data.get('start_date', '') # Not used in service currently but in signature
+    try:
+        df = portfolio_service.get_benchmark_chart_data(**handlers.parse_benchmark(json_body()))
+        return jsonify(handlers.records(df))
+    except Exception as e:
+        return jsonify({"msg": str(e)}), 500
+
+@app.route('/api/portfolio/nav', methods=['GET'])
+@jwt_required()
+def portfolio_nav():
+    """
+    Recorded portfolio value series from pre-aggregated rollups.
+    Query: portfolio ('wallet' | 'ledger'), days (omit for full history), max_points.
+    The finest tier that covers the range within max_points is used (raw, 1h, 1d or 1w).
+    """
+    portfolio_id, start, max_points = handlers.parse_nav_query(request.args)
+    df = nav_snapshotter.series(portfolio_id, start=start, max_points=max_points)
+    return jsonify(handlers.nav_response(portfolio_id, df))
 
+# --- MARKET DATA ENDPOINTS ---
+
+@app.route('/api/market/history', methods=['POST'])
+@jwt_required()
+def market_history():
+    """
+    Returns OHLC history for one symbol.
+    interval: intraday ('1m', '5m', '15m', '30m', '1h', '4h'), '1d' (default),
+    or '1wk' / '1mo' rollups; max_points caps the row count.
+    Intraday windows are capped per interval (MAX_HISTORY_DAYS); longer ones get a 400.
+    """
+    symbol, asset_type, days, interval, max_points = handlers.parse_history(json_body())
     try:
-        df = portfolio_service.get_benchmark_chart_data(
-            btc_amount=btc_amount,
-            usdt_amount=usdt_amount,
-            initial_usd=initial_usd,
-            start_date_str=start_date_str,
-            days=days
-        )
-        # Convert DataFrame to JSON friendly format (records)
-        return jsonify(df.reset_index().to_dict(orient='records'))
+        df = portfolio_service.manager.get_historical_data(
+            symbol, asset_type, days=days, interval=interval if handlers.is_intraday(interval) else '1d')
+        return jsonify(handlers.history_records(df, interval, max_points))
     except Exception as e:
         return jsonify({"msg": str(e)}), 500
 
+@app.route('/api/market/regime', methods=['GET'])
+@jwt_required()
+def market_regime():
+    """
+    Latest precomputed regime (trend, volatility regime, drawdown, breadth) for BTC, gold,
+    S&P 500 and BIST 100. Served from cache; computed once only if the scheduler has not run yet.
+    """
+    snapshot = get_market_regime().current(portfolio_service.manager)
+    if snapshot is None:
+        return jsonify({"msg": "Market regime not available"}), 503
+    return jsonify(snapshot)
+
+@app.route('/api/symbols/search', methods=['GET'])
+@jwt_required()
+def search_symbols():
+    """
+    Prefix search over the local symbol catalog (no upstream call).
+    Query: q (prefix), type (optional asset type), limit (default 10, max 50).
+    """
+    prefix, asset_type, limit = handlers.parse_search(request.args)
+    return jsonify(get_symbol_catalog().search(prefix, asset_type=asset_type, limit=limit))
+
+# --- RISK ENDPOINTS ---
+
+@app.route('/api/risk/stress-test', methods=['POST'])
+@jwt_required()
+def stress_test():
+    """
+    Replays current weights through named historical windows.
+    Body: {"portfolio": {"BTC": {"type": "crypto", "value": 30000}, ...},
+           "currency": optional, "scenarios": optional list of scenario names}
+    Results are sorted by peak drawdown (worst first).
+    """
+    return jsonify(handlers.run_stress_test(stress_tester, *handlers.parse_stress_test(json_body())))
+
+@app.route('/api/risk/scenarios', methods=['GET'])
+@jwt_required()
+def stress_scenarios():
+    """Named historical windows available to the stress test."""
+    return jsonify(SCENARIOS)
+
+# --- SIMULATION ENDPOINTS ---
+
+@app.route('/api/simulation/sensitivity', methods=['POST'])
+@jwt_required()
+def sensitivity():
+    """
+    Portfolio value over the full Cartesian grid of per-asset / per-class shocks.
+    Body: {"portfolio": {"BTC": {"type": "crypto", "value": 30000}, ...},
+           "axes": [{"target": "BTC", "min": -0.5, "max": 1.0, "steps": 101},
+                    {"target": "commodity", "min": -0.2, "max": 0.2, "steps": 41}],
+           "extremes": optional number of worst/best cells (default 5)}
+    A target is a held symbol or an asset class; `values` is indexed [axis0][axis1]...
+    """
+    return jsonify(handlers.run_sensitivity(*handlers.parse_sensitivity(json_body())))
+
+# --- ALERT ENDPOINTS ---
+
+@app.route('/api/alerts', methods=['GET'])
+@jwt_required()
+def list_alerts():
+    """Active alerts of the current user (?all=1 includes triggered/deleted ones)."""
+    active_only = not handlers.flag_param(request.args, 'all')
+    return jsonify(alert_engine.list_alerts(get_jwt_identity(), active_only=active_only))
+
+@app.route('/api/alerts', methods=['POST'])
+@jwt_required()
+def create_alert():
+    """
+    Body: {"symbol", "type", "kind", "threshold", ...}
+    kind: above | below (threshold = price), pct_move (threshold = percent, reference_price
+    defaults to the current quote), probability (threshold = 0-1, target_price, horizon_days;
+    symbol in Yahoo form, e.g. BTC-USD).
+    """
+    alert = handlers.parse_alert(json_body())
+    if handlers.needs_reference_price(alert):
+        handlers.set_reference_price(alert, portfolio_service.manager.get_price(alert['symbol'], alert['asset_type']))
+    return jsonify(handlers.create_alert(alert_engine, get_jwt_identity(), alert)), 201
+
+@app.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+@jwt_required()
+def delete_alert(alert_id):
+    return jsonify(handlers.delete_alert(alert_engine, get_jwt_identity(), alert_id))
+
+@app.route('/api/alerts/notifications', methods=['GET'])
+@jwt_required()
+def alert_notifications():
+    """
+    Pending notifications from the outbox. Returned items are marked delivered
+    unless ?peek=1 is given.
+    """
+    return jsonify(handlers.deliver_notifications(alert_engine, get_jwt_identity(), request.args))
+
+# --- JOB ENDPOINTS ---
+
+@app.route('/api/jobs', methods=['GET'])
+@jwt_required()
+def list_jobs():
+    """Scheduled precompute jobs with their persisted last-run state."""
+    return jsonify(handlers.background_jobs().status())
+
+@app.route('/api/jobs/<name>/run', methods=['POST'])
+@jwt_required()
+def run_job(name):
+    """Starts a job immediately unless another worker currently holds its lease."""
+    return jsonify(handlers.run_job(name)), 202
+
+# --- SYNC ENDPOINT ---
+
+@app.route('/api/sync', methods=['POST'])
+@jwt_required()
+def sync():
+    """
+    Delta sync for offline clients.
+    Body: {"cursor": <last seq>, "limit": 500,
+           "series": {"wallet": {"resolution": "1h", "since": <ts of the last bar held>}},
+           "quotes": {"BTC": {"type": "crypto", "price": <last price held>}}}
+    Returns rows changed after the cursor (columnar, plus deleted keys), bars from the last held
+    one onwards and only the quotes that moved. Repeat with the returned cursor while has_more.
+    The body is gzip-compressed when the client sends Accept-Encoding: gzip.
+    """
+    data = json_body()
+    quotes = handlers.parse_sync(data)
+    payload = handlers.run_sync(sync_service, data)
+    prices = {symbol: portfolio_service.manager.get_price(symbol, q['type']) for symbol, q in quotes.items()}
+    payload['quotes'] = changed_quotes(quotes, prices)
+    body, headers = encode_sync(payload, request.headers.get('Accept-Encoding', ''))
+    return Response(body, headers=headers)
+
+# --- EXPORT ENDPOINT ---
+
+@app.route('/api/export/<dataset>', methods=['GET'])
+@jwt_required()
+def export_data(dataset):
+    """
+    Streams a stored dataset (analyses, history, holdings, transactions) without loading it into memory.
+    Query: format (csv | ndjson | parquet), start / end (YYYY-MM-DD, inclusive, on the dataset's date column).
+    Rows are read in fixed-size batches and each batch is sent as soon as it is encoded.
+    """
+    chunks, mimetype, headers = handlers.open_export(dataset, request.args)
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
 # --- ML ENDPOINT ---
 
 @app.route('/api/ml/predict', methods=['POST'])
@@ -137,17 +314,23 @@ def predict_probability():
     """
     Exposes the XGBoost prediction model.
     """
-    data = request.json
-    symbol = data.get('symbol', 'BTC-USD')
-    target_price = data.get('target_price', 100000)
-    days = data.get('days', 10)
-
+    symbol, target_price, days, interval = handlers.parse_prediction(json_body())
     try:
-        result = fp.predict_probability(symbol, target_price, days)
-        return jsonify(result)
+        return jsonify(inference_service.predict_probability(symbol, target_price, days, interval=interval))
     except Exception as e:
         return jsonify({"msg": str(e)}), 500
 
+@app.route('/api/ml/predict/batch', methods=['POST'])
+@jwt_required()
+def predict_probability_batch():
+    """
+    Runs many predictions on the shared process pool.
+    Body: {"queries": [{"symbol", "target_price", "days", "interval"}, ...]}
+    Streams NDJSON lines {"index", "query", "result"} as each symbol finishes.
+    """
+    queries = handlers.parse_batch(json_body())
+    return Response(stream_with_context(handlers.batch_lines(queries)), mimetype='application/x-ndjson')
+
 # --- AI ENDPOINTS ---
 
 @app.route('/api/ai/analyze', methods=['POST'])
@@ -156,18 +339,11 @@ def analyze_portfolio():
     """
     Analyze portfolio risk using DecisionSupportAI.
     """
-    if not ai_service:
-        return jsonify({"msg": "AI Service not initialized (Missing API Key)"}), 503
-
-    data = request.json
-    portfolio = data.get('portfolio')
-
-    if not portfolio:
-         return jsonify({"msg": "Missing portfolio data"}), 400
-
+    ai = handlers.require_ai(ai_service)
+    portfolio, positions, currency = handlers.parse_analysis(json_body())
     try:
-        result = ai_service.analyze_portfolio_risk(portfolio)
-        return jsonify(result)
+        stress = stress_tester.run(positions, currency=currency) if positions is not None else None
+        return jsonify(ai.analyze_portfolio_risk(portfolio, stress_results=stress))
     except Exception as e:
         return jsonify({"msg": str(e)}), 500
 
@@ -177,18 +353,10 @@ def get_recommendation():
     """
     Get generic AI recommendation.
     """
-    if not ai_service:
-        return jsonify({"msg": "AI Service not initialized (Missing API Key)"}), 503
-
-    data = request.json
-    context = data.get('context') # Expected dict
-
-    if not context:
-        return jsonify({"msg": "Missing context"}), 400
-
+    ai = handlers.require_ai(ai_service)
+    context = handlers.parse_context(json_body())
     try:
-        recommendation = ai_service.get_ai_recommendation(context)
-        return jsonify({"recommendation": recommendation})
+        return jsonify({"recommendation": ai.get_ai_recommendation(context)})
     except Exception as e:
         return jsonify({"msg": str(e)}), 500
 
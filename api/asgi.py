@@ -0,0 +1,412 @@
+"""
+ASGI serving mode for the API.
+
+Same routes, payloads and JWT tokens as api/app.py (tokens issued by either app are accepted
+by the other); request parsing and response building live in api/handlers.py and are shared
+with the Flask app. Upstream waits no longer hold a worker thread:
+
+- quotes and daily history: ccxt.async_support / aiohttp (services.async_market)
+- LLM recommendation: Gemini generate_content_async
+- pandas / XGBoost work: bounded CPU executor
+- SQLite-backed and blocking upstream calls (alerts, jobs, benchmark): Starlette's thread pool
+
+Run:
+    uvicorn api.asgi:app --host 0.0.0.0 --port 5000 --workers 4
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial, wraps
+
+import jwt as pyjwt
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+from werkzeug.http import http_date
+
+# Add the parent directory to sys.path to allow imports from services and root
+parent_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if parent_dir not in sys.path:
+    sys.path.insert(0, parent_dir)
+
+from services.portfolio_service import PortfolioService
+from services.ai_service import DecisionSupportAI
+from services.async_market import AsyncMarketData
+from services.symbol_catalog import get_symbol_catalog
+from services.alert_engine import get_alert_engine
+from services.precompute_jobs import start_background_jobs
+from services import inference_service
+from services.stress_test import SCENARIOS, StressTester
+from services.market_regime import get_market_regime
+from services.nav_snapshots import NavSnapshotter
+from services.sync import SyncService, changed_quotes, encode_sync
+from api import handlers
+from api.handlers import APIError
+
+try:
+    load_dotenv(verbose=True)
+except AssertionError:
+    pass
+
+# --- CONFIGURATION ---
+# Must match api/app.py so both serving modes accept the same tokens
+JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'super-secret-key-change-me')
+JWT_ALGORITHM = 'HS256'
+JWT_ACCESS_TOKEN_EXPIRES = 3600  # 1 hour
+
+# pandas / XGBoost work runs here so it never blocks the event loop
+cpu_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='asgi-cpu')
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+ai_service = DecisionSupportAI(api_key=GOOGLE_API_KEY) if GOOGLE_API_KEY else None
+
+portfolio_service = PortfolioService()
+market = AsyncMarketData(portfolio_service.manager)
+
+stress_tester = StressTester(portfolio_service.manager)
+nav_snapshotter = NavSnapshotter()
+sync_service = SyncService(snapshotter=nav_snapshotter)
+
+alert_engine = get_alert_engine()
+portfolio_service.manager.add_quote_listener(alert_engine.submit_quote)
+
+start_background_jobs(portfolio_service)
+
+
+def _json_default(value):
+    # Same wire format as Flask's JSON provider (HTTP dates), plus numpy scalars
+    if hasattr(value, 'utctimetuple'):
+        return http_date(value)
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class APIResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return json.dumps(content, ensure_ascii=False, default=_json_default,
+                          separators=(',', ':')).encode('utf-8')
+
+
+def msg(text: str, status: int) -> APIResponse:
+    return APIResponse({"msg": text}, status_code=status)
+
+
+async def api_error(request: Request, exc: APIError) -> APIResponse:
+    return msg(exc.msg, exc.status)
+
+
+async def run_cpu(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, partial(fn, *args, **kwargs))
+
+
+async def json_body(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+# --- AUTHENTICATION ---
+
+def create_access_token(identity: str) -> str:
+    """Same claims as flask_jwt_extended.create_access_token."""
+    now = int(time.time())
+    claims = {
+        'fresh': False,
+        'iat': now,
+        'jti': str(uuid.uuid4()),
+        'type': 'access',
+        'sub': identity,
+        'nbf': now,
+        'exp': now + JWT_ACCESS_TOKEN_EXPIRES,
+    }
+    return pyjwt.encode(claims, JWT_SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+
+def jwt_required(endpoint):
+    """Mirrors flask_jwt_extended's status codes and messages; sets request.state.identity."""
+    @wraps(endpoint)
+    async def wrapper(request: Request):
+        header = request.headers.get('Authorization')
+        if not header:
+            return msg("Missing Authorization Header", 401)
+        scheme, _, token = header.partition(' ')
+        if scheme != 'Bearer' or not token:
+            return msg("Bad Authorization header. Expected 'Authorization: Bearer <JWT>'", 422)
+        try:
+            claims = pyjwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+        except pyjwt.ExpiredSignatureError:
+            return msg("Token has expired", 401)
+        except pyjwt.InvalidTokenError as e:
+            return msg(str(e), 422)
+        if claims.get('type') != 'access' or 'sub' not in claims:
+            return msg("Only non-refresh tokens are allowed", 422)
+        request.state.identity = claims['sub']
+        return await endpoint(request)
+    return wrapper
+
+
+async def login(request: Request):
+    """Simple mock login to get a JWT."""
+    if 'json' not in request.headers.get('content-type', ''):
+        return msg("Missing JSON in request", 400)
+    identity = handlers.parse_login(await json_body(request))
+    return APIResponse({"access_token": create_access_token(identity)})
+
+
+# --- PORTFOLIO ENDPOINTS ---
+
+@jwt_required
+async def calculate_portfolio(request: Request):
+    """Quotes are fetched concurrently; valuation (FX conversion) runs off the event loop."""
+    holdings, currency = handlers.parse_holdings(await json_body(request))
+    try:
+        prices = await market.get_prices(holdings)
+        result = await run_in_threadpool(portfolio_service.manager.value_holdings, holdings, prices, currency)
+        return APIResponse(result)
+    except Exception as e:
+        return msg(str(e), 500)
+
+
+@jwt_required
+async def benchmark_portfolio(request: Request):
+    """
+    Returns benchmark chart data. Cold daily frames are fetched upstream by the sync manager,
+    so the call runs in the I/O thread pool rather than the CPU executor.
+    """
+    kwargs = handlers.parse_benchmark(await json_body(request))
+    try:
+        df = await run_in_threadpool(portfolio_service.get_benchmark_chart_data, **kwargs)
+        return APIResponse(handlers.records(df))
+    except Exception as e:
+        return msg(str(e), 500)
+
+
+@jwt_required
+async def portfolio_nav(request: Request):
+    """Recorded portfolio value series; same query parameters as the Flask endpoint."""
+    portfolio_id, start, max_points = handlers.parse_nav_query(request.query_params)
+    df = await run_in_threadpool(nav_snapshotter.series, portfolio_id, start=start, max_points=max_points)
+    return APIResponse(handlers.nav_response(portfolio_id, df))
+
+
+# --- MARKET DATA ENDPOINTS ---
+
+@jwt_required
+async def market_history(request: Request):
+    """
+    Daily history (and its '1wk' / '1mo' rollups) is fetched with async clients.
+    Intraday intervals read the local 1m bar store, which only downloads the missing delta,
+    so they run in the thread pool.
+    """
+    symbol, asset_type, days, interval, max_points = handlers.parse_history(await json_body(request))
+    try:
+        if handlers.is_intraday(interval):
+            df = await run_in_threadpool(portfolio_service.manager.get_historical_data,
+                                         symbol, asset_type, days=days, interval=interval)
+        else:
+            df = await market.get_historical_data(symbol, asset_type, days=days)
+        return APIResponse(await run_cpu(handlers.history_records, df, interval, max_points))
+    except Exception as e:
+        return msg(str(e), 500)
+
+
+@jwt_required
+async def market_regime(request: Request):
+    """Latest precomputed regime; a cold process computes it once in the threadpool."""
+    regime = get_market_regime()
+    snapshot = regime.latest() or await run_in_threadpool(regime.current, portfolio_service.manager)
+    if snapshot is None:
+        return msg("Market regime not available", 503)
+    return APIResponse(snapshot)
+
+
+@jwt_required
+async def search_symbols(request: Request):
+    """Prefix search over the local symbol catalog (no upstream call)."""
+    prefix, asset_type, limit = handlers.parse_search(request.query_params)
+    return APIResponse(get_symbol_catalog().search(prefix, asset_type=asset_type, limit=limit))
+
+
+# --- RISK ENDPOINTS ---
+
+@jwt_required
+async def stress_test(request: Request):
+    """Historical scenario replay; history is cached, the tensor math runs in the CPU executor."""
+    args = handlers.parse_stress_test(await json_body(request))
+    return APIResponse(await run_cpu(handlers.run_stress_test, stress_tester, *args))
+
+
+@jwt_required
+async def stress_scenarios(request: Request):
+    return APIResponse(SCENARIOS)
+
+
+# --- SIMULATION ENDPOINTS ---
+
+@jwt_required
+async def sensitivity(request: Request):
+    """Multi-asset what-if grid; same body as the Flask endpoint."""
+    args = handlers.parse_sensitivity(await json_body(request))
+    return APIResponse(await run_cpu(handlers.run_sensitivity, *args))
+
+
+# --- ALERT ENDPOINTS ---
+
+@jwt_required
+async def list_alerts(request: Request):
+    active_only = not handlers.flag_param(request.query_params, 'all')
+    return APIResponse(await run_in_threadpool(
+        alert_engine.list_alerts, request.state.identity, active_only=active_only))
+
+
+@jwt_required
+async def create_alert(request: Request):
+    alert = handlers.parse_alert(await json_body(request))
+    if handlers.needs_reference_price(alert):
+        handlers.set_reference_price(alert, await market.get_price(alert['symbol'], alert['asset_type']))
+    result = await run_in_threadpool(handlers.create_alert, alert_engine, request.state.identity, alert)
+    return APIResponse(result, status_code=201)
+
+
+@jwt_required
+async def delete_alert(request: Request):
+    return APIResponse(await run_in_threadpool(
+        handlers.delete_alert, alert_engine, request.state.identity, request.path_params['alert_id']))
+
+
+@jwt_required
+async def alert_notifications(request: Request):
+    return APIResponse(await run_in_threadpool(
+        handlers.deliver_notifications, alert_engine, request.state.identity, request.query_params))
+
+
+# --- JOB ENDPOINTS ---
+
+@jwt_required
+async def list_jobs(request: Request):
+    return APIResponse(await run_in_threadpool(handlers.background_jobs().status))
+
+
+@jwt_required
+async def run_job(request: Request):
+    return APIResponse(await run_in_threadpool(handlers.run_job, request.path_params['name']), status_code=202)
+
+
+# --- SYNC ENDPOINT ---
+
+@jwt_required
+async def sync(request: Request):
+    """Delta sync (same body and response as the Flask endpoint); quotes are fetched concurrently."""
+    data = await json_body(request)
+    quotes = handlers.parse_sync(data)
+    payload = await run_in_threadpool(handlers.run_sync, sync_service, data)
+    payload['quotes'] = changed_quotes(quotes, await market.get_prices(quotes))
+    body, headers = encode_sync(payload, request.headers.get('accept-encoding', ''))
+    return Response(body, headers=headers)
+
+
+# --- EXPORT ENDPOINT ---
+
+@jwt_required
+async def export_data(request: Request):
+    """Streams a stored dataset; batches are read and encoded in the thread pool."""
+    chunks, mimetype, headers = await run_in_threadpool(
+        handlers.open_export, request.path_params['dataset'], request.query_params)
+    return StreamingResponse(chunks, media_type=mimetype, headers=headers)
+
+
+# --- ML ENDPOINTS ---
+
+@jwt_required
+async def predict_probability(request: Request):
+    symbol, target_price, days, interval = handlers.parse_prediction(await json_body(request))
+    try:
+        result = await run_cpu(inference_service.predict_probability, symbol, target_price, days, interval=interval)
+        return APIResponse(result)
+    except Exception as e:
+        return msg(str(e), 500)
+
+
+@jwt_required
+async def predict_probability_batch(request: Request):
+    """Streams NDJSON lines {"index", "query", "result"} as each symbol finishes."""
+    queries = handlers.parse_batch(await json_body(request))
+    # Sync generator: Starlette iterates it in the thread pool
+    return StreamingResponse(handlers.batch_lines(queries), media_type='application/x-ndjson')
+
+
+# --- AI ENDPOINTS ---
+
+@jwt_required
+async def analyze_portfolio(request: Request):
+    ai = handlers.require_ai(ai_service)
+    portfolio, positions, currency = handlers.parse_analysis(await json_body(request))
+    try:
+        stress = None
+        if positions is not None:
+            stress = await run_cpu(stress_tester.run, positions, currency=currency)
+        return APIResponse(await run_cpu(ai.analyze_portfolio_risk, portfolio, stress_results=stress))
+    except Exception as e:
+        return msg(str(e), 500)
+
+
+@jwt_required
+async def get_recommendation(request: Request):
+    ai = handlers.require_ai(ai_service)
+    context = handlers.parse_context(await json_body(request))
+    try:
+        return APIResponse({"recommendation": await ai.get_ai_recommendation_async(context)})
+    except Exception as e:
+        return msg(str(e), 500)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    await market.close()
+
+
+routes = [
+    Route('/api/auth/login', login, methods=['POST']),
+    Route('/api/portfolio/calculate', calculate_portfolio, methods=['POST']),
+    Route('/api/portfolio/benchmark', benchmark_portfolio, methods=['POST']),
+    Route('/api/portfolio/nav', portfolio_nav, methods=['GET']),
+    Route('/api/market/history', market_history, methods=['POST']),
+    Route('/api/market/regime', market_regime, methods=['GET']),
+    Route('/api/symbols/search', search_symbols, methods=['GET']),
+    Route('/api/risk/stress-test', stress_test, methods=['POST']),
+    Route('/api/risk/scenarios', stress_scenarios, methods=['GET']),
+    Route('/api/simulation/sensitivity', sensitivity, methods=['POST']),
+    Route('/api/alerts', list_alerts, methods=['GET']),
+    Route('/api/alerts', create_alert, methods=['POST']),
+    Route('/api/alerts/notifications', alert_notifications, methods=['GET']),
+    Route('/api/alerts/{alert_id:int}', delete_alert, methods=['DELETE']),
+    Route('/api/jobs', list_jobs, methods=['GET']),
+    Route('/api/jobs/{name}/run', run_job, methods=['POST']),
+    Route('/api/sync', sync, methods=['POST']),
+    Route('/api/export/{dataset}', export_data, methods=['GET']),
+    Route('/api/ml/predict', predict_probability, methods=['POST']),
+    Route('/api/ml/predict/batch', predict_probability_batch, methods=['POST']),
+    Route('/api/ai/analyze', analyze_portfolio, methods=['POST']),
+    Route('/api/ai/recommendation', get_recommendation, methods=['POST']),
+]
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    exception_handlers={APIError: api_error},
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+)
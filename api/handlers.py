@@ -0,0 +1,365 @@
+"""
+Request parsing and response building shared by api/app.py (Flask) and api/asgi.py (ASGI).
+
+The parse_* functions take the decoded JSON body (a dict) or the query parameters (a mapping
+of strings), validate them and return the arguments for the service call. Invalid input raises
+APIError with the HTTP status and message; both apps turn it into {"msg": ...}. The apps only
+decide how each service call runs (inline, in the thread pool or in the CPU executor).
+"""
+import json
+import time
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+from services.alert_engine import KINDS as ALERT_KINDS
+from services.batch_prediction import MAX_BATCH_QUERIES, iter_batch_predictions, normalize_query
+from services.bar_aggregator import INTERVAL_SECONDS, check_history_window
+from services.downsampling import downsample_frame, rollup_ohlc, ROLLUP_RULES
+from services.export import EXPORTS, export_stream
+from services.nav_snapshots import DEFAULT_MAX_POINTS
+from services.precompute_jobs import get_background_jobs
+from services.sensitivity import sensitivity_grid
+from services.stress_test import SCENARIOS, positions_from_portfolio
+from services.sync import normalize_quotes
+
+
+class APIError(Exception):
+    """Client-facing error; rendered as {"msg": msg} with the given status."""
+
+    def __init__(self, msg: str, status: int = 400):
+        super().__init__(msg)
+        self.msg = msg
+        self.status = status
+
+
+def int_param(params: Mapping, name: str, default: int) -> int:
+    """Integer query parameter; missing or malformed values fall back to the default."""
+    try:
+        return int(params.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def flag_param(params: Mapping, name: str) -> bool:
+    return params.get(name) in ('1', 'true')
+
+
+def records(df) -> List[Dict]:
+    """DataFrame -> JSON-friendly row records (index included)."""
+    return df.reset_index().to_dict(orient='records')
+
+
+# --- AUTHENTICATION ---
+
+def parse_login(data: Dict) -> str:
+    """Mock user check; returns the identity to put in the token."""
+    if data.get('username') != 'admin' or data.get('password') != 'password':
+        raise APIError("Bad username or password", 401)
+    return data['username']
+
+
+# --- PORTFOLIO ---
+
+def parse_holdings(data: Dict) -> Tuple[Dict, Optional[str]]:
+    """
+    holdings: {'BTC': {'type': 'crypto', 'amount': 0.5}, ...}
+    Optional 'currency' selects the reporting currency (default Config.REPORTING_CURRENCY).
+    """
+    holdings = data.get('holdings')
+    if not holdings:
+        raise APIError("Missing holdings data")
+    return holdings, data.get('currency')
+
+
+def parse_benchmark(data: Dict) -> Dict:
+    """Keyword arguments for PortfolioService.get_benchmark_chart_data."""
+    return {
+        'btc_amount': data.get('btc_amount', 0),
+        'usdt_amount': data.get('usdt_amount', 0),
+        'initial_usd': data.get('initial_usd', 0),
+        'start_date_str': data.get('start_date', ''),  # Not used in service currently but in signature
+        'days': data.get('days', 365),
+        'max_points': data.get('max_points'),  # Optional: payload size stays constant for long ranges
+        'currency': data.get('currency'),  # Optional: returns measured in this currency
+        'extra_assets': data.get('extra_assets') or [],  # Optional: [{'symbol', 'type', 'amount'}]
+    }
+
+
+def parse_nav_query(params: Mapping) -> Tuple[str, Optional[float], int]:
+    """(portfolio_id, start timestamp or None for full history, max_points)"""
+    try:
+        days = float(params['days']) if params.get('days') else None
+        max_points = min(max(int(params.get('max_points', DEFAULT_MAX_POINTS)), 10), 5000)
+    except ValueError as e:
+        raise APIError(str(e))
+    start = time.time() - days * 86400 if days else None
+    return params.get('portfolio', 'wallet'), start, max_points
+
+
+def nav_response(portfolio_id: str, df) -> Dict:
+    return {'portfolio': portfolio_id, 'resolution': df.attrs['resolution'], 'points': records(df)}
+
+
+# --- MARKET DATA ---
+
+def parse_history(data: Dict) -> Tuple[str, str, float, str, Optional[int]]:
+    """
+    (symbol, asset_type, days, interval, max_points). Intraday windows are capped per interval
+    (MAX_HISTORY_DAYS); '1d' and the '1wk' / '1mo' rollups are not.
+    """
+    symbol = data.get('symbol')
+    days = data.get('days', 365)
+    interval = data.get('interval', '1d')
+    if not symbol:
+        raise APIError("Missing symbol")
+    if interval not in ROLLUP_RULES and interval not in INTERVAL_SECONDS:
+        raise APIError(f"Unsupported interval: {interval}")
+    if is_intraday(interval):
+        try:
+            days = check_history_window(interval, days)
+        except ValueError as e:
+            raise APIError(str(e))
+    return symbol, data.get('type', 'crypto'), days, interval, data.get('max_points')
+
+
+def is_intraday(interval: str) -> bool:
+    """Intraday intervals come from the local 1m bar store; everything else from daily history."""
+    return interval in INTERVAL_SECONDS and interval != '1d'
+
+
+def history_records(df, interval: str, max_points: Optional[int]) -> List[Dict]:
+    """Rolls daily bars up for '1wk' / '1mo', caps the row count and builds the records."""
+    if interval in ROLLUP_RULES:
+        df = rollup_ohlc(df, interval)
+    df = downsample_frame(df, max_points)
+    df.index.name = 'timestamp'
+    return records(df)
+
+
+def parse_search(params: Mapping) -> Tuple[str, Optional[str], int]:
+    """(prefix, asset_type, limit); limit defaults to 10, max 50."""
+    prefix = params.get('q', '').strip()
+    if not prefix:
+        raise APIError("Missing q")
+    return prefix, params.get('type') or None, min(max(int_param(params, 'limit', 10), 1), 50)
+
+
+# --- RISK ---
+
+def parse_positions(portfolio: Dict, error: str) -> List[Dict]:
+    try:
+        return positions_from_portfolio(portfolio)
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise APIError(f"{error}: {e}")
+
+
+def parse_stress_test(data: Dict) -> Tuple[List[Dict], Optional[str], Optional[List[Dict]]]:
+    """(positions, currency, scenarios or None for the full library)"""
+    portfolio = data.get('portfolio')
+    if not portfolio:
+        raise APIError("Missing portfolio data")
+
+    scenarios = None
+    if data.get('scenarios'):
+        by_name = {s['name']: s for s in SCENARIOS}
+        unknown = [name for name in data['scenarios'] if name not in by_name]
+        if unknown:
+            raise APIError(f"Unknown scenarios: {', '.join(unknown)}")
+        scenarios = [by_name[name] for name in data['scenarios']]
+    return parse_positions(portfolio, "Invalid portfolio"), data.get('currency'), scenarios
+
+
+def run_stress_test(stress_tester, positions, currency, scenarios) -> List[Dict]:
+    try:
+        return stress_tester.run(positions, currency=currency, scenarios=scenarios)
+    except (KeyError, TypeError, ValueError) as e:
+        raise APIError(f"Invalid portfolio: {e}")
+
+
+# --- SIMULATION ---
+
+def parse_sensitivity(data: Dict) -> Tuple[List[Dict], List[Dict], int]:
+    """(positions, axes, extremes)"""
+    portfolio = data.get('portfolio')
+    if not portfolio or not data.get('axes'):
+        raise APIError("Missing portfolio or axes")
+    try:
+        extremes = int(data.get('extremes', 5))
+    except (TypeError, ValueError) as e:
+        raise APIError(f"Invalid request: {e}")
+    return parse_positions(portfolio, "Invalid request"), data['axes'], extremes
+
+
+def run_sensitivity(positions: List[Dict], axes: List[Dict], extremes: int) -> Dict:
+    """Evaluates the grid; `values` becomes a nested list indexed [axis0][axis1]..."""
+    try:
+        result = sensitivity_grid(positions, axes, extremes=extremes)
+    except (KeyError, TypeError, ValueError) as e:
+        raise APIError(f"Invalid request: {e}")
+    result['values'] = result['values'].tolist()
+    return result
+
+
+# --- ALERTS ---
+
+def parse_alert(data: Dict) -> Dict:
+    """
+    Keyword arguments for AlertEngine.create_alert (without user_id). For pct_move without a
+    reference_price the caller fills it with the current quote (needs_reference_price).
+    """
+    symbol = (data.get('symbol') or '').strip().upper()
+    kind = data.get('kind')
+    if not symbol or kind not in ALERT_KINDS:
+        raise APIError(f"symbol and kind ({', '.join(ALERT_KINDS)}) are required")
+    return {
+        'symbol': symbol,
+        'asset_type': data.get('type', 'crypto'),
+        'kind': kind,
+        'threshold': data.get('threshold', 0),
+        'reference_price': data.get('reference_price'),
+        'target_price': data.get('target_price'),
+        'horizon_days': data.get('horizon_days'),
+    }
+
+
+def needs_reference_price(alert: Dict) -> bool:
+    return alert['kind'] == 'pct_move' and not alert['reference_price']
+
+
+def set_reference_price(alert: Dict, price: Optional[float]) -> Dict:
+    if not price:
+        raise APIError(f"Price not found for {alert['symbol']}", 404)
+    alert['reference_price'] = price
+    return alert
+
+
+def create_alert(alert_engine, user_id: str, alert: Dict) -> Dict:
+    try:
+        return alert_engine.create_alert(user_id, **alert)
+    except (TypeError, ValueError) as e:
+        raise APIError(str(e))
+
+
+def delete_alert(alert_engine, user_id: str, alert_id: int) -> Dict:
+    if not alert_engine.delete_alert(user_id, alert_id):
+        raise APIError("Alert not found", 404)
+    return {"deleted": alert_id}
+
+
+def deliver_notifications(alert_engine, user_id: str, params: Mapping) -> List[Dict]:
+    """Pending notifications; returned items are marked delivered unless ?peek=1 is given."""
+    items = alert_engine.pending_notifications(user_id, limit=min(int_param(params, 'limit', 100), 500))
+    if not flag_param(params, 'peek'):
+        alert_engine.mark_delivered(user_id, [item['id'] for item in items])
+    return items
+
+
+# --- JOBS ---
+
+def background_jobs():
+    scheduler = get_background_jobs()
+    if scheduler is None:
+        raise APIError("Scheduler is disabled (set SCHEDULER_ENABLED=1)", 404)
+    return scheduler
+
+
+def run_job(name: str) -> Dict:
+    """Starts a job immediately unless another worker currently holds its lease."""
+    scheduler = background_jobs()
+    if name not in scheduler.jobs:
+        raise APIError(f"Unknown job: {name}", 404)
+    if not scheduler.run_now(name):
+        raise APIError(f"{name} is already running", 409)
+    return {"started": name}
+
+
+# --- SYNC ---
+
+def parse_sync(data: Dict) -> Dict[str, Dict]:
+    """Quotes the client holds ({'BTC': {'type', 'price'}}); the rest of the body goes to SyncService."""
+    try:
+        return normalize_quotes(data.get('quotes'))
+    except (TypeError, ValueError) as e:
+        raise APIError(str(e))
+
+
+def run_sync(sync_service, data: Dict) -> Dict:
+    try:
+        return sync_service.sync(data)
+    except (TypeError, ValueError) as e:
+        raise APIError(str(e))
+
+
+# --- EXPORT ---
+
+def open_export(dataset: str, params: Mapping) -> Tuple[Iterator[bytes], str, Dict[str, str]]:
+    """(byte chunks, mimetype, headers); validation errors are raised before the response starts."""
+    if dataset not in EXPORTS:
+        raise APIError(f"Unknown dataset: {dataset}", 404)
+    try:
+        chunks, meta = export_stream(dataset, params.get('format', 'csv'),
+                                     start=params.get('start'), end=params.get('end'))
+    except ValueError as e:
+        raise APIError(str(e))
+    except RuntimeError as e:
+        raise APIError(str(e), 503)
+    return chunks, meta['mimetype'], {'Content-Disposition': f'attachment; filename="{meta["filename"]}"'}
+
+
+# --- ML ---
+
+def parse_prediction(data: Dict) -> Tuple[str, float, float, str]:
+    """(symbol, target_price, days, interval)"""
+    interval = data.get('interval', '1d')
+    if interval not in INTERVAL_SECONDS:
+        raise APIError(f"Unsupported interval: {interval}")
+    return data.get('symbol', 'BTC-USD'), data.get('target_price', 100000), data.get('days', 10), interval
+
+
+def parse_batch(data: Dict) -> List[Dict]:
+    queries = data.get('queries')
+    if not isinstance(queries, list) or not queries:
+        raise APIError("Missing queries")
+    if len(queries) > MAX_BATCH_QUERIES:
+        raise APIError(f"At most {MAX_BATCH_QUERIES} queries per batch")
+    try:
+        keys = [normalize_query(q) for q in queries]
+    except (AttributeError, TypeError, ValueError) as e:
+        raise APIError(f"Invalid query: {e}")
+    bad = next((k[3] for k in keys if k[3] not in INTERVAL_SECONDS), None)
+    if bad:
+        raise APIError(f"Unsupported interval: {bad}")
+    return queries
+
+
+def batch_lines(queries: List[Dict]) -> Iterator[str]:
+    """NDJSON lines {"index", "query", "result"} in completion order."""
+    for index, result in iter_batch_predictions(queries):
+        yield json.dumps({"index": index, "query": queries[index], "result": result},
+                         ensure_ascii=False) + "\n"
+
+
+# --- AI ---
+
+def require_ai(ai_service):
+    if not ai_service:
+        raise APIError("AI Service not initialized (Missing API Key)", 503)
+    return ai_service
+
+
+def parse_analysis(data: Dict) -> Tuple[Dict, Optional[List[Dict]], Optional[str]]:
+    """
+    (portfolio, positions, currency). Historical stress scenarios feed the risk report
+    unless "stress_test": false; positions is None then.
+    """
+    portfolio = data.get('portfolio')
+    if not portfolio:
+        raise APIError("Missing portfolio data")
+    positions = parse_positions(portfolio, "Invalid portfolio") if data.get('stress_test', True) else None
+    return portfolio, positions, data.get('currency')
+
+
+def parse_context(data: Dict) -> Dict:
+    context = data.get('context')
+    if not context:
+        raise APIError("Missing context")
+    return context
@@ -2,11 +2,10 @@ import streamlit as st
 from dotenv import load_dotenv
 import db
 
-# Services
-from multi_asset_manager import AssetManager
-
 # Views
+from views.data_providers import get_live_price, start_jobs
 from views.sidebar_view import render_sidebar
+from views.header_view import render_header_view
 from views.portfolio_view import render_portfolio_view
 from views.performance_view import render_performance_view
 from views.future_simulation_view import render_future_simulation_view
@@ -19,12 +18,14 @@ load_dotenv()
 # --- SAYFA AYARLARI ---
 st.set_page_config(page_title="FutureWallet: Karar Destek", page_icon="💎", layout="wide")
 db.init_db()
+# Gece ön hesaplama ve açılışta önbellek ısıtma (SCHEDULER_ENABLED)
+start_jobs()
 
 st.title("💎 FutureWallet: Yatırım Karar Destek Sistemi")
 
 # --- INITIALIZATION ---
-if 'asset_manager' not in st.session_state:
-    st.session_state.asset_manager = AssetManager()
+# AssetManager / PortfolioService views.data_providers içinde st.cache_resource ile
+# tüm oturumlar arasında paylaşılır; burada oturum başına nesne oluşturulmaz.
 
 # --- RENDER SIDEBAR ---
 api_key = render_sidebar()
@@ -35,22 +36,11 @@ saved_btc = st.session_state.get('saved_btc', 0.0)
 saved_usdt = st.session_state.get('saved_usdt', 0.0)
 saved_initial = st.session_state.get('saved_initial', 0.0)
 
-# Canlı fiyatı AssetManager'dan al
-try:
-    current_btc_price = st.session_state.asset_manager.get_price('BTC', 'crypto')
-    if current_btc_price is None: current_btc_price = 0.0
-except:
-    current_btc_price = 0.0
-
+# Canlı fiyat önbellekten (TTL) gelir; widget etkileşimleri yeni istek tetiklemez
+current_btc_price = get_live_price('BTC', 'crypto')
 real_value = (saved_btc * current_btc_price) + saved_usdt
-profit = real_value - saved_initial
-roi = (profit / saved_initial) * 100 if saved_initial > 0 else 0
-
-col1, col2, col3, col4 = st.columns(4)
-col1.metric("Mevcut Toplam Varlık", f"${real_value:,.0f}")
-col2.metric("Toplam Kar/Zarar", f"${profit:,.0f}", delta=f"%{roi:.1f}")
-col3.metric("Ana Para", f"${saved_initial:,.0f}")
-col4.metric("Canlı BTC Fiyatı", f"${current_btc_price:,.0f}")
+
+render_header_view(saved_btc, saved_usdt, saved_initial)
 
 st.divider()
 
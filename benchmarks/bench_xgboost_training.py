@@ -0,0 +1,149 @@
+"""
+XGBoost Training Benchmark
+future_price eğitim hattını eski XGBClassifier yapılandırmasıyla karşılaştırır:
+duvar saati süresi, tepe bellek (RSS) ve test doğruluğu.
+
+Her yapılandırma ayrı bir süreçte çalışır; böylece tepe bellek ölçümleri birbirini etkilemez.
+
+Kullanım:
+    python -m benchmarks.bench_xgboost_training                 # sentetik 4000 günlük seri
+    python -m benchmarks.bench_xgboost_training --bars 20000 --repeat 5
+    python -m benchmarks.bench_xgboost_training --symbol BTC-USD   # gerçek veri (ağ gerekir)
+"""
+
+import argparse
+import multiprocessing
+import resource
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import future_price as fp
+
+LEGACY_FEATURES = fp.FEATURES
+
+
+def synthetic_history(bars: int, seed: int = 7) -> pd.DataFrame:
+    """Rejim değiştiren geometrik Brown hareketi; günlük OHLC barları"""
+    rng = np.random.default_rng(seed)
+    drift = np.repeat(rng.normal(0.0005, 0.002, bars // 250 + 1), 250)[:bars]
+    vol = np.repeat(rng.uniform(0.015, 0.05, bars // 250 + 1), 250)[:bars]
+    close = 100 * np.exp(np.cumsum(drift + vol * rng.standard_normal(bars)))
+    high = close * (1 + np.abs(rng.normal(0, 0.01, bars)))
+    index = pd.date_range('2014-01-01', periods=bars, freq='D')
+    return pd.DataFrame({'Open': close, 'High': high, 'Low': close * 0.99, 'Close': close}, index=index)
+
+
+def run_legacy(df: pd.DataFrame, target_price: float, horizon: int, nthread: int) -> Dict:
+    """Önceki future_price akışı: pandas özellikleri + XGBClassifier (varsayılan ayarlar)"""
+    from xgboost import XGBClassifier
+
+    df = df.copy()
+    guncel = float(df['Close'].iloc[-1])
+    oran = (target_price - guncel) / guncel
+    df['Getiri'] = df['Close'].pct_change()
+    df['Volatilite'] = df['Getiri'].rolling(window=7).std()
+    df['Drawdown'] = (df['Close'] / df['High'].cummax()) - 1
+    df['Hedefe_Yakinlik'] = (target_price - df['Close']) / df['Close']
+    sma_20 = df['Close'].rolling(window=20).mean()
+    sma_50 = df['Close'].rolling(window=50).mean()
+    df['Trend_Gucu'] = (sma_20 - sma_50) / sma_50
+    indexer = pd.api.indexers.FixedForwardWindowIndexer(window_size=horizon)
+    df['Gelecek_Max'] = df['High'].rolling(window=indexer).max()
+    df['Target'] = (df['Gelecek_Max'] >= df['Close'] * (1 + oran)).astype(int)
+    df.dropna(inplace=True)
+
+    X, y = df[LEGACY_FEATURES], df['Target']
+    model = XGBClassifier(n_estimators=200, learning_rate=0.02, max_depth=5,
+                          eval_metric='logloss', n_jobs=nthread)
+    model.fit(X.iloc[:-fp.TEST_SIZE], y.iloc[:-fp.TEST_SIZE])
+    acc = float(np.mean(model.predict(X.iloc[-fp.TEST_SIZE:]) == y.iloc[-fp.TEST_SIZE:]))
+    return {'accuracy': acc, 'rounds': 200}
+
+
+def run_pipeline(df: pd.DataFrame, target_price: float, horizon: int, nthread: int,
+                 dmatrices=None) -> Dict:
+    """Yeni hat: float32 matris + QuantileDMatrix + hist + erken durdurma"""
+    X, y, _ = fp.build_dataset(fp.base_features(df), target_price, horizon)
+    dtrain, dvalid = dmatrices or fp.make_dmatrices(X, y, nthread)
+    booster = fp.train_model(dtrain, dvalid, nthread)
+    _, test_start = fp.split_dataset(len(X))
+    pred = fp.predict_proba(booster, X[test_start:]) >= 0.5
+    acc = float(np.mean(pred == y[test_start:].astype(bool)))
+    return {'accuracy': acc, 'rounds': booster.best_iteration + 1, 'dmatrices': (dtrain, dvalid)}
+
+
+def _worker(name: str, df: pd.DataFrame, target_price: float, horizon: int,
+            nthread: int, repeat: int, queue):
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    times: List[float] = []
+    result = {}
+    cached = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        if name == 'legacy':
+            result = run_legacy(df, target_price, horizon, nthread)
+        else:
+            result = run_pipeline(df, target_price, horizon, nthread,
+                                  dmatrices=cached if name == 'pipeline (cached DMatrix)' else None)
+            cached = result.pop('dmatrices')
+        times.append(time.perf_counter() - start)
+    if name == 'pipeline (cached DMatrix)' and len(times) > 1:
+        times = times[1:]  # İlk tur önbelleği doldurur
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({
+        'name': name,
+        'median_s': statistics.median(times),
+        'peak_rss_mb': rss_after / 1024,
+        'rss_growth_mb': (rss_after - rss_before) / 1024,
+        'accuracy': result['accuracy'],
+        'rounds': result['rounds'],
+    })
+
+
+def benchmark(df: pd.DataFrame, target_price: float, horizon: int, nthread: int, repeat: int) -> List[Dict]:
+    ctx = multiprocessing.get_context('spawn')
+    rows = []
+    for name in ('legacy', 'pipeline', 'pipeline (cached DMatrix)'):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_worker, args=(name, df, target_price, horizon, nthread, repeat, queue))
+        proc.start()
+        rows.append(queue.get())
+        proc.join()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="future_price eğitim hattı karşılaştırması")
+    parser.add_argument('--symbol', help="Gerçek veri için yfinance sembolü (örn. BTC-USD)")
+    parser.add_argument('--bars', type=int, default=4000, help="Sentetik seri uzunluğu")
+    parser.add_argument('--target-increase', type=float, default=0.10, help="Hedef artış oranı")
+    parser.add_argument('--horizon', type=int, default=30, help="Vade (bar)")
+    parser.add_argument('--nthread', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    if args.symbol:
+        df = fp.normalize_ohlcv(fp._load_history(args.symbol, '1d'))
+    else:
+        df = synthetic_history(args.bars)
+    if df.empty:
+        print("Veri çekilemedi.", file=sys.stderr)
+        return 1
+
+    nthread = args.nthread or fp.Config.ML_NTHREAD
+    target = float(df['Close'].iloc[-1]) * (1 + args.target_increase)
+    print(f"{len(df)} bar, hedef +{args.target_increase:.0%}, vade {args.horizon}, nthread={nthread}")
+    print(f"{'yapılandırma':<28}{'süre (s)':>10}{'tepe RSS (MB)':>15}{'artış (MB)':>12}{'doğruluk':>10}{'tur':>6}")
+    for row in benchmark(df, target, args.horizon, nthread, args.repeat):
+        print(f"{row['name']:<28}{row['median_s']:>10.3f}{row['peak_rss_mb']:>15.1f}"
+              f"{row['rss_growth_mb']:>12.1f}{row['accuracy']:>10.3f}{row['rounds']:>6}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
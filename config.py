@@ -3,4 +3,49 @@ import os
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
     GOOGLE_API_KEY = os.environ.get('GOOGLE_API_KEY')
+
+    # Upstream uç noktaları (boş bırakılırsa gerçek servisler kullanılır).
+    # Yük testinde loadtest/fake_upstream.py sunucusuna yönlendirilebilir.
+    BINANCE_API_URL = os.environ.get('BINANCE_API_URL')
+    YAHOO_API_URL = os.environ.get('YAHOO_API_URL')
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')
+
+    # Kaynak yönlendirme: yedek kaynağın tetiklendiği gecikme yüzdeliği ve devre kesici soğuma süresi
+    SOURCE_HEDGE_PERCENTILE = float(os.environ.get('SOURCE_HEDGE_PERCENTILE', 95))
+    SOURCE_COOLDOWN_SECONDS = float(os.environ.get('SOURCE_COOLDOWN_SECONDS', 30))
+    # Aynı anda uçuşta olabilecek en fazla yedek (hedge) istek; dolunca birincil kaynak beklenir
+    SOURCE_MAX_HEDGES = int(os.environ.get('SOURCE_MAX_HEDGES', 4))
+
+    # Upstream hız limitleri (istek/sn ve anlık patlama kapasitesi) ve eşzamanlı bağlantı havuzu
+    BINANCE_RATE_LIMIT = float(os.environ.get('BINANCE_RATE_LIMIT', 10))
+    BINANCE_RATE_BURST = float(os.environ.get('BINANCE_RATE_BURST', 20))
+    YAHOO_RATE_LIMIT = float(os.environ.get('YAHOO_RATE_LIMIT', 4))
+    YAHOO_RATE_BURST = float(os.environ.get('YAHOO_RATE_BURST', 8))
+    UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_POOL_SIZE', 8))
+
+    # XGBoost eğitim/tahmin thread sayısı (eşzamanlı isteklerde çekirdekler aşırı paylaşılmasın)
+    ML_NTHREAD = int(os.environ.get('ML_NTHREAD', min(4, os.cpu_count() or 1)))
+    # Toplu tahmin süreç havuzu boyutu (0 = çekirdek sayısı / ML_NTHREAD)
+    ML_BATCH_WORKERS = int(os.environ.get('ML_BATCH_WORKERS', 0))
+
+    # Portföy değerlerinin raporlandığı para birimi (TRY, EUR ...); kurlar USD bazında çekilir
+    REPORTING_CURRENCY = os.environ.get('REPORTING_CURRENCY', 'USD')
+
+    # Zamanlanmış ön hesaplama işleri (gece OHLCV/benchmark/model yenileme, açılışta önbellek ısıtma)
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '0').lower() in ('1', 'true', 'yes')
+
+    # İşçiler arası paylaşılan önbellek dosyası (boş = yalnızca süreç içi önbellek) ve yerel kopya süresi
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH', '')
+    LOCAL_CACHE_TTL = float(os.environ.get('LOCAL_CACHE_TTL', 30))
+    # Anlık fiyatların önbellekte tutulma süresi (sn; 0 = önbelleksiz)
+    QUOTE_CACHE_TTL = float(os.environ.get('QUOTE_CACHE_TTL', 10))
+
+    # Ayrı çıkarım süreci (python -m services.inference_service) Unix soketi; boşsa tahmin süreç içinde yapılır
+    INFERENCE_SOCKET = os.environ.get('INFERENCE_SOCKET', '')
+    INFERENCE_AUTHKEY = os.environ.get('INFERENCE_AUTHKEY', '')
+    # ASGI sunucusunun (api/asgi.py) async upstream bağlantı havuzu üst sınırı
+    ASYNC_UPSTREAM_CONNECTIONS = int(os.environ.get('ASYNC_UPSTREAM_CONNECTIONS', 100))
+    # Gemini bağlamı: bölüm başına token bütçesi ve aynı prompt için yanıtın önbellekte tutulma süresi (sn)
+    AI_CONTEXT_TOKENS = int(os.environ.get('AI_CONTEXT_TOKENS', 800))
+    AI_RESPONSE_TTL = float(os.environ.get('AI_RESPONSE_TTL', 60 * 60))
     # Add other configuration variables here
@@ -36,6 +36,16 @@ def init_db():
                     created_at TIMESTAMP
                 )''')
 
+    # Dışa aktarımda tarih aralığı filtreleri (services/export.py)
+    c.execute('CREATE INDEX IF NOT EXISTS idx_analyses_date ON analyses (created_at)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_history_date ON history (sim_date)')
+
+    init_ledger_tables(c)
+    init_alert_tables(c)
+    init_job_tables(c)
+    init_nav_tables(c)
+    init_sync_tables(c)
+
     # Varsayılan değerler
     c.execute('SELECT count(*) FROM portfolio')
     if c.fetchone()[0] == 0:
@@ -47,6 +57,171 @@ def init_db():
     conn.commit()
     conn.close()
 
+def init_ledger_tables(c):
+    """İşlem defteri tabloları (services/ledger.py)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS transactions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    trade_date TEXT,
+                    symbol TEXT,
+                    asset_type TEXT,
+                    side TEXT,
+                    quantity REAL,
+                    price REAL,
+                    fee REAL,
+                    source TEXT,
+                    created_at TIMESTAMP
+                )''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_transactions_asset
+                 ON transactions (symbol, asset_type, trade_date)''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (trade_date)')
+
+    # Açık/kapanmış alış lotları; FIFO satış yalnızca kalanı olan en eski lotlara dokunur
+    c.execute('''CREATE TABLE IF NOT EXISTS lots (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tx_id INTEGER,
+                    symbol TEXT,
+                    asset_type TEXT,
+                    open_date TEXT,
+                    quantity REAL,
+                    remaining REAL,
+                    unit_cost REAL
+                )''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_lots_open
+                 ON lots (symbol, asset_type, remaining, open_date, id)''')
+
+    c.execute('''CREATE TABLE IF NOT EXISTS positions (
+                    symbol TEXT,
+                    asset_type TEXT,
+                    quantity REAL,
+                    cost_basis REAL,
+                    realized_pnl REAL,
+                    last_trade_date TEXT,
+                    updated_at TIMESTAMP,
+                    PRIMARY KEY (symbol, asset_type)
+                )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_positions_date ON positions (last_trade_date)')
+
+    # Gün sonu pozisyon durumu (yalnızca işlem olan günler); geçmiş sorgular defteri yeniden oynatmaz
+    c.execute('''CREATE TABLE IF NOT EXISTS pnl_snapshots (
+                    snap_date TEXT,
+                    symbol TEXT,
+                    asset_type TEXT,
+                    quantity REAL,
+                    cost_basis REAL,
+                    realized_pnl REAL,
+                    PRIMARY KEY (symbol, asset_type, snap_date)
+                )''')
+
+def init_alert_tables(c):
+    """Fiyat alarmı tabloları (services/alert_engine.py)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS alerts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    symbol TEXT,
+                    asset_type TEXT,
+                    kind TEXT,
+                    threshold REAL,
+                    reference_price REAL,
+                    target_price REAL,
+                    horizon_days REAL,
+                    active INTEGER DEFAULT 1,
+                    created_at TIMESTAMP,
+                    triggered_at TIMESTAMP
+                )''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_alerts_active
+                 ON alerts (active, symbol, asset_type)''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_alerts_user
+                 ON alerts (user_id, active)''')
+
+    # Teslim kuyruğu; dedup_key aynı alarmın birden fazla işçiden iki kez yazılmasını önler
+    c.execute('''CREATE TABLE IF NOT EXISTS alert_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    alert_id INTEGER,
+                    user_id TEXT,
+                    dedup_key TEXT UNIQUE,
+                    payload TEXT,
+                    created_at TIMESTAMP,
+                    delivered_at TIMESTAMP
+                )''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_outbox_pending
+                 ON alert_outbox (user_id, delivered_at)''')
+
+def init_job_tables(c):
+    """Zamanlanmış iş durumu ve işçiler arası kira kilidi (services/job_scheduler.py)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS job_runs (
+                    job_name TEXT PRIMARY KEY,
+                    last_run_at REAL,
+                    last_status TEXT,
+                    last_error TEXT,
+                    last_duration REAL,
+                    run_count INTEGER DEFAULT 0,
+                    lease_owner TEXT,
+                    lease_until REAL
+                )''')
+
+def init_nav_tables(c):
+    """Portföy değeri zaman serisi ve kademeli özetleri (services/nav_snapshots.py)"""
+    c.execute('''CREATE TABLE IF NOT EXISTS nav_snapshots (
+                    portfolio_id TEXT,
+                    ts INTEGER,
+                    value REAL,
+                    currency TEXT,
+                    PRIMARY KEY (portfolio_id, ts)
+                ) WITHOUT ROWID''')
+
+    # resolution: '1h', '1d', '1w'; bucket: dilim başlangıcı (UTC epoch sn)
+    c.execute('''CREATE TABLE IF NOT EXISTS nav_rollups (
+                    portfolio_id TEXT,
+                    resolution TEXT,
+                    bucket INTEGER,
+                    open REAL,
+                    high REAL,
+                    low REAL,
+                    close REAL,
+                    mean REAL,
+                    samples INTEGER,
+                    PRIMARY KEY (portfolio_id, resolution, bucket)
+                ) WITHOUT ROWID''')
+
+# Mobil eşitlemede izlenen tablolar ve satır anahtarı ifadesi (t = satır)
+SYNC_KEYS = {
+    'portfolio': 't.id',
+    'positions': "t.symbol || '/' || t.asset_type",
+    'analyses': 't.id',
+    'history': 't.id',
+}
+
+def init_sync_tables(c):
+    """Eşitleme değişiklik günlüğü ve tetikleyicileri (services/sync.py); yalnızca var olan tablolar izlenir"""
+    # Kayıt başına yalnızca son değişiklik tutulur; seq hiçbir zaman yeniden kullanılmaz (AUTOINCREMENT)
+    c.execute('''CREATE TABLE IF NOT EXISTS change_log (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entity TEXT,
+                    entity_key TEXT,
+                    op TEXT,
+                    changed_at REAL,
+                    UNIQUE (entity, entity_key)
+                )''')
+    existing = {r[0] for r in c.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+    now = "(julianday('now') - 2440587.5) * 86400.0"
+    for table, key in SYNC_KEYS.items():
+        if table not in existing:
+            continue
+        for event, row, op in (('INSERT', 'NEW', 'upsert'), ('UPDATE', 'NEW', 'upsert'), ('DELETE', 'OLD', 'delete')):
+            # TEXT'e çevrilmezse INTEGER anahtarla karşılaştırma sayısal yapılır ve UNIQUE indeksi kullanılamaz
+            row_key = f"CAST({key.replace('t.', f'{row}.')} AS TEXT)"
+            c.execute(f'DROP TRIGGER IF EXISTS sync_{table}_{event.lower()}')
+            c.execute(f'''CREATE TRIGGER sync_{table}_{event.lower()} AFTER {event} ON {table}
+                          BEGIN
+                              DELETE FROM change_log WHERE entity='{table}' AND entity_key={row_key};
+                              INSERT INTO change_log (entity, entity_key, op, changed_at)
+                              VALUES ('{table}', {row_key}, '{op}', {now});
+                          END''')
+        # Tetikleyiciden önce yazılmış satırlar ilk eşitlemede gönderilir
+        if f'sync_{table}_insert' not in existing:
+            c.execute(f'''INSERT OR IGNORE INTO change_log (entity, entity_key, op, changed_at)
+                          SELECT '{table}', {key}, 'upsert', {now} FROM {table} t''')
+
 def get_portfolio():
     """Tüm portföy detaylarını çeker"""
     conn = sqlite3.connect(DB_NAME)
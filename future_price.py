@@ -1,128 +1,320 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from xgboost import XGBClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+import xgboost as xgb
 
-def predict_probability(symbol="BTC-USD", target_price=100000, days=10):
+from config import Config
+from services.bar_aggregator import INTERVAL_SECONDS, aggregate_bars, normalize_ohlcv, observed_bars_per_day
+from services.cache import TTLCache, get_cache
+
+# Yahoo'nun gün içi periyotlar için sunduğu en uzun geçmiş
+INTRADAY_PERIODS = {'1m': '7d', '5m': '60d', '15m': '60d', '30m': '60d', '1h': '730d'}
+
+FEATURES = ['Getiri', 'Volatilite', 'Drawdown', 'Trend_Gucu', 'Hedefe_Yakinlik']
+
+# Eski XGBClassifier(n_estimators=200, learning_rate=0.02, max_depth=5) ayarlarının karşılığı;
+# 200 tur artık üst sınır, doğrulama kaybı iyileşmeyince eğitim erken durur
+TRAIN_PARAMS = {
+    'objective': 'binary:logistic',
+    'eval_metric': 'logloss',
+    'tree_method': 'hist',
+    'max_bin': 256,
+    'eta': 0.02,
+    'max_depth': 5,
+}
+MAX_ROUNDS = 200
+EARLY_STOPPING_ROUNDS = 20
+TEST_SIZE = 200           # Son 200 bar doğruluk ölçümü için
+VALID_FRACTION = 0.15     # Eğitim kısmının son %15'i erken durdurma için (zaman sıralı)
+
+# Hedeften bağımsız özellikler (sembol/periyot başına) ve hazır DMatrix'ler.
+# DMatrix pickle edilemez, süreç içinde kalır; eğitilmiş modeller (ham UBJ) işçiler arasında paylaşılır.
+_frame_cache = get_cache('ml_frames', maxsize=32, ttl=15 * 60)
+_dmatrix_cache = TTLCache(maxsize=16, ttl=15 * 60)
+_model_cache = get_cache('ml_models', maxsize=64, ttl=15 * 60)
+# Hazır tahmin sonuçları; günlük modeller gece zamanlanmış işte yeniden eğitilir
+_result_cache = get_cache('ml_results', maxsize=256, ttl=15 * 60)
+DAILY_RESULT_TTL = 24 * 60 * 60
+
+
+def _load_history(symbol, interval):
+    """Model için bar geçmişi; Yahoo'nun sunmadığı periyotlar (4h) 1h barlardan üretilir"""
+    if interval == '1d':
+        # ATH'yi doğru bulmak için 'max' (tüm zamanlar) periyodunu çekiyoruz
+        return yf.download(symbol, period="max", interval="1d", progress=False)
+    native = interval if interval in INTRADAY_PERIODS else '1h'
+    df = yf.download(symbol, period=INTRADAY_PERIODS[native], interval=native, progress=False)
+    return aggregate_bars(normalize_ohlcv(df), interval)
+
+
+def base_features(df):
     """
-    Calculates the probability of the symbol reaching the target price within the given days.
-    Returns a dictionary with the results.
+    Hedef fiyattan bağımsız özellikleri bir kez hesaplar.
+    Dönen çerçeve Close/High ve ilk dört özelliği içerir.
     """
-    result = {
+    # yfinance returns MultiIndex columns sometimes (Price, Ticker). Drop the ticker level.
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.droplevel(1)
+
+    close = df['Close'].astype('float64')
+    high = df['High'].astype('float64')
+    frame = pd.DataFrame({'Close': close, 'High': high}, index=df.index)
+
+    # Temel değişimler
+    frame['Getiri'] = close.pct_change()
+    frame['Volatilite'] = frame['Getiri'].rolling(window=7).std()
+
+    # Drawdown (Zirveden Uzaklık)
+    frame['Drawdown'] = (close / high.cummax()) - 1
+
+    # Ortalamalar ve Momentum
+    sma_20 = close.rolling(window=20).mean()
+    sma_50 = close.rolling(window=50).mean()
+    frame['Trend_Gucu'] = (sma_20 - sma_50) / sma_50
+    return frame
+
+
+def _get_frame(symbol, interval):
+    key = (symbol, interval)
+    frame = _frame_cache.get(key)
+    if frame is None:
+        df = _load_history(symbol, interval)
+        if df.empty:
+            return df
+        frame = base_features(df)
+        _frame_cache.set(key, frame)
+    return frame
+
+
+def build_dataset(frame, target_price, horizon):
+    """
+    Eğitim matrisini tek seferde, bitişik float32 olarak üretir.
+
+    Returns:
+        (X, y, x_latest): etiketli satırlar, etiketleri ve etiketi henüz belli olmayan
+        en güncel satırın özellikleri (tahmin bu satır için yapılır)
+    """
+    close = frame['Close'].to_numpy(dtype=np.float64)
+    gereken_artis_orani = (target_price - close[-1]) / close[-1]
+
+    # Hedefe Uzaklık (Target Proximity)
+    hedefe_yakinlik = (target_price - close) / close
+    feats = np.column_stack([frame[col].to_numpy(dtype=np.float64) for col in FEATURES[:-1]] + [hedefe_yakinlik])
+
+    # --- ETİKETLEME (TARGET) ---
+    # Gelecek `horizon` bar içindeki en yüksek fiyat hedefe değdi mi?
+    indexer = pd.api.indexers.FixedForwardWindowIndexer(window_size=horizon)
+    gelecek_max = frame['High'].rolling(window=indexer).max().to_numpy(dtype=np.float64)
+    labels = gelecek_max >= close * (1 + gereken_artis_orani)
+
+    # Pencere sonu verinin dışına taşan satırların etiketi yoktur
+    valid = np.isfinite(feats).all(axis=1)
+    labeled = valid.copy()
+    labeled[len(labeled) - horizon + 1:] = False
+    labeled &= np.isfinite(gelecek_max)
+
+    X = np.ascontiguousarray(feats[labeled], dtype=np.float32)
+    y = labels[labeled].astype(np.float32)
+    latest = np.flatnonzero(valid)
+    x_latest = np.ascontiguousarray(feats[latest[-1:]], dtype=np.float32)
+    return X, y, x_latest
+
+
+def split_dataset(n):
+    """Zaman sıralı (eğitim, doğrulama, test) sınırları: [0, v) [v, t) [t, n)"""
+    test_start = n - TEST_SIZE if n > TEST_SIZE + 50 else int(n * 0.8)
+    valid_start = test_start - max(20, int(test_start * VALID_FRACTION))
+    return valid_start, test_start
+
+
+def make_dmatrices(X, y, nthread=None):
+    """Eğitim + doğrulama QuantileDMatrix'leri; doğrulama eğitimin kantil sınırlarını paylaşır"""
+    nthread = nthread or Config.ML_NTHREAD
+    valid_start, test_start = split_dataset(len(X))
+    dtrain = xgb.QuantileDMatrix(X[:valid_start], y[:valid_start],
+                                 max_bin=TRAIN_PARAMS['max_bin'], nthread=nthread)
+    dvalid = xgb.QuantileDMatrix(X[valid_start:test_start], y[valid_start:test_start],
+                                 ref=dtrain, nthread=nthread)
+    return dtrain, dvalid
+
+
+def train_model(dtrain, dvalid, nthread=None):
+    """Histogram yöntemiyle eğitir; doğrulama kaybı EARLY_STOPPING_ROUNDS tur iyileşmezse durur"""
+    params = dict(TRAIN_PARAMS, nthread=nthread or Config.ML_NTHREAD)
+    return xgb.train(params, dtrain, num_boost_round=MAX_ROUNDS,
+                     evals=[(dvalid, 'valid')],
+                     early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                     verbose_eval=False)
+
+
+def load_booster(raw, nthread=None):
+    """save_raw('ubj') çıktısından modeli yükler (best_iteration korunur)"""
+    booster = xgb.Booster(params={'nthread': nthread or Config.ML_NTHREAD})
+    booster.load_model(bytearray(raw))
+    return booster
+
+
+def predict_proba(booster, X):
+    """En iyi tura kadar olan ağaçlarla olasılık tahmini (ara DMatrix kurmadan)"""
+    return booster.inplace_predict(X, iteration_range=(0, booster.best_iteration + 1))
+
+
+def feature_importances(booster):
+    """XGBClassifier.feature_importances_ ile aynı ölçek: toplamı 1 olan 'gain' payları"""
+    scores = booster.get_score(importance_type='gain')
+    values = np.array([scores.get(f"f{i}", 0.0) for i in range(len(FEATURES))])
+    total = values.sum()
+    if total > 0:
+        values = values / total
+    return pd.Series(values, index=FEATURES).sort_values(ascending=False).to_dict()
+
+
+def _empty_result(target_price, days, interval):
+    return {
         "success": False,
         "message": "",
         "current_price": 0,
         "target_price": target_price,
         "days": days,
+        "interval": interval,
         "probability": 0,
         "accuracy": 0,
         "feature_importances": {},
         "required_increase": 0
     }
 
-    try:
-        # --- 2. VERİ ÇEKME ---
-        # ATH'yi doğru bulmak için 'max' (tüm zamanlar) periyodunu çekiyoruz
-        df = yf.download(symbol, period="max", interval="1d", progress=False)
 
-        if df.empty:
-            result["message"] = "Veri çekilemedi."
-            return result
+def prepare_prediction(symbol, target_price, days, interval="1d"):
+    """
+    Veri + özellik aşaması (model gerektirmez).
 
-        # yfinance returns MultiIndex columns sometimes (Price, Ticker). We need to flatten if necessary.
-        # But usually for single ticker it's fine. Let's ensure 'Close' exists.
-        if isinstance(df.columns, pd.MultiIndex):
-             # If columns are MultiIndex (e.g. ('Close', 'BTC-USD')), drop level 1
-             df.columns = df.columns.droplevel(1)
-
-        # En güncel kapanış
-        guncel_fiyat = float(df['Close'].iloc[-1])
-        result["current_price"] = guncel_fiyat
-
-        # Gereken yükseliş oranı
-        if target_price <= guncel_fiyat:
-            result["success"] = True
-            result["probability"] = 1.0
-            result["message"] = "Fiyat zaten hedefin üzerinde!"
-            return result
-        else:
-            gereken_artis_orani = (target_price - guncel_fiyat) / guncel_fiyat
-            result["required_increase"] = gereken_artis_orani
+    Returns:
+        (result, job): job None ise result nihaidir (veri yok, hedef zaten aşılmış, yetersiz veri).
+        job = {'key', 'X', 'y', 'x_latest', 'test_start'}; key aynı veri + hedef için aynı modeli gösterir.
+    """
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    result = _empty_result(target_price, days, interval)
 
-        # --- 3. ÖZELLİK MÜHENDİSLİĞİ (Gelişmiş) ---
-        # Temel değişimler
-        df['Getiri'] = df['Close'].pct_change()
-        df['Volatilite'] = df['Getiri'].rolling(window=7).std()
+    # --- 2. VERİ ÇEKME ---
+    frame = _get_frame(symbol, interval)
 
-        # YENİ: Drawdown (Zirveden Uzaklık)
-        df['Running_Max'] = df['High'].cummax()
-        df['Drawdown'] = (df['Close'] / df['Running_Max']) - 1
+    if frame.empty:
+        result["message"] = "Veri çekilemedi."
+        return result, None
 
-        # YENİ: Hedefe Uzaklık (Target Proximity)
-        df['Hedefe_Yakinlik'] = (target_price - df['Close']) / df['Close']
+    # En güncel kapanış
+    guncel_fiyat = float(frame['Close'].iloc[-1])
+    result["current_price"] = guncel_fiyat
 
-        # Ortalamalar ve Momentum
-        df['SMA_20'] = df['Close'].rolling(window=20).mean()
-        df['SMA_50'] = df['Close'].rolling(window=50).mean()
-        df['Trend_Gucu'] = (df['SMA_20'] - df['SMA_50']) / df['SMA_50']
+    # Gereken yükseliş oranı
+    if target_price <= guncel_fiyat:
+        result["success"] = True
+        result["probability"] = 1.0
+        result["message"] = "Fiyat zaten hedefin üzerinde!"
+        return result, None
+    result["required_increase"] = (target_price - guncel_fiyat) / guncel_fiyat
 
-        # --- 4. ETİKETLEME (TARGET) ---
-        # Gelecek VADE_GUN içindeki en yüksek fiyat hedefe değdi mi?
-        indexer = pd.api.indexers.FixedForwardWindowIndexer(window_size=days)
-        df['Gelecek_Max'] = df['High'].rolling(window=indexer).max()
+    # --- 3-4. ÖZELLİKLER VE ETİKETLER ---
+    # Ufuk takvim günü; bar sayısı geçmişin seans yoğunluğundan çıkar (hisse/emtia 7/24 işlem görmez)
+    horizon = max(1, int(round(days * observed_bars_per_day(frame.index, interval))))
+    X, y, x_latest = build_dataset(frame, target_price, horizon)
 
-        # Mantık: Gelecekteki En Yüksek Fiyat >= (Şu anki Fiyat + Gereken Artış)
-        df['Target'] = (df['Gelecek_Max'] >= df['Close'] * (1 + gereken_artis_orani)).astype(int)
+    if len(X) < 200:
+        result["message"] = "Yetersiz veri (en az 200 bar gerekli)."
+        return result, None
 
-        # NaN temizliği
-        df.dropna(inplace=True)
+    _, test_start = split_dataset(len(X))
+    job = {
+        'key': (symbol, interval, frame.index[-1], float(target_price), horizon),
+        'X': X, 'y': y, 'x_latest': x_latest, 'test_start': test_start,
+    }
+    return result, job
 
-        if len(df) < 200:
-             result["message"] = "Yetersiz veri (en az 200 gün gerekli)."
-             return result
 
-        # --- 5. MODEL EĞİTİMİ ---
-        features = ['Getiri', 'Volatilite', 'Drawdown', 'Trend_Gucu', 'Hedefe_Yakinlik']
-        X = df[features]
-        y = df['Target']
-
-        # Son 200 günü test için ayıralım
-        test_size = 200
-        if len(df) > test_size + 50:
-            X_train = X.iloc[:-test_size]
-            y_train = y.iloc[:-test_size]
-            X_test = X.iloc[-test_size:]
-            y_test = y.iloc[-test_size:]
-        else:
-            # Veri azsa standart split
-            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-
-        model = XGBClassifier(n_estimators=200, learning_rate=0.02, max_depth=5, eval_metric='logloss')
-        model.fit(X_train, y_train)
+def get_booster(job, nthread=None):
+    """Önbellekteki modeli yükler, yoksa eğitip (ham UBJ olarak) paylaşılan önbelleğe yazar"""
+    # Aynı veri + hedef için kantil taslakları tekrar hesaplanmaz
+    raw_model = _model_cache.get(job['key'])
+    if raw_model is not None:
+        # Aynı veri + hedefle başka bir işçi (veya zamanlanmış iş) modeli zaten eğitti
+        return load_booster(raw_model, nthread)
+    X, y = job['X'], job['y']
+    dtrain, dvalid = _dmatrix_cache.get_or_set(job['key'], lambda: make_dmatrices(X, y, nthread))
+    booster = train_model(dtrain, dvalid, nthread)
+    _model_cache.set(job['key'], bytes(booster.save_raw('ubj')))
+    return booster
 
-        # --- 6. SONUÇ ---
-        # Modelin başarısı
-        acc = accuracy_score(y_test, model.predict(X_test))
-        result["accuracy"] = acc
 
-        # Tahmin
-        son_veri = X.iloc[[-1]]
-        olasilik = model.predict_proba(son_veri)[0][1]
-        result["probability"] = float(olasilik)
+def prediction_rows(job):
+    """Doğruluk ölçümü (son TEST_SIZE bar) + en güncel bar; tek inplace_predict çağrısı için"""
+    return np.vstack([job['X'][job['test_start']:], job['x_latest']])
 
-        # Hangi veri daha etkili oldu?
-        imps = pd.Series(model.feature_importances_, index=features).sort_values(ascending=False)
-        result["feature_importances"] = imps.to_dict()
 
-        result["success"] = True
-        return result
+def finish_prediction(result, job, proba, importances):
+    """prediction_rows(job) üzerindeki olasılıklardan sonucu tamamlar"""
+    # Modelin başarısı (son TEST_SIZE bar, eğitimde görülmedi)
+    y_pred = proba[:-1] >= 0.5
+    result["accuracy"] = float(np.mean(y_pred == job['y'][job['test_start']:].astype(bool)))
+
+    # Tahmin: en güncel bar
+    result["probability"] = float(proba[-1])
+
+    # Hangi veri daha etkili oldu?
+    result["feature_importances"] = importances
+
+    result["success"] = True
+    return result
+
+
+def predict_probability(symbol="BTC-USD", target_price=100000, days=10, interval="1d", nthread=None):
+    """
+    Calculates the probability of the symbol reaching the target price within the given days.
+    interval selects the bar size the model is trained on ('1h' etc. for short horizons);
+    days may be fractional for intraday bars (e.g. 0.25 = 6 hours).
+    nthread caps XGBoost threads for this call (defaults to Config.ML_NTHREAD).
+    Returns a dictionary with the results.
+    """
+    if interval not in INTERVAL_SECONDS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    result = _empty_result(target_price, days, interval)
+    try:
+        result, job = prepare_prediction(symbol, target_price, days, interval)
+        if job is None:
+            return result
+
+        # --- 5. MODEL EĞİTİMİ ---
+        booster = get_booster(job, nthread)
+
+        # --- 6. SONUÇ ---
+        proba = predict_proba(booster, prediction_rows(job))
+        return finish_prediction(result, job, proba, feature_importances(booster))
 
     except Exception as e:
         result["message"] = str(e)
         return result
 
+
+def predict_probability_cached(symbol="BTC-USD", target_price=100000, days=10, interval="1d", refresh=False,
+                               compute=None):
+    """
+    predict_probability with a shared result cache. Daily-bar results are kept for a day
+    (the scheduler retrains popular pairs off-peak with refresh=True); intraday results
+    follow the 15 minute feature cache. Failed results are not cached.
+    compute replaces predict_probability on a miss (e.g. the out-of-process inference client).
+    """
+    key = (symbol, interval, float(target_price), float(days))
+    if not refresh:
+        cached = _result_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+    result = (compute or predict_probability)(symbol, target_price, days, interval=interval)
+    if result["success"]:
+        _result_cache.set(key, result, ttl=DAILY_RESULT_TTL if interval == '1d' else None)
+    return dict(result)
+
+
 if __name__ == "__main__":
     # Test run
     print("Testing module...")
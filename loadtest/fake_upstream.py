@@ -0,0 +1,428 @@
+"""
+Fake Upstream Server
+Yük testi için Binance, Yahoo Finance ve Gemini uç noktalarını taklit eden yerel sunucu.
+
+Kullanım:
+    python -m loadtest.fake_upstream --port 8600 --latency-ms 80 --error-rate 0.02
+    python -m loadtest.fake_upstream --group binance:latency_ms=400,error_rate=0.2 --group gemini:rate_limit=5
+
+Servisleri bu sunucuya yönlendirmek için:
+    BINANCE_API_URL=http://127.0.0.1:8600
+    YAHOO_API_URL=http://127.0.0.1:8600
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8600
+"""
+
+import argparse
+import math
+import random
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+from flask import Flask, jsonify, request
+
+DAY_MS = 86_400_000
+
+INTERVAL_MS = {
+    '1m': 60_000,
+    '5m': 300_000,
+    '15m': 900_000,
+    '30m': 1_800_000,
+    '1h': 3_600_000,
+    '4h': 14_400_000,
+    '1d': DAY_MS,
+    '1wk': 7 * DAY_MS,
+    '1w': 7 * DAY_MS,
+}
+
+YAHOO_RANGES = {
+    '1d': 1, '5d': 5, '1mo': 30, '3mo': 90, '6mo': 180,
+    '1y': 365, '2y': 730, '5y': 1825, '10y': 3650, 'max': 3650,
+}
+
+# Bilinen semboller için gerçekçi başlangıç fiyatları
+BASE_PRICES = {
+    'BTC': 60000.0, 'ETH': 3000.0, 'BNB': 550.0, 'SOL': 150.0,
+    'GC=F': 2300.0, '^GSPC': 5200.0, 'XU100.IS': 9500.0, 'THYAO.IS': 290.0,
+    'AAPL': 190.0, 'USDTRY=X': 32.5, 'EURUSD=X': 1.08,
+}
+
+DEFAULT_BEHAVIOR = {
+    'binance': {'latency_ms': 80.0, 'jitter_ms': 30.0},
+    'yahoo': {'latency_ms': 150.0, 'jitter_ms': 60.0},
+    'gemini': {'latency_ms': 900.0, 'jitter_ms': 300.0},
+}
+
+
+class UpstreamBehavior:
+    """Bir uç nokta grubunun gecikme, hata oranı ve hız limiti ayarları"""
+
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 0.0,
+                 error_rate: float = 0.0, rate_limit: float = 0.0,
+                 burst: Optional[float] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # rate_limit: saniyedeki istek sayısı (0 = limitsiz)
+        self.rate_limit = rate_limit
+        self.burst = burst if burst is not None else max(rate_limit, 1.0)
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'throttled': 0}
+
+    def update(self, **settings):
+        with self._lock:
+            for key, value in settings.items():
+                if key in ('latency_ms', 'jitter_ms', 'error_rate', 'rate_limit', 'burst'):
+                    setattr(self, key, float(value))
+            self._tokens = min(self._tokens, self.burst)
+
+    def to_dict(self) -> Dict:
+        return {
+            'latency_ms': self.latency_ms,
+            'jitter_ms': self.jitter_ms,
+            'error_rate': self.error_rate,
+            'rate_limit': self.rate_limit,
+            'burst': self.burst,
+            'stats': dict(self.stats),
+        }
+
+    def admit(self) -> str:
+        """İsteği kabul eder veya reddeder: 'ok', 'throttled' ya da 'error'"""
+        with self._lock:
+            self.stats['requests'] += 1
+            if self.rate_limit > 0:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate_limit)
+                self._last = now
+                if self._tokens < 1.0:
+                    self.stats['throttled'] += 1
+                    return 'throttled'
+                self._tokens -= 1.0
+            if self.error_rate > 0 and random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return 'error'
+        return 'ok'
+
+    def sleep(self):
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+
+def _synthetic_price(symbol: str, ts_ms: int) -> float:
+    """Sembol ve zamana göre deterministik fiyat (farklı pencereler tutarlı kalır)"""
+    seed = zlib.crc32(symbol.encode())
+    base = BASE_PRICES.get(symbol, 10.0 + (seed % 490))
+    t = ts_ms / DAY_MS
+    phase = (seed % 360) * math.pi / 180
+    trend = 1 + 0.25 * math.sin(t / 180 + phase)
+    swing = 1 + 0.04 * math.sin(t / 9 + phase * 2)
+    noise = 1 + 0.01 * random.Random(seed ^ (ts_ms // 60_000)).uniform(-1, 1)
+    return round(base * trend * swing * noise, 6)
+
+
+def _bars(symbol: str, step_ms: int, end_ms: int, count: int) -> List[Dict]:
+    end_ms -= end_ms % step_ms
+    start_ms = end_ms - (count - 1) * step_ms
+    bars = []
+    for i in range(count):
+        ts = start_ms + i * step_ms
+        open_ = _synthetic_price(symbol, ts)
+        close = _synthetic_price(symbol, ts + step_ms - 1)
+        spread = abs(close - open_) + open_ * 0.004
+        bars.append({
+            'ts': ts,
+            'open': open_,
+            'high': max(open_, close) + spread / 2,
+            'low': min(open_, close) - spread / 2,
+            'close': close,
+            'volume': round(1000 + (zlib.crc32(f"{symbol}{ts}".encode()) % 9000), 2),
+        })
+    return bars
+
+
+def _binance_symbols() -> List[Dict]:
+    bases = sorted({s for s in BASE_PRICES if s.isalpha() and s.isupper() and s != 'AAPL'})
+    return [{
+        'symbol': f"{base}USDT",
+        'status': 'TRADING',
+        'baseAsset': base,
+        'baseAssetPrecision': 8,
+        'quoteAsset': 'USDT',
+        'quotePrecision': 8,
+        'quoteAssetPrecision': 8,
+        'orderTypes': ['LIMIT', 'MARKET'],
+        'isSpotTradingAllowed': True,
+        'isMarginTradingAllowed': False,
+        'filters': [],
+        'permissions': ['SPOT'],
+    } for base in bases]
+
+
+def create_app(behaviors: Optional[Dict[str, UpstreamBehavior]] = None) -> Flask:
+    app = Flask(__name__)
+    if behaviors is None:
+        behaviors = {name: UpstreamBehavior(**cfg) for name, cfg in DEFAULT_BEHAVIOR.items()}
+    app.config['BEHAVIORS'] = behaviors
+
+    def gate(group: str):
+        """Gecikme uygular; hata veya limit durumunda (body, status) döner"""
+        behavior = behaviors[group]
+        outcome = behavior.admit()
+        behavior.sleep()
+        if outcome == 'throttled':
+            if group == 'binance':
+                body = {'code': -1003, 'msg': 'Too many requests; current limit exceeded.'}
+            elif group == 'gemini':
+                body = {'error': {'code': 429, 'message': 'Resource has been exhausted', 'status': 'RESOURCE_EXHAUSTED'}}
+            else:
+                body = {'chart': {'result': None, 'error': {'code': 'Too Many Requests', 'description': 'Rate limited'}}}
+            resp = jsonify(body)
+            resp.status_code = 429
+            resp.headers['Retry-After'] = '1'
+            return resp
+        if outcome == 'error':
+            if group == 'binance':
+                body = {'code': -1001, 'msg': 'Internal error; unable to process your request.'}
+            elif group == 'gemini':
+                body = {'error': {'code': 503, 'message': 'The model is overloaded.', 'status': 'UNAVAILABLE'}}
+            else:
+                body = {'chart': {'result': None, 'error': {'code': 'Internal Server Error', 'description': 'Upstream error'}}}
+            resp = jsonify(body)
+            resp.status_code = 503
+            return resp
+        return None
+
+    # --- BINANCE (ccxt) ---
+
+    @app.route('/api/v3/ping')
+    def binance_ping():
+        return gate('binance') or jsonify({})
+
+    @app.route('/api/v3/time')
+    def binance_time():
+        return gate('binance') or jsonify({'serverTime': int(time.time() * 1000)})
+
+    @app.route('/api/v3/exchangeInfo')
+    def binance_exchange_info():
+        return gate('binance') or jsonify({
+            'timezone': 'UTC',
+            'serverTime': int(time.time() * 1000),
+            'rateLimits': [],
+            'symbols': _binance_symbols(),
+        })
+
+    @app.route('/api/v3/ticker/24hr')
+    def binance_ticker():
+        failure = gate('binance')
+        if failure:
+            return failure
+        market_id = request.args.get('symbol', 'BTCUSDT')
+        base = market_id[:-4] if market_id.endswith('USDT') else market_id
+        now = int(time.time() * 1000)
+        last = _synthetic_price(base, now)
+        open_ = _synthetic_price(base, now - DAY_MS)
+        return jsonify({
+            'symbol': market_id,
+            'priceChange': str(last - open_),
+            'priceChangePercent': str(round((last / open_ - 1) * 100, 3)),
+            'weightedAvgPrice': str((last + open_) / 2),
+            'prevClosePrice': str(open_),
+            'lastPrice': str(last),
+            'lastQty': '0.01',
+            'bidPrice': str(last * 0.9999),
+            'bidQty': '1.0',
+            'askPrice': str(last * 1.0001),
+            'askQty': '1.0',
+            'openPrice': str(open_),
+            'highPrice': str(max(last, open_) * 1.01),
+            'lowPrice': str(min(last, open_) * 0.99),
+            'volume': '12345.6',
+            'quoteVolume': str(12345.6 * last),
+            'openTime': now - DAY_MS,
+            'closeTime': now,
+            'firstId': 1,
+            'lastId': 1000,
+            'count': 1000,
+        })
+
+    @app.route('/api/v3/klines')
+    def binance_klines():
+        failure = gate('binance')
+        if failure:
+            return failure
+        market_id = request.args.get('symbol', 'BTCUSDT')
+        base = market_id[:-4] if market_id.endswith('USDT') else market_id
+        step = INTERVAL_MS.get(request.args.get('interval', '1d'), DAY_MS)
+        limit = min(int(request.args.get('limit', 500)), 1000)
+        now = int(time.time() * 1000)
+        start = request.args.get('startTime', type=int)
+        end = request.args.get('endTime', type=int, default=now)
+        if start is not None:
+            # Binance gibi: açılış zamanı startTime'a eşit/sonraki ilk bardan başla
+            start += -start % step
+            end = min(now, end, start + (limit - 1) * step)
+            count = max(0, min(limit, (end - start) // step + 1))
+        else:
+            count = limit
+        rows = []
+        for bar in _bars(base, step, end, count):
+            rows.append([
+                bar['ts'], str(bar['open']), str(bar['high']), str(bar['low']),
+                str(bar['close']), str(bar['volume']), bar['ts'] + step - 1,
+                str(bar['volume'] * bar['close']), 100, '0', '0', '0',
+            ])
+        return jsonify(rows)
+
+    # --- YAHOO FINANCE (chart v8) ---
+
+    @app.route('/v8/finance/chart/<path:symbol>')
+    def yahoo_chart(symbol):
+        failure = gate('yahoo')
+        if failure:
+            return failure
+        interval = request.args.get('interval', '1d')
+        step = INTERVAL_MS.get(interval, DAY_MS)
+        now = int(time.time() * 1000)
+        period1 = request.args.get('period1', type=int)
+        period2 = request.args.get('period2', type=int)
+        if period1 is not None:
+            end = (period2 * 1000) if period2 else now
+            count = max(1, (min(end, now) - period1 * 1000) // step)
+        else:
+            days = YAHOO_RANGES.get(request.args.get('range', '1mo'), 30)
+            end = now
+            count = max(1, days * DAY_MS // step)
+        bars = _bars(symbol, step, min(end, now), int(count))
+        currency = 'TRY' if symbol.endswith('.IS') else 'USD'
+        return jsonify({'chart': {'result': [{
+            'meta': {
+                'currency': currency,
+                'symbol': symbol,
+                'regularMarketPrice': bars[-1]['close'],
+                'dataGranularity': interval,
+            },
+            'timestamp': [b['ts'] // 1000 for b in bars],
+            'indicators': {
+                'quote': [{
+                    'open': [b['open'] for b in bars],
+                    'high': [b['high'] for b in bars],
+                    'low': [b['low'] for b in bars],
+                    'close': [b['close'] for b in bars],
+                    'volume': [b['volume'] for b in bars],
+                }],
+                'adjclose': [{'adjclose': [b['close'] for b in bars]}],
+            },
+        }], 'error': None}})
+
+    # --- GEMINI (generativelanguage v1beta REST) ---
+
+    @app.route('/v1beta/models')
+    def gemini_models():
+        failure = gate('gemini')
+        if failure:
+            return failure
+        names = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-pro']
+        return jsonify({'models': [{
+            'name': f"models/{name}",
+            'baseModelId': name,
+            'version': '001',
+            'displayName': name,
+            'description': 'Fake upstream model',
+            'inputTokenLimit': 1048576,
+            'outputTokenLimit': 8192,
+            'supportedGenerationMethods': ['generateContent', 'countTokens'],
+        } for name in names]})
+
+    @app.route('/v1beta/models/<path:model_action>', methods=['POST'])
+    def gemini_generate(model_action):
+        failure = gate('gemini')
+        if failure:
+            return failure
+        model, _, action = model_action.partition(':')
+        if action != 'generateContent':
+            return jsonify({'error': {'code': 404, 'message': f"Unknown action {action}", 'status': 'NOT_FOUND'}}), 404
+        payload = request.get_json(silent=True) or {}
+        prompt_chars = sum(len(part.get('text', ''))
+                           for content in payload.get('contents', [])
+                           for part in content.get('parts', []))
+        text = (
+            "📊 Durum Analizi:\nSahte yanıt (yük testi).\n\n"
+            "💡 Opsiyon 1: Mevcut durumu koru\n✅ Artıları: ...\n❌ Eksileri: ...\n\n"
+            "💡 Opsiyon 2: Dengele\n✅ Artıları: ...\n❌ Eksileri: ...\n\n"
+            "⚠️ UYARI: Bu bir AI tahminidir. Lisanslı danışman görüşü alınız."
+        )
+        prompt_tokens = prompt_chars // 4
+        return jsonify({
+            'candidates': [{
+                'content': {'parts': [{'text': text}], 'role': 'model'},
+                'finishReason': 'STOP',
+                'index': 0,
+            }],
+            'usageMetadata': {
+                'promptTokenCount': prompt_tokens,
+                'candidatesTokenCount': len(text) // 4,
+                'totalTokenCount': prompt_tokens + len(text) // 4,
+            },
+            'modelVersion': model.split('/')[-1],
+        })
+
+    # --- YÖNETİM ---
+
+    @app.route('/_fake/config', methods=['GET', 'POST'])
+    def fake_config():
+        """Test sırasında davranışı değiştirmek için: {"binance": {"error_rate": 0.5}}"""
+        if request.method == 'POST':
+            for group, settings in (request.get_json(silent=True) or {}).items():
+                if group in behaviors:
+                    behaviors[group].update(**settings)
+        return jsonify({name: b.to_dict() for name, b in behaviors.items()})
+
+    return app
+
+
+def _parse_group(spec: str):
+    """'binance:latency_ms=200,error_rate=0.1' -> ('binance', {...})"""
+    group, _, settings = spec.partition(':')
+    values = {}
+    for item in filter(None, settings.split(',')):
+        key, _, value = item.partition('=')
+        values[key.strip()] = float(value)
+    return group.strip(), values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FutureWallet sahte upstream sunucusu")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--latency-ms', type=float, default=None, help="Tüm gruplar için temel gecikme")
+    parser.add_argument('--jitter-ms', type=float, default=None)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="0-1 arası hata oranı")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Saniyedeki istek limiti (0 = limitsiz)")
+    parser.add_argument('--group', action='append', default=[],
+                        help="Grup bazlı ayar, örn. binance:latency_ms=300,error_rate=0.1")
+    args = parser.parse_args(argv)
+
+    behaviors = {}
+    for name, defaults in DEFAULT_BEHAVIOR.items():
+        cfg = dict(defaults, error_rate=args.error_rate, rate_limit=args.rate_limit)
+        if args.latency_ms is not None:
+            cfg['latency_ms'] = args.latency_ms
+        if args.jitter_ms is not None:
+            cfg['jitter_ms'] = args.jitter_ms
+        behaviors[name] = UpstreamBehavior(**cfg)
+    for spec in args.group:
+        group, settings = _parse_group(spec)
+        if group not in behaviors:
+            parser.error(f"Bilinmeyen grup: {group}")
+        behaviors[group].update(**settings)
+
+    app = create_app(behaviors)
+    app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""
+Load Generator
+api/app.py uç noktalarına eşzamanlı yük üretir; uç nokta bazında throughput ve p50/p99 gecikme raporlar.
+
+Kullanım:
+    python -m loadtest.load_generator --base-url http://127.0.0.1:5000 --concurrency 32 --duration 30
+    python -m loadtest.load_generator --scenario quote=5 --scenario benchmark=1 --requests 2000
+"""
+
+import argparse
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+# name -> (method, path, json body)
+SCENARIOS = {
+    'quote': ('POST', '/api/portfolio/calculate', {
+        'holdings': {'BTC': {'type': 'crypto', 'amount': 0.5}},
+    }),
+    'portfolio': ('POST', '/api/portfolio/calculate', {
+        'holdings': {
+            'BTC': {'type': 'crypto', 'amount': 0.5},
+            'THYAO': {'type': 'stock_tr', 'amount': 100},
+            'GC=F': {'type': 'commodity', 'amount': 2},
+        },
+    }),
+    'benchmark': ('POST', '/api/portfolio/benchmark', {
+        'btc_amount': 0.1, 'usdt_amount': 500, 'initial_usd': 5000, 'days': 365,
+    }),
+    'predict': ('POST', '/api/ml/predict', {
+        'symbol': 'BTC-USD', 'target_price': 100000, 'days': 30,
+    }),
+    'analyze': ('POST', '/api/ai/analyze', {
+        'portfolio': {
+            'BTC': {'type': 'crypto', 'value': 30000, 'returns': [0.01, -0.02, 0.03]},
+            'GC=F': {'type': 'commodity', 'value': 10000, 'returns': [0.001, 0.002]},
+        },
+    }),
+    'recommendation': ('POST', '/api/ai/recommendation', {
+        'context': {'portfolio': 'BTC: 0.5, Nakit: 500$', 'user_question': 'Ne yapmalıyım?'},
+    }),
+}
+
+DEFAULT_MIX = {'quote': 6, 'portfolio': 3, 'benchmark': 2, 'recommendation': 1}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Sıralı listede en yakın sıra (nearest-rank) yüzdeliği"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class LoadReport:
+    """Uç nokta bazında gecikme ve hata kayıtları (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+        self.status_counts: Dict[str, Dict[int, int]] = {}
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def record(self, name: str, latency_s: float, status: int):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(latency_s)
+            counts = self.status_counts.setdefault(name, {})
+            counts[status] = counts.get(status, 0) + 1
+            if status == 0 or status >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def summary(self) -> List[Dict]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        rows = []
+        for name in sorted(self.latencies):
+            values = sorted(self.latencies[name])
+            rows.append({
+                'endpoint': name,
+                'requests': len(values),
+                'errors': self.errors.get(name, 0),
+                'rps': len(values) / elapsed if elapsed > 0 else 0.0,
+                'p50_ms': percentile(values, 50) * 1000,
+                'p99_ms': percentile(values, 99) * 1000,
+                'max_ms': values[-1] * 1000,
+                'statuses': dict(sorted(self.status_counts[name].items())),
+            })
+        return rows
+
+    def render(self) -> str:
+        header = f"{'endpoint':<16}{'req':>8}{'err':>7}{'rps':>9}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}  statuses"
+        lines = [header, '-' * len(header)]
+        total = 0
+        for row in self.summary():
+            total += row['requests']
+            lines.append(
+                f"{row['endpoint']:<16}{row['requests']:>8}{row['errors']:>7}{row['rps']:>9.1f}"
+                f"{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['max_ms']:>10.1f}  {row['statuses']}"
+            )
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        lines.append(f"Toplam: {total} istek, {elapsed:.1f} sn, {total / elapsed if elapsed else 0:.1f} istek/sn")
+        return "\n".join(lines)
+
+
+def login(base_url: str, username: str, password: str) -> str:
+    resp = requests.post(f"{base_url}/api/auth/login",
+                         json={'username': username, 'password': password}, timeout=10)
+    resp.raise_for_status()
+    return resp.json()['access_token']
+
+
+def run_load(base_url: str, mix: Dict[str, int], concurrency: int = 16,
+             duration: Optional[float] = 30.0, total_requests: Optional[int] = None,
+             token: Optional[str] = None, timeout: float = 60.0) -> LoadReport:
+    """
+    Ağırlıklı senaryo karışımıyla yük üretir.
+    duration veya total_requests'ten hangisi önce dolarsa test biter.
+    """
+    names: List[str] = []
+    weights: List[int] = []
+    for name, weight in mix.items():
+        if name not in SCENARIOS:
+            raise ValueError(f"Bilinmeyen senaryo: {name}")
+        names.append(name)
+        weights.append(weight)
+
+    report = LoadReport()
+    deadline = time.perf_counter() + duration if duration else None
+    counter = {'issued': 0}
+    counter_lock = threading.Lock()
+    headers = {'Authorization': f"Bearer {token}"} if token else {}
+
+    def next_request() -> Optional[Tuple[str, str, str, Dict]]:
+        with counter_lock:
+            if total_requests is not None and counter['issued'] >= total_requests:
+                return None
+            if deadline is not None and time.perf_counter() >= deadline:
+                return None
+            counter['issued'] += 1
+        name = random.choices(names, weights=weights)[0]
+        return (name,) + SCENARIOS[name]
+
+    def worker():
+        session = requests.Session()
+        while True:
+            job = next_request()
+            if job is None:
+                return
+            name, method, path, body = job
+            start = time.perf_counter()
+            try:
+                resp = session.request(method, f"{base_url}{path}", json=body,
+                                       headers=headers, timeout=timeout)
+                status = resp.status_code
+            except requests.RequestException:
+                status = 0
+            report.record(name, time.perf_counter() - start, status)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    report.finished = time.perf_counter()
+    return report
+
+
+def _parse_mix(specs: List[str]) -> Dict[str, int]:
+    if not specs:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for spec in specs:
+        name, _, weight = spec.partition('=')
+        mix[name] = int(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FutureWallet API yük üreticisi")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=30.0, help="Saniye (0 = sınırsız)")
+    parser.add_argument('--requests', type=int, default=None, help="Toplam istek sayısı")
+    parser.add_argument('--scenario', action='append', default=[],
+                        help=f"isim=ağırlık; seçenekler: {', '.join(SCENARIOS)}")
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='password')
+    args = parser.parse_args(argv)
+
+    token = login(args.base_url, args.username, args.password)
+    report = run_load(args.base_url, _parse_mix(args.scenario), concurrency=args.concurrency,
+                      duration=args.duration or None, total_requests=args.requests, token=token)
+    print(report.render())
+
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,21 @@ Kripto + Borsa + Emtia + Forex varlıklarını yönetir
 import yfinance as yf
 import ccxt
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Dict, List
+import requests
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from services.source_router import SourceRouter, get_default_router
+from services.downsampling import downsample_frame
+from services.bar_aggregator import (
+    BarStore, INTERVAL_SECONDS, BASE_INTERVAL, aggregate_bars, check_history_window, normalize_ohlcv
+)
+from services.fx_service import FX_UNAVAILABLE, FXService, quote_currency
+from services.cache import get_cache
+from services.upstream_scheduler import (
+    UpstreamScheduler, get_upstream_scheduler, PRIORITY_QUOTE, PRIORITY_HISTORY
+)
 
 class AssetManager:
     """Çoklu varlık türünü tek bir arayüzden yönetir"""
@@ -19,9 +32,71 @@ class AssetManager:
         'commodity': {'prefix': '', 'source': 'yfinance'},    # Altın, Petrol
         'forex': {'prefix': '=X', 'source': 'yfinance'}       # Döviz çiftleri
     }
+
+    # Binance tek çağrıda en fazla 1000 bar döndürür; daha uzun pencereler sayfalanır
+    CCXT_PAGE_LIMIT = 1000
+    # Tek çağrıda çekilecek en fazla sayfa; sınırlı pencerelerde (MAX_HISTORY_DAYS) hiç aşılmaz
+    CCXT_MAX_PAGES = 50
+    # Yahoo'nun doğrudan sunduğu periyotlar; diğerleri (4h) 1h barlardan üretilir
+    YAHOO_INTERVALS = {'1m', '5m', '15m', '30m', '1h', '1d'}
     
-    def __init__(self):
-        self.exchange = ccxt.binance()
+    def __init__(self, binance_url: Optional[str] = None, yahoo_url: Optional[str] = None,
+                 router: Optional[SourceRouter] = None,
+                 scheduler: Optional[UpstreamScheduler] = None):
+        binance_url = binance_url or Config.BINANCE_API_URL
+        self.binance_url = binance_url
+        self.yahoo_url = (yahoo_url or Config.YAHOO_API_URL or '').rstrip('/') or None
+
+        if binance_url:
+            # Yerel/sahte uç nokta: yalnızca spot piyasalar (futures uç noktaları taklit edilmez)
+            self.exchange = ccxt.binance({
+                'urls': {'api': {'public': f"{binance_url.rstrip('/')}/api/v3"}},
+                'options': {'fetchMarkets': {'types': ['spot']}},
+            })
+        else:
+            self.exchange = ccxt.binance()
+
+        self._http = requests.Session() if self.yahoo_url else None
+        # Kaynak sağlığı süreç genelinde paylaşılır (devre kesici + hedged istek)
+        self.router = router if router else get_default_router()
+        # Hız limiti, öncelik ve istek birleştirme de süreç genelinde ortak
+        self.scheduler = scheduler if scheduler else get_upstream_scheduler()
+        # Gün içi periyotlar için 1m barlar bir kez indirilir, sonra yalnızca delta çekilir
+        self.bar_store = BarStore()
+        # Kote para birimi -> raporlama para birimi dönüşümü (kurlar toplu çekilir)
+        self.fx = FXService(self)
+        # Anlık fiyatlar işçiler arasında paylaşılır (SHARED_CACHE_PATH tanımlıysa)
+        self._quotes = get_cache('quotes', maxsize=1024, ttl=Config.QUOTE_CACHE_TTL)
+        # Yeni çekilen ya da değişen anlık fiyatta çağrılır: fn(symbol, asset_type, price) (ör. alarm motoru)
+        self.quote_listeners: List[Callable[[str, str, float], None]] = []
+        # Dinleyicilere son bildirilen fiyat; önbellekten gelen aynı fiyat tekrar bildirilmez
+        self._notified: Dict[Tuple[str, str], float] = {}
+
+    def add_quote_listener(self, listener: Callable[[str, str, float], None]):
+        if listener not in self.quote_listeners:
+            self.quote_listeners.append(listener)
+
+    def _notify_quote(self, symbol: str, asset_type: str, price: float, fresh: bool = True):
+        """
+        fresh: fiyat bu çağrıda upstream'den çekildi. Önbellek isabetlerinde dinleyiciler yalnızca
+        fiyat son bildirilenden farklıysa (ör. başka işçi paylaşılan önbelleği güncellediyse) çağrılır.
+        """
+        key = (symbol, asset_type)
+        if not fresh and self._notified.get(key) == price:
+            return
+        self._notified[key] = price
+        for listener in self.quote_listeners:
+            try:
+                listener(symbol, asset_type, price)
+            except Exception as e:
+                # Dinleyici hatası fiyat yanıtını etkilemez
+                print(f"Fiyat dinleyicisi hatası ({symbol}): {e}")
+
+    def _upstream(self, source: str, key: tuple, fn, priority: int):
+        """Çağrıyı paylaşılan upstream zamanlayıcısı üzerinden yürütür"""
+        result = self.scheduler.run(source, key, fn, priority)
+        # Birleştirilen istekler aynı nesneyi paylaşır; çağıranın değişiklikleri birbirine sızmasın
+        return result.copy() if isinstance(result, pd.DataFrame) else result
     
     def get_price(self, symbol: str, asset_type: str) -> float:
         """
@@ -34,24 +109,42 @@ class AssetManager:
         Returns:
             Güncel fiyat (float)
         """
+        cache_quotes = Config.QUOTE_CACHE_TTL > 0
+        price = self._quotes.get((symbol, asset_type)) if cache_quotes else None
+        fresh = price is None
+        if fresh:
+            price = self._get_price(symbol, asset_type)
+            if price is not None and cache_quotes:
+                self._quotes.set((symbol, asset_type), price)
+        if price is not None and self.quote_listeners:
+            self._notify_quote(symbol, asset_type, price, fresh)
+        return price
+
+    def _get_price(self, symbol: str, asset_type: str) -> Optional[float]:
         try:
             config = self.ASSET_TYPES[asset_type]
             
             if config['source'] == 'ccxt':
-                # Kripto için Binance
-                # Binance REST API bazen TR'den bloklanabilir veya hata verebilir
-                try:
-                    ticker = self.exchange.fetch_ticker(f"{symbol}/USDT")
-                    return ticker['last']
-                except Exception as e:
-                    # Fallback to yfinance if ccxt fails (e.g. BTC-USD)
-                    # print(f"CCXT Error ({symbol}): {e}, trying yfinance...")
-                    return self._get_yfinance_price(f"{symbol}-USD")
+                # Kripto için Binance, yedek olarak yfinance (BTC-USD).
+                # Binance REST API bazen TR'den bloklanabilir veya yavaş yanıt verebilir;
+                # router yavaş kaynağı yedekle yarıştırır, hata veren kaynağı bir süre atlar.
+                return self.router.call([
+                    ('binance', lambda: self._upstream(
+                        'binance', ('ticker', symbol),
+                        lambda: self._fetch_ccxt_price(symbol), PRIORITY_QUOTE)),
+                    ('yahoo', lambda: self._upstream(
+                        'yahoo', ('quote', f"{symbol}-USD"),
+                        lambda: self._fetch_yfinance_price(f"{symbol}-USD"), PRIORITY_QUOTE)),
+                ])
             
             elif config['source'] == 'yfinance':
                 # Borsa/Emtia/Forex için Yahoo Finance
                 full_symbol = f"{symbol}{config['prefix']}"
-                return self._get_yfinance_price(full_symbol)
+                return self.router.call([
+                    ('yahoo', lambda: self._upstream(
+                        'yahoo', ('quote', full_symbol),
+                        lambda: self._fetch_yfinance_price(full_symbol), PRIORITY_QUOTE)),
+                ])
                 
             return None
             
@@ -59,64 +152,250 @@ class AssetManager:
             print(f"Fiyat çekme hatası ({symbol}): {e}")
             return None
 
+    def _fetch_ccxt_price(self, symbol: str) -> Optional[float]:
+        """Binance son fiyatı; bilinmeyen sembol kaynak hatası sayılmaz (None döner)"""
+        try:
+            ticker = self.exchange.fetch_ticker(f"{symbol}/USDT")
+        except ccxt.BadSymbol:
+            return None
+        return ticker['last']
+
+    def _fetch_yfinance_price(self, symbol: str) -> Optional[float]:
+        """Ağ hatalarını yükseltir (router sağlık skoru için); veri yoksa None döner"""
+        # period='1d' fetches the most recent data
+        data = self._download(symbol, period="1d")
+        if not data.empty:
+            # 'Close' might be multi-index or simple series depending on yfinance version
+            # Ensure we get a scalar
+            val = data['Close'].iloc[-1]
+            if isinstance(val, pd.Series):
+                val = val.iloc[0]
+            return float(val)
+        return None
+
     def _get_yfinance_price(self, symbol: str) -> float:
         try:
-            # period='1d' fetches the most recent data
-            data = yf.download(symbol, period="1d", progress=False)
-            if not data.empty:
-                # 'Close' might be multi-index or simple series depending on yfinance version
-                # Ensure we get a scalar
-                val = data['Close'].iloc[-1]
-                if isinstance(val, pd.Series):
-                    val = val.iloc[0]
-                return float(val)
+            return self._fetch_yfinance_price(symbol)
         except Exception as e:
             print(f"YFinance Error ({symbol}): {e}")
         return None
     
-    def get_historical_data(self, symbol: str, asset_type: str, 
-                           days: int = 365) -> pd.DataFrame:
+    def _download(self, symbol: str, start: Optional[datetime] = None,
+                  period: Optional[str] = None, interval: str = '1d') -> pd.DataFrame:
+        """yf.download sarmalayıcısı; YAHOO_API_URL tanımlıysa chart uç noktasını doğrudan çağırır"""
+        if not self.yahoo_url:
+            # Paralellik upstream zamanlayıcısının havuzunda; yfinance kendi thread'lerini açmasın
+            if start is not None:
+                return yf.download(symbol, start=start, interval=interval, progress=False, threads=False)
+            return yf.download(symbol, period=period or "1mo", interval=interval,
+                               progress=False, threads=False)
+
+        params = {'interval': interval}
+        if start is not None:
+            params['period1'] = int(start.timestamp())
+            params['period2'] = int(datetime.now().timestamp())
+        else:
+            params['range'] = period or "1mo"
+        resp = self._http.get(f"{self.yahoo_url}/v8/finance/chart/{symbol}", params=params, timeout=10)
+        resp.raise_for_status()
+        return self._parse_yahoo_chart(resp.json())
+
+    @staticmethod
+    def _parse_yahoo_chart(payload: Dict) -> pd.DataFrame:
+        """Yahoo chart JSON yanıtını yfinance ile aynı kolon yapısına çevirir"""
+        result = (payload.get('chart') or {}).get('result') or []
+        if not result or not result[0].get('timestamp'):
+            return pd.DataFrame()
+        chart = result[0]
+        quote = chart['indicators']['quote'][0]
+        df = pd.DataFrame({
+            'Open': quote.get('open'),
+            'High': quote.get('high'),
+            'Low': quote.get('low'),
+            'Close': quote.get('close'),
+            'Volume': quote.get('volume'),
+        }, index=pd.to_datetime(chart['timestamp'], unit='s'))
+        df.index.name = 'Date'
+        return df.dropna(subset=['Close'])
+
+    def get_closes(self, symbols: List[str], start: Optional[datetime] = None,
+                   period: str = '5d', priority: int = PRIORITY_QUOTE) -> pd.DataFrame:
+        """
+        Birden çok Yahoo sembolünün kapanışlarını tek istekte çeker (kolon = sembol).
+        Kur matrisi gibi toplu ihtiyaçlar için; her sembol ayrı istek gerektirmez.
+        """
+        symbols = sorted(set(symbols))
+        key = ('closes', tuple(symbols), start.strftime('%Y-%m-%d') if start else period)
+        return self.router.call([
+            ('yahoo', lambda: self._upstream(
+                'yahoo', key, lambda: self._download_closes(symbols, start, period), priority)),
+        ], is_valid=lambda df: df is not None and not df.empty)
+
+    def _download_closes(self, symbols: List[str], start: Optional[datetime],
+                         period: str) -> pd.DataFrame:
+        if self.yahoo_url:
+            # Chart uç noktası tek sembol kabul eder
+            closes = {}
+            for symbol in symbols:
+                df = self._download(symbol, start=start, period=period)
+                if not df.empty:
+                    closes[symbol] = df['Close']
+            return pd.DataFrame(closes)
+
+        if start is not None:
+            df = yf.download(symbols, start=start, progress=False, threads=False)
+        else:
+            df = yf.download(symbols, period=period, progress=False, threads=False)
+        if df.empty:
+            return pd.DataFrame()
+        closes = df['Close']
+        if isinstance(closes, pd.Series):
+            closes = closes.to_frame(symbols[0])
+        if closes.index.tz is not None:
+            closes.index = closes.index.tz_localize(None)
+        return closes
+
+    def get_historical_data(self, symbol: str, asset_type: str,
+                           days: int = 365, interval: str = '1d',
+                           priority: int = PRIORITY_HISTORY) -> pd.DataFrame:
         """
         Geçmiş fiyat verisini çeker
+
+        Args:
+            days: Geriye dönük pencere (gün); bar sayısından bağımsızdır
+            interval: '1m', '5m', '15m', '30m', '1h', '4h' veya '1d'
+            priority: Upstream öncelik sınıfı (arka plan işleri PRIORITY_BACKFILL kullanır)
         """
+        if interval not in INTERVAL_SECONDS:
+            raise ValueError(f"Desteklenmeyen periyot: {interval}")
+        if interval != '1d':
+            days = check_history_window(interval, days)
         try:
+            if interval != '1d':
+                return self._get_intraday_history(symbol, asset_type, days, interval, priority)
+
             config = self.ASSET_TYPES[asset_type]
             start_date = datetime.now() - timedelta(days=days)
+            has_rows = lambda df: df is not None and not df.empty
+            day_key = start_date.strftime('%Y-%m-%d')
             
             # Prefer yfinance for historical data generally as it's easier for plotting (except maybe very specific crypto)
+
             if config['source'] == 'yfinance':
                 full_symbol = f"{symbol}{config['prefix']}"
-                data = yf.download(full_symbol, start=start_date, progress=False)
-                return data
+                return self.router.call([
+                    ('yahoo', lambda: self._upstream(
+                        'yahoo', ('history', full_symbol, day_key),
+                        lambda: self._download(full_symbol, start=start_date), priority)),
+                ], is_valid=has_rows)
             
             elif config['source'] == 'ccxt':
-                # Try CCXT first
-                try:
-                    ohlcv = self.exchange.fetch_ohlcv(
-                        f"{symbol}/USDT",
-                        timeframe='1d',
-                        limit=days
-                    )
-                    df = pd.DataFrame(
-                        ohlcv,
-                        columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
-                    )
-                    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-                    df.set_index('timestamp', inplace=True)
-                    # Rename close to Close to match yfinance
-                    df.rename(columns={'close': 'Close'}, inplace=True)
-                    return df
-                except Exception:
-                    # Fallback to yfinance for crypto history if binance fails
-                    full_symbol = f"{symbol}-USD"
-                    data = yf.download(full_symbol, start=start_date, progress=False)
-                    return data
-                
+                # CCXT öncelikli; Binance yavaş/bloklu ise yfinance (BTC-USD) devreye girer
+                return self.router.call([
+                    ('binance', lambda: self._upstream(
+                        'binance', ('ohlcv', symbol, days),
+                        lambda: self._fetch_ccxt_history(symbol, days), priority)),
+                    ('yahoo', lambda: self._upstream(
+                        'yahoo', ('history', f"{symbol}-USD", day_key),
+                        lambda: self._download(f"{symbol}-USD", start=start_date), priority)),
+                ], is_valid=has_rows)
+
         except Exception as e:
             print(f"Veri çekme hatası: {e}")
             return pd.DataFrame()
+
+    def _get_intraday_history(self, symbol: str, asset_type: str, days: float,
+                              interval: str, priority: int) -> pd.DataFrame:
+        """
+        Kısa pencerelerde 1m barlar depodan (eksik kısım indirilerek) alınıp yerelde
+        birleştirilir; 1m verisinin tutulmadığı uzun pencerelerde hedef periyot doğrudan çekilir.
+        """
+        if days <= self.bar_store.max_days:
+            bars = self.bar_store.get(
+                symbol, asset_type, days,
+                lambda since: self._fetch_bars(symbol, asset_type, BASE_INTERVAL, since, priority)
+            )
+            return aggregate_bars(bars, interval)
+
+        since = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=days)
+        return normalize_ohlcv(self._fetch_bars(symbol, asset_type, interval, since, priority))
+
+    def _fetch_bars(self, symbol: str, asset_type: str, interval: str,
+                    since: datetime, priority: int) -> pd.DataFrame:
+        """since (UTC, naive) anından itibaren verilen periyotta OHLCV barları"""
+        config = self.ASSET_TYPES[asset_type]
+        since = since.replace(tzinfo=timezone.utc)
+        minute = int(since.timestamp()) // 60
+        has_rows = lambda df: df is not None and not df.empty
+
+        def yahoo(full_symbol):
+            native = interval if interval in self.YAHOO_INTERVALS else '1h'
+            return ('yahoo', lambda: self._upstream(
+                'yahoo', ('bars', full_symbol, native, minute),
+                lambda: aggregate_bars(
+                    normalize_ohlcv(self._download(full_symbol, start=since, interval=native)), interval),
+                priority))
+
+        if config['source'] == 'ccxt':
+            return self.router.call([
+                ('binance', lambda: self._upstream(
+                    'binance', ('bars', symbol, interval, minute),
+                    lambda: self._fetch_ccxt_ohlcv(symbol, interval, since), priority)),
+                yahoo(f"{symbol}-USD"),
+            ], is_valid=has_rows)
+        return self.router.call([yahoo(f"{symbol}{config['prefix']}")], is_valid=has_rows)
+
+    def _fetch_ccxt_history(self, symbol: str, days: int) -> pd.DataFrame:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        return self._fetch_ccxt_ohlcv(symbol, '1d', since)
+
+    def _fetch_ccxt_ohlcv(self, symbol: str, timeframe: str, since: datetime) -> pd.DataFrame:
+        """
+        fetch_ohlcv'yi `since` imleciyle sayfalayarak çağırır; sayfa limiti (1000 bar)
+        aşılan pencerelerde de tüm barlar döner. Sayfalar arası bekleme ccxt'nin
+        kendi hız sınırlayıcısına bırakılır; en fazla CCXT_MAX_PAGES sayfa çekilir.
+        """
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        step = INTERVAL_SECONDS[timeframe] * 1000
+        cursor = int(since.timestamp() * 1000)
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        ohlcv = []
+        try:
+            for _ in range(self.CCXT_MAX_PAGES):
+                if cursor > now_ms:
+                    break
+                page = self.exchange.fetch_ohlcv(
+                    f"{symbol}/USDT",
+                    timeframe=timeframe,
+                    since=cursor,
+                    limit=self.CCXT_PAGE_LIMIT
+                )
+                if not page:
+                    break
+                ohlcv.extend(page)
+                cursor = page[-1][0] + step
+                if len(page) < self.CCXT_PAGE_LIMIT:
+                    break
+        except ccxt.BadSymbol:
+            return pd.DataFrame()
+        return self._ohlcv_frame(ohlcv)
+
+    @staticmethod
+    def _ohlcv_frame(ohlcv: List[list]) -> pd.DataFrame:
+        """ccxt OHLCV satırlarını zaman indeksli kareye çevirir (senkron ve async yol ortak)"""
+        df = pd.DataFrame(
+            ohlcv,
+            columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']
+        )
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        df.set_index('timestamp', inplace=True)
+        df = df[~df.index.duplicated(keep='last')]
+        # Rename close to Close to match yfinance
+        df.rename(columns={'close': 'Close'}, inplace=True)
+        return df
     
-    def calculate_portfolio_value(self, holdings: Dict) -> Dict:
+    def calculate_portfolio_value(self, holdings: Dict, currency: Optional[str] = None) -> Dict:
         """
         Karışık portföy değerini hesaplar
         
@@ -126,24 +405,38 @@ class AssetManager:
                 'THYAO': {'type': 'stock_tr', 'amount': 100},
                 'GLD': {'type': 'commodity', 'amount': 50}
             }
+            currency: Raporlama para birimi (varsayılan Config.REPORTING_CURRENCY)
         
         Returns:
-            Toplam değer ve detaylar
+            Toplam değer ve detaylar; 'price' varlığın kendi para biriminde,
+            'value' raporlama para biriminde
         """
-        total_value = 0
+        prices = {symbol: self.get_price(symbol, info['type']) for symbol, info in holdings.items()}
+        return self.value_holdings(holdings, prices, currency)
+
+    def value_holdings(self, holdings: Dict, prices: Dict[str, Optional[float]],
+                       currency: Optional[str] = None) -> Dict:
+        """
+        Önceden çekilmiş fiyatlarla portföy değerini hesaplar (async sunucu fiyatları
+        eşzamanlı çekip bu adımı ayrı çalıştırır). Sonuç calculate_portfolio_value ile aynıdır.
+        """
+        currency = (currency or Config.REPORTING_CURRENCY).upper()
         details = {}
-        
+        local_values = []
+        quote_ccys = []
+        priced = []
+
         for symbol, info in holdings.items():
-            price = self.get_price(symbol, info['type'])
+            price = prices.get(symbol)
             
             if price:
-                value = price * info['amount']
-                total_value += value
-                
+                priced.append(symbol)
+                local_values.append(price * info['amount'])
+                quote_ccys.append(quote_currency(symbol, info['type']))
                 details[symbol] = {
                     'price': price,
                     'amount': info['amount'],
-                    'value': value,
+                    'currency': quote_ccys[-1],
                     'type': info['type']
                 }
             else:
@@ -155,15 +448,28 @@ class AssetManager:
                     'type': info['type'],
                     'error': 'Price fetch failed'
                 }
+
+        # Tüm kalemler tek vektörel adımda raporlama para birimine çevrilir
+        values = self.fx.convert(local_values, quote_ccys, to=currency)
+        total_value = 0
+        for symbol, value in zip(priced, values):
+            if value == value:  # NaN: kur bulunamadı
+                details[symbol]['value'] = float(value)
+                total_value += float(value)
+            else:
+                details[symbol]['value'] = 0
+                details[symbol]['error'] = FX_UNAVAILABLE
         
         return {
             'total': total_value,
+            'currency': currency,
             'assets': details,
             'timestamp': datetime.now()
         }
     
-    def compare_performance(self, symbols: List[Dict], 
-                           days: int = 365) -> pd.DataFrame:
+    def compare_performance(self, symbols: List[Dict],
+                           days: int = 365, max_points: Optional[int] = None,
+                           currency: Optional[str] = None) -> pd.DataFrame:
         """
         Farklı varlık türlerinin performansını karşılaştırır
         
@@ -173,6 +479,8 @@ class AssetManager:
                 {'symbol': 'XU100', 'type': 'stock_tr'},
                 {'symbol': 'GC=F', 'type': 'commodity'}
             ]
+            max_points: Verilirse seri LTTB ile en fazla bu kadar noktaya indirilir
+            currency: Getiriler bu para birimi cinsinden hesaplanır (her gün o günün kuruyla)
         
         Returns:
             Normalize edilmiş performans DataFrame'i
@@ -197,9 +505,13 @@ class AssetManager:
                     series = data[close_col]
                     if isinstance(series, pd.DataFrame):
                         series = series.iloc[:, 0]
+                    series = self.fx.convert_series(
+                        series, quote_currency(item['symbol'], item['type']), to=currency).dropna()
+                    if series.empty:
+                        continue
 
                     first_val = series.iloc[0]
                     normalized = ((series / first_val) - 1) * 100
                     performance[item['symbol']] = normalized
         
-        return performance
+        return downsample_frame(performance, max_points)
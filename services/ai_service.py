@@ -3,23 +3,245 @@ AI-Powered Decision Support Service
 Yatırım kararları için akıllı öneri sistemi
 """
 
+import asyncio
+import hashlib
+import re
 import google.generativeai as genai
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Sequence
 import pandas as pd
 import numpy as np
 
-def get_gemini_models(api_key: str) -> List[str]:
+from config import Config
+from services.cache import get_cache
+
+# Model listesi nadiren değişir; zamanlanmış ısıtma işi de bu önbelleği doldurur
+_models_cache = get_cache('gemini_models', maxsize=8, ttl=24 * 60 * 60)
+# Bağlam deterministik olduğundan aynı prompt aynı anahtara düşer; hata mesajları önbelleğe alınmaz
+_responses = get_cache('ai_responses', maxsize=256, ttl=Config.AI_RESPONSE_TTL)
+
+def configure_genai(api_key: str, api_endpoint: Optional[str] = None):
+    """
+    Configures the Gemini client. GEMINI_API_ENDPOINT (or api_endpoint) points
+    it at a different host, e.g. the local fake upstream used for load tests.
+    """
+    endpoint = api_endpoint or Config.GEMINI_API_ENDPOINT
+    if endpoint:
+        genai.configure(api_key=api_key, transport='rest',
+                        client_options={'api_endpoint': endpoint})
+    else:
+        genai.configure(api_key=api_key)
+
+def get_gemini_models(api_key: str, refresh: bool = False) -> List[str]:
     """
     Lists available Gemini models that support content generation.
+    Non-empty results are cached per key; refresh=True bypasses the cache.
     """
+    if not refresh:
+        cached = _models_cache.get(api_key)
+        if cached is not None:
+            return list(cached)
     try:
-        genai.configure(api_key=api_key)
+        configure_genai(api_key)
         models = [m.name for m in genai.list_models() if 'generateContent' in m.supported_generation_methods]
-        return models
+        if models:
+            _models_cache.set(api_key, models)
+        return list(models)
     except Exception as e:
         print(f"Error fetching models: {e}")
         return []
 
+# Yerel token tahmini (SentencePiece benzeri): kelime ~4 karakter, her rakam, noktalama ve satır 1 token
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]+|\d|\n|[^\w\s]")
+
+
+def count_tokens(text: str) -> int:
+    """Ağ çağrısı olmadan, deterministik token tahmini (bütçe kontrolü için üst sınıra yakın)"""
+    return sum((len(piece) + 3) // 4 if piece[0].isalpha() else 1 for piece in _TOKEN_PATTERN.findall(text))
+
+
+def _num(value) -> str:
+    """Yuvarlanmış, binlik ayraçsız sayı (büyük değerlerde kuruş token harcamaz)"""
+    if value is None or value != value:
+        return '-'
+    value = float(value)
+    if abs(value) >= 100:
+        return f"{value:.0f}"
+    if abs(value) >= 1:
+        return f"{value:.2f}".rstrip('0').rstrip('.')
+    return f"{value:.3g}"
+
+
+def _pct(ratio) -> str:
+    return '-' if ratio is None or ratio != ratio else f"{ratio * 100:.1f}"
+
+
+class ContextBuilder:
+    """
+    Gemini bağlamını kompakt, deterministik tablolara çevirir (str(dict) yerine).
+
+    - Sayılar yuvarlanır, satırlar sabit anahtarla sıralanır: aynı girdi -> aynı metin (yanıt önbelleklenebilir)
+    - Her bölüm token bütçesine sığdırılır; sığmayan satırlar silinmez, tür bazında toplanır
+
+    Args:
+        budget: Bölüm başına token bütçesi (varsayılan Config.AI_CONTEXT_TOKENS)
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = budget or Config.AI_CONTEXT_TOKENS
+
+    @staticmethod
+    def table(columns: Sequence[str], rows: Sequence[Sequence]) -> str:
+        return '\n'.join('|'.join(str(v) for v in row) for row in [columns, *rows])
+
+    def fit(self, render: Callable[[int], str], count: int) -> str:
+        """render(k) bütçeye sığan en büyük k ile (ikili arama; k=0 her zaman döner)"""
+        low, high = 0, count
+        while low < high:
+            mid = (low + high + 1) // 2
+            if count_tokens(render(mid)) <= self.budget:
+                low = mid
+            else:
+                high = mid - 1
+        return render(low)
+
+    def portfolio(self, portfolio: Dict, currency: Optional[str] = None) -> str:
+        """{'BTC': {'type', 'amount', 'value'}} -> değer sırasına göre tablo; kalan varlıklar türe göre toplanır"""
+        currency = (currency or Config.REPORTING_CURRENCY).upper()
+        items = sorted(((name, info) for name, info in portfolio.items() if info.get('value')),
+                       key=lambda item: (-float(item[1]['value']), item[0]))
+        total = sum(float(info['value']) for _, info in items)
+
+        def render(k: int) -> str:
+            rows = [(name, info['type'], _num(info.get('amount')), _num(info['value']),
+                     _pct(float(info['value']) / total)) for name, info in items[:k]]
+            rest = {}
+            for _, info in items[k:]:
+                count, value = rest.get(info['type'], (0, 0.0))
+                rest[info['type']] = (count + 1, value + float(info['value']))
+            rows += [(f"+{count} varlık", asset_type, '-', _num(value), _pct(value / total))
+                     for asset_type, (count, value) in sorted(rest.items(), key=lambda r: -r[1][1])]
+            header = f"Toplam {_num(total)} {currency}, {len(items)} varlık"
+            return header + '\n' + self.table(('varlık', 'tür', 'miktar', 'değer', 'pay%'), rows)
+
+        return self.fit(render, len(items)) if total > 0 else "Portföy boş"
+
+    def series(self, values: Dict[str, float], title: str, unit: str = '%') -> str:
+        """{'Cüzdanım': 12.34, 'S&P 500': 8.1} gibi son değerler; değere göre sıralı"""
+        items = sorted(((str(k), float(v)) for k, v in values.items() if v == v), key=lambda kv: (-kv[1], kv[0]))
+        return self.fit(lambda k: f"{title} ({unit})\n" + self.table(('seri', unit), [(n, _num(v)) for n, v in items[:k]]),
+                        len(items))
+
+    def mapping(self, values: Dict, title: Optional[str] = None) -> str:
+        """Düz anahtar/değer sözlüğü (iç içe yapılar atlanır)"""
+        rows = [(k, _num(v) if isinstance(v, (int, float, np.number)) and not isinstance(v, bool) else v)
+                for k, v in sorted(values.items()) if not isinstance(v, (dict, list, tuple, pd.Series))]
+        return self.fit(lambda k: (f"{title}\n" if title else '') + '\n'.join(f"{key}: {v}" for key, v in rows[:k]),
+                        len(rows))
+
+    def probability(self, result: Dict) -> str:
+        """get_probability çıktısı: olasılık, doğruluk ve en etkili 5 özellik"""
+        lines = [f"Hedef: {_num(result.get('target_price'))} | Vade: {result.get('days', '-')} gün",
+                 f"Olasılık%: {_pct(result.get('probability'))} | Model doğruluğu: {_num(result.get('accuracy'))}"]
+        importances = result.get('feature_importances')
+        if importances is not None and len(importances):
+            top = pd.Series(importances, dtype=float).sort_values(ascending=False).head(5)
+            lines.append("Etkili özellikler: " + ', '.join(f"{k} {_num(v)}" for k, v in top.items()))
+        return '\n'.join(lines)
+
+    def simulation(self, sim: Dict, sensitivity: Optional[Dict] = None) -> str:
+        """Tek fiyat senaryosu ve (varsa) duyarlılık ızgarasının en kötü/en iyi hücreleri"""
+        lines = [f"Senaryo BTC fiyatı: {_num(sim.get('sim_price'))} | Portföy: {_num(sim.get('sim_total'))} "
+                 f"| Fark: {_num(sim.get('sim_diff'))}"]
+        if sensitivity:
+            axes = ', '.join(f"{a['label']} {_pct(a['shocks'][0])}..{_pct(a['shocks'][-1])}%"
+                             for a in sensitivity['axes'])
+            lines.append(f"Duyarlılık ızgarası ({axes}), mevcut {_num(sensitivity['base_value'])}:")
+            rows = [(label, ' '.join(f"{t} {_pct(v)}%" for t, v in sorted(cell['shocks'].items())),
+                     _num(cell['value']), _pct(cell['change_pct']))
+                    for label, cells in (('en kötü', sensitivity['worst']), ('en iyi', sensitivity['best']))
+                    for cell in cells[:1]]
+            lines.append(self.table(('durum', 'şoklar', 'değer', 'değişim%'), rows))
+        return '\n'.join(lines)
+
+    def regime(self, snapshot: Dict) -> str:
+        """MarketRegimeService anlık görüntüsü: genel rejim + varlık başına gösterge tablosu"""
+        breadth = snapshot.get('above_sma200')
+        header = (f"Rejim: {snapshot['regime']} ({snapshot['as_of']}), SMA200 üstü: "
+                  f"{'-' if breadth is None else f'{breadth:.0%}'}, yükseliş trendi: {snapshot['uptrend']}/"
+                  f"{len(snapshot['assets'])}, yüksek volatilite: {snapshot['high_volatility']}")
+        rows = [(a['name'], a['trend'], a['vol_regime'], _pct(a['volatility']), _pct(a['drawdown']),
+                 _pct(a['return_1m']), _pct(a['return_3m'])) for a in snapshot['assets']]
+        columns = ('varlık', 'trend', 'volatilite', 'yıllık vol%', 'zirveden%', '1a%', '3a%')
+        return self.fit(lambda k: header + '\n' + self.table(columns, rows[:k]), len(rows))
+
+    def trades(self, trades: List[Dict]) -> str:
+        """
+        trades_from_frame çıktısı: özet + sembol bazında toplamlar; bütçe kalırsa
+        dönem boyunca eşit aralıklı örnek işlemler (baştan kesme yerine)
+        """
+        if not trades:
+            return "İşlem yok"
+        frame = pd.DataFrame(trades)
+        frame['notional'] = frame['quantity'] * frame['price']
+        header = (f"{len(frame)} işlem, {frame['date'].min()}..{frame['date'].max()}, "
+                  f"alış {int((frame['side'] == 'buy').sum())}, satış {int((frame['side'] == 'sell').sum())}, "
+                  f"komisyon {_num(frame['fee'].sum())}")
+        grouped = frame.groupby(['symbol', 'side']).agg(
+            n=('quantity', 'size'), qty=('quantity', 'sum'), notional=('notional', 'sum'),
+            first=('date', 'min'), last=('date', 'max')).reset_index()
+        grouped['avg'] = grouped['notional'] / grouped['qty']
+        grouped = grouped.sort_values(['notional', 'symbol', 'side'], ascending=[False, True, True])
+        summary_rows = [(r.symbol, r.side, r.n, _num(r.qty), _num(r.avg), _num(r.notional), f"{r.first}..{r.last}")
+                        for r in grouped.itertuples()]
+        columns = ('sembol', 'yön', 'adet', 'miktar', 'ort.fiyat', 'hacim', 'dönem')
+
+        half = ContextBuilder(self.budget // 2)
+        summary = half.fit(lambda k: header + '\n' + self.table(columns, summary_rows[:k]), len(summary_rows))
+        rest = ContextBuilder(max(self.budget - count_tokens(summary), 1))
+
+        def sample(k: int) -> str:
+            if k == 0:
+                return ''
+            picks = np.unique(np.linspace(0, len(frame) - 1, k).round().astype(int))
+            rows = [(t['date'], t['symbol'], t['side'], _num(t['quantity']), _num(t['price']))
+                    for t in frame.iloc[picks].to_dict('records')]
+            return '\nÖrnek işlemler:\n' + self.table(('tarih', 'sembol', 'yön', 'miktar', 'fiyat'), rows)
+
+        return summary + rest.fit(sample, len(frame))
+
+    def frame(self, df: pd.DataFrame) -> str:
+        """Şeması bilinmeyen tablo: kolon özeti + eşit aralıklı örnek satırlar"""
+        if df.empty:
+            return "Veri yok"
+        numeric = df.select_dtypes('number')
+        stats = [f"{c}: min {_num(numeric[c].min())}, ort {_num(numeric[c].mean())}, maks {_num(numeric[c].max())}"
+                 for c in numeric.columns]
+        header = f"{len(df)} satır, kolonlar: {', '.join(map(str, df.columns))}\n" + '\n'.join(stats)
+
+        def render(k: int) -> str:
+            if k == 0:
+                return header
+            picks = np.unique(np.linspace(0, len(df) - 1, k).round().astype(int))
+            rows = [[_num(v) if isinstance(v, (int, float, np.number)) and not isinstance(v, bool) else v
+                     for v in row] for row in df.iloc[picks].itertuples(index=False)]
+            return header + '\nÖrnek satırlar:\n' + self.table([str(c) for c in df.columns], rows)
+
+        return self.fit(render, len(df))
+
+    def section(self, value) -> str:
+        """Ham bağlam değerini biçimlendirir: portföy sözlüğü -> tablo, düz sözlük -> anahtar/değer"""
+        if isinstance(value, dict):
+            if value and all(isinstance(v, dict) and 'value' in v for v in value.values()):
+                return self.portfolio(value)
+            return self.mapping(value)
+        text = str(value)
+        if count_tokens(text) <= self.budget:
+            return text
+        # Bütçeyi aşan serbest metin satır sınırından kısaltılır
+        lines = text.split('\n')
+        return self.fit(lambda k: '\n'.join(lines[:k]), len(lines))
+
+
 class DecisionSupportAI:
     """
     Karar destek AI motoru
@@ -54,11 +276,15 @@ class DecisionSupportAI:
         }
     }
     
-    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash"):
-        genai.configure(api_key=api_key)
+    def __init__(self, api_key: str, model_name: str = "gemini-1.5-flash",
+                 api_endpoint: Optional[str] = None):
+        configure_genai(api_key, api_endpoint)
+        self.model_name = model_name
         self.model = genai.GenerativeModel(model_name)
+        # REST taşıması (özel uç nokta) gerçek bir async istemci sunmaz
+        self._rest_transport = bool(api_endpoint or Config.GEMINI_API_ENDPOINT)
     
-    def analyze_portfolio_risk(self, portfolio: Dict) -> Dict:
+    def analyze_portfolio_risk(self, portfolio: Dict, stress_results: Optional[List[Dict]] = None) -> Dict:
         """
         Portföy risk analizı yapar
         
@@ -68,6 +294,8 @@ class DecisionSupportAI:
                 'THYAO': {'type': 'stock_tr', 'value': 20000, 'returns': [...]},
                 ...
             }
+            stress_results: StressTester.run çıktısı; verilirse rapora eklenir ve profilin
+                izin verdiği düşüşü aşan senaryolar uyarı üretir
         
         Returns:
             Risk raporu ve öneriler
@@ -92,13 +320,32 @@ class DecisionSupportAI:
         # Risk profili tespiti
         detected_profile = self._detect_risk_profile(allocation_pct, portfolio_volatility)
         
-        return {
+        report = {
             'total_value': total_value,
             'allocation': allocation_pct,
             'volatility': portfolio_volatility,
             'detected_profile': detected_profile,
             'warnings': self._generate_warnings(allocation_pct, detected_profile)
         }
+        if stress_results:
+            report['stress_tests'] = stress_results
+            report['warnings'] += self._stress_warnings(stress_results, detected_profile)
+        return report
+
+    def _stress_warnings(self, stress_results: List[Dict], profile: str) -> List[str]:
+        """Profilin en fazla düşüş limitini aşan tarihsel senaryolar (en kötü 3'ü)"""
+        limit = self.RISK_PROFILES[profile]['max_drawdown']
+        breaches = sorted((r for r in stress_results if -r['max_drawdown'] > limit),
+                          key=lambda r: r['max_drawdown'])
+        warnings = []
+        for r in breaches[:3]:
+            recovery = (f"{r['recovery_days']} günde toparlandı" if r['recovery_days'] is not None
+                        else "pencere içinde toparlanmadı")
+            warnings.append(
+                f"⚠️ {r['scenario']} senaryosunda portföy {-r['max_drawdown']:.1%} düşerdi "
+                f"({self.RISK_PROFILES[profile]['name']} profil limiti: {limit:.1%}); {recovery}."
+            )
+        return warnings
     
     def _detect_risk_profile(self, allocation: Dict, volatility: float) -> str:
         """Portföy yapısından risk profilini tahmin eder"""
@@ -194,12 +441,60 @@ class DecisionSupportAI:
         
         Args:
             context: {
-                'portfolio': {...},
-                'market_condition': 'bull/bear/sideways',
+                'portfolio': {...} veya ContextBuilder çıktısı,
+                'market_condition': 'bull/bear/sideways' (verilmezse son piyasa rejimi),
                 'user_question': "Ne yapmalıyım?"
             }
+        Aynı prompt (model başına) AI_RESPONSE_TTL boyunca önbellekten döner.
         """
+        prompt = self._recommendation_prompt(context)
+        key = self._response_key(prompt)
+        cached = _responses.get(key)
+        if cached is not None:
+            return cached
+        try:
+            response = self.model.generate_content(prompt)
+            _responses.set(key, response.text)
+            return response.text
         
+        except Exception as e:
+            return f"❌ AI servisi geçici olarak erişilemez durumda: {e}"
+
+    async def get_ai_recommendation_async(self, context: Dict) -> str:
+        """get_ai_recommendation'ın async sürümü (ASGI sunucusu; yanıt beklenirken thread tutulmaz)"""
+        prompt = self._recommendation_prompt(context)
+        key = self._response_key(prompt)
+        cached = _responses.get(key)
+        if cached is not None:
+            return cached
+        try:
+            if self._rest_transport:
+                response = await asyncio.to_thread(self.model.generate_content, prompt)
+            else:
+                response = await self.model.generate_content_async(prompt)
+            _responses.set(key, response.text)
+            return response.text
+
+        except Exception as e:
+            return f"❌ AI servisi geçici olarak erişilemez durumda: {e}"
+
+    def _response_key(self, prompt: str) -> tuple:
+        return (self.model_name, hashlib.sha256(prompt.encode('utf-8')).hexdigest())
+
+    @staticmethod
+    def _recommendation_prompt(context: Dict) -> str:
+        # Ham sözlükler (ör. API istekleri) de bütçeli tablo biçimine çevrilir
+        builder = ContextBuilder()
+        portfolio = builder.section(context.get('portfolio', 'Bilgi yok'))
+        market = context.get('market_condition')
+        if market is None:
+            # Zamanlanmış işin hazırladığı rejim; yalnızca önbellek okunur (istek içinde indirme yok)
+            from services.market_regime import get_market_regime
+            regime = get_market_regime().latest()
+            market = builder.regime(regime) if regime else 'Bilinmiyor'
+        else:
+            market = builder.section(market)
+        question = builder.section(context.get('user_question', ''))
         # Güvenli prompt tasarımı (hallucination önleme)
         prompt = f"""
         SEN BİR YATIRIM KARAR DESTEK ASİSTANISIN.
@@ -211,13 +506,13 @@ class DecisionSupportAI:
         - Sadece GENEL bilgi ver
         
         PORTFÖY DURUMU:
-        {context.get('portfolio', 'Bilgi yok')}
+        {portfolio}
         
         PİYASA KOŞULLARI:
-        {context.get('market_condition', 'Bilinmiyor')}
+        {market}
         
         KULLANICI SORUSU:
-        {context.get('user_question', '')}
+        {question}
         
         GÖREV:
         1. Mevcut durumu objektif değerlendir
@@ -242,13 +537,7 @@ class DecisionSupportAI:
         
         ⚠️ UYARI: Bu bir AI tahminidir. Lisanslı danışman görüşü alınız.
         """
-        
-        try:
-            response = self.model.generate_content(prompt)
-            return response.text
-        
-        except Exception as e:
-            return f"❌ AI servisi geçici olarak erişilemez durumda: {e}"
+        return prompt
     
     def generate_exit_strategy(self, position: Dict) -> Dict:
         """
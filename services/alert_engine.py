@@ -0,0 +1,365 @@
+"""
+Alert Engine
+Fiyat alarmları: kalıcı kayıt SQLite'ta (alerts), tetiklenen bildirimler teslim kuyruğunda (alert_outbox).
+
+Bellekte her (sembol, tür) için iki sıralı eşik dizisi tutulur (yukarı / aşağı kırılım).
+Diziler tetiklenen alarmlar her zaman sonda kalacak şekilde sıralıdır; bir fiyat tiki
+bisect ile kesim noktasını bulur ve sondaki dilimi keser: O(log n + tetiklenen).
+
+- 'above' / 'below': mutlak eşik
+- 'pct_move': referans fiyattan ±% hareket (iki yönlü eşiğe çevrilir, ilk kırılan tetikler)
+- 'probability': predict_probability sonucu eşiği geçince (periyodik değerlendirme)
+Silinen/başka yönü tetiklenen alarmlar dizide bırakılır (tembel silme), kesimde atlanır.
+
+Web tarafında fiyat tikleri submit_quote ile kuyruğa bırakılır; periyodik sync ve tetiklenen
+alarmların veritabanı yazımları istek thread'inde (ya da ASGI olay döngüsünde) değil, arka plandaki
+tek dağıtıcı thread'de yürür.
+"""
+import json
+import queue
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import db
+
+KINDS = ('above', 'below', 'pct_move', 'probability')
+PRICE_KINDS = ('above', 'below', 'pct_move')
+# Diğer işçilerin eklediği alarmların belleğe alınma aralığı (sn)
+SYNC_INTERVAL = 5.0
+
+AssetKey = Tuple[str, str]
+
+
+class ThresholdBook:
+    """Tek varlığın iki yönlü eşik dizileri"""
+
+    def __init__(self):
+        # Yukarı: -eşik artan sırada (eşik azalan) -> fiyatın altındaki eşikler sonda
+        self._up_keys: List[float] = []
+        self._up_ids: List[int] = []
+        # Aşağı: eşik artan sırada -> fiyatın üstündeki eşikler sonda
+        self._down_keys: List[float] = []
+        self._down_ids: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._up_ids) + len(self._down_ids)
+
+    def _side(self, direction: str):
+        if direction == 'above':
+            return self._up_keys, self._up_ids
+        return self._down_keys, self._down_ids
+
+    def add(self, direction: str, threshold: float, alert_id: int):
+        keys, ids = self._side(direction)
+        key = -threshold if direction == 'above' else threshold
+        i = bisect_right(keys, key)
+        keys.insert(i, key)
+        ids.insert(i, alert_id)
+
+    def extend(self, entries: List[Tuple[str, float, int]]):
+        """Toplu yükleme: eklenip bir kez sıralanır (O(n log n))"""
+        for direction in ('above', 'below'):
+            keys, ids = self._side(direction)
+            sign = -1.0 if direction == 'above' else 1.0
+            rows = sorted(list(zip(keys, ids)) +
+                          [(sign * t, i) for d, t, i in entries if d == direction])
+            keys[:] = [k for k, _ in rows]
+            ids[:] = [i for _, i in rows]
+
+    def pop_crossed(self, price: float) -> List[int]:
+        """Fiyatın kırdığı tüm eşiklerin alarm kimliklerini çıkarır"""
+        fired = []
+        i = bisect_left(self._up_keys, -price)      # eşik <= fiyat
+        if i < len(self._up_keys):
+            fired += self._up_ids[i:]
+            del self._up_keys[i:], self._up_ids[i:]
+        j = bisect_left(self._down_keys, price)     # eşik >= fiyat
+        if j < len(self._down_keys):
+            fired += self._down_ids[j:]
+            del self._down_keys[j:], self._down_ids[j:]
+        return fired
+
+
+def price_thresholds(kind: str, threshold: float, reference_price: Optional[float]) -> List[Tuple[str, float]]:
+    """Alarm türünü (yön, mutlak eşik) çiftlerine çevirir"""
+    if kind == 'above':
+        return [('above', threshold)]
+    if kind == 'below':
+        return [('below', threshold)]
+    if kind == 'pct_move':
+        return [('above', reference_price * (1 + threshold / 100.0)),
+                ('below', reference_price * (1 - threshold / 100.0))]
+    return []
+
+
+def _describe(alert: Dict, observed: float) -> str:
+    symbol, kind, threshold = alert['symbol'], alert['kind'], alert['threshold']
+    if kind == 'above':
+        return f"{symbol} {threshold:,.4g} seviyesinin üzerine çıktı ({observed:,.4g})."
+    if kind == 'below':
+        return f"{symbol} {threshold:,.4g} seviyesinin altına indi ({observed:,.4g})."
+    if kind == 'pct_move':
+        return f"{symbol} referans fiyattan %{threshold:g} hareket etti ({observed:,.4g})."
+    return (f"{symbol} için {alert['target_price']:,.4g} hedefine {alert['horizon_days']:g} günde "
+            f"ulaşma olasılığı %{observed * 100:.1f} oldu.")
+
+
+class AlertEngine:
+    """
+    Args:
+        db_path: SQLite dosyası (varsayılan db.DB_NAME)
+    """
+
+    COLUMNS = ('id', 'user_id', 'symbol', 'asset_type', 'kind', 'threshold',
+               'reference_price', 'target_price', 'horizon_days')
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._books: Dict[AssetKey, ThresholdBook] = {}
+        # Bellekteki etkin fiyat alarmları; buradan çıkan kimlik dizide kalsa da tetiklenmez
+        self._alerts: Dict[int, Dict] = {}
+        self._max_id = 0
+        self._synced_at = 0.0
+        # submit_quote -> dağıtıcı thread: (symbol, asset_type, price)
+        self._ticks: "queue.Queue[Tuple[str, str, float]]" = queue.Queue()
+        self._dispatcher: Optional[threading.Thread] = None
+        conn = self._connect()
+        db.init_alert_tables(conn.cursor())
+        conn.commit()
+        conn.close()
+        self.sync()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path or db.DB_NAME)
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    # --- Dizin ---
+
+    def _index(self, alerts: List[Dict]):
+        by_asset: Dict[AssetKey, List[Tuple[str, float, int]]] = {}
+        for alert in alerts:
+            self._alerts[alert['id']] = alert
+            self._max_id = max(self._max_id, alert['id'])
+            entries = by_asset.setdefault((alert['symbol'], alert['asset_type']), [])
+            for direction, threshold in price_thresholds(alert['kind'], alert['threshold'],
+                                                         alert['reference_price']):
+                entries.append((direction, threshold, alert['id']))
+        for key, entries in by_asset.items():
+            book = self._books.setdefault(key, ThresholdBook())
+            if len(entries) == 1:
+                book.add(*entries[0])
+            else:
+                book.extend(entries)
+
+    def sync(self):
+        """Veritabanındaki (başka işçilerin eklediği dahil) yeni etkin fiyat alarmlarını dizine alır"""
+        conn = self._connect()
+        rows = conn.execute(f'''SELECT {", ".join(self.COLUMNS)} FROM alerts
+                                WHERE active=1 AND id > ? AND kind IN ('above', 'below', 'pct_move')
+                                ORDER BY id''', (self._max_id,)).fetchall()
+        conn.close()
+        with self._lock:
+            self._index([dict(zip(self.COLUMNS, r)) for r in rows if r[0] not in self._alerts])
+            self._synced_at = time.monotonic()
+
+    # --- Alarm yönetimi ---
+
+    def create_alert(self, user_id: str, symbol: str, asset_type: str, kind: str, threshold: float,
+                     reference_price: Optional[float] = None, target_price: Optional[float] = None,
+                     horizon_days: Optional[float] = None) -> Dict:
+        """
+        Args:
+            threshold: 'above'/'below' için fiyat, 'pct_move' için yüzde,
+                'probability' için 0-1 arası olasılık
+            reference_price: 'pct_move' referansı (genelde oluşturma anındaki fiyat)
+            target_price, horizon_days: 'probability' için tahmin hedefi ve süresi
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Bilinmeyen alarm türü: {kind}")
+        threshold = float(threshold)
+        if threshold <= 0:
+            raise ValueError("Eşik pozitif olmalı")
+        if kind == 'pct_move' and not reference_price:
+            raise ValueError("pct_move için referans fiyat gerekli")
+        if kind == 'probability':
+            if threshold > 1 or not target_price or not horizon_days:
+                raise ValueError("probability için 0-1 arası eşik, target_price ve horizon_days gerekli")
+
+        alert = {'user_id': str(user_id), 'symbol': symbol.upper(), 'asset_type': asset_type,
+                 'kind': kind, 'threshold': threshold,
+                 'reference_price': float(reference_price) if reference_price else None,
+                 'target_price': float(target_price) if target_price else None,
+                 'horizon_days': float(horizon_days) if horizon_days else None}
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('''INSERT INTO alerts (user_id, symbol, asset_type, kind, threshold, reference_price,
+                                         target_price, horizon_days, active, created_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1, ?)''',
+                  (alert['user_id'], alert['symbol'], alert['asset_type'], kind, threshold,
+                   alert['reference_price'], alert['target_price'], alert['horizon_days'], datetime.now()))
+        alert['id'] = c.lastrowid
+        conn.commit()
+        conn.close()
+        if kind in PRICE_KINDS:
+            with self._lock:
+                self._index([alert])
+        return alert
+
+    def delete_alert(self, user_id: str, alert_id: int) -> bool:
+        conn = self._connect()
+        c = conn.cursor()
+        c.execute('UPDATE alerts SET active=0 WHERE id=? AND user_id=? AND active=1', (alert_id, str(user_id)))
+        deleted = c.rowcount > 0
+        conn.commit()
+        conn.close()
+        if deleted:
+            with self._lock:
+                self._alerts.pop(alert_id, None)
+        return deleted
+
+    def list_alerts(self, user_id: str, active_only: bool = True) -> List[Dict]:
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        sql = 'SELECT * FROM alerts WHERE user_id=?' + (' AND active=1' if active_only else '') + ' ORDER BY id'
+        rows = [dict(r) for r in conn.execute(sql, (str(user_id),))]
+        conn.close()
+        return rows
+
+    # --- Değerlendirme ---
+
+    def submit_quote(self, symbol: str, asset_type: str, price: Optional[float]):
+        """AssetManager fiyat dinleyicisi: tiki dağıtıcı kuyruğuna bırakır ve hemen döner (DB erişimi yok)"""
+        if not price:
+            return
+        if self._dispatcher is None:
+            with self._lock:
+                if self._dispatcher is None:
+                    self._dispatcher = threading.Thread(target=self._dispatch_loop, name='alert-dispatch',
+                                                        daemon=True)
+                    self._dispatcher.start()
+        self._ticks.put((symbol, asset_type, float(price)))
+
+    def _dispatch_loop(self):
+        while True:
+            symbol, asset_type, price = self._ticks.get()
+            try:
+                self.on_quote(symbol, asset_type, price)
+            except Exception as e:
+                print(f"Alarm değerlendirme hatası ({symbol}): {e}")
+            finally:
+                self._ticks.task_done()
+
+    def flush(self):
+        """Kuyruktaki tiklerin değerlendirilmesini bekler"""
+        self._ticks.join()
+
+    def on_quote(self, symbol: str, asset_type: str, price: Optional[float]) -> List[int]:
+        """
+        Kırılan alarmları tetikler, tetiklenen kimlikleri döndürür. Eşzamanlıdır (gerekirse sync
+        yapar, tetiklenenleri yazar); istek yolunda submit_quote kullanılır.
+        """
+        if not price:
+            return []
+        if time.monotonic() - self._synced_at > SYNC_INTERVAL:
+            self.sync()
+        with self._lock:
+            book = self._books.get((symbol.upper(), asset_type))
+            if book is None:
+                return []
+            crossed = book.pop_crossed(float(price))
+            fired = [self._alerts.pop(i) for i in crossed if i in self._alerts]
+        return self._fire([(alert, float(price)) for alert in fired])
+
+    def evaluate_probability_alerts(self, predict: Optional[Callable] = None) -> List[int]:
+        """
+        Olasılık alarmlarını değerlendirir; aynı (sembol, hedef, süre) için model bir kez çalışır.
+        predict varsayılanı future_price.predict_probability_cached (Yahoo sembolü, ör. 'BTC-USD');
+        zamanlanmış yeniden eğitim sonrası sonuçlar önbellekten okunur.
+        """
+        if predict is None:
+            import future_price
+            predict = future_price.predict_probability_cached
+        conn = self._connect()
+        rows = conn.execute(f'''SELECT {", ".join(self.COLUMNS)} FROM alerts
+                                WHERE active=1 AND kind='probability' ''').fetchall()
+        conn.close()
+
+        groups: Dict[Tuple, List[Dict]] = {}
+        for row in rows:
+            alert = dict(zip(self.COLUMNS, row))
+            groups.setdefault((alert['symbol'], alert['target_price'], alert['horizon_days']), []).append(alert)
+
+        fired = []
+        for (symbol, target, days), alerts in groups.items():
+            result = predict(symbol, target, days)
+            if not result.get('success'):
+                continue
+            probability = float(result['probability'])
+            fired += [(a, probability) for a in alerts if probability >= a['threshold']]
+        return self._fire(fired)
+
+    def _fire(self, fired: List[Tuple[Dict, float]]) -> List[int]:
+        """
+        Alarmı kapatır ve bildirimi kuyruğa yazar (tek işlem). Başka bir işçi aynı alarmı
+        önce kapattıysa (active=0) bildirim yazılmaz; dedup_key ayrıca çift kaydı engeller.
+        """
+        if not fired:
+            return []
+        now = datetime.now()
+        ids = []
+        conn = self._connect()
+        c = conn.cursor()
+        for alert, observed in fired:
+            c.execute('UPDATE alerts SET active=0, triggered_at=? WHERE id=? AND active=1', (now, alert['id']))
+            if c.rowcount == 0:
+                continue
+            payload = {'alert_id': alert['id'], 'symbol': alert['symbol'], 'asset_type': alert['asset_type'],
+                       'kind': alert['kind'], 'threshold': alert['threshold'], 'observed': observed,
+                       'message': _describe(alert, observed), 'triggered_at': now.isoformat()}
+            c.execute('''INSERT OR IGNORE INTO alert_outbox (alert_id, user_id, dedup_key, payload, created_at)
+                         VALUES (?, ?, ?, ?, ?)''',
+                      (alert['id'], alert['user_id'], f"alert:{alert['id']}",
+                       json.dumps(payload, ensure_ascii=False), now))
+            ids.append(alert['id'])
+        conn.commit()
+        conn.close()
+        return ids
+
+    # --- Teslim ---
+
+    def pending_notifications(self, user_id: str, limit: int = 100) -> List[Dict]:
+        conn = self._connect()
+        rows = conn.execute('''SELECT id, payload FROM alert_outbox WHERE user_id=? AND delivered_at IS NULL
+                               ORDER BY id LIMIT ?''', (str(user_id), limit)).fetchall()
+        conn.close()
+        return [dict(json.loads(payload), id=outbox_id) for outbox_id, payload in rows]
+
+    def mark_delivered(self, user_id: str, outbox_ids: List[int]) -> int:
+        conn = self._connect()
+        c = conn.cursor()
+        c.executemany('UPDATE alert_outbox SET delivered_at=? WHERE id=? AND user_id=? AND delivered_at IS NULL',
+                      [(datetime.now(), i, str(user_id)) for i in outbox_ids])
+        count = c.rowcount
+        conn.commit()
+        conn.close()
+        return count
+
+
+_engine: Optional[AlertEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_alert_engine() -> AlertEngine:
+    """Süreç genelinde paylaşılan alarm motoru (ilk çağrıda etkin alarmları yükler)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AlertEngine()
+        return _engine
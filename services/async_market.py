@@ -0,0 +1,233 @@
+"""
+Async Market Data Service
+ASGI sunucusu için anlık fiyat ve günlük geçmişin async istemcilerle çekilmesi:
+Binance -> ccxt.async_support, Yahoo chart -> aiohttp.
+
+Upstream'i beklerken thread tutulmaz; binlerce eşzamanlı istek tek olay döngüsünde bekleyebilir.
+Senkron AssetManager ile ortak olanlar:
+- Fiyat önbelleği (_quotes, SHARED_CACHE_PATH ile işçiler arası) ve fiyat dinleyicileri (alarm motoru)
+- Kaynak sağlığı / devre kesici (SourceRouter.acall) ve hız limiti token'ları (UpstreamScheduler.reserve)
+Aynı anahtarlı eşzamanlı istekler tek upstream çağrısında birleştirilir.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+import aiohttp
+import ccxt.async_support as ccxt_async
+import pandas as pd
+
+from config import Config
+from multi_asset_manager import AssetManager
+from services.bar_aggregator import INTERVAL_SECONDS
+
+# YAHOO_API_URL tanımlı değilse doğrudan Yahoo chart uç noktası kullanılır
+YAHOO_CHART_URL = 'https://query1.finance.yahoo.com'
+REQUEST_TIMEOUT = 10.0
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    if isinstance(exc, (ccxt_async.RateLimitExceeded, ccxt_async.DDoSProtection)):
+        return True
+    return getattr(exc, 'status', None) == 429
+
+
+class AsyncMarketData:
+    """
+    Args:
+        manager: Önbellek, dinleyiciler, router ve zamanlayıcısı paylaşılan AssetManager
+        connections: aiohttp bağlantı havuzu üst sınırı (varsayılan Config.ASYNC_UPSTREAM_CONNECTIONS)
+    """
+
+    def __init__(self, manager: Optional[AssetManager] = None, connections: Optional[int] = None):
+        self.manager = manager or AssetManager()
+        self.connections = connections or Config.ASYNC_UPSTREAM_CONNECTIONS
+        self.yahoo_url = self.manager.yahoo_url or YAHOO_CHART_URL
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._exchange = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    # --- Bağlantılar (olay döngüsüne bağlı) ---
+
+    def _bind(self):
+        """Oturumlar ilk kullanıldıkları döngüye bağlıdır; döngü değişmişse yeniden kurulur"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        self._loop = loop
+        self._inflight = {}
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.connections),
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            headers={'User-Agent': 'Mozilla/5.0'},
+        )
+        binance_url = self.manager.binance_url
+        if binance_url:
+            self._exchange = ccxt_async.binance({
+                'urls': {'api': {'public': f"{binance_url.rstrip('/')}/api/v3"}},
+                'options': {'fetchMarkets': {'types': ['spot']}},
+            })
+        else:
+            self._exchange = ccxt_async.binance()
+
+    async def close(self):
+        """ASGI lifespan kapanışında çağrılır"""
+        if self._session is not None:
+            await self._session.close()
+        if self._exchange is not None:
+            await self._exchange.close()
+        self._loop = self._session = self._exchange = None
+
+    # --- Hız limiti + birleştirme ---
+
+    async def _upstream(self, source: str, key: tuple, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self._bind()
+        full_key = (source, key)
+        existing = self._inflight.get(full_key)
+        if existing is None:
+            existing = asyncio.ensure_future(self._throttled(source, fn))
+            self._inflight[full_key] = existing
+
+            def release(future):
+                if self._inflight.get(full_key) is future:
+                    del self._inflight[full_key]
+            existing.add_done_callback(release)
+        # shield: bekleyenlerden biri iptal edilse de (hedge kaybı) ortak çağrı sürer
+        result = await asyncio.shield(existing)
+        return result.copy() if isinstance(result, pd.DataFrame) else result
+
+    async def _throttled(self, source: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        scheduler = self.manager.scheduler
+        while True:
+            wait = scheduler.reserve(source)
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+        try:
+            return await fn()
+        except Exception as e:
+            if _is_rate_limited(e):
+                scheduler.throttle(source)
+            raise
+
+    # --- Upstream çağrıları ---
+
+    async def _fetch_ccxt_price(self, symbol: str) -> Optional[float]:
+        try:
+            ticker = await self._exchange.fetch_ticker(f"{symbol}/USDT")
+        except ccxt_async.BadSymbol:
+            return None
+        return ticker['last']
+
+    async def _fetch_ccxt_ohlcv(self, symbol: str, timeframe: str, since: datetime) -> pd.DataFrame:
+        """AssetManager._fetch_ccxt_ohlcv ile aynı sayfalama"""
+        step = INTERVAL_SECONDS[timeframe] * 1000
+        cursor = int(since.timestamp() * 1000)
+        now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+        limit = AssetManager.CCXT_PAGE_LIMIT
+        ohlcv = []
+        try:
+            for _ in range(AssetManager.CCXT_MAX_PAGES):
+                if cursor > now_ms:
+                    break
+                page = await self._exchange.fetch_ohlcv(f"{symbol}/USDT", timeframe=timeframe,
+                                                        since=cursor, limit=limit)
+                if not page:
+                    break
+                ohlcv.extend(page)
+                cursor = page[-1][0] + step
+                if len(page) < limit:
+                    break
+        except ccxt_async.BadSymbol:
+            return pd.DataFrame()
+        return AssetManager._ohlcv_frame(ohlcv)
+
+    async def _yahoo_chart(self, symbol: str, start: Optional[datetime] = None,
+                           period: Optional[str] = None, interval: str = '1d') -> pd.DataFrame:
+        params = {'interval': interval}
+        if start is not None:
+            params['period1'] = str(int(start.timestamp()))
+            params['period2'] = str(int(datetime.now().timestamp()))
+        else:
+            params['range'] = period or '1mo'
+        async with self._session.get(f"{self.yahoo_url}/v8/finance/chart/{symbol}", params=params) as resp:
+            resp.raise_for_status()
+            payload = await resp.json(content_type=None)
+        return AssetManager._parse_yahoo_chart(payload)
+
+    async def _fetch_yahoo_price(self, symbol: str) -> Optional[float]:
+        data = await self._yahoo_chart(symbol, period='1d')
+        return float(data['Close'].iloc[-1]) if not data.empty else None
+
+    # --- Genel arayüz ---
+
+    async def get_price(self, symbol: str, asset_type: str) -> Optional[float]:
+        """AssetManager.get_price'ın async karşılığı (aynı önbellek ve dinleyiciler)"""
+        manager = self.manager
+        cache_quotes = Config.QUOTE_CACHE_TTL > 0
+        price = manager._quotes.get((symbol, asset_type)) if cache_quotes else None
+        fresh = price is None
+        if fresh:
+            price = await self._get_price(symbol, asset_type)
+            if price is not None and cache_quotes:
+                manager._quotes.set((symbol, asset_type), price)
+        if price is not None and manager.quote_listeners:
+            manager._notify_quote(symbol, asset_type, price, fresh)
+        return price
+
+    async def _get_price(self, symbol: str, asset_type: str) -> Optional[float]:
+        try:
+            config = AssetManager.ASSET_TYPES[asset_type]
+            if config['source'] == 'ccxt':
+                yahoo_symbol = f"{symbol}-USD"
+                sources = [
+                    ('binance', lambda: self._upstream('binance', ('ticker', symbol),
+                                                       lambda: self._fetch_ccxt_price(symbol))),
+                    ('yahoo', lambda: self._upstream('yahoo', ('quote', yahoo_symbol),
+                                                     lambda: self._fetch_yahoo_price(yahoo_symbol))),
+                ]
+            else:
+                full_symbol = f"{symbol}{config['prefix']}"
+                sources = [
+                    ('yahoo', lambda: self._upstream('yahoo', ('quote', full_symbol),
+                                                     lambda: self._fetch_yahoo_price(full_symbol))),
+                ]
+            return await self.manager.router.acall(sources)
+        except Exception as e:
+            print(f"Fiyat çekme hatası ({symbol}): {e}")
+            return None
+
+    async def get_prices(self, holdings: Dict) -> Dict[str, Optional[float]]:
+        """{'BTC': {'type': 'crypto', ...}} için tüm fiyatlar eşzamanlı çekilir"""
+        symbols = list(holdings)
+        prices = await asyncio.gather(*(self.get_price(s, holdings[s]['type']) for s in symbols))
+        return dict(zip(symbols, prices))
+
+    async def get_historical_data(self, symbol: str, asset_type: str, days: int = 365) -> pd.DataFrame:
+        """Günlük geçmiş (AssetManager.get_historical_data(..., interval='1d') karşılığı)"""
+        has_rows = lambda df: df is not None and not df.empty
+        try:
+            config = AssetManager.ASSET_TYPES[asset_type]
+            start_date = datetime.now() - timedelta(days=days)
+            day_key = start_date.strftime('%Y-%m-%d')
+
+            def yahoo(full_symbol):
+                return ('yahoo', lambda: self._upstream(
+                    'yahoo', ('history', full_symbol, day_key),
+                    lambda: self._yahoo_chart(full_symbol, start=start_date)))
+
+            if config['source'] == 'ccxt':
+                since = datetime.now(timezone.utc) - timedelta(days=days)
+                sources = [
+                    ('binance', lambda: self._upstream(
+                        'binance', ('ohlcv', symbol, days),
+                        lambda: self._fetch_ccxt_ohlcv(symbol, '1d', since))),
+                    yahoo(f"{symbol}-USD"),
+                ]
+            else:
+                sources = [yahoo(f"{symbol}{config['prefix']}")]
+            return await self.manager.router.acall(sources, is_valid=has_rows)
+        except Exception as e:
+            print(f"Veri çekme hatası: {e}")
+            return pd.DataFrame()
@@ -0,0 +1,182 @@
+"""
+Bar Aggregation Service
+İnce çözünürlüklü (1m) OHLCV barlarını yerelde daha kaba barlara (5m, 1h, 1d ...) birleştirir
+ve 1m barlarını sembol başına bir kez indirip artımlı olarak güncelleyen bellek içi depo.
+"""
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+# Desteklenen periyotlar (saniye)
+INTERVAL_SECONDS = {
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600,
+    '4h': 14400,
+    '1d': 86400,
+}
+
+# Periyot -> pandas resample kuralı
+RESAMPLE_RULES = {
+    '1m': '1min', '5m': '5min', '15m': '15min', '30m': '30min',
+    '1h': '1h', '4h': '4h', '1d': '1D',
+}
+
+BASE_INTERVAL = '1m'
+# 1m verisi yalnızca kısa pencere için tutulur (yfinance da en fazla ~7 gün 1m verir)
+MAX_BASE_DAYS = 7
+
+# Periyot başına izin verilen en uzun geçmiş penceresi (gün). 1m/5m depodaki 1m penceresiyle,
+# diğerleri Yahoo'nun intraday sınırlarıyla (15m/30m: 60 gün, 1h: 730 gün) sınırlıdır; '1d' sınırsız.
+MAX_HISTORY_DAYS = {
+    '1m': MAX_BASE_DAYS,
+    '5m': MAX_BASE_DAYS,
+    '15m': 60,
+    '30m': 60,
+    '1h': 730,
+    '4h': 730,
+}
+
+OHLC_AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+def bars_per_day(interval: str) -> float:
+    """7/24 işlem gören piyasa varsayımıyla gün başına bar sayısı"""
+    return 86400 / INTERVAL_SECONDS[interval]
+
+
+def observed_bars_per_day(index: pd.DatetimeIndex, interval: str, window_days: int = 28) -> float:
+    """
+    Geçmişteki bar yoğunluğu (takvim günü başına, son `window_days` gün).
+    Seanslı piyasalarda (hisse, emtia) hafta sonu ve seans dışı saatlerde bar olmadığından
+    7/24 varsayımından (bars_per_day) düşüktür; veri yetersizse bars_per_day döner.
+    """
+    nominal = bars_per_day(interval)
+    if len(index) < 2:
+        return nominal
+    last = index[-1]
+    span = min(float(window_days), (last - index[0]) / pd.Timedelta(days=1))
+    if span <= 0:
+        return nominal
+    count = int((index > last - pd.Timedelta(days=span)).sum())
+    return min(nominal, count / span)
+
+
+def check_history_window(interval: str, days) -> float:
+    """
+    Pencereyi (gün) sayıya çevirir; periyodun sınırını (MAX_HISTORY_DAYS) aşan ya da
+    pozitif olmayan pencerelerde ValueError verir.
+    """
+    try:
+        days = float(days)
+    except (TypeError, ValueError):
+        raise ValueError(f"Geçersiz gün sayısı: {days}")
+    if days <= 0:
+        raise ValueError("days pozitif olmalı")
+    limit = MAX_HISTORY_DAYS.get(interval)
+    if limit is not None and days > limit:
+        raise ValueError(f"{interval} periyodunda en fazla {limit} günlük geçmiş alınabilir")
+    return days
+
+
+def resample_ohlc(df: pd.DataFrame, rule: str) -> pd.DataFrame:
+    """
+    OHLCV çerçevesini verilen pandas kuralıyla (örn. '1h', 'W', 'ME') tek adımda birleştirir.
+    Kolon adı büyük/küçük harfe duyarsız tanınır; bilinmeyen kolonlarda son değer alınır.
+    Boş kalan periyotlar (işlem olmayan saatler) düşürülür.
+    """
+    if df.empty:
+        return df
+    agg = {col: OHLC_AGG.get(str(col).lower(), 'last') for col in df.columns}
+    rolled = df.resample(rule).agg(agg)
+    close_col = next((c for c in rolled.columns if str(c).lower() == 'close'), None)
+    return rolled.dropna(subset=[close_col]) if close_col is not None else rolled.dropna(how='all')
+
+
+def aggregate_bars(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """İnce barları hedef periyoda birleştirir (hedef kaynak periyoduyla aynıysa değiştirmez)"""
+    if interval not in RESAMPLE_RULES:
+        raise ValueError(f"Desteklenmeyen periyot: {interval}")
+    if interval == BASE_INTERVAL:
+        return df
+    return resample_ohlc(df, RESAMPLE_RULES[interval])
+
+
+def normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
+    """ccxt/yfinance çıktısını Open/High/Low/Close/Volume kolonlarına ve sıralı indekse getirir"""
+    if df.empty:
+        return df
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.droplevel(1)
+    rename = {c: c.capitalize() for c in df.columns if isinstance(c, str) and c.capitalize() in OHLCV_COLUMNS}
+    df = df.rename(columns=rename)
+    if df.index.tz is not None:
+        df.index = df.index.tz_convert('UTC').tz_localize(None)
+    df = df[~df.index.duplicated(keep='last')].sort_index()
+    return df
+
+
+class BarStore:
+    """
+    Sembol başına 1m bar deposu.
+
+    İlk istekte pencere indirilir; sonraki isteklerde yalnızca son bardan itibaren
+    (delta) çekilip eklenir. Son bar genellikle henüz kapanmamıştır; delta onu da içerir
+    ve yeni satır eskisinin üzerine yazılır. Daha kaba periyotlar bu veriden yerelde üretilir.
+    """
+
+    def __init__(self, max_days: int = MAX_BASE_DAYS):
+        self.max_days = max_days
+        self._frames: Dict[Tuple[str, str], pd.DataFrame] = {}
+        # İndirilmiş pencerenin başlangıcı; ilk bar bundan sonra olabilir (seans dışı, hafta sonu, yeni listeleme)
+        self._covered: Dict[Tuple[str, str], datetime] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock_for(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, symbol: str, asset_type: str, days: float,
+            fetch: Callable[[datetime], pd.DataFrame],
+            now: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Args:
+            fetch: since (UTC, naive datetime) -> o andan itibaren 1m barlar
+            now: Şimdiki an (UTC, naive); bar indeksi de UTC olduğundan yerel saat kullanılmaz
+        Returns:
+            Son `days` günün 1m barları
+        """
+        key = (symbol, asset_type)
+        now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+        start = now - timedelta(days=min(days, self.max_days))
+        with self._lock_for(key):
+            frame = self._frames.get(key)
+            covered = self._covered.get(key)
+            if frame is None or covered is None or covered > start:
+                frame = normalize_ohlcv(fetch(start))
+                covered = start
+            else:
+                # Son bar (açık olabilir) dahil yeniden çekilir; normalize_ohlcv yinelenen indekste yeniyi tutar
+                since = frame.index[-1].to_pydatetime() if not frame.empty else covered
+                if since <= now:
+                    delta = normalize_ohlcv(fetch(since))
+                    if not delta.empty:
+                        frame = normalize_ohlcv(pd.concat([frame, delta])) if not frame.empty else delta
+            cutoff = now - timedelta(days=self.max_days)
+            if not frame.empty:
+                frame = frame[frame.index >= cutoff]
+            self._frames[key] = frame
+            self._covered[key] = max(covered, cutoff)
+        return frame[frame.index >= start] if not frame.empty else frame
+
+    def clear(self):
+        with self._guard:
+            self._frames.clear()
+            self._covered.clear()
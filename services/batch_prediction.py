@@ -0,0 +1,103 @@
+"""
+Batch Prediction Service
+Çok sayıda (sembol, hedef, vade) sorgusunu süreç havuzunda çalıştırır.
+
+Aynı sorgular bir kez hesaplanır; aynı sembol/periyottaki sorgular tek bir işe toplanır,
+böylece veri indirme ve hedeften bağımsız özellikler paylaşılır. Her işçi sınırlı sayıda
+XGBoost thread'i kullanır (işçi x thread <= çekirdek). Sonuçlar, her sembol bittiğinde akıtılır.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+
+MAX_BATCH_QUERIES = 100
+
+# (symbol, interval) -> [(target_price, days), ...]
+Plan = Dict[Tuple[str, str], List[Tuple[float, float]]]
+
+
+def normalize_query(query: Dict) -> Tuple[str, float, float, str]:
+    """Sorguyu (symbol, target_price, days, interval) anahtarına çevirir"""
+    symbol = query.get('symbol')
+    if not symbol:
+        raise ValueError("Missing symbol")
+    return (
+        str(symbol),
+        float(query.get('target_price', 100000)),
+        float(query.get('days', 10)),
+        str(query.get('interval', '1d')),
+    )
+
+
+def plan_batch(queries: List[Dict]) -> Tuple[Plan, List[Tuple[str, float, float, str]]]:
+    """
+    Returns:
+        (plan, keys): sembol/periyot başına tekilleştirilmiş iş listesi ve
+        her girdi sorgusunun anahtarı (sonuçlar bu anahtarla geri dağıtılır)
+    """
+    keys = [normalize_query(q) for q in queries]
+    plan: Plan = {}
+    for symbol, target, days, interval in dict.fromkeys(keys):
+        plan.setdefault((symbol, interval), []).append((target, days))
+    return plan, keys
+
+
+def _init_worker(nthread: int):
+    """İşçi başına thread limiti; xgboost/OpenMP yüklenmeden önce ayarlanır"""
+    os.environ['OMP_NUM_THREADS'] = str(nthread)
+    Config.ML_NTHREAD = nthread
+
+
+def _predict_group(symbol: str, interval: str, items: List[Tuple[float, float]]) -> List[Dict]:
+    """Tek sembolün tüm sorguları; veri ve temel özellikler işçide bir kez hazırlanır"""
+    import future_price
+    return [future_price.predict_probability(symbol, target, days, interval=interval)
+            for target, days in items]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_prediction_pool() -> ProcessPoolExecutor:
+    """Süreç genelinde paylaşılan tahmin havuzu (işçiler sıcak önbellekleriyle yaşar)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            nthread = max(1, Config.ML_NTHREAD)
+            workers = Config.ML_BATCH_WORKERS or max(1, (os.cpu_count() or 1) // nthread)
+            # spawn: çok thread'li Flask sürecini fork etmekten kaçınılır
+            _pool = ProcessPoolExecutor(max_workers=workers,
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(nthread,))
+        return _pool
+
+
+def iter_batch_predictions(queries: List[Dict],
+                           executor: Optional[Executor] = None) -> Iterator[Tuple[int, Dict]]:
+    """
+    Sorguları havuzda çalıştırır; her sembol bittiğinde o sembole ait
+    (girdi sırası, sonuç) çiftlerini üretir. Tekrarlanan sorgular aynı sonucu paylaşır.
+    """
+    plan, keys = plan_batch(queries)
+    executor = executor or get_prediction_pool()
+
+    positions: Dict[Tuple[str, float, float, str], List[int]] = {}
+    for i, key in enumerate(keys):
+        positions.setdefault(key, []).append(i)
+
+    futures = {executor.submit(_predict_group, symbol, interval, items): (symbol, interval, items)
+               for (symbol, interval), items in plan.items()}
+    for future in as_completed(futures):
+        symbol, interval, items = futures[future]
+        try:
+            results = future.result()
+        except Exception as e:
+            results = [{'success': False, 'message': str(e)} for _ in items]
+        for (target, days), result in zip(items, results):
+            for i in positions[(symbol, target, days, interval)]:
+                yield i, result
@@ -0,0 +1,261 @@
+"""
+Cache Service
+Önbellek arayüzü ve katmanları:
+
+- TTLCache: süreç içi, thread-safe LRU + TTL (her işçinin kendi belleği)
+- SQLiteCache: aynı makinedeki tüm işçilerin paylaştığı dosya tabanlı katman (WAL, pickle)
+- TieredCache: önce yerel LRU, bulunamazsa paylaşılan katman (bulunan değer, paylaşılan kaydın
+  kalan ömrünü aşmayacak şekilde yerelde de tutulur)
+
+get_cache() Config.SHARED_CACHE_PATH tanımlıysa katmanlı, değilse yalnızca yerel önbellek döndürür.
+Böylece N işçi aynı fiyat/geçmiş/modeli upstream'den bir kez çeker.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional, Tuple
+
+from config import Config
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Tüm önbellek katmanlarının ortak arayüzü"""
+
+    ttl: float = 300.0
+
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: Hashable):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+    def get_with_ttl(self, key: Hashable, default: Any = None) -> Tuple[Any, Optional[float]]:
+        """(değer, kalan ömür sn); kalan ömür bilinmiyorsa None"""
+        return self.get(key, default), None
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Kayıt yoksa factory() ile üretip saklar (factory kilit dışında çalışır)"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = factory()
+            self.set(key, value, ttl)
+        return value
+
+
+class TTLCache(CacheBackend):
+    """
+    En fazla `maxsize` kayıt tutan, her kaydı `ttl` saniye geçerli sayan LRU önbellek.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING or entry[0] < time.monotonic():
+                if entry is not _MISSING:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Süreçler arası paylaşılan önbellek. Değerler pickle ile saklanır; süre duvar saatiyle
+    (time.time) ölçülür. Veritabanı hatası önbellek ıskası sayılır, isteği bozmaz.
+
+    Args:
+        path: Paylaşılan SQLite dosyası
+        namespace: Aynı dosyadaki farklı önbellekleri ayırır ('quotes', 'ml_models' ...)
+        maxsize: Ad alanı başına kayıt üst sınırı (aşılınca süresi en yakın olanlar silinir)
+    """
+
+    PRUNE_EVERY = 256
+
+    def __init__(self, path: str, namespace: str, ttl: float = 300.0, maxsize: int = 10000):
+        self.path = path
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._writes = 0
+        conn = self._conn()
+        conn.execute('''CREATE TABLE IF NOT EXISTS cache_entries (
+                            namespace TEXT,
+                            key TEXT,
+                            expires REAL,
+                            value BLOB,
+                            PRIMARY KEY (namespace, key)
+                        )''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (namespace, expires)')
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 bağlantıları thread'ler arasında paylaşılmaz
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=2, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        return self.get_with_ttl(key, default)[0]
+
+    def get_with_ttl(self, key: Hashable, default: Any = None) -> Tuple[Any, Optional[float]]:
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                'SELECT value, expires FROM cache_entries WHERE namespace=? AND key=? AND expires>=?',
+                (self.namespace, self._key(key), now)).fetchone()
+            if row is not None:
+                self.hits += 1
+                return pickle.loads(row[0]), row[1] - now
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError) as e:
+            print(f"Paylaşılan önbellek okuma hatası ({self.namespace}): {e}")
+        self.misses += 1
+        return default, None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        expires = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            conn = self._conn()
+            conn.execute('INSERT OR REPLACE INTO cache_entries (namespace, key, expires, value) VALUES (?, ?, ?, ?)',
+                         (self.namespace, self._key(key), expires, sqlite3.Binary(blob)))
+            self._writes += 1
+            if self._writes % self.PRUNE_EVERY == 0:
+                self.prune()
+        except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError) as e:
+            print(f"Paylaşılan önbellek yazma hatası ({self.namespace}): {e}")
+
+    def prune(self):
+        """Süresi dolanları ve üst sınırı aşan en eski kayıtları siler"""
+        conn = self._conn()
+        conn.execute('DELETE FROM cache_entries WHERE namespace=? AND expires<?', (self.namespace, time.time()))
+        conn.execute('''DELETE FROM cache_entries WHERE namespace=? AND key IN (
+                            SELECT key FROM cache_entries WHERE namespace=?
+                            ORDER BY expires DESC LIMIT -1 OFFSET ?)''',
+                     (self.namespace, self.namespace, self.maxsize))
+
+    def delete(self, key: Hashable):
+        try:
+            self._conn().execute('DELETE FROM cache_entries WHERE namespace=? AND key=?',
+                                 (self.namespace, self._key(key)))
+        except sqlite3.Error as e:
+            print(f"Paylaşılan önbellek silme hatası ({self.namespace}): {e}")
+
+    def clear(self):
+        try:
+            self._conn().execute('DELETE FROM cache_entries WHERE namespace=?', (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"Paylaşılan önbellek temizleme hatası ({self.namespace}): {e}")
+
+
+class TieredCache(CacheBackend):
+    """
+    Yerel LRU önünde paylaşılan katman. Yerel kopyalar `local.ttl` kadar (paylaşılan TTL'den
+    kısa) tutulur; böylece başka işçinin yazdığı daha yeni değer en geç bu sürede görülür.
+    Paylaşılan katmandan okunan kopya, o kaydın kalan ömründen uzun yaşamaz.
+    """
+
+    def __init__(self, local: TTLCache, shared: CacheBackend):
+        self.local = local
+        self.shared = shared
+        self.ttl = shared.ttl
+
+    @property
+    def hits(self) -> int:
+        return self.local.hits + self.shared.hits
+
+    @property
+    def misses(self) -> int:
+        return self.shared.misses
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is _MISSING:
+            value, remaining = self.shared.get_with_ttl(key, _MISSING)
+            if value is _MISSING:
+                return default
+            self.local.set(key, value, self.local.ttl if remaining is None else min(remaining, self.local.ttl))
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        local_ttl = self.local.ttl if ttl is None else min(ttl, self.local.ttl)
+        self.local.set(key, value, local_ttl)
+        self.shared.set(key, value, ttl if ttl is not None else self.ttl)
+
+    def delete(self, key: Hashable):
+        self.local.delete(key)
+        self.shared.delete(key)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+
+def get_cache(namespace: str, maxsize: int = 256, ttl: float = 300.0, shared: bool = True) -> CacheBackend:
+    """
+    Önbellek fabrikası. shared=False veya Config.SHARED_CACHE_PATH boşsa yalnızca TTLCache;
+    aksi halde yerel TTLCache (en fazla Config.LOCAL_CACHE_TTL sn) + paylaşılan SQLiteCache.
+    maxsize her iki katmanı da sınırlar. Paylaşılan katmana yalnızca pickle edilebilen değerler yazılmalıdır.
+    """
+    if not shared or not Config.SHARED_CACHE_PATH:
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    local = TTLCache(maxsize=maxsize, ttl=min(ttl, Config.LOCAL_CACHE_TTL))
+    return TieredCache(local, SQLiteCache(Config.SHARED_CACHE_PATH, namespace, ttl=ttl, maxsize=maxsize))
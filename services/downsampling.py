@@ -0,0 +1,123 @@
+"""
+Downsampling Service
+Uzun grafik serileri için şekil koruyan seyreltme (LTTB) ve OHLC periyot birleştirme.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from services.bar_aggregator import resample_ohlc
+
+# API / arayüz periyot adları -> pandas resample kuralları
+ROLLUP_RULES = {
+    '1d': None,
+    '1wk': 'W',
+    '1w': 'W',
+    '1mo': 'ME',
+    '1M': 'ME',
+}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: seçilen noktaların konumlarını döner.
+
+    İlk ve son nokta her zaman korunur. Kova sınırları ve bir sonraki kovanın
+    ortalamaları tek seferde (np.add.reduceat) hesaplanır; her kovadaki üçgen
+    alanları vektörel olarak bulunur.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # İç noktalar (1..n-2) n_out-2 kovaya bölünür
+    edges = np.floor(np.linspace(1, n - 1, n_out - 1)).astype(np.int64)
+    edges[-1] = n - 1
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+
+    # Her kovanın ortalaması; son kovanın "sonraki"si son noktadır
+    sum_x = np.add.reduceat(x[:n - 1], starts)
+    sum_y = np.add.reduceat(y[:n - 1], starts)
+    avg_x = np.append(sum_x / counts, x[-1])
+    avg_y = np.append(sum_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], ends[i]
+        px, py = x[prev], y[prev]
+        nx, ny = avg_x[i + 1], avg_y[i + 1]
+        # Üçgen alanı (2x): |(px - nx)(by - py) - (px - bx)(ny - py)|
+        area = np.abs((px - nx) * (y[lo:hi] - py) - (px - x[lo:hi]) * (ny - py))
+        prev = lo + int(np.argmax(area))
+        selected[i + 1] = prev
+    return selected
+
+
+def downsample_series(series: pd.Series, max_points: int) -> pd.Series:
+    """Tek bir seriyi LTTB ile en fazla max_points noktaya indirir (NaN'lar atlanır)"""
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series
+    x = _index_as_float(series.index)
+    return series.iloc[lttb_indices(x, series.to_numpy(dtype=np.float64), max_points)]
+
+
+def downsample_frame(df: pd.DataFrame, max_points: Optional[int]) -> pd.DataFrame:
+    """
+    Çok kolonlu grafik verisini en fazla max_points satıra indirir.
+
+    Nokta bütçesi kolonlara bölünür; her kolonun LTTB ile seçtiği satırların
+    birleşimi tutulur, böylece tüm seriler ortak indekste kalır.
+    """
+    if not max_points or df.empty or len(df) <= max_points:
+        return df
+    numeric = df.select_dtypes(include='number')
+    if numeric.empty:
+        return df.iloc[lttb_indices(np.arange(len(df)), np.zeros(len(df)), max_points)]
+
+    budget = max(3, max_points // len(numeric.columns))
+    x_all = _index_as_float(df.index)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[0] = keep[-1] = True
+    for col in numeric.columns:
+        values = numeric[col].to_numpy(dtype=np.float64)
+        valid = np.flatnonzero(~np.isnan(values))
+        if len(valid) == 0:
+            continue
+        picked = lttb_indices(x_all[valid], values[valid], budget)
+        keep[valid[picked]] = True
+    return df.iloc[np.flatnonzero(keep)]
+
+
+def rollup_ohlc(df: pd.DataFrame, interval: str) -> pd.DataFrame:
+    """
+    Günlük barları haftalık ('1wk') veya aylık ('1mo') OHLC barlara birleştirir.
+    Kolon adları (Open/open vb.) korunur; tanınmayan kolonlar için son değer alınır.
+    """
+    if interval not in ROLLUP_RULES:
+        raise ValueError(f"Desteklenmeyen periyot: {interval}")
+    if isinstance(df.columns, pd.MultiIndex):
+        # yfinance tek sembol için (Price, Ticker) kolonları döndürebilir
+        df = df.copy()
+        df.columns = df.columns.droplevel(1)
+    rule = ROLLUP_RULES[interval]
+    if rule is None:
+        return df
+    return resample_ohlc(df, rule)
+
+
+def _index_as_float(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    try:
+        return index.to_numpy(dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.arange(len(index), dtype=np.float64)
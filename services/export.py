@@ -0,0 +1,243 @@
+"""
+Export Service
+Kayıtlı verilerin (analizler, simülasyon geçmişi, pozisyonlar, işlem defteri) toplu dışa aktarımı.
+
+- Satırlar SQLite imlecinden sabit boyutlu partilerle (fetchmany) okunur; tablo hiçbir zaman
+  tümüyle belleğe (DataFrame) alınmaz, bellek kullanımı satır sayısından bağımsızdır
+- Her parti hemen kodlanıp gönderilir: CSV, NDJSON ya da Parquet (parti başına bir row group);
+  ilk baytlar ilk partiden sonra akmaya başlar
+- Tarih aralığı filtresi tarih sütunu indeksini kullanır (db.py: idx_*_date), sonuç o sütuna göre sıralıdır
+
+Parquet için pyarrow gerekir (isteğe bağlı bağımlılık).
+
+Çalıştırma:
+    python -m services.export analyses --format csv --start 2025-01-01 -o analyses.csv
+"""
+import argparse
+import csv
+import importlib.util
+import io
+import json
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import db
+
+# Dışa aktarılabilir kümeler: tablo ve tarih filtresi / sıralama sütunu
+EXPORTS = {
+    'analyses': {'table': 'analyses', 'date_column': 'created_at'},
+    'history': {'table': 'history', 'date_column': 'sim_date'},
+    'holdings': {'table': 'positions', 'date_column': 'last_trade_date'},
+    'transactions': {'table': 'transactions', 'date_column': 'trade_date'},
+}
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+EXPORT_BATCH = 5000
+
+
+def _day(value) -> Optional[str]:
+    if value is None or value == '':
+        return None
+    if isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+
+
+def date_filter(column: str, start=None, end=None) -> Tuple[str, tuple]:
+    """
+    [start, end] gün aralığı (her ikisi dahil). Tarihler metin olarak saklandığından ('YYYY-MM-DD...')
+    karşılaştırma dizgi sırasıyla yapılır ve sütun indeksi kullanılır; bitiş günü ertesi günden küçük olarak yazılır.
+    """
+    start, end = _day(start), _day(end)
+    clauses, params = [], []
+    if start:
+        clauses.append(f'{column} >= ?')
+        params.append(start)
+    if end:
+        clauses.append(f'{column} < ?')
+        params.append((datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d'))
+    if start and end and start > end:
+        raise ValueError("start > end")
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), tuple(params)
+
+
+class RowStream:
+    """
+    Bir dışa aktarım kümesinin sütunları ve parti üreteci; bağlantı üreteç bitince (ya da istemci
+    koptuğunda, GeneratorExit) kapanır.
+
+    Args:
+        name: EXPORTS anahtarı
+        start, end: Tarih aralığı (gün, dahil)
+        batch_size: fetchmany parti boyutu
+        db_path: SQLite dosyası (varsayılan db.DB_NAME)
+    """
+
+    def __init__(self, name: str, start=None, end=None, batch_size: int = EXPORT_BATCH,
+                 db_path: Optional[str] = None):
+        if name not in EXPORTS:
+            raise ValueError(f"Bilinmeyen küme: {name} ({', '.join(EXPORTS)})")
+        spec = EXPORTS[name]
+        self.name = name
+        self.batch_size = max(int(batch_size), 1)
+        where, params = date_filter(spec['date_column'], start, end)
+        # ASGI akışında partiler farklı thread'lerden çekilir; bağlantı yalnızca bu akışa aittir
+        self._conn = sqlite3.connect(db_path or db.DB_NAME, check_same_thread=False)
+        try:
+            self.types = {row[1]: (row[2] or '').upper()
+                          for row in self._conn.execute(f"PRAGMA table_info({spec['table']})")}
+            if not self.types:
+                raise ValueError(f"Tablo yok: {spec['table']}")
+            self._cursor = self._conn.execute(
+                f"SELECT * FROM {spec['table']}{where} ORDER BY {spec['date_column']}", params)
+        except Exception:
+            self._conn.close()
+            raise
+        self.columns = [d[0] for d in self._cursor.description]
+
+    def batches(self) -> Iterator[List[tuple]]:
+        try:
+            while True:
+                rows = self._cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self._conn.close()
+
+    def close(self):
+        self._conn.close()
+
+
+def iter_csv(stream: RowStream) -> Iterator[bytes]:
+    """Başlık satırı + parti başına bir parça"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(stream.columns)
+    for rows in stream.batches():
+        writer.writerows(rows)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(stream: RowStream) -> Iterator[bytes]:
+    """Satır başına bir JSON nesnesi, parti başına bir parça"""
+    columns = stream.columns
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    for rows in stream.batches():
+        yield ''.join([encode(dict(zip(columns, row))) + '\n' for row in rows]).encode('utf-8')
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter çıktısını toplar; her row group sonrası biriken baytlar alınıp boşaltılır"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b''.join(self._chunks), []
+        return data
+
+
+def arrow_schema(stream: RowStream):
+    """SQLite tanımlı sütun türlerinden sabit şema (partiler arası tür kayması olmaz)"""
+    import pyarrow as pa
+
+    def arrow_type(declared: str):
+        if 'INT' in declared:
+            return pa.int64()
+        if any(t in declared for t in ('REAL', 'FLOA', 'DOUB')):
+            return pa.float64()
+        return pa.string()
+
+    return pa.schema([(c, arrow_type(stream.types.get(c, ''))) for c in stream.columns])
+
+
+def iter_parquet(stream: RowStream) -> Iterator[bytes]:
+    """Parti başına bir row group; dosya altbilgisi (footer) son parçada"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(stream)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    try:
+        for rows in stream.batches():
+            arrays = [pa.array([row[i] if row[i] is None or not pa.types.is_string(field.type) else str(row[i])
+                                for row in rows], type=field.type) for i, field in enumerate(schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema), row_group_size=len(rows))
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {'csv': iter_csv, 'ndjson': iter_ndjson, 'parquet': iter_parquet}
+
+
+def export_stream(name: str, fmt: str = 'csv', start=None, end=None, batch_size: int = EXPORT_BATCH,
+                  db_path: Optional[str] = None) -> Tuple[Iterator[bytes], Dict[str, str]]:
+    """
+    Returns:
+        (bayt parçaları üreteci, {'mimetype', 'filename'}). Geçersiz küme / tarih / biçim hemen
+        ValueError, pyarrow yoksa Parquet için RuntimeError verir (yanıt başlamadan).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Bilinmeyen biçim: {fmt} ({', '.join(FORMATS)})")
+    if fmt == 'parquet' and importlib.util.find_spec('pyarrow') is None:
+        raise RuntimeError("Parquet dışa aktarımı için pyarrow gerekli (pip install pyarrow)")
+    stream = RowStream(name, start=start, end=end, batch_size=batch_size, db_path=db_path)
+    mimetype, extension = FORMATS[fmt]
+    return ENCODERS[fmt](stream), {'mimetype': mimetype, 'filename': f'{name}.{extension}'}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FutureWallet veri dışa aktarımı")
+    parser.add_argument('dataset', choices=list(EXPORTS))
+    parser.add_argument('--format', choices=list(FORMATS), default='csv')
+    parser.add_argument('--start', help="YYYY-MM-DD (dahil)")
+    parser.add_argument('--end', help="YYYY-MM-DD (dahil)")
+    parser.add_argument('--batch-size', type=int, default=EXPORT_BATCH)
+    parser.add_argument('--db', default=None, help=f"SQLite dosyası (varsayılan {db.DB_NAME})")
+    parser.add_argument('-o', '--output', default='-', help="Çıktı dosyası ('-' = stdout)")
+    args = parser.parse_args(argv)
+
+    try:
+        chunks, _ = export_stream(args.dataset, args.format, start=args.start, end=args.end,
+                                  batch_size=args.batch_size, db_path=args.db)
+    except (RuntimeError, ValueError) as e:
+        parser.error(str(e))
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
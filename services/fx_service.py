@@ -0,0 +1,181 @@
+"""
+FX Service
+Varlıkların kote edildiği para birimini çözer ve değerleri raporlama para birimine çevirir.
+
+Kurlar USD bazında ({CCY}USD=X) tutulur ve eksik olanlar tek istekte toplu çekilir;
+dönüşüm tüm değer vektörüne tek adımda uygulanır. USD dışı para birimi yoksa hiç istek atılmaz.
+Kur çekilemezse (kaynak/yönlendirici hatası) hata yükseltilmez; o para birimi NaN kalır ve
+çağıran kalemi "FX rate unavailable" ile işaretler.
+Alt birimle kote edilen fiyatlar (LSE: GBp = peni) dönüşümden önce ana birime bölünür.
+"""
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.cache import get_cache
+
+BASE_CURRENCY = 'USD'
+
+# Borsa soneki -> para birimi (stock_us altında girilen yabancı hisseler için)
+SUFFIX_CURRENCIES = {
+    '.IS': 'TRY',
+    '.L': 'GBp',  # Yahoo LSE hisselerini peni cinsinden verir
+    '.DE': 'EUR',
+    '.PA': 'EUR',
+    '.T': 'JPY',
+}
+
+# Alt birim -> (ana birim, bölen); büyük/küçük harfe duyarlı (GBp != GBP)
+MINOR_UNITS = {
+    'GBp': ('GBP', 100.0),
+    'GBX': ('GBP', 100.0),
+}
+
+# USD'ye sabit kabul edilen birimler (stablecoin, nakit)
+USD_ALIASES = {'USD', 'USDT', 'USDC'}
+
+# Kuru bulunamayan kalemlerin hata mesajı
+FX_UNAVAILABLE = 'FX rate unavailable'
+
+
+def quote_currency(symbol: str, asset_type: str) -> str:
+    """
+    Varlık fiyatının hangi para biriminde olduğunu döndürür.
+
+    - stock_tr: TRY (BIST)
+    - forex: çiftin karşı tarafı (USDTRY -> TRY, EURUSD -> USD)
+    - diğerleri: sonek eşleşmesi yoksa USD (kripto USDT paritesi USD sayılır)
+    """
+    symbol = symbol.upper()
+    if asset_type == 'stock_tr':
+        return 'TRY'
+    if asset_type == 'forex':
+        pair = symbol.replace('=X', '').replace('/', '')
+        return pair[3:6] if len(pair) >= 6 else BASE_CURRENCY
+    for suffix, ccy in SUFFIX_CURRENCIES.items():
+        if symbol.endswith(suffix):
+            return ccy
+    return BASE_CURRENCY
+
+
+def fx_ticker(currency: str) -> str:
+    """1 birim para biriminin USD karşılığını veren Yahoo sembolü"""
+    return f"{currency}USD=X"
+
+
+def _column(closes: pd.DataFrame, name: str) -> pd.Series:
+    if closes is None or name not in closes.columns:
+        return pd.Series(dtype=float)
+    return closes[name].dropna()
+
+
+class FXService:
+    """
+    USD bazlı kur matrisi + vektörel dönüşüm.
+
+    Args:
+        manager: Kapanışları toplu çeken AssetManager (get_closes)
+        ttl: Anlık kurların önbellekte kalma süresi (sn)
+    """
+
+    def __init__(self, manager, ttl: float = 300.0):
+        self.manager = manager
+        self._rates = get_cache('fx_rates', maxsize=64, ttl=ttl)
+        self._history = get_cache('fx_history', maxsize=64, ttl=6 * 3600)
+
+    @staticmethod
+    def _normalize(currency: Optional[str]) -> str:
+        currency = (currency or Config.REPORTING_CURRENCY or BASE_CURRENCY).upper()
+        return BASE_CURRENCY if currency in USD_ALIASES else currency
+
+    @classmethod
+    def _major(cls, currency: Optional[str]):
+        """Para birimi -> (normalize ana birim, bölen); ör. 'GBp' -> ('GBP', 100)"""
+        if currency in MINOR_UNITS:
+            return MINOR_UNITS[currency]
+        return cls._normalize(currency), 1.0
+
+    def usd_rates(self, currencies: Iterable[str]) -> Dict[str, float]:
+        """
+        Para birimi -> 1 birimin USD değeri; önbellekte olmayanlar tek istekte çekilir.
+        Çekilemeyen kurlar NaN döner.
+        """
+        wanted = {self._normalize(c) for c in currencies}
+        rates = {BASE_CURRENCY: 1.0}
+        missing = []
+        for ccy in wanted - {BASE_CURRENCY}:
+            rate = self._rates.get(ccy)
+            if rate is None:
+                missing.append(ccy)
+            else:
+                rates[ccy] = rate
+
+        if missing:
+            try:
+                closes = self.manager.get_closes([fx_ticker(c) for c in missing], period='5d')
+            except Exception as e:
+                print(f"Kur çekme hatası ({', '.join(sorted(missing))}): {e}")
+                closes = None
+            for ccy in missing:
+                series = _column(closes, fx_ticker(ccy))
+                if series.empty:
+                    rates[ccy] = np.nan
+                else:
+                    rates[ccy] = float(series.iloc[-1])
+                    self._rates.set(ccy, rates[ccy])
+        return rates
+
+    def convert(self, values: Sequence[float], currencies: Sequence[str],
+                to: Optional[str] = None) -> np.ndarray:
+        """
+        values[i] (currencies[i] cinsinden) -> `to` cinsinden, tek vektörel çarpımla.
+        Kuru bulunamayan kalemler NaN döner.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        to = self._normalize(to)
+        majors = [self._major(c) for c in currencies]
+        codes = [code for code, _ in majors]
+        values = values / np.array([divisor for _, divisor in majors], dtype=np.float64)
+        if all(c == to for c in codes):
+            return values
+
+        unique, inverse = np.unique(codes, return_inverse=True)
+        rates = self.usd_rates(list(unique) + [to])
+        usd = np.array([rates.get(c, np.nan) for c in unique], dtype=np.float64)
+        return values * (usd[inverse] / rates.get(to, np.nan))
+
+    def historical_usd_rates(self, currency: str, index: pd.DatetimeIndex) -> pd.Series:
+        """`index` tarihlerindeki (o güne kadarki son) kur; hafta sonu/tatiller önceki kapanışla dolar"""
+        currency = self._normalize(currency)
+        if currency == BASE_CURRENCY or len(index) == 0:
+            return pd.Series(1.0, index=index)
+
+        start = (pd.Timestamp(index[0]) - pd.Timedelta(days=7)).normalize()
+        key = (currency, start)
+        history = self._history.get(key)
+        if history is None:
+            try:
+                closes = self.manager.get_closes([fx_ticker(currency)], start=start.to_pydatetime())
+            except Exception as e:
+                print(f"Kur geçmişi çekme hatası ({currency}): {e}")
+                closes = None
+            history = _column(closes, fx_ticker(currency))
+            if not history.empty:
+                self._history.set(key, history)
+        if history.empty:
+            return pd.Series(np.nan, index=index)
+        return history.sort_index().reindex(index, method='ffill')
+
+    def convert_series(self, series: pd.Series, currency: str, to: Optional[str] = None) -> pd.Series:
+        """Zaman serisini her tarihin kendi kuruyla (point-in-time) çevirir"""
+        (currency, divisor), to = self._major(currency), self._normalize(to)
+        if divisor != 1.0:
+            series = series / divisor
+        if currency == to:
+            return series
+        rate = self.historical_usd_rates(currency, series.index)
+        if to != BASE_CURRENCY:
+            rate = rate / self.historical_usd_rates(to, series.index)
+        return series * rate.to_numpy()
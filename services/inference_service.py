@@ -0,0 +1,329 @@
+"""
+Inference Service
+XGBoost eğitim/tahminini web işçilerinin dışında, ayrı bir yerel süreçte çalıştırır.
+
+- İletişim: multiprocessing.connection üzerinden Unix soketi. Mesajlar pickle ile taşındığından
+  INFERENCE_AUTHKEY zorunludur; tanımlı değilse süreç de istemci de başlamaz
+- Eğitilmiş modeller süreçte yerleşik tutulur (LRU); yoksa paylaşılan model önbelleğinden yüklenir
+  veya eğitilir
+- Veri hazırlığı ve model yükleme/eğitimi küçük bir havuzda (PREPARE_WORKERS) yürür; soğuk bir
+  sembolün indirmesi ya da eğitimi diğer isteklerin önünü tıkamaz. Aynı model anahtarı tek kez
+  yüklenir/eğitilir, eşzamanlı istekler o sonucu bekler
+- Modeli hazır istekler en fazla MAX_WAIT_MS beklenip (veya MAX_BATCH dolunca) tekilleştirilir:
+  aynı model anahtarına (aynı veri + hedef) düşen istekler tek inplace_predict sonucunu paylaşır.
+  Anahtar hedef fiyatı içerdiğinden farklı istekler farklı modellerdir; aralarında birleştirme yapılmaz
+
+Web tarafı predict_probability() kullanır: sonuç önbelleği -> çıkarım süreci (INFERENCE_SOCKET)
+-> erişilemezse süreç içi hesaplama.
+
+Çalıştırma:
+    python -m services.inference_service --socket /tmp/futurewallet-inference.sock
+"""
+import argparse
+import os
+import queue
+import stat
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.connection import AuthenticationError, Client, Listener
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+MAX_BATCH = 64
+MAX_WAIT_MS = 5.0
+PREPARE_WORKERS = 4
+RESIDENT_MODELS = 32
+REQUEST_TIMEOUT = 120.0
+
+
+def _authkey() -> bytes:
+    """INFERENCE_AUTHKEY; SECRET_KEY'e (varsayılanı herkesçe bilinir) düşülmez"""
+    if not Config.INFERENCE_AUTHKEY:
+        raise RuntimeError("INFERENCE_AUTHKEY tanımlı değil; çıkarım soketi kimlik doğrulamasız açılmaz")
+    return Config.INFERENCE_AUTHKEY.encode('utf-8')
+
+
+class InferenceServer:
+    """
+    Args:
+        address: Unix soket yolu
+        max_batch: Bir turda tekilleştirilen en fazla istek
+        max_wait: İlk istekten sonra aynı turu doldurmak için beklenecek en uzun süre (sn)
+        resident: Bellekte tutulan en fazla model
+        workers: Veri hazırlığı + model yükleme/eğitimi için havuz boyutu
+    """
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, max_batch: int = MAX_BATCH,
+                 max_wait: float = MAX_WAIT_MS / 1000.0, resident: int = RESIDENT_MODELS,
+                 nthread: Optional[int] = None, workers: int = PREPARE_WORKERS):
+        self.address = address
+        self.authkey = authkey or _authkey()
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.resident = resident
+        self.nthread = nthread
+        # Modeli hazır istekler: (result, job, (booster, feature_importances), future)
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference-prepare')
+        # model anahtarı -> (booster, feature_importances)
+        self._models: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # Yüklenmekte/eğitilmekte olan model anahtarı -> sonucu bekleyenlerin Future'ı
+        self._loading: Dict[tuple, Future] = {}
+        self._models_lock = threading.Lock()
+        self._listener: Optional[Listener] = None
+        self._stop = threading.Event()
+        self.ready = threading.Event()
+        self.stats = {'requests': 0, 'batches': 0, 'predict_calls': 0, 'models_loaded': 0}
+
+    # --- Model yönetimi ---
+
+    def _model(self, job: Dict):
+        """Yerleşik model; yoksa yükler/eğitir. Aynı anahtarı eşzamanlı isteyenler tek yüklemeyi bekler."""
+        import future_price as fp
+        key = job['key']
+        with self._models_lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry
+            loading = self._loading.get(key)
+            owner = loading is None
+            if owner:
+                loading = self._loading[key] = Future()
+        if not owner:
+            return loading.result()
+        try:
+            booster = fp.get_booster(job, self.nthread)
+            entry = (booster, fp.feature_importances(booster))
+        except BaseException as e:
+            with self._models_lock:
+                self._loading.pop(key, None)
+            loading.set_exception(e)
+            raise
+        with self._models_lock:
+            self._models[key] = entry
+            self.stats['models_loaded'] += 1
+            while len(self._models) > self.resident:
+                self._models.popitem(last=False)
+            self._loading.pop(key, None)
+        loading.set_result(entry)
+        return entry
+
+    def _prepare(self, payload: tuple, future: Future):
+        """Havuzda: veri + özellikler, ardından model; hazır istek tahmin kuyruğuna girer"""
+        import future_price as fp
+        symbol, target_price, days, interval = payload
+        try:
+            result, job = fp.prepare_prediction(symbol, target_price, days, interval)
+        except Exception as e:
+            future.set_result(dict(fp._empty_result(target_price, days, interval), message=str(e)))
+            return
+        if job is None:
+            future.set_result(result)
+            return
+        try:
+            entry = self._model(job)
+        except Exception as e:
+            future.set_result(dict(result, message=str(e)))
+            return
+        self._queue.put((result, job, entry, future))
+
+    # --- Tahmin turu (aynı model anahtarındaki istekler tekilleştirilir) ---
+
+    def _run_batch(self, batch: List[tuple]):
+        import future_price as fp
+        self.stats['batches'] += 1
+        groups: "OrderedDict[tuple, List]" = OrderedDict()
+        for result, job, entry, future in batch:
+            groups.setdefault(job['key'], []).append((result, job, entry, future))
+
+        for members in groups.values():
+            try:
+                _, job, (booster, importances), _ = members[0]
+                # Aynı anahtar = aynı veri ve hedef = aynı satırlar: tek tahmin, sonuç paylaşılır
+                proba = fp.predict_proba(booster, fp.prediction_rows(job))
+                self.stats['predict_calls'] += 1
+                for result, job, _, future in members:
+                    future.set_result(fp.finish_prediction(result, job, proba, importances))
+            except Exception as e:
+                for result, _, _, future in members:
+                    if not future.done():
+                        future.set_result(dict(result, message=str(e)))
+
+    def _batch_loop(self):
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    # --- Bağlantılar ---
+
+    def _handle(self, conn):
+        with conn:
+            while not self._stop.is_set():
+                try:
+                    op, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if op == 'predict_probability':
+                    self.stats['requests'] += 1
+                    future = Future()
+                    self._pool.submit(self._prepare, tuple(payload), future)
+                    reply = future.result()
+                elif op == 'stats':
+                    reply = dict(self.stats, resident=len(self._models), queued=self._queue.qsize())
+                elif op == 'ping':
+                    reply = 'pong'
+                else:
+                    reply = {'error': f"Unknown operation: {op}"}
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        # Önceki süreçten kalan soket dosyası yeni dinleyiciyi engeller
+        if os.path.exists(self.address) and stat.S_ISSOCK(os.stat(self.address).st_mode):
+            os.unlink(self.address)
+        threading.Thread(target=self._batch_loop, name='inference-batcher', daemon=True).start()
+        self._listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        self.ready.set()
+        try:
+            while not self._stop.is_set():
+                try:
+                    conn = self._listener.accept()
+                except AuthenticationError:
+                    continue
+                except OSError:
+                    break
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            self._listener.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class InferenceClient:
+    """Thread başına bir bağlantı (Connection nesneleri thread-safe değildir)"""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, timeout: float = REQUEST_TIMEOUT):
+        self.address = address
+        self.authkey = authkey or _authkey()
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = Client(self.address, family='AF_UNIX', authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _drop(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    def call(self, op: str, payload=None):
+        conn = self._conn()
+        try:
+            conn.send((op, payload))
+            if not conn.poll(self.timeout):
+                raise TimeoutError(f"Çıkarım süreci {self.timeout:.0f} sn içinde yanıt vermedi")
+            return conn.recv()
+        except BaseException:
+            # Yarım kalmış yanıt sonraki isteğe karışmasın
+            self._drop()
+            raise
+
+    def predict_probability(self, symbol: str, target_price: float, days: float, interval: str = '1d') -> Dict:
+        return self.call('predict_probability', (symbol, target_price, days, interval))
+
+    def stats(self) -> Dict:
+        return self.call('stats')
+
+
+_client: Optional[InferenceClient] = None
+_client_lock = threading.Lock()
+
+
+def get_inference_client() -> Optional[InferenceClient]:
+    """
+    Config.INFERENCE_SOCKET tanımlıysa paylaşılan istemci, değilse None.
+    Soket tanımlı ama INFERENCE_AUTHKEY boşsa RuntimeError (yapılandırma hatası).
+    """
+    global _client
+    if not Config.INFERENCE_SOCKET:
+        return None
+    _authkey()
+    with _client_lock:
+        if _client is None:
+            _client = InferenceClient(Config.INFERENCE_SOCKET)
+        return _client
+
+
+def predict_probability(symbol: str, target_price: float, days: float, interval: str = '1d') -> Dict:
+    """
+    Web işçilerinin tahmin giriş noktası. Sonuç önbellekte yoksa çıkarım sürecine gider;
+    süreç çalışmıyor ya da yanıt vermiyorsa (soket yok, bağlantı reddedildi, zaman aşımı) hesaplama
+    süreç içinde yapılır.
+    """
+    import future_price as fp
+    client = get_inference_client()
+    if client is None:
+        return fp.predict_probability_cached(symbol, target_price, days, interval=interval)
+
+    def compute(symbol, target_price, days, interval='1d'):
+        try:
+            return client.predict_probability(symbol, target_price, days, interval)
+        except (OSError, EOFError) as e:
+            # OSError: soket yok / bağlantı reddedildi / zaman aşımı (TimeoutError)
+            print(f"Çıkarım sürecine ulaşılamadı, süreç içinde hesaplanıyor: {e}")
+            return fp.predict_probability(symbol, target_price, days, interval=interval)
+
+    return fp.predict_probability_cached(symbol, target_price, days, interval=interval, compute=compute)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="FutureWallet çıkarım süreci")
+    parser.add_argument('--socket', default=Config.INFERENCE_SOCKET or '/tmp/futurewallet-inference.sock')
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT_MS)
+    parser.add_argument('--resident', type=int, default=RESIDENT_MODELS, help="Bellekte tutulan model sayısı")
+    parser.add_argument('--nthread', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=PREPARE_WORKERS, help="Veri hazırlığı / eğitim havuzu")
+    args = parser.parse_args(argv)
+    if not Config.INFERENCE_AUTHKEY:
+        parser.error("INFERENCE_AUTHKEY tanımlanmalı (istemcilerle aynı değer)")
+
+    server = InferenceServer(args.socket, max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000.0,
+                             resident=args.resident, nthread=args.nthread, workers=args.workers)
+    print(f"Çıkarım süreci dinliyor: {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
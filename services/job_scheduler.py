@@ -0,0 +1,310 @@
+"""
+Job Scheduler Service
+Süreç içi zamanlanmış iş yürütücü: cron benzeri takvim, kalıcı son çalışma durumu (job_runs),
+rastgele gecikme (jitter) ve işçiler arası tek çalıştırma (SQLite kira kilidi).
+
+Birden fazla işçi (gunicorn, streamlit) aynı işi aynı zaman diliminde yalnızca bir kez çalıştırır:
+kira kilidi alınırken işin o dilim için zaten çalışmış olması (last_run_at >= vade) da kontrol edilir.
+'@reboot' işleri süreç başına bir kez ve kilitsiz çalışır (yerel önbellek ısıtma).
+"""
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+import db
+
+REBOOT = '@reboot'
+ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+# dakika, saat, ayın günü, ay, haftanın günü (0/7 = Pazar)
+FIELD_RANGES = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+# Takvim bu kadar yıl içinde eşleşmiyorsa (ör. 31 Şubat) geçersiz sayılır
+MAX_SEARCH_YEARS = 5
+
+
+def _parse_field(text: str, lo: int, hi: int) -> frozenset:
+    values = set()
+    for part in text.split(','):
+        step = 1
+        if '/' in part:
+            part, step_text = part.split('/', 1)
+            step = int(step_text)
+        if part == '*':
+            start, end = lo, hi
+        elif '-' in part:
+            a, b = part.split('-', 1)
+            start, end = int(a), int(b)
+        else:
+            start = int(part)
+            end = hi if step > 1 else start   # '5/15' -> 5, 20, 35, 50
+        if step < 1 or start < lo or end > hi or start > end:
+            raise ValueError(f"Geçersiz cron alanı: {text}")
+        values.update(range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    """
+    Beş alanlı cron ifadesi ('*/15 2-5 * * 1-5') veya @hourly/@daily/@weekly/@monthly/@reboot.
+    Zamanlar yerel saatle değerlendirilir; çözünürlük dakikadır.
+    """
+
+    def __init__(self, expr: str):
+        self.expr = expr.strip()
+        self.reboot = self.expr == REBOOT
+        if self.reboot:
+            return
+        fields = ALIASES.get(self.expr, self.expr).split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron ifadesi 5 alan içermeli: {expr}")
+        parsed = [_parse_field(f, lo, hi) for f, (lo, hi) in zip(fields, FIELD_RANGES)]
+        self.minutes, self.hours, self.days, self.months, dows = parsed
+        self.dows = frozenset(d % 7 for d in dows)
+        self._dom_any = fields[2] == '*'
+        self._dow_any = fields[4] == '*'
+
+    def __repr__(self) -> str:
+        return f"CronSchedule({self.expr!r})"
+
+    def _day_matches(self, t: datetime) -> bool:
+        dom = t.day in self.days
+        dow = (t.weekday() + 1) % 7 in self.dows
+        # Cron kuralı: iki alan da kısıtlıysa herhangi biri yeterli
+        if not self._dom_any and not self._dow_any:
+            return dom or dow
+        return dom and dow
+
+    def next_after(self, dt: datetime) -> Optional[datetime]:
+        """`dt`'den sonraki ilk vade (@reboot için None)"""
+        if self.reboot:
+            return None
+        t = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt.year + MAX_SEARCH_YEARS
+        while t.year <= limit:
+            if t.month not in self.months:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.hours:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutes:
+                t += timedelta(minutes=1)
+            else:
+                return t
+        raise ValueError(f"Cron ifadesi hiç eşleşmiyor: {self.expr}")
+
+
+class Job:
+    """
+    Args:
+        name: Benzersiz iş adı (job_runs anahtarı)
+        schedule: Cron ifadesi
+        fn: Argümansız çağrılabilir
+        jitter: Vadeye eklenen 0..jitter sn rastgele gecikme (upstream'e eşzamanlı yüklenmeyi dağıtır)
+        lease: Kira süresi (sn); işçi çökerse kilit bu süre sonunda serbest kalır
+    """
+
+    def __init__(self, name: str, schedule: str, fn: Callable[[], object],
+                 jitter: float = 0.0, lease: float = 30 * 60):
+        self.name = name
+        self.schedule = CronSchedule(schedule)
+        self.fn = fn
+        self.jitter = jitter
+        self.lease = lease
+
+
+class JobScheduler:
+    """
+    Args:
+        db_path: job_runs tablosunun SQLite dosyası (varsayılan db.DB_NAME)
+        poll_interval: Vadesi gelen işlerin kontrol aralığı (sn)
+        max_workers: Eşzamanlı iş sayısı; 0 verilirse işler run_pending içinde sırayla çalışır
+    """
+
+    def __init__(self, db_path: Optional[str] = None, poll_interval: float = 30.0, max_workers: int = 2):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.jobs: Dict[str, Job] = {}
+        self._created = datetime.now()
+        self._rebooted = set()
+        self._running = set()
+        self._jitter: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix='job') if max_workers else None
+        conn = self._connect()
+        db.init_job_tables(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path or db.DB_NAME, timeout=10)
+
+    def add_job(self, job: Job) -> Job:
+        self.jobs[job.name] = job
+        return job
+
+    # --- Kalıcı durum ---
+
+    def _last_run(self, name: str) -> Optional[float]:
+        conn = self._connect()
+        row = conn.execute('SELECT last_run_at FROM job_runs WHERE job_name=?', (name,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def _acquire(self, job: Job, due: float, now: float) -> bool:
+        """Kira kilidini alır; başka işçi çalıştırıyorsa veya bu dilimi zaten çalıştırdıysa False"""
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR IGNORE INTO job_runs (job_name, run_count) VALUES (?, 0)', (job.name,))
+            cur = conn.execute('''UPDATE job_runs SET lease_owner=?, lease_until=?
+                                  WHERE job_name=? AND (lease_until IS NULL OR lease_until < ?)
+                                    AND (last_run_at IS NULL OR last_run_at < ?)''',
+                               (self.owner, now + job.lease, job.name, now, due))
+            conn.commit()
+            return cur.rowcount == 1
+        finally:
+            conn.close()
+
+    def _record(self, job: Job, started: float, error: Optional[str], locked: bool):
+        conn = self._connect()
+        conn.execute('INSERT OR IGNORE INTO job_runs (job_name, run_count) VALUES (?, 0)', (job.name,))
+        conn.execute('''UPDATE job_runs SET last_run_at=?, last_status=?, last_error=?, last_duration=?,
+                               run_count=run_count + 1,
+                               lease_owner=CASE WHEN ? THEN NULL ELSE lease_owner END,
+                               lease_until=CASE WHEN ? THEN NULL ELSE lease_until END
+                        WHERE job_name=?''',
+                     (started, 'error' if error else 'ok', error, time.time() - started,
+                      locked, locked, job.name))
+        conn.commit()
+        conn.close()
+
+    # --- Yürütme ---
+
+    def _due(self, job: Job, now: datetime) -> Optional[datetime]:
+        """İşin bekleyen vadesi (jitter hariç); kaçırılan dilimler tek seferde telafi edilir"""
+        if job.schedule.reboot:
+            return None if job.name in self._rebooted else self._created
+        last = self._last_run(job.name)
+        base = datetime.fromtimestamp(last) if last is not None else self._created
+        due = job.schedule.next_after(base)
+        return due if due <= now else None
+
+    def _jittered(self, job: Job, due: datetime) -> datetime:
+        slot = self._jitter.get(job.name)
+        if slot is None or slot[0] != due:
+            slot = (due, random.uniform(0, job.jitter) if job.jitter else 0.0)
+            self._jitter[job.name] = slot
+        return due + timedelta(seconds=slot[1])
+
+    def _execute(self, job: Job, locked: bool):
+        started = time.time()
+        error = None
+        try:
+            job.fn()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            print(f"Zamanlanmış iş hatası ({job.name}): {error}")
+        finally:
+            self._record(job, started, error, locked)
+            with self._lock:
+                self._running.discard(job.name)
+
+    def _start(self, job: Job, locked: bool):
+        with self._lock:
+            if job.name in self._running:
+                return False
+            self._running.add(job.name)
+        if self._executor is None:
+            self._execute(job, locked)
+        else:
+            self._executor.submit(self._execute, job, locked)
+        return True
+
+    def run_pending(self, now: Optional[datetime] = None) -> List[str]:
+        """Vadesi gelmiş (jitter dahil) işleri başlatır; başlatılan iş adlarını döndürür"""
+        now = now or datetime.now()
+        started = []
+        for job in list(self.jobs.values()):
+            if job.name in self._running:
+                continue
+            due = self._due(job, now)
+            if due is None:
+                continue
+            if job.schedule.reboot:
+                self._rebooted.add(job.name)
+                if self._start(job, locked=False):
+                    started.append(job.name)
+                continue
+            if self._jittered(job, due) > now:
+                continue
+            if self._acquire(job, due.timestamp(), time.time()):
+                if self._start(job, locked=True):
+                    started.append(job.name)
+        return started
+
+    def run_now(self, name: str) -> bool:
+        """İşi vadesini beklemeden başlatır (yine de işçiler arası kilit alınır)"""
+        job = self.jobs[name]
+        if not self._acquire(job, time.time() + 1, time.time()):
+            return False
+        return self._start(job, locked=True)
+
+    def status(self) -> List[Dict]:
+        conn = self._connect()
+        rows = {r[0]: r for r in conn.execute(
+            'SELECT job_name, last_run_at, last_status, last_error, last_duration, run_count, lease_owner '
+            'FROM job_runs')}
+        conn.close()
+        result = []
+        for job in self.jobs.values():
+            row = rows.get(job.name, (job.name, None, None, None, None, 0, None))
+            base = datetime.fromtimestamp(row[1]) if row[1] else self._created
+            next_run = job.schedule.next_after(base)
+            result.append({
+                'name': job.name,
+                'schedule': job.schedule.expr,
+                'last_run_at': datetime.fromtimestamp(row[1]).isoformat() if row[1] else None,
+                'last_status': row[2],
+                'last_error': row[3],
+                'last_duration': row[4],
+                'run_count': row[5],
+                'running': job.name in self._running,
+                'locked_by': row[6],
+                'next_run_at': next_run.isoformat() if next_run else None,
+            })
+        return result
+
+    # --- Arka plan döngüsü ---
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"Zamanlayıcı hatası: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='job-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
@@ -0,0 +1,311 @@
+"""
+Ledger Service
+Lot bazlı işlem defteri: her alış bir lot açar, satışlar FIFO sırasıyla lotları kapatır.
+
+- Pozisyon, maliyet ve gerçekleşen K/Z her işlemde artımlı güncellenir; bir satış yalnızca
+  kapattığı lotlara dokunur (O(dokunulan lot)), defter baştan oynatılmaz.
+- Maliyet yöntemi 'fifo' (kapatılan lotların maliyeti) veya 'average' (ortalama maliyet).
+- Her işlem gününün sonundaki durum pnl_snapshots tablosuna yazılır; geçmiş tarihli
+  K/Z sorgusu varlık başına tek indeks araması yapar.
+- Geriye tarihli işlem gelirse yalnızca o varlığın defteri yeniden kurulur.
+"""
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import db
+
+EPSILON = 1e-9
+COST_METHODS = ('fifo', 'average')
+
+SIDE_ALIASES = {
+    'buy': 'buy', 'b': 'buy', 'al': 'buy', 'alış': 'buy', 'alis': 'buy', 'alım': 'buy', 'alim': 'buy',
+    'sell': 'sell', 's': 'sell', 'sat': 'sell', 'satış': 'sell', 'satis': 'sell', 'satım': 'sell',
+}
+
+# Yüklenen dosyalardaki olası kolon adları -> defter alanı
+COLUMN_ALIASES = {
+    'date': ('date', 'tarih', 'date(utc)', 'time', 'timestamp', 'trade_date'),
+    'symbol': ('symbol', 'sembol', 'pair', 'asset', 'coin', 'varlık', 'varlik'),
+    'asset_type': ('asset_type', 'tür', 'tur', 'category'),
+    'side': ('side', 'işlem', 'islem', 'direction', 'yön', 'yon'),
+    'quantity': ('quantity', 'qty', 'amount', 'executed', 'miktar', 'adet'),
+    'price': ('price', 'fiyat'),
+    'fee': ('fee', 'komisyon', 'commission'),
+}
+
+CRYPTO_QUOTES = ('/USDT', 'USDT', '/USD', '-USD')
+
+AssetKey = Tuple[str, str]
+
+
+def normalize_side(side: str) -> str:
+    value = SIDE_ALIASES.get(str(side).strip().lower())
+    if value is None:
+        raise ValueError(f"Bilinmeyen işlem yönü: {side}")
+    return value
+
+
+def normalize_symbol(symbol: str, asset_type: str) -> str:
+    """'BTC/USDT', 'BTCUSDT', 'BTC-USD' -> 'BTC' (yalnızca kripto)"""
+    symbol = str(symbol).strip().upper()
+    if asset_type == 'crypto':
+        for quote in CRYPTO_QUOTES:
+            if symbol.endswith(quote) and len(symbol) > len(quote):
+                return symbol[:-len(quote)]
+    return symbol
+
+
+def _day(value) -> str:
+    return pd.Timestamp(value).strftime('%Y-%m-%d')
+
+
+def _fee(value) -> float:
+    """Boş hücre (CSV'de NaN, Excel'de None) komisyonsuz sayılır; NaN maliyete sızmasın"""
+    return 0.0 if value is None or pd.isna(value) or value == '' else float(value)
+
+
+def trades_from_frame(df: pd.DataFrame, default_type: str = 'crypto') -> List[Dict]:
+    """
+    Yüklenen CSV/Excel tablosunu işlem listesine çevirir (tarihe göre sıralı).
+    Yön kolonu yoksa negatif miktar satış sayılır.
+    """
+    lower = {str(c).strip().lower(): c for c in df.columns}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        match = next((lower[a] for a in aliases if a in lower), None)
+        if match is not None:
+            columns[field] = match
+    missing = [f for f in ('date', 'symbol', 'quantity', 'price') if f not in columns]
+    if missing:
+        raise ValueError(f"Eksik kolon(lar): {', '.join(missing)}")
+
+    trades = []
+    for row in df.to_dict('records'):
+        quantity = float(row[columns['quantity']])
+        if 'side' in columns:
+            side = normalize_side(row[columns['side']])
+        else:
+            side = 'sell' if quantity < 0 else 'buy'
+        asset_type = str(row[columns['asset_type']]) if 'asset_type' in columns else default_type
+        trades.append({
+            'date': _day(row[columns['date']]),
+            'symbol': normalize_symbol(row[columns['symbol']], asset_type),
+            'type': asset_type,
+            'side': side,
+            'quantity': abs(quantity),
+            'price': float(row[columns['price']]),
+            'fee': _fee(row[columns['fee']]) if 'fee' in columns else 0.0,
+        })
+    trades.sort(key=lambda t: t['date'])
+    return trades
+
+
+class Ledger:
+    """
+    Args:
+        db_path: SQLite dosyası (varsayılan db.DB_NAME)
+        method: 'fifo' veya 'average'
+    """
+
+    def __init__(self, db_path: Optional[str] = None, method: str = 'fifo'):
+        if method not in COST_METHODS:
+            raise ValueError(f"Bilinmeyen maliyet yöntemi: {method}")
+        self.db_path = db_path
+        self.method = method
+        self._lock = threading.Lock()
+        conn = self._connect()
+        db.init_ledger_tables(conn.cursor())
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Otomatik işlem kapalı: yazmalar BEGIN IMMEDIATE ile süreçler arası da sıralanır
+        return sqlite3.connect(self.db_path or db.DB_NAME, isolation_level=None)
+
+    # --- Yazma ---
+
+    def record_trade(self, date, symbol: str, asset_type: str, side: str, quantity: float,
+                     price: float, fee: float = 0.0, source: str = 'manual') -> Dict:
+        """Tek işlemi deftere yazar; güncel pozisyonu döndürür"""
+        trade = {'date': _day(date), 'symbol': symbol.upper(), 'type': asset_type,
+                 'side': normalize_side(side), 'quantity': float(quantity),
+                 'price': float(price), 'fee': float(fee or 0.0)}
+        self.import_trades([trade], source=source)
+        return self.position(trade['symbol'], asset_type)
+
+    def import_trades(self, trades: Iterable[Dict], source: str = 'import') -> int:
+        """
+        İşlemleri tek veritabanı işlemi içinde uygular (toplu içe aktarma).
+        Hatalı bir satırda (ör. eldekinden fazla satış) hiçbiri yazılmaz.
+        """
+        count = 0
+        with self._lock:
+            conn = self._connect()
+            c = conn.cursor()
+            try:
+                c.execute('BEGIN IMMEDIATE')
+                stale = set()
+                for trade in trades:
+                    if trade['quantity'] <= 0:
+                        raise ValueError(f"Geçersiz miktar: {trade['quantity']}")
+                    key = (trade['symbol'], trade['type'])
+                    tx_id = self._insert_transaction(c, trade, source)
+                    count += 1
+                    if key in stale:
+                        continue
+                    last = c.execute('SELECT last_trade_date FROM positions WHERE symbol=? AND asset_type=?',
+                                     key).fetchone()
+                    if last and last[0] and trade['date'] < last[0]:
+                        # Geriye tarihli işlem: varlık sonunda baştan kurulur
+                        stale.add(key)
+                        continue
+                    self._apply(c, tx_id, trade)
+                for key in stale:
+                    self._rebuild(c, key)
+                c.execute('COMMIT')
+            except Exception:
+                c.execute('ROLLBACK')
+                raise
+            finally:
+                conn.close()
+        return count
+
+    def import_frame(self, df: pd.DataFrame, default_type: str = 'crypto') -> int:
+        """Yüklenen işlem dosyasını (load_transactions çıktısı) deftere aktarır"""
+        return self.import_trades(trades_from_frame(df, default_type), source='file')
+
+    @staticmethod
+    def _insert_transaction(c, trade: Dict, source: str) -> int:
+        c.execute('''INSERT INTO transactions (trade_date, symbol, asset_type, side, quantity, price, fee,
+                                               source, created_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                  (trade['date'], trade['symbol'], trade['type'], trade['side'], trade['quantity'],
+                   trade['price'], trade['fee'], source, datetime.now()))
+        return c.lastrowid
+
+    def _apply(self, c, tx_id: int, trade: Dict):
+        """Bir işlemi pozisyona, lotlara ve günün anlık görüntüsüne uygular"""
+        key = (trade['symbol'], trade['type'])
+        row = c.execute('SELECT quantity, cost_basis, realized_pnl FROM positions WHERE symbol=? AND asset_type=?',
+                        key).fetchone()
+        quantity, cost_basis, realized = row if row else (0.0, 0.0, 0.0)
+
+        if trade['side'] == 'buy':
+            unit_cost = trade['price'] + trade['fee'] / trade['quantity']
+            c.execute('''INSERT INTO lots (tx_id, symbol, asset_type, open_date, quantity, remaining, unit_cost)
+                         VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                      (tx_id, key[0], key[1], trade['date'], trade['quantity'], trade['quantity'], unit_cost))
+            quantity += trade['quantity']
+            cost_basis += trade['quantity'] * unit_cost
+        else:
+            if trade['quantity'] > quantity + EPSILON:
+                raise ValueError(f"{key[0]}: eldeki miktardan ({quantity}) fazla satış ({trade['quantity']})")
+            fifo_cost = self._consume_lots(c, key, trade['quantity'])
+            if self.method == 'fifo':
+                removed = fifo_cost
+            else:
+                removed = cost_basis * trade['quantity'] / quantity if quantity > EPSILON else 0.0
+            realized += trade['quantity'] * trade['price'] - trade['fee'] - removed
+            quantity -= trade['quantity']
+            cost_basis -= removed
+            if quantity <= EPSILON:
+                quantity, cost_basis = 0.0, 0.0
+
+        c.execute('''INSERT OR REPLACE INTO positions
+                     (symbol, asset_type, quantity, cost_basis, realized_pnl, last_trade_date, updated_at)
+                     VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                  (key[0], key[1], quantity, cost_basis, realized, trade['date'], datetime.now()))
+        c.execute('''INSERT OR REPLACE INTO pnl_snapshots
+                     (snap_date, symbol, asset_type, quantity, cost_basis, realized_pnl)
+                     VALUES (?, ?, ?, ?, ?, ?)''',
+                  (trade['date'], key[0], key[1], quantity, cost_basis, realized))
+
+    @staticmethod
+    def _consume_lots(c, key: AssetKey, quantity: float) -> float:
+        """En eski açık lotlardan `quantity` kadar düşer; kapatılan maliyeti döndürür"""
+        cost = 0.0
+        open_lots = c.execute('''SELECT id, remaining, unit_cost FROM lots
+                                 WHERE symbol=? AND asset_type=? AND remaining > ?
+                                 ORDER BY open_date, id''', (key[0], key[1], EPSILON))
+        updates = []
+        for lot_id, remaining, unit_cost in open_lots:
+            if quantity <= EPSILON:
+                break
+            take = min(remaining, quantity)
+            cost += take * unit_cost
+            quantity -= take
+            updates.append((remaining - take, lot_id))
+        c.executemany('UPDATE lots SET remaining=? WHERE id=?', updates)
+        return cost
+
+    def _rebuild(self, c, key: AssetKey):
+        """Bir varlığın lotlarını, pozisyonunu ve anlık görüntülerini işlem sırasıyla yeniden kurar"""
+        for table in ('lots', 'positions', 'pnl_snapshots'):
+            c.execute(f'DELETE FROM {table} WHERE symbol=? AND asset_type=?', key)
+        rows = c.execute('''SELECT id, trade_date, side, quantity, price, fee FROM transactions
+                            WHERE symbol=? AND asset_type=? ORDER BY trade_date, id''', key).fetchall()
+        for tx_id, date, side, quantity, price, fee in rows:
+            self._apply(c, tx_id, {'date': date, 'symbol': key[0], 'type': key[1], 'side': side,
+                                   'quantity': quantity, 'price': price, 'fee': fee or 0.0})
+
+    # --- Okuma ---
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        conn = self._connect()
+        try:
+            return pd.read_sql_query(sql, conn, params=params)
+        finally:
+            conn.close()
+
+    def position(self, symbol: str, asset_type: str) -> Optional[Dict]:
+        df = self._query('''SELECT symbol, asset_type, quantity, cost_basis, realized_pnl FROM positions
+                            WHERE symbol=? AND asset_type=?''', (symbol.upper(), asset_type))
+        return df.iloc[0].to_dict() if len(df) else None
+
+    def pnl(self, as_of=None, prices: Optional[Dict[AssetKey, float]] = None) -> pd.DataFrame:
+        """
+        Varlık başına miktar, maliyet, gerçekleşen ve (fiyat verilirse) gerçekleşmemiş K/Z.
+        `as_of` verilirse o günün sonundaki durum anlık görüntülerden okunur.
+
+        Args:
+            prices: {(symbol, asset_type): fiyat}
+        """
+        if as_of is None:
+            df = self._query('SELECT symbol, asset_type, quantity, cost_basis, realized_pnl FROM positions')
+        else:
+            df = self._query('''SELECT s.symbol, s.asset_type, s.quantity, s.cost_basis, s.realized_pnl
+                                FROM pnl_snapshots s
+                                JOIN (SELECT symbol, asset_type, MAX(snap_date) AS snap_date
+                                      FROM pnl_snapshots WHERE snap_date <= ?
+                                      GROUP BY symbol, asset_type) m
+                                  ON s.symbol = m.symbol AND s.asset_type = m.asset_type
+                                 AND s.snap_date = m.snap_date''', (_day(as_of),))
+        df = df.sort_values(['asset_type', 'symbol']).reset_index(drop=True)
+        df['avg_cost'] = (df['cost_basis'] / df['quantity']).where(df['quantity'] > EPSILON, 0.0)
+        if prices is not None:
+            price = pd.Series([prices.get((s, t)) for s, t in zip(df['symbol'], df['asset_type'])],
+                              index=df.index, dtype='float64')
+            df['market_value'] = df['quantity'] * price
+            df['unrealized_pnl'] = df['market_value'] - df['cost_basis']
+        return df
+
+    def pnl_history(self, start=None, end=None) -> pd.DataFrame:
+        """Günlük toplam maliyet ve kümülatif gerçekleşen K/Z (anlık görüntülerden, tekrar oynatmadan)"""
+        snaps = self._query('SELECT snap_date, symbol, asset_type, cost_basis, realized_pnl FROM pnl_snapshots')
+        if snaps.empty:
+            return pd.DataFrame(columns=['cost_basis', 'realized_pnl'])
+        snaps['snap_date'] = pd.to_datetime(snaps['snap_date'])
+        start = pd.Timestamp(start).normalize() if start is not None else snaps['snap_date'].min()
+        end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.now().normalize()
+        dates = pd.date_range(start, end, freq='D')
+
+        result = {}
+        for field in ('cost_basis', 'realized_pnl'):
+            wide = snaps.pivot_table(index='snap_date', columns=['symbol', 'asset_type'], values=field)
+            # Pencere öncesindeki son durum ilk güne taşınır
+            wide = wide.reindex(wide.index.union(dates)).ffill().reindex(dates)
+            result[field] = wide.fillna(0.0).sum(axis=1)
+        return pd.DataFrame(result, index=dates)
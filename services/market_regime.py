@@ -0,0 +1,187 @@
+"""
+Market Regime Service
+Benchmark seti (BTC, altın, S&P 500, BIST 100) için piyasa rejimi: trend, volatilite rejimi,
+zirveden düşüş ve genişlik (breadth).
+
+- Günlük kapanışlar gün boyu önbellekten gelir; göstergeler (SMA, rolling volatilite, rolling zirve)
+  tüm varlıklar için tek (gün x varlık) karesi üzerinde vektörel hesaplanır
+- Sonuç zamanlanmış işle (market_regime) yenilenir ve paylaşılan önbellekte tutulur;
+  latest() indirme yapmaz, O(1) okuma (get_ai_recommendation her çağrıda kullanır)
+
+Takvimler farklı olduğundan (kripto hafta sonu işlem görür) kareler iş günlerine indirgenir;
+yıllıklandırma 252 gün üzerinden yapılır. Fiyatlar varlığın kendi para biriminde (BIST için TRY).
+"""
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from multi_asset_manager import AssetManager
+from services.cache import get_cache
+from services.portfolio_service import BENCHMARK_ASSETS
+
+REGIME_ASSETS = BENCHMARK_ASSETS + [{'symbol': 'XU100', 'type': 'stock_tr', 'name': 'BIST 100'}]
+# SMA200 + bir yıllık volatilite yüzdeliği için yeterli iş günü
+LOOKBACK_DAYS = 450
+HISTORY_TTL = 24 * 60 * 60
+# Zamanlanmış iş saatlik yeniler; iş durursa eski rejim bu süreden sonra sunulmaz
+REGIME_TTL = 6 * 60 * 60
+TRADING_DAYS = 252
+SHORT_WINDOW, LONG_WINDOW, VOL_WINDOW = 50, 200, 20
+
+
+def regime_indicators(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Args:
+        closes: (iş günü x varlık) kapanışlar
+
+    Returns:
+        Varlık başına son gün göstergeleri: price, sma50, sma200, trend, volatility,
+        vol_percentile, vol_regime, drawdown, return_1m, return_3m
+    """
+    prices = closes.ffill()
+    sma_short = prices.rolling(SHORT_WINDOW, min_periods=SHORT_WINDOW).mean()
+    sma_long = prices.rolling(LONG_WINDOW, min_periods=LONG_WINDOW).mean()
+    vol = np.log(prices).diff().rolling(VOL_WINDOW, min_periods=VOL_WINDOW).std() * np.sqrt(TRADING_DAYS)
+    peak = prices.rolling(TRADING_DAYS, min_periods=1).max()
+
+    last_vol = vol.iloc[-1]
+    recent_vol = vol.iloc[-TRADING_DAYS:]
+    # Son volatilitenin son bir yıl içindeki yüzdelik sırası
+    vol_percentile = recent_vol.le(last_vol).sum() / recent_vol.notna().sum()
+
+    price, short, long = prices.iloc[-1], sma_short.iloc[-1], sma_long.iloc[-1]
+    trend = np.select([long.isna(), (price > long) & (short > long), (price < long) & (short < long)],
+                      ['belirsiz', 'yükseliş', 'düşüş'], 'yatay')
+    vol_regime = np.select([last_vol.isna(), vol_percentile >= 2 / 3, vol_percentile <= 1 / 3],
+                           ['belirsiz', 'yüksek', 'düşük'], 'normal')
+
+    def change(days: int) -> pd.Series:
+        return price / prices.iloc[-days - 1] - 1 if len(prices) > days else pd.Series(np.nan, index=prices.columns)
+
+    return pd.DataFrame({
+        'price': price,
+        'sma50': short,
+        'sma200': long,
+        'trend': trend,
+        'volatility': last_vol,
+        'vol_percentile': vol_percentile,
+        'vol_regime': vol_regime,
+        'drawdown': price / peak.iloc[-1] - 1,
+        'return_1m': change(21),
+        'return_3m': change(63),
+    }, index=prices.columns)
+
+
+def summarize_regime(indicators: pd.DataFrame) -> Dict:
+    """Genişlik ve genel rejim: varlıkların çoğu SMA200 üstünde ve volatilite yüksek değilse risk-on"""
+    known = indicators['sma200'].notna()
+    above_long = float((indicators['price'] > indicators['sma200'])[known].mean()) if known.any() else None
+    above_short = float((indicators['price'] > indicators['sma50'])[indicators['sma50'].notna()].mean()) \
+        if indicators['sma50'].notna().any() else None
+    high_vol = int((indicators['vol_regime'] == 'yüksek').sum())
+    if above_long is None:
+        regime = 'belirsiz'
+    elif above_long >= 0.75 and high_vol <= len(indicators) // 2:
+        regime = 'risk-on'
+    elif above_long <= 0.25 or high_vol > len(indicators) // 2:
+        regime = 'risk-off'
+    else:
+        regime = 'karışık'
+    return {
+        'above_sma200': above_long,
+        'above_sma50': above_short,
+        'uptrend': int((indicators['trend'] == 'yükseliş').sum()),
+        'high_volatility': high_vol,
+        'regime': regime,
+    }
+
+
+class MarketRegimeService:
+    """
+    Args:
+        manager: Geçmişi çeken AssetManager (refresh'e verilmezse bu kullanılır)
+        assets: İzlenen varlıklar (varsayılan REGIME_ASSETS)
+    """
+
+    def __init__(self, manager: Optional[AssetManager] = None, assets: Optional[List[Dict]] = None):
+        self.manager = manager
+        self.assets = assets or REGIME_ASSETS
+        self._history = get_cache('regime_history', maxsize=64, ttl=HISTORY_TTL)
+        self._latest = get_cache('market_regime', maxsize=1, ttl=REGIME_TTL)
+        self._lock = threading.Lock()
+
+    def daily_closes(self, manager: AssetManager, symbol: str, asset_type: str) -> pd.Series:
+        """Günlük kapanışlar (gün boyu önbellekli)"""
+        key = (symbol, asset_type, LOOKBACK_DAYS, datetime.now().strftime('%Y-%m-%d'))
+        series = self._history.get(key)
+        if series is None:
+            data = manager.get_historical_data(symbol, asset_type, days=LOOKBACK_DAYS)
+            if data is None or data.empty or 'Close' not in data.columns:
+                return pd.Series(dtype=float)
+            close = data['Close']
+            if isinstance(close, pd.DataFrame):
+                close = close.iloc[:, 0]
+            close.index = pd.DatetimeIndex(close.index).tz_localize(None).normalize()
+            series = close[~close.index.duplicated(keep='last')].astype(float).dropna()
+            if not series.empty:
+                self._history.set(key, series)
+        return series
+
+    def compute(self, manager: Optional[AssetManager] = None) -> Optional[Dict]:
+        """Geçmişi (önbellekten) toplayıp rejimi hesaplar; veri yoksa None"""
+        manager = manager or self.manager or AssetManager()
+        closes = {a['symbol']: self.daily_closes(manager, a['symbol'], a['type']) for a in self.assets}
+        closes = {s: c for s, c in closes.items() if not c.empty}
+        if not closes:
+            return None
+        frame = pd.DataFrame(closes).sort_index().resample('B').last().ffill()
+        indicators = regime_indicators(frame)
+
+        names = {a['symbol']: a for a in self.assets}
+        assets = []
+        for symbol, row in indicators.iterrows():
+            entry = {'symbol': symbol, 'name': names[symbol].get('name', symbol), 'type': names[symbol]['type']}
+            for column, value in row.items():
+                entry[column] = value if isinstance(value, str) else (None if pd.isna(value) else float(value))
+            assets.append(entry)
+        return {
+            'as_of': str(frame.index[-1].date()),
+            'computed_at': datetime.now().isoformat(timespec='seconds'),
+            'assets': assets,
+            **summarize_regime(indicators),
+        }
+
+    def refresh(self, manager: Optional[AssetManager] = None) -> Optional[Dict]:
+        """Zamanlanmış iş: yeniden hesaplar ve paylaşılan önbelleğe yazar"""
+        snapshot = self.compute(manager)
+        if snapshot is not None:
+            self._latest.set('latest', snapshot)
+        return snapshot
+
+    def latest(self) -> Optional[Dict]:
+        """Son hesaplanan rejim (indirme yok); henüz hesaplanmadıysa None"""
+        return self._latest.get('latest')
+
+    def current(self, manager: Optional[AssetManager] = None) -> Optional[Dict]:
+        """latest(); zamanlayıcı kapalı ve süreç soğuksa bir kez hesaplanır (eşzamanlı çağrılar bekler)"""
+        snapshot = self.latest()
+        if snapshot is None:
+            with self._lock:
+                snapshot = self.latest() or self.refresh(manager)
+        return snapshot
+
+
+_service: Optional[MarketRegimeService] = None
+_service_lock = threading.Lock()
+
+
+def get_market_regime() -> MarketRegimeService:
+    """Süreç genelinde paylaşılan rejim servisi"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MarketRegimeService()
+        return _service
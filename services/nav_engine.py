@@ -0,0 +1,150 @@
+"""
+NAV Engine
+Çoklu varlık portföyünün günlük net varlık değeri (NAV) serisini vektörel olarak hesaplar.
+
+- Fiyat matrisi (gün x varlık): her varlık kendi borsa takviminde kapanış verir; ortak takvim
+  günlüktür (kripto 7/24). Borsanın kapalı olduğu günlerde son kapanış taşınır (calendar-aware ffill).
+- Pozisyon matrisi (gün x varlık): işlem günlüğündeki miktar değişimleri tarihlerine yerleştirilip
+  kümülatif toplanır; portföy zamanla değişebilir.
+- NAV = pozisyon x fiyat matrislerinin eleman çarpımının satır toplamı (tek vektörel adım).
+Sonuç portföy sürümü (işlem günlüğünün özeti) + para birimi + pencere ile önbelleklenir.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from services.cache import get_cache
+from services.fx_service import FXService, quote_currency
+
+# Borsa kapalıyken (hafta sonu, bayram) son kapanışın en fazla kaç gün taşınacağı
+MAX_STALE_DAYS = 7
+# Pencere başında kapalı gün varsa önceki kapanışı bulabilmek için ek geçmiş
+LOOKBACK_PAD_DAYS = 10
+
+CASH_TYPES = {'cash'}
+
+AssetKey = Tuple[str, str]  # (symbol, asset_type)
+
+
+def portfolio_version(transactions: Iterable[Dict]) -> str:
+    """İşlem günlüğünün kararlı özeti; günlük değişmedikçe aynı kalır"""
+    rows = sorted(
+        (str(pd.Timestamp(t['date']).date()), t['symbol'], t['type'], float(t['amount']))
+        for t in transactions
+    )
+    return hashlib.sha1(repr(rows).encode('utf-8')).hexdigest()
+
+
+def holdings_from_positions(positions: Iterable[Dict], start) -> List[Dict]:
+    """Sabit pozisyonları (symbol, type, amount) `start` tarihli işlemlere çevirir"""
+    return [
+        {'date': start, 'symbol': p['symbol'], 'type': p['type'], 'amount': float(p['amount'])}
+        for p in positions if float(p['amount'])
+    ]
+
+
+def holdings_matrix(transactions: List[Dict], dates: pd.DatetimeIndex,
+                    assets: List[AssetKey]) -> np.ndarray:
+    """
+    (gün x varlık) pozisyon matrisi. Pencereden önceki işlemler ilk güne yazılır;
+    her gün o güne kadarki değişimlerin toplamıdır.
+    """
+    deltas = np.zeros((len(dates), len(assets)), dtype=np.float64)
+    if not transactions:
+        return deltas
+    col = {a: i for i, a in enumerate(assets)}
+    tx_dates = pd.DatetimeIndex([pd.Timestamp(t['date']).normalize() for t in transactions])
+    rows = np.clip(dates.searchsorted(tx_dates, side='left'), 0, len(dates))
+    cols = np.array([col[(t['symbol'], t['type'])] for t in transactions])
+    amounts = np.array([float(t['amount']) for t in transactions])
+    in_window = rows < len(dates)  # Pencereden sonraki işlemler etkisiz
+    np.add.at(deltas, (rows[in_window], cols[in_window]), amounts[in_window])
+    return np.cumsum(deltas, axis=0)
+
+
+class NavEngine:
+    """
+    Args:
+        manager: Geçmiş kapanışları veren AssetManager (get_historical_data)
+        fx: Kur dönüşümü (varsayılan manager.fx)
+    """
+
+    def __init__(self, manager, fx: Optional[FXService] = None, cache_ttl: float = 15 * 60):
+        self.manager = manager
+        self.fx = fx if fx is not None else FXService(manager)
+        self._cache = get_cache('nav', maxsize=128, ttl=cache_ttl)
+
+    def _close_series(self, symbol: str, asset_type: str, days: int) -> pd.Series:
+        df = self.manager.get_historical_data(symbol, asset_type, days=days)
+        if df is None or df.empty:
+            return pd.Series(dtype=np.float64)
+        close = df['Close'] if 'Close' in df.columns else df['close']
+        if isinstance(close, pd.DataFrame):
+            close = close.iloc[:, 0]
+        close = close.astype(np.float64).dropna()
+        index = pd.DatetimeIndex(close.index)
+        if index.tz is not None:
+            index = index.tz_convert('UTC').tz_localize(None)
+        close.index = index.normalize()
+        return close[~close.index.duplicated(keep='last')]
+
+    def price_matrix(self, assets: List[AssetKey], dates: pd.DatetimeIndex,
+                     currency: Optional[str] = None) -> pd.DataFrame:
+        """
+        (gün x varlık) kapanış matrisi, `currency` cinsinden.
+        Geçmişler paralel çekilir; her kolon ortak günlük takvime hizalanıp ileri doldurulur.
+        """
+        days = (pd.Timestamp.now().normalize() - dates[0]).days + LOOKBACK_PAD_DAYS
+        priced = [a for a in assets if a[1] not in CASH_TYPES]
+        with ThreadPoolExecutor(max_workers=max(1, min(8, len(priced)))) as pool:
+            closes = dict(zip(priced, pool.map(lambda a: self._close_series(a[0], a[1], days), priced)))
+
+        matrix = pd.DataFrame(index=dates, dtype=np.float64)
+        for symbol, asset_type in assets:
+            key = f"{symbol}|{asset_type}"
+            if asset_type in CASH_TYPES:
+                # Nakit kendi para biriminde 1.0; raporlama para birimine günün kuruyla çevrilir
+                matrix[key] = self.fx.convert_series(pd.Series(1.0, index=dates),
+                                                     quote_currency(symbol, asset_type), to=currency)
+                continue
+            close = closes.get((symbol, asset_type), pd.Series(dtype=np.float64))
+            if close.empty:
+                matrix[key] = np.nan
+                continue
+            # Birleşik takvim üzerinde ileri doldur, sonra pencereye indir
+            full_index = close.index.union(dates)
+            aligned = close.reindex(full_index).ffill(limit=MAX_STALE_DAYS).reindex(dates)
+            matrix[key] = self.fx.convert_series(aligned, quote_currency(symbol, asset_type), to=currency)
+        return matrix
+
+    def compute(self, transactions: List[Dict], start, end=None,
+                currency: Optional[str] = None) -> pd.DataFrame:
+        """
+        Returns:
+            Günlük indeksli DataFrame: varlık başına değer kolonları ('SYMBOL|type') + 'NAV'.
+            Fiyatı bilinmeyen günlerde ilgili varlık NAV'a 0 katkı yapar.
+        """
+        start = pd.Timestamp(start).normalize()
+        end = pd.Timestamp(end).normalize() if end is not None else pd.Timestamp.now().normalize()
+        key = (portfolio_version(transactions), start, end, (currency or '').upper())
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached.copy()
+
+        dates = pd.date_range(start, end, freq='D')
+        assets = list(dict.fromkeys((t['symbol'], t['type']) for t in transactions))
+        if not assets or len(dates) == 0:
+            return pd.DataFrame({'NAV': 0.0}, index=dates)
+
+        prices = self.price_matrix(assets, dates, currency)
+        holdings = holdings_matrix(transactions, dates, assets)
+        price_values = np.nan_to_num(prices.to_numpy(dtype=np.float64), nan=0.0)
+
+        values = holdings * price_values
+        result = pd.DataFrame(values, index=dates, columns=prices.columns)
+        result['NAV'] = values.sum(axis=1)
+        self._cache.set(key, result)
+        return result.copy()
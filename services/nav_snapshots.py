@@ -0,0 +1,285 @@
+"""
+NAV Snapshots
+Portföy değerinin zamanlanmış kaydı ve kademeli saklama (tiered retention).
+
+- nav_snapshots: ham değerler (her NAV_SNAPSHOT işinde bir satır, yalnızca son 2 gün)
+- nav_rollups: saatlik / günlük / haftalık OHLC + ortalama (+ örnek sayısı). Her kademe bir
+  öncekinin kapanmış dilimlerinden artımlı üretilir (yalnızca son özetten sonraki satırlar okunur),
+  süresi dolan ince satırlar ancak üst kademeye aktarıldıktan sonra silinir.
+- Grafik okumaları aralığı max_points içinde karşılayan en ince kademeyi seçer; kademenin henüz
+  özetlenmemiş son dilimleri bir alttaki kademeden tamamlanır.
+
+Saklama: ham 2 gün, saatlik 90 gün, günlük 3 yıl, haftalık 10 yıl. Son kademe de süreyle sınırlı
+olduğundan portföy başına satır sayısı yaşla büyümez (~576 ham + 2160 saatlik + 1095 günlük + 522 haftalık);
+10 yıldan eski değerler silinir.
+Dilimler UTC'dir; haftalar Pazartesi başlar.
+"""
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+import db
+from config import Config
+from services.downsampling import downsample_frame
+from services.ledger import EPSILON, Ledger
+
+HOUR, DAY, WEEK = 3600, 86400, 7 * 86400
+# 1970-01-01 Perşembe; haftalık dilimler Pazartesiye hizalanır
+WEEK_OFFSET = 4 * DAY
+# (çözünürlük, dilim genişliği sn, saklama süresi sn; None = süresiz)
+TIERS: List[Tuple[str, Optional[int], Optional[int]]] = [
+    ('raw', None, 2 * DAY),
+    ('1h', HOUR, 90 * DAY),
+    ('1d', DAY, 3 * 365 * DAY),
+    ('1w', WEEK, 10 * 365 * DAY),
+]
+# Ham kademe için nokta tahmini (zamanlanmış iş aralığı)
+SNAPSHOT_INTERVAL = 5 * 60
+DEFAULT_MAX_POINTS = 500
+OHLC = ['open', 'high', 'low', 'close', 'mean', 'samples']
+
+
+def bucket_start(ts, width: int):
+    """UTC epoch sn -> dilim başlangıcı (haftalar Pazartesi)"""
+    offset = WEEK_OFFSET if width == WEEK else 0
+    return (ts - offset) // width * width + offset
+
+
+def rollup(frame: pd.DataFrame, width: int) -> pd.DataFrame:
+    """
+    Zamana göre sıralı (ts + OHLC) satırları dilimlere toplar.
+    Ortalama örnek sayısıyla ağırlıklıdır; böylece özetlerin özeti ham ortalamaya eşittir.
+    """
+    frame = frame.assign(bucket=bucket_start(frame['ts'].to_numpy(), width),
+                         weighted=frame['mean'] * frame['samples'])
+    out = frame.groupby('bucket', sort=True).agg(
+        open=('open', 'first'), high=('high', 'max'), low=('low', 'min'), close=('close', 'last'),
+        weighted=('weighted', 'sum'), samples=('samples', 'sum'))
+    out['mean'] = out.pop('weighted') / out['samples']
+    return out.reset_index().rename(columns={'bucket': 'ts'})[['ts'] + OHLC]
+
+
+class NavSnapshotter:
+    """
+    Args:
+        db_path: SQLite dosyası (varsayılan db.DB_NAME)
+        tiers: Kademe tanımları (varsayılan TIERS)
+    """
+
+    def __init__(self, db_path: Optional[str] = None, tiers: Optional[List[Tuple]] = None):
+        self.db_path = db_path
+        self.tiers = tiers or TIERS
+        self._lock = threading.Lock()
+        conn = self._connect()
+        db.init_nav_tables(conn.cursor())
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.db_path or db.DB_NAME, timeout=30)
+
+    # --- Yazma ---
+
+    def record(self, portfolio_id: str, value: float, currency: Optional[str] = None,
+               ts: Optional[float] = None) -> int:
+        """Tek ham değer; aynı saniyedeki ikinci kayıt öncekinin yerine geçer"""
+        ts = int(ts if ts is not None else time.time())
+        conn = self._connect()
+        try:
+            conn.execute('INSERT OR REPLACE INTO nav_snapshots (portfolio_id, ts, value, currency) VALUES (?, ?, ?, ?)',
+                         (portfolio_id, ts, float(value), (currency or Config.REPORTING_CURRENCY).upper()))
+            conn.commit()
+        finally:
+            conn.close()
+        return ts
+
+    def capture(self, service, ledger: Optional[Ledger] = None) -> Dict[str, float]:
+        """
+        Zamanlanmış iş: 'wallet' (portfolio tablosundaki BTC + nakit) ve 'ledger' (defterdeki açık
+        pozisyonlar) değerlerini raporlama para biriminde kaydeder. Boş portföyler atlanır.
+        """
+        values = {}
+        saved = db.get_portfolio()
+        if saved and ((saved[0] or 0) > 0 or (saved[1] or 0) > 0):
+            snapshot = service.get_portfolio_snapshot(saved[0] or 0.0, saved[1] or 0.0, [])
+            values['wallet'] = (snapshot['total_value'], snapshot['currency'])
+
+        positions = (ledger or Ledger(self.db_path)).pnl()
+        positions = positions[positions['quantity'] > EPSILON] if not positions.empty else positions
+        if not positions.empty:
+            assets = [{'symbol': r.symbol, 'type': r.asset_type, 'amount': float(r.quantity)}
+                      for r in positions.itertuples()]
+            snapshot = service.get_portfolio_snapshot(0.0, 0.0, assets)
+            values['ledger'] = (snapshot['total_value'], snapshot['currency'])
+
+        now = time.time()
+        for portfolio_id, (value, currency) in values.items():
+            self.record(portfolio_id, value, currency, ts=now)
+        return {k: v for k, (v, _) in values.items()}
+
+    def compact(self, now: Optional[float] = None) -> Dict[str, int]:
+        """
+        Kapanmış dilimleri üst kademelere aktarır, süresi dolan satırları siler.
+        Returns: {'1h': eklenen, ..., 'deleted': silinen}
+        """
+        now = int(now if now is not None else time.time())
+        stats = {name: 0 for name, _, _ in self.tiers[1:]}
+        stats['deleted'] = 0
+        with self._lock:
+            conn = self._connect()
+            try:
+                ids = [r[0] for r in conn.execute('SELECT DISTINCT portfolio_id FROM nav_snapshots UNION '
+                                                  'SELECT DISTINCT portfolio_id FROM nav_rollups')]
+                for portfolio_id in ids:
+                    for i in range(1, len(self.tiers)):
+                        stats[self.tiers[i][0]] += self._roll_tier(conn, portfolio_id, i, now)
+                    for i in range(len(self.tiers)):
+                        stats['deleted'] += self._expire_tier(conn, portfolio_id, i, now)
+                conn.commit()
+            finally:
+                conn.close()
+        return stats
+
+    def _last_bucket(self, conn, portfolio_id: str, resolution: str) -> Optional[int]:
+        return conn.execute('SELECT MAX(bucket) FROM nav_rollups WHERE portfolio_id=? AND resolution=?',
+                            (portfolio_id, resolution)).fetchone()[0]
+
+    def _roll_tier(self, conn, portfolio_id: str, index: int, now: int) -> int:
+        resolution, width, _ = self.tiers[index]
+        last = self._last_bucket(conn, portfolio_id, resolution)
+        since = last + width if last is not None else None
+        # Yalnızca kapanmış dilimler; açık dilim bir sonraki sıkıştırmada
+        source = self._read(conn, portfolio_id, index - 1, since, bucket_start(now, width) - 1)
+        if source.empty:
+            return 0
+        rows = rollup(source, width)
+        conn.executemany('''INSERT OR REPLACE INTO nav_rollups
+                            (portfolio_id, resolution, bucket, open, high, low, close, mean, samples)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                         [(portfolio_id, resolution, int(r.ts), r.open, r.high, r.low, r.close, r.mean,
+                           int(r.samples)) for r in rows.itertuples()])
+        return len(rows)
+
+    def _expire_tier(self, conn, portfolio_id: str, index: int, now: int) -> int:
+        resolution, _, retention = self.tiers[index]
+        if retention is None:
+            return 0
+        if index == len(self.tiers) - 1:
+            # Son kademe: saklama süresini aşan değerler tamamen silinir
+            cutoff = now - retention
+        else:
+            # Üst kademeye aktarılmamış satır silinmez
+            parent, parent_width, _ = self.tiers[index + 1]
+            rolled = self._last_bucket(conn, portfolio_id, parent)
+            if rolled is None:
+                return 0
+            cutoff = min(now - retention, rolled + parent_width)
+        if resolution == 'raw':
+            cur = conn.execute('DELETE FROM nav_snapshots WHERE portfolio_id=? AND ts < ?', (portfolio_id, cutoff))
+        else:
+            cur = conn.execute('DELETE FROM nav_rollups WHERE portfolio_id=? AND resolution=? AND bucket < ?',
+                               (portfolio_id, resolution, cutoff))
+        return cur.rowcount
+
+    # --- Okuma ---
+
+    def _read(self, conn, portfolio_id: str, index: int, start: Optional[int], end: Optional[int]) -> pd.DataFrame:
+        """
+        Kademe satırları [start, end] (ts + OHLC). Kademenin henüz özetlemediği son kısım
+        bir alttaki kademeden (özyinelemeli) tamamlanır.
+        """
+        start = start if start is not None else 0
+        end = end if end is not None else 2 ** 62
+        resolution, width, _ = self.tiers[index]
+        if resolution == 'raw':
+            return pd.read_sql_query(
+                '''SELECT ts, value AS open, value AS high, value AS low, value AS close, value AS mean,
+                          1 AS samples
+                   FROM nav_snapshots WHERE portfolio_id=? AND ts BETWEEN ? AND ? ORDER BY ts''',
+                conn, params=(portfolio_id, start, end))
+
+        rows = pd.read_sql_query(
+            '''SELECT bucket AS ts, open, high, low, close, mean, samples FROM nav_rollups
+               WHERE portfolio_id=? AND resolution=? AND bucket BETWEEN ? AND ? ORDER BY bucket''',
+            conn, params=(portfolio_id, resolution, int(bucket_start(start, width)), end))
+        last = self._last_bucket(conn, portfolio_id, resolution)
+        tail_start = max(start, last + width) if last is not None else start
+        if tail_start > end:
+            return rows
+        tail = self._read(conn, portfolio_id, index - 1, tail_start, end)
+        if tail.empty:
+            return rows
+        tail = rollup(tail, width)
+        return tail if rows.empty else pd.concat([rows, tail], ignore_index=True)
+
+    def choose_tier(self, start: int, end: int, max_points: int, now: Optional[float] = None) -> int:
+        """Aralığı kapsayan ve max_points'i aşmayan en ince kademe"""
+        now = now if now is not None else time.time()
+        for i, (_, width, retention) in enumerate(self.tiers):
+            covered = retention is None or start >= now - retention
+            if covered and (end - start) / (width or SNAPSHOT_INTERVAL) <= max_points:
+                return i
+        return len(self.tiers) - 1
+
+    def series(self, portfolio_id: str, start: Optional[float] = None, end: Optional[float] = None,
+               max_points: int = DEFAULT_MAX_POINTS) -> pd.DataFrame:
+        """
+        Grafik serisi: DatetimeIndex (UTC) + open/high/low/close/mean/samples, en fazla max_points satır.
+        attrs['resolution'] seçilen kademeyi gösterir.
+        """
+        now = time.time()
+        end = int(end if end is not None else now)
+        conn = self._connect()
+        try:
+            if start is None:
+                first = conn.execute('''SELECT MIN(t) FROM (SELECT MIN(ts) AS t FROM nav_snapshots WHERE portfolio_id=?
+                                        UNION ALL SELECT MIN(bucket) FROM nav_rollups WHERE portfolio_id=?)''',
+                                     (portfolio_id, portfolio_id)).fetchone()[0]
+                start = first if first is not None else end
+            start = int(start)
+            index = self.choose_tier(start, end, max_points, now)
+            frame = self._read(conn, portfolio_id, index, start, end)
+        finally:
+            conn.close()
+
+        frame.index = pd.to_datetime(frame.pop('ts'), unit='s')
+        frame.index.name = 'timestamp'
+        frame = downsample_frame(frame, max_points)
+        frame.attrs['resolution'] = self.tiers[index][0]
+        return frame
+
+    def bars(self, portfolio_id: str, resolution: str, since: Optional[float] = None,
+             max_points: int = DEFAULT_MAX_POINTS) -> pd.DataFrame:
+        """
+        Tek kademenin since anını içeren dilimden itibaren çubukları (ts + OHLC), en fazla son max_points satır.
+        Son çubuk açık dilim olabilir; artımlı eşitlemede istemci elindeki son çubuğun ts'ini gönderir
+        ve o çubuk güncel haliyle yeniden gelir. since verilmezse son max_points dilim.
+        """
+        names = [name for name, _, _ in self.tiers]
+        if resolution not in names:
+            raise ValueError(f"Bilinmeyen çözünürlük: {resolution} ({', '.join(names)})")
+        index = names.index(resolution)
+        end = int(time.time())
+        start = int(since) if since is not None else end - max_points * (self.tiers[index][1] or SNAPSHOT_INTERVAL)
+        conn = self._connect()
+        try:
+            frame = self._read(conn, portfolio_id, index, start, end)
+        finally:
+            conn.close()
+        return frame.tail(max_points).reset_index(drop=True)
+
+    def row_counts(self, portfolio_id: str) -> Dict[str, int]:
+        """Kademe başına saklanan satır sayısı"""
+        conn = self._connect()
+        try:
+            counts = {'raw': conn.execute('SELECT COUNT(*) FROM nav_snapshots WHERE portfolio_id=?',
+                                          (portfolio_id,)).fetchone()[0]}
+            for resolution, count in conn.execute('''SELECT resolution, COUNT(*) FROM nav_rollups
+                                                     WHERE portfolio_id=? GROUP BY resolution''', (portfolio_id,)):
+                counts[resolution] = count
+        finally:
+            conn.close()
+        return counts
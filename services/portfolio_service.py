@@ -5,51 +5,72 @@ Handles portfolio calculations, data fetching, and benchmark comparisons.
 import pandas as pd
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
+from config import Config
 from multi_asset_manager import AssetManager
+from services.downsampling import downsample_frame
+from services.fx_service import FX_UNAVAILABLE, FXService, quote_currency
+from services.symbol_catalog import SymbolCatalog, get_symbol_catalog
+from services.nav_engine import NavEngine, holdings_from_positions
+from services.cache import get_cache
+
+# Karşılaştırma varlıkları (grafikteki adlarıyla)
+BENCHMARK_ASSETS = [
+    {'symbol': 'BTC', 'type': 'crypto', 'name': 'Bitcoin'},
+    {'symbol': 'GC=F', 'type': 'commodity', 'name': 'Altın (Ons)'},
+    {'symbol': '^GSPC', 'type': 'stock_us', 'name': 'S&P 500'},
+]
+# Benchmark kareleri gün boyunca geçerli (anahtar tarihi içerir); gece işi yeni günü önceden hesaplar
+BENCHMARK_TTL = 24 * 60 * 60
 
 class PortfolioService:
-    def __init__(self, asset_manager: Optional[AssetManager] = None):
+    def __init__(self, asset_manager: Optional[AssetManager] = None,
+                 catalog: Optional[SymbolCatalog] = None):
         self.manager = asset_manager if asset_manager else AssetManager()
+        # Kur önbelleği AssetManager ile paylaşılır
+        self.fx = self.manager.fx if isinstance(self.manager, AssetManager) else FXService(self.manager)
+        self.nav = NavEngine(self.manager, fx=self.fx)
+        self._catalog = catalog
+        self._benchmark_cache = get_cache('benchmark_frames', maxsize=32, ttl=BENCHMARK_TTL)
+
+    @property
+    def catalog(self) -> SymbolCatalog:
+        # İlk kullanımda yüklenir (Binance piyasaları arka planda gelir)
+        if self._catalog is None:
+            self._catalog = get_symbol_catalog()
+        return self._catalog
 
     def get_benchmark_chart_data(self, btc_amount: float, usdt_amount: float,
                                  initial_usd: float, start_date_str: str,
-                                 days: int = 365) -> pd.DataFrame:
+                                 days: int = 365, max_points: Optional[int] = None,
+                                 currency: Optional[str] = None,
+                                 extra_assets: Optional[List[Dict]] = None) -> pd.DataFrame:
         """
         Prepares historical performance chart data using AssetManager.
         Replaces logic previously in app.py's get_benchmark_chart_data.
+        If max_points is given, the frame is reduced with LTTB so its size does not
+        grow with the requested range.
+        Returns are measured in `currency` (default Config.REPORTING_CURRENCY),
+        converting each day at that day's rate.
+        The wallet line ('Cüzdanım') is the NAV of BTC + USDT + extra_assets.
         """
-        # Comparison assets
-        comparison_assets = [
-            {'symbol': 'BTC', 'type': 'crypto'},       # Bitcoin
-            {'symbol': 'GC=F', 'type': 'commodity'},   # Gold
-            {'symbol': '^GSPC', 'type': 'stock_us'}    # S&P 500
-        ]
-
-        # Fetch data
-        df_combined = self.manager.compare_performance(comparison_assets, days=days)
-
-        # Rename columns (Symbol -> Readable Name)
-        rename_map = {'BTC': 'Bitcoin', 'GC=F': 'Altın (Ons)', '^GSPC': 'S&P 500'}
-        df_combined.rename(columns=rename_map, inplace=True)
-
-        # Calculate Wallet Performance (Simulated)
-        if 'Bitcoin' in df_combined.columns and initial_usd > 0:
-            # Re-fetch BTC history to ensure alignment and accuracy
-            btc_hist = self.manager.get_historical_data('BTC', 'crypto', days=days)
-
-            if not btc_hist.empty:
-                btc_prices = btc_hist['Close']
-                if isinstance(btc_prices, pd.DataFrame):
-                    btc_prices = btc_prices.iloc[:, 0]
-
-                # Align indices
-                common_idx = df_combined.index.intersection(btc_prices.index)
-                btc_prices = btc_prices.loc[common_idx]
-
-                wallet_values = (btc_prices * btc_amount) + usdt_amount
-                wallet_normalized = ((wallet_values / initial_usd) - 1) * 100
-
-                df_combined.loc[common_idx, 'Cüzdanım'] = wallet_normalized
+        # Comparison assets (Bitcoin, Gold, S&P 500), precomputed off-peak when possible
+        df_combined = self.get_benchmark_frame(days, currency)
+
+        # Calculate Wallet Performance (Simulated): BTC + nakit + ek varlıkların günlük NAV'ı
+        if len(df_combined) > 0 and initial_usd > 0:
+            start = df_combined.index[0]
+            positions = [
+                {'symbol': 'BTC', 'type': 'crypto', 'amount': btc_amount},
+                {'symbol': 'USDT', 'type': 'cash', 'amount': usdt_amount},
+            ] + list(extra_assets or [])
+            nav = self.nav.compute(holdings_from_positions(positions, start), start, currency=currency)['NAV']
+
+            if len(nav) > 0:
+                # Başlangıç tutarı (USD) başlangıç gününün kuruyla çevrilir
+                initial_value = self.fx.convert_series(
+                    pd.Series([float(initial_usd)], index=nav.index[:1]), 'USD', to=currency).iloc[0]
+                wallet = nav.reindex(df_combined.index.normalize()).to_numpy()
+                df_combined['Cüzdanım'] = ((wallet / initial_value) - 1) * 100
 
         # Inflation Curve
         num_days = len(df_combined)
@@ -59,54 +80,96 @@ class PortfolioService:
             # Align with dataframe index
             df_combined['ABD Enflasyonu'] = pd.Series(inf_series, index=df_combined.index).ffill()
 
-        return df_combined
+        return downsample_frame(df_combined, max_points)
+
+    def get_benchmark_frame(self, days: int = 365, currency: Optional[str] = None,
+                            refresh: bool = False) -> pd.DataFrame:
+        """
+        Normalized returns of BENCHMARK_ASSETS, cached per (days, currency, day).
+        refresh=True recomputes and stores the frame (used by the scheduled precompute job).
+        """
+        key = (int(days), (currency or Config.REPORTING_CURRENCY).upper(), datetime.now().strftime('%Y-%m-%d'))
+        frame = None if refresh else self._benchmark_cache.get(key)
+        if frame is None:
+            frame = self.manager.compare_performance(BENCHMARK_ASSETS, days=days, currency=currency)
+            # Rename columns (Symbol -> Readable Name)
+            frame = frame.rename(columns={a['symbol']: a['name'] for a in BENCHMARK_ASSETS})
+            if not frame.empty:
+                self._benchmark_cache.set(key, frame)
+        return frame.copy()
 
     def get_portfolio_snapshot(self, saved_btc: float, saved_usdt: float,
-                              extra_assets: List[Dict]) -> Dict:
+                              extra_assets: List[Dict], currency: Optional[str] = None) -> Dict:
         """
         Returns a complete snapshot of the portfolio including current values.
+        Values and the total are in `currency` (default Config.REPORTING_CURRENCY);
+        btc_price stays in USD.
         """
+        currency = (currency or Config.REPORTING_CURRENCY).upper()
+
         # Get BTC price
         current_btc_price = self.manager.get_price('BTC', 'crypto')
         if current_btc_price is None:
             current_btc_price = 0.0
 
-        # Base Portfolio
-        full_portfolio = {
-            'BTC (Cüzdan)': {'type': 'crypto', 'amount': saved_btc, 'value': saved_btc * current_btc_price},
-            'Nakit (USDT)': {'type': 'cash', 'amount': saved_usdt, 'value': saved_usdt}
-        }
-
-        total_val = (saved_btc * current_btc_price) + saved_usdt
-
-        # Extra Assets
+        # Base Portfolio (USD) + Extra Assets (kendi para birimlerinde)
+        rows = [
+            ('BTC (Cüzdan)', 'BTC', 'crypto', saved_btc, saved_btc * current_btc_price, 'USD'),
+            ('Nakit (USDT)', 'USDT', 'cash', saved_usdt, saved_usdt, 'USD'),
+        ]
         for asset in extra_assets:
             p = self.manager.get_price(asset['symbol'], asset['type'])
             if p:
-                val = p * asset['amount']
-                full_portfolio[asset['symbol']] = {
-                    'type': asset['type'],
-                    'amount': asset['amount'],
-                    'value': val
-                }
-                total_val += val
+                rows.append((asset['symbol'], asset['symbol'], asset['type'], asset['amount'],
+                             p * asset['amount'], quote_currency(asset['symbol'], asset['type'])))
+
+        # Tek vektörel dönüşüm; kuru bulunamayan kalem toplama katılmaz
+        values = self.fx.convert([r[4] for r in rows], [r[5] for r in rows], to=currency)
+        full_portfolio = {}
+        total_val = 0.0
+        for (name, symbol, asset_type, amount, _, quote_ccy), value in zip(rows, values):
+            full_portfolio[name] = {'symbol': symbol, 'type': asset_type, 'amount': amount,
+                                    'value': float(value) if value == value else 0.0}
+            if quote_ccy != currency:
+                full_portfolio[name]['currency'] = quote_ccy
+            if value != value:
+                full_portfolio[name]['error'] = FX_UNAVAILABLE
+            total_val += full_portfolio[name]['value']
 
         return {
             'portfolio': full_portfolio,
             'total_value': total_val,
+            'currency': currency,
             'btc_price': current_btc_price
         }
 
     def validate_and_add_asset(self, symbol: str, asset_type: str, amount: float) -> Optional[Dict]:
         """
         Validates asset existence and returns the asset object if valid.
+        Catalog symbols are accepted without a network call (price is then None);
+        unknown symbols fall back to a live price check, and failures are remembered
+        for a while so repeated typos do not hit the network again.
         """
+        symbol = symbol.upper()
+        if self.catalog.contains(symbol, asset_type):
+            return {
+                'symbol': symbol,
+                'type': asset_type,
+                'amount': amount,
+                'price': None,
+                'name': self.catalog.name(symbol, asset_type)
+            }
+        if self.catalog.is_known_missing(symbol, asset_type):
+            return None
+
         test_price = self.manager.get_price(symbol, asset_type)
         if test_price:
+            self.catalog.add(symbol, asset_type)
             return {
                 'symbol': symbol,
                 'type': asset_type,
                 'amount': amount,
                 'price': test_price
             }
+        self.catalog.remember_missing(symbol, asset_type)
         return None
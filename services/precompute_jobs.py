@@ -0,0 +1,133 @@
+"""
+Precompute Jobs
+Yoğun saatlerde istek içinde hesaplanan verilerin gece/boş zamanda önceden hazırlanması.
+
+- warmup (@reboot): anlık fiyatlar, kurlar, benchmark karesi ve Gemini model listesi
+- ohlcv_refresh: popüler varlıkların 1m bar deposuna yalnızca delta indirilir (PRIORITY_BACKFILL)
+- benchmark_precompute: yeni günün benchmark kareleri
+- model_retrain: popüler (sembol, hedef, süre) çiftleri için günlük modeller yeniden eğitilir
+- probability_alerts: olasılık alarmları (önbellekteki sonuçlarla) değerlendirilir
+- catalog_refresh: Binance sembol kataloğu
+- market_regime: benchmark setinin piyasa rejimi (AI önerileri ve /api/market/regime)
+- nav_snapshot / nav_compact: portföy değerinin 5 dakikalık kaydı ve kademeli özetlere sıkıştırılması
+"""
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+import db
+from config import Config
+from services.job_scheduler import Job, JobScheduler
+from services.market_regime import get_market_regime
+from services.nav_snapshots import NavSnapshotter
+from services.portfolio_service import BENCHMARK_ASSETS, PortfolioService
+from services.symbol_catalog import get_symbol_catalog, refresh_catalog
+from services.upstream_scheduler import PRIORITY_BACKFILL
+
+POPULAR_LIMIT = 20
+# Performans görünümündeki dönem seçenekleri
+BENCHMARK_WINDOWS = (90, 365, 730, 1825)
+# predict_probability / API varsayılanı her zaman hazır tutulur
+DEFAULT_PREDICTIONS = [('BTC-USD', 100000.0, 10.0)]
+
+
+def _query(sql: str, params: tuple = ()) -> list:
+    conn = sqlite3.connect(db.DB_NAME)
+    try:
+        return conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError:
+        # Tablo henüz oluşturulmamış (init_db çağrılmadı)
+        return []
+    finally:
+        conn.close()
+
+
+def popular_assets(limit: int = POPULAR_LIMIT) -> List[Tuple[str, str]]:
+    """Benchmark varlıkları + en çok alarm kurulan ve defterde açık pozisyonu olan varlıklar"""
+    assets = [(a['symbol'], a['type']) for a in BENCHMARK_ASSETS]
+    assets += _query('''SELECT symbol, asset_type FROM alerts WHERE active=1 AND kind != 'probability'
+                        GROUP BY symbol, asset_type ORDER BY COUNT(*) DESC LIMIT ?''', (limit,))
+    assets += _query('SELECT symbol, asset_type FROM positions WHERE quantity > 0 LIMIT ?', (limit,))
+    return list(dict.fromkeys(tuple(a) for a in assets))[:limit]
+
+
+def popular_predictions(limit: int = POPULAR_LIMIT) -> List[Tuple[str, float, float]]:
+    """Olasılık alarmlarında en çok kullanılan (sembol, hedef, gün) çiftleri"""
+    rows = _query('''SELECT symbol, target_price, horizon_days FROM alerts WHERE active=1 AND kind='probability'
+                     GROUP BY symbol, target_price, horizon_days ORDER BY COUNT(*) DESC LIMIT ?''', (limit,))
+    pairs = DEFAULT_PREDICTIONS + [(s, float(t), float(d)) for s, t, d in rows]
+    return list(dict.fromkeys(pairs))[:limit]
+
+
+def warm_caches(service: PortfolioService):
+    """Dağıtım sonrası ilk isteklerin soğuk önbelleğe düşmemesi için"""
+    for symbol, asset_type in popular_assets():
+        service.manager.get_price(symbol, asset_type)
+    if Config.REPORTING_CURRENCY.upper() != 'USD':
+        service.fx.usd_rates([Config.REPORTING_CURRENCY])
+    service.get_benchmark_frame(365)
+    get_market_regime().refresh(service.manager)
+    if Config.GOOGLE_API_KEY:
+        from services.ai_service import get_gemini_models
+        get_gemini_models(Config.GOOGLE_API_KEY)
+
+
+def refresh_ohlcv(service: PortfolioService):
+    """1m bar deposunu popüler varlıklar için günceller (yalnızca son bardan sonrası indirilir)"""
+    manager = service.manager
+    for symbol, asset_type in popular_assets():
+        manager.get_historical_data(symbol, asset_type, days=manager.bar_store.max_days,
+                                    interval='1h', priority=PRIORITY_BACKFILL)
+
+
+def precompute_benchmarks(service: PortfolioService):
+    for days in BENCHMARK_WINDOWS:
+        service.get_benchmark_frame(days, refresh=True)
+
+
+def retrain_models():
+    import future_price
+    for symbol, target, days in popular_predictions():
+        future_price.predict_probability_cached(symbol, target, days, refresh=True)
+
+
+def evaluate_probability_alerts():
+    from services.alert_engine import get_alert_engine
+    get_alert_engine().evaluate_probability_alerts()
+
+
+def register_default_jobs(scheduler: JobScheduler, service: PortfolioService) -> JobScheduler:
+    snapshotter = NavSnapshotter()
+    scheduler.add_job(Job('warmup', '@reboot', lambda: warm_caches(service)))
+    scheduler.add_job(Job('catalog_refresh', '0 */6 * * *',
+                          lambda: refresh_catalog(get_symbol_catalog()), jitter=300))
+    scheduler.add_job(Job('ohlcv_refresh', '15 2 * * *', lambda: refresh_ohlcv(service), jitter=600))
+    scheduler.add_job(Job('benchmark_precompute', '30 2 * * *',
+                          lambda: precompute_benchmarks(service), jitter=600))
+    scheduler.add_job(Job('model_retrain', '0 3 * * *', retrain_models, jitter=900, lease=2 * 60 * 60))
+    scheduler.add_job(Job('probability_alerts', '20 * * * *', evaluate_probability_alerts, jitter=120))
+    scheduler.add_job(Job('market_regime', '5 * * * *',
+                          lambda: get_market_regime().refresh(service.manager), jitter=120))
+    scheduler.add_job(Job('nav_snapshot', '*/5 * * * *', lambda: snapshotter.capture(service), lease=4 * 60))
+    scheduler.add_job(Job('nav_compact', '40 * * * *', snapshotter.compact, jitter=120))
+    return scheduler
+
+
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def start_background_jobs(service: PortfolioService) -> Optional[JobScheduler]:
+    """Config.SCHEDULER_ENABLED ise süreç başına bir zamanlayıcı başlatır"""
+    global _scheduler
+    if not Config.SCHEDULER_ENABLED:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = register_default_jobs(JobScheduler(), service)
+            _scheduler.start()
+        return _scheduler
+
+
+def get_background_jobs() -> Optional[JobScheduler]:
+    return _scheduler
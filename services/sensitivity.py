@@ -0,0 +1,147 @@
+"""
+Sensitivity Service
+Çoklu varlık "ya olursa" ızgarası: varlık ya da varlık sınıfı başına şok aralıkları
+(ör. BTC -%50…+%100, altın ±%20, BIST ±%30) için portföy değerinin tam Kartezyen ızgarası.
+
+- Her eksen bir üyelik satırıdır (eksen x varlık); eksen maruziyeti tek matris çarpımıyla
+  (üyelik @ değerler) holdings vektöründen çıkar
+- Izgara, eksen şok vektörlerinin yayınlanmış (broadcast) toplamıdır; hücre başına döngü yok
+- En kötü / en iyi hücreler argpartition ile seçilir, yalnızca onlar için varlık kırılımı üretilir
+
+Bir varlık birden çok eksene uyuyorsa sembol ekseni sınıf eksenine önceliklidir
+(ör. 'BTC' ve 'crypto' eksenleri birlikte: BTC kendi ekseninde, kalan kripto sınıf ekseninde).
+"""
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Şoklanabilir varlık sınıfları (AssetManager.ASSET_TYPES anahtarları)
+ASSET_CLASSES = {
+    'crypto': 'Kripto',
+    'stock_tr': 'BIST',
+    'stock_us': 'ABD Hisse',
+    'commodity': 'Emtia',
+    'forex': 'Döviz',
+}
+DEFAULT_STEPS = 21
+MAX_STEPS = 201
+# Izgara hücre üst sınırı (ör. 3 eksen x 100 adım = 1M)
+MAX_GRID_CELLS = 1_000_000
+
+
+def shock_vector(axis: Dict) -> np.ndarray:
+    """{'min': -0.5, 'max': 1.0, 'steps': 101} -> eşit aralıklı şoklar (oran; -0.5 = %-50)"""
+    low, high = float(axis['min']), float(axis['max'])
+    steps = int(axis.get('steps', DEFAULT_STEPS))
+    if low > high:
+        raise ValueError(f"min > max ({axis.get('target')})")
+    if low < -1.0:
+        raise ValueError(f"Şok -100%'ün altında olamaz ({axis.get('target')})")
+    if not 1 <= steps <= MAX_STEPS:
+        raise ValueError(f"steps 1-{MAX_STEPS} arasında olmalı ({axis.get('target')})")
+    return np.linspace(low, high, steps)
+
+
+def membership_matrix(positions: Sequence[Dict], targets: Sequence[str]) -> np.ndarray:
+    """
+    (eksen x varlık) 0/1 üyelik matrisi. Hedef bir sembolse yalnızca o varlık,
+    sınıfsa o türdeki (başka eksende sembolüyle yer almayan) varlıklar.
+    """
+    symbols = np.array([p['symbol'] for p in positions], dtype=object)
+    types = np.array([p['type'] for p in positions], dtype=object)
+    membership = np.zeros((len(targets), len(positions)))
+    by_symbol = np.zeros(len(positions), dtype=bool)
+    for k, target in enumerate(targets):
+        if target in symbols:
+            membership[k] = symbols == target
+            by_symbol |= symbols == target
+        elif target not in ASSET_CLASSES:
+            raise ValueError(f"Bilinmeyen hedef: {target}")
+    for k, target in enumerate(targets):
+        if target not in symbols:
+            membership[k] = (types == target) & ~by_symbol
+    if (membership.sum(axis=0) > 1).any():
+        raise ValueError("Bir varlık birden fazla eksende şoklanamaz")
+    return membership
+
+
+def evaluate_grid(values: np.ndarray, membership: np.ndarray, shocks: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Args:
+        values: (varlık,) mevcut değerler
+        membership: (eksen x varlık) üyelik matrisi
+        shocks: eksen başına şok vektörü
+
+    Returns:
+        (len(shocks[0]) x len(shocks[1]) x ...) portföy değerleri
+    """
+    exposures = membership @ values
+    grid = np.asarray(values.sum(), dtype=float)
+    for k, shock in enumerate(shocks):
+        shape = [1] * len(shocks)
+        shape[k] = len(shock)
+        grid = grid + (exposures[k] * shock).reshape(shape)
+    return grid
+
+
+def extreme_cells(grid: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    """En düşük ve en yüksek `count` hücrenin düz indeksleri (sıralı)"""
+    flat = grid.ravel()
+    count = min(count, flat.size)
+    if count <= 0:
+        empty = np.array([], dtype=np.intp)
+        return empty, empty
+    worst = np.argpartition(flat, count - 1)[:count]
+    best = np.argpartition(flat, flat.size - count)[flat.size - count:]
+    return worst[np.argsort(flat[worst])], best[np.argsort(-flat[best])]
+
+
+def sensitivity_grid(positions: List[Dict], axes: List[Dict], extremes: int = 5) -> Dict:
+    """
+    Args:
+        positions: [{'symbol', 'type', 'value'}] (değerler raporlama para biriminde)
+        axes: [{'target': 'BTC' | 'crypto', 'min', 'max', 'steps'}]
+        extremes: Tabloda gösterilecek en kötü / en iyi hücre sayısı
+
+    Returns:
+        {'base_value', 'axes': [{'target', 'label', 'exposure', 'shocks'}], 'values' (ızgara),
+         'worst', 'best': [{'shocks', 'value', 'change', 'change_pct', 'assets'}]}
+    """
+    if not axes:
+        raise ValueError("En az bir şok ekseni gerekli")
+    positions = [p for p in positions if p.get('value')]
+    targets = [a['target'] for a in axes]
+    if len(set(targets)) != len(targets):
+        raise ValueError("Aynı hedef iki kez şoklanamaz")
+    shocks = [shock_vector(a) for a in axes]
+    if np.prod([len(s) for s in shocks], dtype=float) > MAX_GRID_CELLS:
+        raise ValueError(f"Izgara {MAX_GRID_CELLS:,} hücreyi aşamaz")
+
+    values = np.array([p['value'] for p in positions], dtype=float)
+    membership = membership_matrix(positions, targets)
+    grid = evaluate_grid(values, membership, shocks)
+    base = float(values.sum())
+
+    def cell(flat_index: int) -> Dict:
+        index = np.unravel_index(flat_index, grid.shape)
+        point = np.array([shocks[k][i] for k, i in enumerate(index)])
+        asset_values = values * (1.0 + point @ membership)
+        value = float(grid[index])
+        return {
+            'shocks': {t: float(s) for t, s in zip(targets, point)},
+            'value': value,
+            'change': value - base,
+            'change_pct': (value - base) / base if base else 0.0,
+            'assets': {p['symbol']: float(v) for p, v in zip(positions, asset_values)},
+        }
+
+    worst, best = extreme_cells(grid, extremes)
+    exposures = membership @ values
+    return {
+        'base_value': base,
+        'axes': [{'target': t, 'label': ASSET_CLASSES.get(t, t), 'exposure': float(e), 'shocks': s.tolist()}
+                 for t, e, s in zip(targets, exposures, shocks)],
+        'values': grid,
+        'worst': [cell(i) for i in worst],
+        'best': [cell(i) for i in best],
+    }
@@ -0,0 +1,386 @@
+"""
+Source Routing Service
+Veri kaynakları (Binance, Yahoo) arasında sağlık skoru, devre kesici ve hedged istek yönetimi.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config import Config
+
+
+class NoSourceAvailable(Exception):
+    """Tüm kaynakların devre kesicisi açık veya hiçbiri geçerli sonuç döndürmedi"""
+
+
+class CircuitBreaker:
+    """
+    Klasik üç durumlu devre kesici.
+    Art arda `failure_threshold` hata -> OPEN; `cooldown` saniye sonra tek deneme (HALF_OPEN).
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_id = 0
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        """allow() ile aynı karar, ancak yarı açık deneme hakkını tüketmez"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.cooldown
+            return not self._trial_in_flight
+
+    def admit(self) -> Optional[int]:
+        """None: reddedildi, 0: normal çağrı, >0: yarı açık deneme hakkının kimliği (release_trial için)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_id += 1
+                return self._trial_id
+            return None
+
+    def allow(self) -> bool:
+        return self.admit() is not None
+
+    def release_trial(self, trial_id: int):
+        """
+        Sonuçlanmadan iptal edilen deneme: durum değişmez, sıradaki çağrı yeniden deneyebilir.
+        Yalnızca hâlâ uçuşta olan aynı deneme serbest bırakılır (tekrarlı çağrı zararsızdır).
+        """
+        with self._lock:
+            if self.state == self.HALF_OPEN and self._trial_in_flight and self._trial_id == trial_id:
+                self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class SourceHealth:
+    """Bir kaynağın gecikme penceresi ve başarı skoru (EWMA)"""
+
+    def __init__(self, window: int = 200, alpha: float = 0.2):
+        self.latencies = deque(maxlen=window)
+        self.alpha = alpha
+        self.score = 1.0
+        self.calls = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, success: bool):
+        with self._lock:
+            self.calls += 1
+            if success:
+                self.latencies.append(latency)
+            else:
+                self.failures += 1
+            self.score = (1 - self.alpha) * self.score + self.alpha * (1.0 if success else 0.0)
+
+    def latency_percentile(self, pct: float, min_samples: int = 10) -> Optional[float]:
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            values = sorted(self.latencies)
+        index = min(len(values) - 1, int(round(pct / 100.0 * (len(values) - 1))))
+        return values[index]
+
+
+class SourceRouter:
+    """
+    Sıralı kaynak listesini sağlık durumuna göre çağırır.
+
+    - Devre kesicisi açık kaynaklar soğuma süresi boyunca atlanır.
+    - Skoru belirgin şekilde düşen birincil kaynak sıranın sonuna alınır.
+    - Birincil kaynak, gecikme yüzdeliği eşiğini aşarsa ikincil kaynak paralel
+      başlatılır (hedged request); ilk geçerli yanıt kazanır.
+    - Uçuştaki yedek istek sayısı max_hedges ile sınırlıdır (kaybeden istek bitene kadar yer tutar);
+      sınır doluyken yedek başlatılmaz. Kazanan belli olunca henüz başlamamış kaybeden iptal edilir.
+    """
+
+    def __init__(self, hedge_percentile: Optional[float] = None,
+                 default_hedge_delay: float = 1.0,
+                 min_hedge_delay: float = 0.2, max_hedge_delay: float = 3.0,
+                 failure_threshold: int = 3, cooldown: Optional[float] = None,
+                 max_workers: int = 16, max_hedges: Optional[int] = None):
+        self.hedge_percentile = hedge_percentile if hedge_percentile is not None else Config.SOURCE_HEDGE_PERCENTILE
+        self.default_hedge_delay = default_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown if cooldown is not None else Config.SOURCE_COOLDOWN_SECONDS
+        self.health: Dict[str, SourceHealth] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.max_hedges = max_hedges if max_hedges is not None else Config.SOURCE_MAX_HEDGES
+        self.hedge_stats = {'launched': 0, 'skipped': 0, 'cancelled': 0}
+        self._lock = threading.Lock()
+        self._hedges = threading.BoundedSemaphore(max(self.max_hedges, 1))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='source-router')
+
+    def _source(self, name: str) -> Tuple[SourceHealth, CircuitBreaker]:
+        with self._lock:
+            if name not in self.health:
+                self.health[name] = SourceHealth()
+                self.breakers[name] = CircuitBreaker(self.failure_threshold, self.cooldown)
+            return self.health[name], self.breakers[name]
+
+    def hedge_delay(self, name: str) -> float:
+        health, _ = self._source(name)
+        observed = health.latency_percentile(self.hedge_percentile)
+        delay = observed if observed is not None else self.default_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, delay))
+
+    def _acquire_hedge(self) -> bool:
+        """Yedek istek hakkı; sınır doluysa False (olay döngüsünü de bloklamaz)"""
+        acquired = self.max_hedges > 0 and self._hedges.acquire(blocking=False)
+        with self._lock:
+            self.hedge_stats['launched' if acquired else 'skipped'] += 1
+        return acquired
+
+    def _release_hedge(self, _=None):
+        self._hedges.release()
+
+    def _order(self, names: List[str]) -> List[str]:
+        # Skor 0.5'lik dilimlere yuvarlanır; tekil hatalar tercih sırasını bozmaz
+        ranked = sorted(names, key=lambda n: -round(self._source(n)[0].score * 2))
+        return [n for n in ranked if self._source(n)[1].available()]
+
+    def _run(self, name: str, fn: Callable[[], Any], is_valid: Callable[[Any], bool]):
+        health, breaker = self._source(name)
+        start = time.monotonic()
+        try:
+            value = fn()
+        except Exception as e:
+            health.record(time.monotonic() - start, False)
+            breaker.record_failure()
+            return False, e
+        # Geçersiz/boş sonuç (örn. bilinmeyen sembol) kaynak hatası sayılmaz
+        health.record(time.monotonic() - start, True)
+        breaker.record_success()
+        return is_valid(value), value
+
+    def call(self, sources: List[Tuple[str, Callable[[], Any]]],
+             is_valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Args:
+            sources: Tercih sırasına göre [(kaynak_adı, çağrı), ...]
+            is_valid: Sonucun kullanılabilir olup olmadığını belirler (varsayılan: None değil)
+
+        Returns:
+            İlk geçerli sonuç. Geçerli sonuç yoksa son geçersiz sonuç döner;
+            tüm kaynaklar hata verdiyse son hata yeniden fırlatılır.
+        """
+        is_valid = is_valid or (lambda v: v is not None)
+        fns = dict(sources)
+        remaining = self._order([name for name, _ in sources])
+        if not remaining:
+            raise NoSourceAvailable(f"Tüm kaynaklar devre dışı: {', '.join(fns)}")
+
+        pending = set()
+        last_error: Optional[Exception] = None
+        last_value = None
+        got_value = False
+        can_hedge = True
+
+        # Yarı açık deneme hakkıyla başlatılan istekler -> kaynak (iptal edilirse hak geri verilir)
+        trials: Dict[Any, Tuple[str, int]] = {}
+
+        def launch(hedge: bool = False) -> Optional[str]:
+            while remaining:
+                name = remaining.pop(0)
+                trial = self._source(name)[1].admit()
+                if trial is not None:
+                    future = self._executor.submit(self._run, name, fns[name], is_valid)
+                    if hedge:
+                        future.add_done_callback(self._release_hedge)
+                    if trial:
+                        trials[future] = (name, trial)
+                    pending.add(future)
+                    return name
+            if hedge:
+                self._release_hedge()
+            return None
+
+        current = launch()
+        if current is None:
+            raise NoSourceAvailable(f"Tüm kaynaklar devre dışı: {', '.join(fns)}")
+        try:
+            while pending:
+                timeout = self.hedge_delay(current) if remaining and can_hedge else None
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # Birincil kaynak yavaş: hak varsa yedeği paralel başlat, yoksa birincili bekle
+                    if self._acquire_hedge():
+                        current = launch(hedge=True) or current
+                    else:
+                        can_hedge = False
+                    continue
+                for fut in done:
+                    pending.discard(fut)
+                    ok, value = fut.result()
+                    if ok:
+                        return value
+                    if isinstance(value, Exception):
+                        last_error = value
+                    else:
+                        last_value, got_value = value, True
+                if not pending and remaining:
+                    current = launch() or current
+        finally:
+            # Kaybeden istek henüz başlamadıysa iptal edilir; çalışıyorsa sonucu yok sayılır
+            for fut in pending:
+                if fut.cancel():
+                    with self._lock:
+                        self.hedge_stats['cancelled'] += 1
+                    if fut in trials:
+                        name, trial = trials[fut]
+                        self._source(name)[1].release_trial(trial)
+
+        if got_value:
+            return last_value
+        raise last_error or NoSourceAvailable("Geçerli sonuç alınamadı")
+
+    async def _arun(self, name: str, fn: Callable[[], Awaitable[Any]], is_valid: Callable[[Any], bool],
+                    trial: int = 0):
+        health, breaker = self._source(name)
+        start = time.monotonic()
+        try:
+            value = await fn()
+        except asyncio.CancelledError:
+            # Yarışı kaybeden deneme sonuçlanmadı: devre kesici yarı açıkta takılı kalmasın
+            if trial:
+                breaker.release_trial(trial)
+            raise
+        except Exception as e:
+            health.record(time.monotonic() - start, False)
+            breaker.record_failure()
+            return False, e
+        health.record(time.monotonic() - start, True)
+        breaker.record_success()
+        return is_valid(value), value
+
+    async def acall(self, sources: List[Tuple[str, Callable[[], Awaitable[Any]]]],
+                    is_valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        call() ile aynı sıralama, devre kesici ve hedged istek kuralları; çağrılar coroutine
+        fonksiyonlarıdır ve olay döngüsünde yürür (sağlık kayıtları senkron yolla ortaktır).
+        """
+        is_valid = is_valid or (lambda v: v is not None)
+        fns = dict(sources)
+        remaining = self._order([name for name, _ in sources])
+        pending = set()
+        last_error: Optional[Exception] = None
+        last_value = None
+        got_value = False
+
+        can_hedge = True
+
+        trials: Dict[Any, Tuple[str, int]] = {}
+
+        def launch(hedge: bool = False) -> Optional[str]:
+            while remaining:
+                name = remaining.pop(0)
+                trial = self._source(name)[1].admit()
+                if trial is not None:
+                    task = asyncio.ensure_future(self._arun(name, fns[name], is_valid, trial))
+                    if hedge:
+                        task.add_done_callback(self._release_hedge)
+                    if trial:
+                        trials[task] = (name, trial)
+                    pending.add(task)
+                    return name
+            if hedge:
+                self._release_hedge()
+            return None
+
+        current = launch()
+        if current is None:
+            raise NoSourceAvailable(f"Tüm kaynaklar devre dışı: {', '.join(fns)}")
+        try:
+            while pending:
+                timeout = self.hedge_delay(current) if remaining and can_hedge else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if self._acquire_hedge():
+                        current = launch(hedge=True) or current
+                    else:
+                        can_hedge = False
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    ok, value = task.result()
+                    if ok:
+                        return value
+                    if isinstance(value, Exception):
+                        last_error = value
+                    else:
+                        last_value, got_value = value, True
+                if not pending and remaining:
+                    current = launch() or current
+        finally:
+            # Kazanan belli olunca yarışı kaybeden istek iptal edilir (bağlantı boşa tutulmaz)
+            for task in pending:
+                task.cancel()
+                # Hiç başlamamış görev _arun'a girmeden iptal olur; hak burada da geri verilir
+                if task in trials:
+                    name, trial = trials[task]
+                    self._source(name)[1].release_trial(trial)
+
+        if got_value:
+            return last_value
+        raise last_error or NoSourceAvailable("Geçerli sonuç alınamadı")
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Kaynak bazında sağlık özeti (izleme için)"""
+        report = {}
+        for name in list(self.health):
+            health, breaker = self._source(name)
+            report[name] = {
+                'state': breaker.state,
+                'score': round(health.score, 3),
+                'calls': health.calls,
+                'failures': health.failures,
+                'p50': health.latency_percentile(50, min_samples=1),
+                'hedge_delay': self.hedge_delay(name),
+            }
+        return report
+
+
+_default_router: Optional[SourceRouter] = None
+_default_lock = threading.Lock()
+
+def get_default_router() -> SourceRouter:
+    """Süreç genelinde paylaşılan router (kaynak sağlığı tüm AssetManager'lar için ortak)"""
+    global _default_router
+    with _default_lock:
+        if _default_router is None:
+            _default_router = SourceRouter()
+        return _default_router
@@ -0,0 +1,219 @@
+"""
+Stress Test Service
+Mevcut portföyün tarihsel kriz pencerelerinde (Mart 2020, 2022 ayı piyasası ...) nasıl
+davranacağını yeniden oynatır.
+
+- Her varlığın günlük kapanışları bir kez çekilip (önbellekli) ortak takvime hizalanır
+- Tüm senaryolar tek (senaryo x gün x varlık) getiri tensörüne toplanır; portföy yolu
+  mevcut ağırlıklarla tek einsum çağrısıyla hesaplanır
+- Her senaryo için toplam getiri, en derin düşüş, dip tarihi, toparlanma süresi ve en kötü gün
+
+Verisi pencereden önce başlamayan varlıklar (ör. 2008'de kripto) o senaryoda düz kabul edilir;
+'coverage' senaryoda verisi olan ağırlık oranını gösterir.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config import Config
+from services.cache import get_cache
+from services.fx_service import quote_currency
+
+# Adlandırılmış tarihsel pencereler (başlangıç/bitiş dahil)
+SCENARIOS = [
+    {'name': 'Küresel Finans Krizi (2008)', 'start': '2008-09-01', 'end': '2009-03-31'},
+    {'name': 'ABD Not İndirimi (2011)', 'start': '2011-07-22', 'end': '2011-10-31'},
+    {'name': 'Çin Devalüasyonu (2015)', 'start': '2015-08-10', 'end': '2015-09-30'},
+    {'name': 'Kripto Kışı (2018)', 'start': '2018-01-01', 'end': '2018-12-31'},
+    {'name': 'TL Kur Krizi (Ağustos 2018)', 'start': '2018-07-15', 'end': '2018-09-15'},
+    {'name': 'Q4 2018 Satışı', 'start': '2018-10-01', 'end': '2018-12-31'},
+    {'name': 'Covid Çöküşü (Mart 2020)', 'start': '2020-02-19', 'end': '2020-04-30'},
+    {'name': 'TL Kur Şoku (Aralık 2021)', 'start': '2021-11-01', 'end': '2021-12-31'},
+    {'name': '2022 Ayı Piyasası', 'start': '2022-01-01', 'end': '2022-10-31'},
+    {'name': 'Terra/LUNA Çöküşü (2022)', 'start': '2022-05-01', 'end': '2022-06-30'},
+    {'name': 'FTX Çöküşü (2022)', 'start': '2022-11-01', 'end': '2022-12-31'},
+    {'name': 'SVB Bankacılık Krizi (2023)', 'start': '2023-03-01', 'end': '2023-03-31'},
+    {'name': 'Yen Carry Çözülmesi (2024)', 'start': '2024-07-15', 'end': '2024-08-15'},
+]
+# Fiyatı sabit kabul edilen varlık türleri (getiri serisi çekilmez)
+FLAT_TYPES = {'cash'}
+HISTORY_TTL = 24 * 60 * 60
+# Kapsama pencereden önceki günün fiyatına bakar; geçmiş en eski senaryodan bu kadar gün önce başlar
+COVERAGE_LOOKBACK = 7
+
+
+def scenario_tensor(returns: np.ndarray, dates: np.ndarray,
+                    scenarios: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hizalanmış (gün x varlık) getiri matrisinden (senaryo x gün x varlık) tensör kurar.
+    Kısa pencereler sıfır getiriyle doldurulur.
+
+    Returns:
+        (tensor, valid, starts): valid (senaryo x gün) gerçek günleri, starts her pencerenin
+        ilk satır indeksini gösterir
+    """
+    starts = np.searchsorted(dates, np.array([s['start'] for s in scenarios], dtype='datetime64[ns]'))
+    ends = np.searchsorted(dates, np.array([s['end'] for s in scenarios], dtype='datetime64[ns]'),
+                           side='right')
+    length = int(max((ends - starts).max(), 1)) if len(scenarios) else 1
+    rows = starts[:, None] + np.arange(length)[None, :]
+    valid = rows < ends[:, None]
+    padded = np.vstack([returns, np.zeros((1, returns.shape[1]))])
+    # Geçersiz satırlar son (sıfır) satıra yönlenir: tek gather, döngü yok
+    tensor = padded[np.where(valid, rows, len(returns))]
+    return tensor, valid, starts
+
+
+def evaluate_scenarios(tensor: np.ndarray, valid: np.ndarray, weights: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Args:
+        tensor: (senaryo x gün x varlık) günlük getiriler
+        valid: (senaryo x gün) gerçek gün maskesi
+        weights: (varlık,) portföy ağırlıkları (toplamı 1)
+
+    Returns:
+        Senaryo başına vektörler: total_return, max_drawdown (negatif), trough (gün indeksi),
+        recovery (dipten önceki zirveye dönüş günü, -1 = toparlanmadı), worst_day, worst_index
+    """
+    port = np.einsum('sda,a->sd', tensor, weights)
+    wealth = np.cumprod(1.0 + port, axis=1)
+    peaks = np.maximum.accumulate(np.maximum(wealth, 1.0), axis=1)
+    drawdown = wealth / peaks - 1.0
+    trough = drawdown.argmin(axis=1)
+    rows = np.arange(len(port))
+    days = np.arange(port.shape[1])[None, :]
+
+    recovered = valid & (days > trough[:, None]) & (wealth >= peaks[rows, trough][:, None] * (1 - 1e-12))
+    recovery = np.where(recovered.any(axis=1), recovered.argmax(axis=1), -1)
+    recovery = np.where(drawdown[rows, trough] >= 0, trough, recovery)
+
+    masked = np.where(valid, port, np.inf)
+    last = np.maximum(valid.sum(axis=1) - 1, 0)
+    return {
+        'total_return': wealth[rows, last] - 1.0,
+        'max_drawdown': drawdown[rows, trough],
+        'trough': trough,
+        'recovery': recovery,
+        'worst_day': masked.min(axis=1),
+        'worst_index': masked.argmin(axis=1),
+    }
+
+
+def positions_from_portfolio(portfolio: Dict) -> List[Dict]:
+    """{'BTC': {'type', 'value', ('symbol')}} -> [{'symbol', 'type', 'value'}]"""
+    return [{'symbol': info.get('symbol', name), 'type': info['type'], 'value': float(info.get('value') or 0)}
+            for name, info in portfolio.items()]
+
+
+class StressTester:
+    """
+    Args:
+        manager: Geçmiş veriyi çeken AssetManager (fx ve önbellek onunla paylaşılır)
+        scenarios: Varsayılan senaryo kütüphanesi (SCENARIOS)
+    """
+
+    def __init__(self, manager, scenarios: Optional[List[Dict]] = None):
+        self.manager = manager
+        self.fx = manager.fx
+        self.scenarios = scenarios or SCENARIOS
+        self._history = get_cache('stress_history', maxsize=512, ttl=HISTORY_TTL)
+
+    def _lookback_days(self, scenarios: Sequence[Dict]) -> int:
+        first = min(datetime.strptime(s['start'], '%Y-%m-%d') for s in scenarios)
+        return (datetime.now() - first).days + COVERAGE_LOOKBACK + 1
+
+    def price_history(self, symbol: str, asset_type: str, days: int, currency: str) -> pd.Series:
+        """Raporlama para biriminde günlük kapanışlar (gün boyu önbellekli)"""
+        key = (symbol, asset_type, currency, days, datetime.now().strftime('%Y-%m-%d'))
+        series = self._history.get(key)
+        if series is None:
+            data = self.manager.get_historical_data(symbol, asset_type, days=days)
+            if data is None or data.empty or 'Close' not in data.columns:
+                return pd.Series(dtype=float)
+            close = data['Close']
+            if isinstance(close, pd.DataFrame):
+                close = close.iloc[:, 0]
+            close.index = pd.DatetimeIndex(close.index).tz_localize(None).normalize()
+            close = close[~close.index.duplicated(keep='last')].astype(float)
+            series = self.fx.convert_series(close, quote_currency(symbol, asset_type), to=currency).dropna()
+            if not series.empty:
+                self._history.set(key, series)
+        return series.copy()
+
+    def aligned_returns(self, assets: Sequence[Tuple[str, str]], days: int,
+                        currency: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (returns, available, dates): (gün x varlık) günlük getiriler, fiyatın bilinip
+            bilinmediği maskesi ve ortak takvim
+        """
+        closes = {}
+        for i, (symbol, asset_type) in enumerate(assets):
+            if asset_type not in FLAT_TYPES:
+                closes[i] = self.price_history(symbol, asset_type, days, currency)
+        frame = pd.DataFrame(closes).sort_index().reindex(columns=range(len(assets)))
+        if frame.empty:
+            return np.zeros((0, len(assets))), np.zeros((0, len(assets)), dtype=bool), np.array([], 'datetime64[ns]')
+        prices = frame.ffill()
+        available = prices.notna().to_numpy()
+        for i, (_, asset_type) in enumerate(assets):
+            if asset_type in FLAT_TYPES:
+                available[:, i] = True
+        returns = prices.pct_change(fill_method=None).fillna(0.0).to_numpy()
+        return returns, available, frame.index.to_numpy(dtype='datetime64[ns]')
+
+    def run(self, positions: List[Dict], currency: Optional[str] = None,
+            scenarios: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Args:
+            positions: [{'symbol', 'type', 'value'}] (değerler raporlama para biriminde)
+            scenarios: Verilmezse tüm kütüphane
+
+        Returns:
+            Senaryo başına sonuçlar, en derin düşüşten başlayarak
+        """
+        currency = (currency or Config.REPORTING_CURRENCY).upper()
+        scenarios = scenarios or self.scenarios
+        positions = [p for p in positions if p.get('value')]
+        total = sum(p['value'] for p in positions)
+        if not positions or total <= 0:
+            return []
+
+        weights = np.array([p['value'] for p in positions], dtype=float) / total
+        assets = [(p['symbol'], p['type']) for p in positions]
+        returns, available, dates = self.aligned_returns(assets, self._lookback_days(scenarios), currency)
+        if not len(dates):
+            return []
+
+        tensor, valid, starts = scenario_tensor(returns, dates, scenarios)
+        # Pencereden önceki gün fiyatı bilinmeyen varlık o senaryoda düz kabul edilir
+        covered = available[np.maximum(starts - 1, 0)] & (starts > 0)[:, None]
+        metrics = evaluate_scenarios(tensor * covered[:, None, :], valid, weights)
+        coverage = covered @ weights
+        stamps = pd.DatetimeIndex(dates)
+
+        results = []
+        for i, scenario in enumerate(scenarios):
+            n_days = int(valid[i].sum())
+            if n_days == 0 or coverage[i] <= 0:
+                continue
+            trough = stamps[starts[i] + metrics['trough'][i]]
+            recovery = int(metrics['recovery'][i])
+            results.append({
+                'scenario': scenario['name'],
+                'start': scenario['start'],
+                'end': scenario['end'],
+                'days': n_days,
+                'total_return': float(metrics['total_return'][i]),
+                'max_drawdown': float(metrics['max_drawdown'][i]),
+                'max_loss': float(metrics['max_drawdown'][i] * total),
+                'trough_date': str(trough.date()),
+                'recovery_days': (stamps[starts[i] + recovery] - trough).days if recovery >= 0 else None,
+                'worst_day': float(metrics['worst_day'][i]),
+                'worst_day_date': str(stamps[starts[i] + metrics['worst_index'][i]].date()),
+                'coverage': float(coverage[i]),
+                'currency': currency,
+            })
+        return sorted(results, key=lambda r: r['max_drawdown'])
@@ -0,0 +1,192 @@
+"""
+Symbol Catalog Service
+Yerel sembol kataloğu: ccxt (Binance spot /USDT) piyasaları + seçilmiş BIST, ABD, emtia ve döviz listeleri.
+
+Semboller sıralı bir dizide tutulur; önek araması bisect ile O(log n + k), tam eşleşme O(1).
+Bulunamayan semboller TTL'li negatif önbellekte hatırlanır, böylece yazım hataları ağa tekrar gitmez.
+"""
+import threading
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import ccxt
+
+from config import Config
+from services.cache import TTLCache
+from services.upstream_scheduler import get_upstream_scheduler, PRIORITY_BACKFILL
+
+BIST_SYMBOLS = {
+    'XU100': 'BIST 100 Endeksi', 'THYAO': 'Türk Hava Yolları', 'GARAN': 'Garanti BBVA',
+    'AKBNK': 'Akbank', 'ISCTR': 'İş Bankası (C)', 'YKBNK': 'Yapı Kredi', 'ASELS': 'Aselsan',
+    'BIMAS': 'BİM Mağazalar', 'EREGL': 'Ereğli Demir Çelik', 'KCHOL': 'Koç Holding',
+    'SAHOL': 'Sabancı Holding', 'SISE': 'Şişecam', 'TUPRS': 'Tüpraş', 'FROTO': 'Ford Otosan',
+    'TOASO': 'Tofaş', 'PGSUS': 'Pegasus', 'TCELL': 'Turkcell', 'TTKOM': 'Türk Telekom',
+    'PETKM': 'Petkim', 'KOZAL': 'Koza Altın', 'ARCLK': 'Arçelik', 'ENKAI': 'Enka İnşaat',
+    'SASA': 'Sasa Polyester', 'HEKTS': 'Hektaş', 'EKGYO': 'Emlak Konut GYO',
+}
+
+US_SYMBOLS = {
+    '^GSPC': 'S&P 500', '^IXIC': 'NASDAQ Composite', '^DJI': 'Dow Jones', 'SPY': 'SPDR S&P 500 ETF',
+    'QQQ': 'Invesco QQQ', 'AAPL': 'Apple', 'MSFT': 'Microsoft', 'GOOGL': 'Alphabet', 'AMZN': 'Amazon',
+    'NVDA': 'NVIDIA', 'META': 'Meta Platforms', 'TSLA': 'Tesla', 'BRK-B': 'Berkshire Hathaway',
+    'JPM': 'JPMorgan Chase', 'V': 'Visa', 'MA': 'Mastercard', 'NFLX': 'Netflix', 'AMD': 'AMD',
+    'INTC': 'Intel', 'KO': 'Coca-Cola', 'DIS': 'Walt Disney', 'MSTR': 'MicroStrategy', 'COIN': 'Coinbase',
+}
+
+COMMODITY_SYMBOLS = {
+    'GC=F': 'Altın (Ons) Vadeli', 'SI=F': 'Gümüş Vadeli', 'CL=F': 'Ham Petrol (WTI)',
+    'BZ=F': 'Brent Petrol', 'NG=F': 'Doğal Gaz', 'HG=F': 'Bakır', 'PL=F': 'Platin',
+    'GLD': 'SPDR Gold Shares', 'SLV': 'iShares Silver Trust',
+}
+
+FOREX_SYMBOLS = {
+    'USDTRY': 'ABD Doları / Türk Lirası', 'EURTRY': 'Euro / Türk Lirası',
+    'GBPTRY': 'Sterlin / Türk Lirası', 'EURUSD': 'Euro / ABD Doları',
+    'GBPUSD': 'Sterlin / ABD Doları', 'USDJPY': 'ABD Doları / Japon Yeni',
+    'USDCHF': 'ABD Doları / İsviçre Frangı', 'AUDUSD': 'Avustralya Doları / ABD Doları',
+}
+
+# Binance piyasaları yüklenemezse kullanılan kripto listesi
+CRYPTO_FALLBACK = {
+    'BTC': 'Bitcoin', 'ETH': 'Ethereum', 'BNB': 'BNB', 'SOL': 'Solana', 'XRP': 'XRP',
+    'ADA': 'Cardano', 'DOGE': 'Dogecoin', 'AVAX': 'Avalanche', 'DOT': 'Polkadot', 'LINK': 'Chainlink',
+    'TRX': 'TRON', 'LTC': 'Litecoin', 'ATOM': 'Cosmos',
+}
+
+CURATED = {
+    'stock_tr': BIST_SYMBOLS,
+    'stock_us': US_SYMBOLS,
+    'commodity': COMMODITY_SYMBOLS,
+    'forex': FOREX_SYMBOLS,
+}
+
+
+class SymbolCatalog:
+    """
+    Sıralı (sembol, tür) dizisi üzerinde önek arama ve tam eşleşme.
+
+    Args:
+        entries: (symbol, asset_type, name) üçlüleri
+        negative_ttl: Bulunamayan sembolün hatırlanma süresi (sn)
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, str]] = (), negative_ttl: float = 600.0):
+        self._lock = threading.Lock()
+        self._missing = TTLCache(maxsize=4096, ttl=negative_ttl)
+        # Ağ doğrulamasıyla öğrenilen semboller yenilemede kaybolmasın
+        self._learned: Dict[Tuple[str, str], str] = {}
+        self._load(entries)
+
+    def _load(self, entries: Iterable[Tuple[str, str, str]]):
+        table = {(s.upper(), t): n for s, t, n in entries}
+        for key, name in self._learned.items():
+            table.setdefault(key, name)
+        rows = sorted(table.items())
+        with self._lock:
+            # Paralel diziler: bisect yalnızca _keys üzerinde çalışır
+            self._keys: List[Tuple[str, str]] = [key for key, _ in rows]
+            self._names: Dict[Tuple[str, str], str] = dict(rows)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def replace(self, entries: Iterable[Tuple[str, str, str]]):
+        """Tüm kataloğu yeni girdilerle değiştirir (periyodik yenileme)"""
+        self._load(entries)
+
+    def add(self, symbol: str, asset_type: str, name: str = ''):
+        """Ağ doğrulamasından geçen yeni sembolü ekler (O(n) ekleme, O(1) okuma)"""
+        key = (symbol.upper(), asset_type)
+        with self._lock:
+            if key not in self._names:
+                # Kopyala-değiştir: eşzamanlı aramalar yarım güncellenmiş diziyi görmez
+                keys = list(self._keys)
+                insort(keys, key)
+                self._keys = keys
+            self._names[key] = name or self._names.get(key, '')
+            self._learned[key] = self._names[key]
+        self._missing.delete(key)
+
+    def contains(self, symbol: str, asset_type: str) -> bool:
+        return (symbol.upper(), asset_type) in self._names
+
+    def name(self, symbol: str, asset_type: str) -> Optional[str]:
+        return self._names.get((symbol.upper(), asset_type))
+
+    def search(self, prefix: str, asset_type: Optional[str] = None, limit: int = 10) -> List[Dict]:
+        """Önek ile başlayan semboller (alfabetik); asset_type verilirse yalnızca o tür"""
+        prefix = prefix.upper()
+        keys = self._keys
+        results = []
+        i = bisect_left(keys, (prefix, ''))
+        while i < len(keys) and keys[i][0].startswith(prefix) and len(results) < limit:
+            symbol, kind = keys[i]
+            if asset_type is None or kind == asset_type:
+                results.append({'symbol': symbol, 'type': kind, 'name': self._names.get(keys[i], '')})
+            i += 1
+        return results
+
+    def symbols(self, asset_type: str) -> List[str]:
+        """Bir türün tüm sembolleri (arayüz seçim listesi için)"""
+        return [s for s, t in self._keys if t == asset_type]
+
+    def is_known_missing(self, symbol: str, asset_type: str) -> bool:
+        return self._missing.get((symbol.upper(), asset_type)) is not None
+
+    def remember_missing(self, symbol: str, asset_type: str):
+        self._missing.set((symbol.upper(), asset_type), True)
+
+
+def curated_entries() -> List[Tuple[str, str, str]]:
+    entries = [(s, t, n) for t, table in CURATED.items() for s, n in table.items()]
+    entries += [(s, 'crypto', n) for s, n in CRYPTO_FALLBACK.items()]
+    return entries
+
+
+def fetch_crypto_entries(exchange=None) -> List[Tuple[str, str, str]]:
+    """Binance spot /USDT piyasalarının baz varlıkları"""
+    if exchange is None:
+        if Config.BINANCE_API_URL:
+            exchange = ccxt.binance({
+                'urls': {'api': {'public': f"{Config.BINANCE_API_URL.rstrip('/')}/api/v3"}},
+                'options': {'fetchMarkets': {'types': ['spot']}},
+            })
+        else:
+            exchange = ccxt.binance({'options': {'fetchMarkets': {'types': ['spot']}}})
+    markets = exchange.load_markets()
+    return [
+        (m['base'], 'crypto', CRYPTO_FALLBACK.get(m['base'], m['base']))
+        for m in markets.values()
+        if m.get('quote') == 'USDT' and m.get('spot', True) and m.get('active') is not False
+    ]
+
+
+_catalog: Optional[SymbolCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def refresh_catalog(catalog: SymbolCatalog, priority: int = PRIORITY_BACKFILL) -> int:
+    """Binance piyasalarını çekip kataloğu yeniler; hata durumunda mevcut katalog korunur"""
+    crypto = get_upstream_scheduler().run('binance', ('markets',), fetch_crypto_entries, priority)
+    if crypto:
+        catalog.replace(curated_entries() + crypto)
+    return len(catalog)
+
+
+def get_symbol_catalog(load_markets: bool = True) -> SymbolCatalog:
+    """
+    Süreç genelinde paylaşılan katalog. Seçilmiş listelerle hemen hazırdır;
+    Binance piyasaları arka planda yüklenir (arama/doğrulama beklemez).
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = SymbolCatalog(curated_entries())
+            if load_markets:
+                def _background():
+                    try:
+                        refresh_catalog(_catalog)
+                    except Exception as e:
+                        print(f"Sembol kataloğu yüklenemedi: {e}")
+                threading.Thread(target=_background, name='symbol-catalog', daemon=True).start()
+        return _catalog
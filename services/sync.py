@@ -0,0 +1,169 @@
+"""
+Delta Sync
+Çevrimdışı çalışan mobil istemciler için artımlı eşitleme: telefon uygulamayı yeniden açtığında
+tüm durumu değil, yalnızca son eşitlemeden beri değişenleri indirir.
+
+- Kayıtlar (portföy, defter pozisyonları, analizler, simülasyon geçmişi): tablolardaki her
+  ekleme/güncelleme/silme tetikleyiciyle change_log'a monoton artan bir seq ile yazılır
+  (db.init_sync_tables). İstemci son gördüğü seq'i (cursor) gönderir; yanıt yalnızca seq > cursor
+  kayıtlarını, tablo başına sütunsal (columns + rows) ve silinen anahtarlar olarak içerir.
+- Grafik serileri (kayıtlı NAV): seri başına istemcinin son çubuğu (since); o çubuk ve sonrası gelir.
+- Fiyatlar: istemcinin bildiği fiyatlar bir sürüm vektörüdür; yalnızca değişen fiyatlar döner.
+
+Günlükte kayıt başına yalnızca son değişiklik tutulduğundan günlük boyutu canlı kayıt + silinen
+anahtar sayısıyla sınırlıdır; uzun süre çevrimdışı kalan istemci de her kaydı en fazla bir kez alır.
+Yanıt kompakt JSON'dur ve istemci kabul ediyorsa gzip ile sıkıştırılır.
+"""
+import gzip
+import json
+import sqlite3
+from typing import Dict, Optional, Tuple
+
+import db
+from services.nav_snapshots import DEFAULT_MAX_POINTS, OHLC, NavSnapshotter
+
+SYNC_BATCH = 500
+MAX_SYNC_BATCH = 5000
+MAX_SYNC_SERIES = 10
+MAX_SYNC_QUOTES = 100
+# Bu boyutun altındaki yanıtlar sıkıştırılmaz (gzip başlığı kazançtan büyük)
+GZIP_MIN_BYTES = 512
+
+
+def normalize_quotes(quotes: Optional[Dict]) -> Dict[str, Dict]:
+    """{'BTC': {'type': 'crypto', 'price': 64000.0}} -> büyük harf semboller; fiyat istemcideki son değer"""
+    if not quotes:
+        return {}
+    if not isinstance(quotes, dict):
+        raise ValueError("quotes bir sözlük olmalı")
+    if len(quotes) > MAX_SYNC_QUOTES:
+        raise ValueError(f"En fazla {MAX_SYNC_QUOTES} fiyat eşitlenebilir")
+    normalized = {}
+    for symbol, known in quotes.items():
+        known = known if isinstance(known, dict) else {}
+        price = known.get('price')
+        normalized[str(symbol).strip().upper()] = {
+            'type': known.get('type', 'crypto'),
+            'price': float(price) if price is not None else None,
+        }
+    return normalized
+
+
+def changed_quotes(known: Dict[str, Dict], prices: Dict[str, Optional[float]]) -> Dict[str, float]:
+    """İstemcinin bildiğinden farklı (ya da hiç bilmediği) fiyatlar; alınamayan fiyatlar atlanır"""
+    return {symbol: float(price) for symbol, price in prices.items()
+            if price is not None and known.get(symbol, {}).get('price') != float(price)}
+
+
+def encode_sync(payload: Dict, accept_encoding: str = '') -> Tuple[bytes, Dict[str, str]]:
+    """Kompakt JSON gövdesi ve başlıklar; istemci kabul ediyorsa gzip"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    headers = {'Content-Type': 'application/json', 'Vary': 'Accept-Encoding'}
+    if 'gzip' in (accept_encoding or '').lower() and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+class SyncService:
+    """
+    Args:
+        db_path: SQLite dosyası (varsayılan db.DB_NAME)
+        snapshotter: NAV çubuklarının okunduğu NavSnapshotter (varsayılan aynı dosya)
+    """
+
+    def __init__(self, db_path: Optional[str] = None, snapshotter: Optional[NavSnapshotter] = None):
+        self.db_path = db_path
+        self.snapshotter = snapshotter or NavSnapshotter(db_path)
+        conn = self._connect()
+        c = conn.cursor()
+        db.init_ledger_tables(c)
+        db.init_sync_tables(c)
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Otomatik işlem kapalı: günlük ve satırlar tek BEGIN içinde, tutarlı bir anda okunur
+        return sqlite3.connect(self.db_path or db.DB_NAME, isolation_level=None, timeout=30)
+
+    def changes(self, cursor: int = 0, limit: int = SYNC_BATCH) -> Dict:
+        """
+        seq > cursor olan değişiklikler (en fazla limit kayıt).
+
+        Returns:
+            {'cursor': yeni cursor, 'latest': sunucudaki son seq, 'has_more', 'reset',
+             'changes': {tablo: {'columns', 'rows', 'deleted': [anahtar]}}}
+            reset: istemcinin cursor'ı sunucuda yok (ör. veritabanı yenilendi); tam eşitleme yapıldı,
+            istemci yerel kopyasını atmalı.
+        """
+        cursor, limit = int(cursor or 0), min(max(int(limit), 1), MAX_SYNC_BATCH)
+        if cursor < 0:
+            raise ValueError("cursor negatif olamaz")
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN')
+            latest = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM change_log').fetchone()[0]
+            reset = cursor > latest
+            if reset:
+                cursor = 0
+            log = conn.execute('SELECT seq, entity, entity_key, op FROM change_log WHERE seq > ? ORDER BY seq LIMIT ?',
+                               (cursor, limit)).fetchall()
+            upper = log[-1][0] if log else cursor
+
+            changes = {}
+            for entity in dict.fromkeys(row[1] for row in log):
+                if entity not in db.SYNC_KEYS:
+                    continue
+                entry = {'columns': [], 'rows': [],
+                         'deleted': [key for _, e, key, op in log if e == entity and op == 'delete']}
+                if any(e == entity and op == 'upsert' for _, e, _, op in log):
+                    # +c.entity: günlük, tablonun tüm geçmişini değil yalnızca seq aralığını (PK) tarar
+                    rows = conn.execute(f'''SELECT t.* FROM change_log c JOIN {entity} t
+                                              ON c.entity_key = {db.SYNC_KEYS[entity]}
+                                            WHERE +c.entity = ? AND c.op = 'upsert' AND c.seq > ? AND c.seq <= ?
+                                            ORDER BY c.seq''', (entity, cursor, upper))
+                    entry['columns'] = [d[0] for d in rows.description]
+                    entry['rows'] = [list(r) for r in rows]
+                changes[entity] = entry
+        finally:
+            conn.close()
+        return {'cursor': upper, 'latest': latest, 'has_more': upper < latest, 'reset': reset, 'changes': changes}
+
+    def series(self, known: Optional[Dict[str, Dict]], max_points: int = DEFAULT_MAX_POINTS) -> Dict:
+        """
+        Args:
+            known: {'wallet': {'resolution': '1h', 'since': istemcideki son çubuğun ts'i}}
+
+        Returns:
+            {'wallet': {'resolution', 'columns': ['ts', ...OHLC], 'rows', 'truncated'}}
+            truncated: aradaki çubuklar max_points'i aştı, istemci seriyi baştan kurmalı.
+        """
+        if not known:
+            return {}
+        if not isinstance(known, dict):
+            raise ValueError("series bir sözlük olmalı")
+        if len(known) > MAX_SYNC_SERIES:
+            raise ValueError(f"En fazla {MAX_SYNC_SERIES} seri eşitlenebilir")
+        result = {}
+        for portfolio_id, spec in known.items():
+            spec = spec if isinstance(spec, dict) else {}
+            resolution = spec.get('resolution', '1h')
+            since = spec.get('since')
+            frame = self.snapshotter.bars(portfolio_id, resolution, since=since, max_points=max_points + 1)
+            truncated = since is not None and len(frame) > max_points
+            frame = frame.tail(max_points)
+            result[portfolio_id] = {
+                'resolution': resolution,
+                'columns': ['ts'] + OHLC,
+                'rows': [list(r) for r in frame.itertuples(index=False, name=None)],
+                'truncated': truncated,
+            }
+        return result
+
+    def sync(self, request: Dict) -> Dict:
+        """
+        Body: {'cursor', 'limit', 'series'} -> changes() + {'series': series()}.
+        Fiyatlar canlı kaynaktan geldiği için API katmanında eklenir (normalize_quotes / changed_quotes).
+        """
+        payload = self.changes(request.get('cursor', 0), request.get('limit', SYNC_BATCH))
+        payload['series'] = self.series(request.get('series'))
+        return payload
@@ -0,0 +1,199 @@
+"""
+Upstream Scheduler Service
+Binance/Yahoo çağrıları için süreç genelinde hız limiti (token bucket), öncelik sınıfları,
+aynı isteklerin birleştirilmesi (coalescing) ve sınırlı bağlantı havuzu.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from config import Config
+
+# Öncelik sınıfları (küçük değer önce çalışır)
+PRIORITY_QUOTE = 0      # Etkileşimli anlık fiyat
+PRIORITY_HISTORY = 1    # Grafik geçmişi
+PRIORITY_BACKFILL = 2   # Arka plan doldurma / ısıtma
+
+
+class TokenBucket:
+    """Saniyede `rate` token üreten, en fazla `burst` biriktiren kova"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: Optional[float] = None) -> float:
+        """Bir token için beklenmesi gereken süre (0 = hemen)"""
+        now = now if now is not None else time.monotonic()
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        block = max(0.0, self.blocked_until - now)
+        if self.tokens >= 1.0:
+            return block
+        return max(block, (1.0 - self.tokens) / self.rate)
+
+    def consume(self):
+        if self.rate > 0:
+            self.tokens -= 1.0
+
+    def penalize(self, seconds: float):
+        """429 sonrası kovayı boşaltıp kaynağı bir süre bloklar (retry fırtınasını önler)"""
+        now = time.monotonic()
+        self.tokens = 0.0
+        self.updated = now
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+def _is_rate_limited(exc: Exception) -> bool:
+    if 'RateLimit' in type(exc).__name__ or 'DDoSProtection' in type(exc).__name__:
+        return True
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None) == 429
+
+
+class UpstreamScheduler:
+    """
+    Tüm upstream çağrılarını `pool_size` işçi thread üzerinden yürütür.
+
+    - Her kaynak kendi token bucket'ına tabidir; limiti dolan kaynağın işleri beklerken
+      diğer kaynakların işleri çalışmaya devam eder.
+    - Kaynak içinde öncelik sırası: quote > history > backfill (aynı öncelikte FIFO).
+    - Aynı anahtarla bekleyen veya çalışan istek varsa yeni çağrı onun sonucunu paylaşır.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None,
+                 pool_size: Optional[int] = None, penalty_seconds: float = 5.0):
+        if limits is None:
+            limits = {
+                'binance': (Config.BINANCE_RATE_LIMIT, Config.BINANCE_RATE_BURST),
+                'yahoo': (Config.YAHOO_RATE_LIMIT, Config.YAHOO_RATE_BURST),
+            }
+        self.buckets = {name: TokenBucket(rate, burst) for name, (rate, burst) in limits.items()}
+        self.pool_size = pool_size or Config.UPSTREAM_POOL_SIZE
+        self.penalty_seconds = penalty_seconds
+        self._queues: Dict[str, list] = {}
+        self._inflight: Dict[Hashable, Future] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self.stats = {'submitted': 0, 'coalesced': 0, 'executed': 0, 'throttled': 0}
+        self._workers = [
+            threading.Thread(target=self._worker, name=f"upstream-{i}", daemon=True)
+            for i in range(self.pool_size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, source: str, key: Hashable, fn: Callable[[], Any],
+               priority: int = PRIORITY_HISTORY) -> Future:
+        full_key = (source, key)
+        with self._cond:
+            self.stats['submitted'] += 1
+            existing = self._inflight.get(full_key)
+            if existing is not None:
+                self.stats['coalesced'] += 1
+                return existing
+            future = Future()
+            self._inflight[full_key] = future
+            if source not in self.buckets:
+                self.buckets[source] = TokenBucket(0, 0)
+            heapq.heappush(self._queues.setdefault(source, []),
+                           (priority, next(self._seq), full_key, fn, future))
+            self._cond.notify()
+        return future
+
+    def run(self, source: str, key: Hashable, fn: Callable[[], Any],
+            priority: int = PRIORITY_HISTORY, timeout: Optional[float] = None) -> Any:
+        """submit() + sonucu bekle (hata varsa yükseltir)"""
+        return self.submit(source, key, fn, priority).result(timeout)
+
+    def reserve(self, source: str) -> float:
+        """
+        Olay döngüsünden (async istemciler) token ayırır: token hazırsa tüketip 0, değilse
+        beklenecek süreyi döndürür. Böylece senkron ve async çağrılar aynı limiti paylaşır.
+        """
+        with self._cond:
+            bucket = self.buckets.setdefault(source, TokenBucket(0, 0))
+            wait = bucket.wait_time()
+            if wait <= 0:
+                bucket.consume()
+            return wait
+
+    def throttle(self, source: str):
+        """Async istemcinin aldığı 429 yanıtı (senkron işçilerdeki penalize ile aynı)"""
+        with self._cond:
+            self.stats['throttled'] += 1
+            self.buckets.setdefault(source, TokenBucket(0, 0)).penalize(self.penalty_seconds)
+
+    def _next_job(self):
+        """Token'ı hazır kaynaklar arasından en yüksek öncelikli işi seçer (kilit altında çağrılır)"""
+        while True:
+            now = time.monotonic()
+            best = None
+            shortest_wait = None
+            for source, queue in self._queues.items():
+                if not queue:
+                    continue
+                wait = self.buckets[source].wait_time(now)
+                if wait <= 0:
+                    if best is None or queue[0][:2] < self._queues[best][0][:2]:
+                        best = source
+                elif shortest_wait is None or wait < shortest_wait:
+                    shortest_wait = wait
+            if best is not None:
+                self.buckets[best].consume()
+                return best, heapq.heappop(self._queues[best])
+            self._cond.wait(timeout=shortest_wait)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                source, (_, _, full_key, fn, future) = self._next_job()
+            if not future.set_running_or_notify_cancel():
+                self._finish(full_key, future)
+                continue
+            try:
+                result = fn()
+            except Exception as e:
+                if _is_rate_limited(e):
+                    with self._cond:
+                        self.stats['throttled'] += 1
+                        self.buckets[source].penalize(self.penalty_seconds)
+                self._finish(full_key, future)
+                future.set_exception(e)
+            else:
+                self._finish(full_key, future)
+                future.set_result(result)
+
+    def _finish(self, full_key: Hashable, future: Future):
+        # Sonuç yayımlanmadan önce anahtar serbest bırakılır; sonraki çağrı taze veri ister
+        with self._cond:
+            self.stats['executed'] += 1
+            if self._inflight.get(full_key) is future:
+                del self._inflight[full_key]
+
+    def queue_depth(self) -> Dict[str, int]:
+        with self._cond:
+            return {source: len(queue) for source, queue in self._queues.items()}
+
+
+_default_scheduler: Optional[UpstreamScheduler] = None
+_default_lock = threading.Lock()
+
+def get_upstream_scheduler() -> UpstreamScheduler:
+    """Süreç genelinde paylaşılan zamanlayıcı (tüm AssetManager örnekleri aynı limitleri kullanır)"""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = UpstreamScheduler()
+        return _default_scheduler
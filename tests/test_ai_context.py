@@ -0,0 +1,79 @@
+import sys
+import os
+import unittest
+
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai_service import ContextBuilder, DecisionSupportAI, count_tokens
+
+def make_portfolio(n):
+    types = ['crypto', 'stock_tr', 'commodity', 'cash']
+    return {f"A{i:03d}": {'type': types[i % 4], 'amount': i * 1.23456, 'value': 1000 + i * 37.12345}
+            for i in range(n)}
+
+class FakeModel:
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        return type('Response', (), {'text': f"yanıt {len(self.prompts)}"})()
+
+class TestContextBuilder(unittest.TestCase):
+    def test_portfolio_is_bounded_deterministic_and_keeps_totals(self):
+        builder = ContextBuilder(budget=300)
+        small = builder.portfolio(make_portfolio(5), 'USD')
+        self.assertIn('A004|crypto|4.94|1148|21.4', small)
+        self.assertTrue(small.split('\n')[-1].startswith('A000|'))
+
+        portfolio = make_portfolio(500)
+        text = builder.portfolio(portfolio, 'USD')
+        self.assertLessEqual(count_tokens(text), 300)
+        self.assertLess(count_tokens(text), count_tokens(str(portfolio)) / 10)
+        # Sığmayan varlıklar silinmez, tür bazında toplanır
+        self.assertIn('Toplam 5131150 USD, 500 varlık', text)
+        shares = [float(line.rsplit('|', 1)[1]) for line in text.split('\n')[2:]]
+        self.assertAlmostEqual(sum(shares), 100, delta=0.5)
+
+        # Sözlük sırası çıktıyı değiştirmez
+        shuffled = dict(reversed(list(portfolio.items())))
+        self.assertEqual(builder.portfolio(shuffled, 'USD'), text)
+
+    def test_trades_summarize_whole_file_within_budget(self):
+        trades = [{'date': f"2024-{m:02d}-01", 'symbol': ['BTC', 'ETH', 'THYAO'][m % 3], 'type': 'crypto',
+                   'side': 'buy' if m % 2 else 'sell', 'quantity': 1.0, 'price': 100.0 * m, 'fee': 0.5}
+                  for m in range(1, 13)] * 50
+        trades.sort(key=lambda t: t['date'])
+        text = ContextBuilder(budget=400).trades(trades)
+        self.assertLessEqual(count_tokens(text), 400)
+        self.assertTrue(text.startswith('600 işlem, 2024-01-01..2024-12-01'))
+        self.assertIn('Örnek işlemler', text)
+        self.assertIn('2024-12-01', text.split('Örnek işlemler')[1])
+
+    def test_prompt_formats_raw_dicts_and_responses_are_cached(self):
+        ai = DecisionSupportAI(api_key="test_key", model_name="test-model")
+        ai.model = FakeModel()
+        context = {'portfolio': make_portfolio(50), 'user_question': "Ne yapmalıyım?"}
+
+        first = ai.get_ai_recommendation(context)
+        second = ai.get_ai_recommendation({'user_question': "Ne yapmalıyım?",
+                                            'portfolio': dict(reversed(list(context['portfolio'].items())))})
+        self.assertEqual(first, second)
+        self.assertEqual(len(ai.model.prompts), 1)
+        self.assertIn('varlık|tür|miktar|değer|pay%', ai.model.prompts[0])
+
+        ai.get_ai_recommendation(dict(context, user_question="Başka bir soru"))
+        self.assertEqual(len(ai.model.prompts), 2)
+
+    def test_frame_fallback_samples_across_rows(self):
+        df = pd.DataFrame({'x': range(1000), 'y': ['a', 'b'] * 500})
+        text = ContextBuilder(budget=200).frame(df)
+        self.assertLessEqual(count_tokens(text), 200)
+        self.assertIn('1000 satır', text)
+        self.assertIn('999|b', text)
+
+if __name__ == '__main__':
+    unittest.main()
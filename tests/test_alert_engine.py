@@ -0,0 +1,105 @@
+import sys
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from multi_asset_manager import AssetManager
+from services.alert_engine import AlertEngine, ThresholdBook
+
+class TestThresholdBook(unittest.TestCase):
+    def test_pop_crossed_returns_only_crossed_thresholds(self):
+        book = ThresholdBook()
+        book.extend([('above', 110.0, 1), ('above', 120.0, 2), ('above', 105.0, 3),
+                     ('below', 90.0, 4), ('below', 80.0, 5)])
+        book.add('below', 95.0, 6)
+
+        self.assertEqual(book.pop_crossed(100.0), [])
+        self.assertEqual(sorted(book.pop_crossed(112.0)), [1, 3])
+        self.assertEqual(sorted(book.pop_crossed(85.0)), [4, 6])
+        self.assertEqual(len(book), 2)
+
+class TestAlertEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'alerts.db')
+        self.engine = AlertEngine(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_price_alert_fires_once_into_outbox(self):
+        alert = self.engine.create_alert('u1', 'BTC', 'crypto', 'above', 100.0)
+        self.assertEqual(self.engine.on_quote('BTC', 'crypto', 99.0), [])
+        self.assertEqual(self.engine.on_quote('BTC', 'crypto', 101.0), [alert['id']])
+        self.assertEqual(self.engine.on_quote('BTC', 'crypto', 102.0), [])
+
+        pending = self.engine.pending_notifications('u1')
+        self.assertEqual([p['alert_id'] for p in pending], [alert['id']])
+        self.assertEqual(self.engine.mark_delivered('u1', [pending[0]['id']]), 1)
+        self.assertEqual(self.engine.pending_notifications('u1'), [])
+        self.assertEqual(self.engine.list_alerts('u1'), [])
+
+    def test_second_worker_does_not_duplicate_notification(self):
+        self.engine.create_alert('u1', 'ETH', 'crypto', 'below', 50.0)
+        other = AlertEngine(self.path)
+        self.assertEqual(len(other.on_quote('ETH', 'crypto', 40.0)), 1)
+        self.assertEqual(self.engine.on_quote('ETH', 'crypto', 40.0), [])
+        self.assertEqual(len(self.engine.pending_notifications('u1')), 1)
+
+    def test_pct_move_fires_on_either_side_once(self):
+        alert = self.engine.create_alert('u1', 'AAPL', 'stock_us', 'pct_move', 5, reference_price=200.0)
+        self.assertEqual(self.engine.on_quote('AAPL', 'stock_us', 205.0), [])
+        self.assertEqual(self.engine.on_quote('AAPL', 'stock_us', 189.0), [alert['id']])
+        # Diğer yönün eşiği tembel silinmiş olarak kalır, tekrar tetiklemez
+        self.assertEqual(self.engine.on_quote('AAPL', 'stock_us', 300.0), [])
+
+    def test_deleted_alert_does_not_fire(self):
+        alert = self.engine.create_alert('u1', 'BTC', 'crypto', 'above', 100.0)
+        self.assertFalse(self.engine.delete_alert('u2', alert['id']))
+        self.assertTrue(self.engine.delete_alert('u1', alert['id']))
+        self.assertEqual(self.engine.on_quote('BTC', 'crypto', 150.0), [])
+
+    def test_quotes_are_dispatched_off_the_request_path_only_when_new(self):
+        alert = self.engine.create_alert('u1', 'BTC', 'crypto', 'above', 100.0)
+        manager = AssetManager(router=MagicMock(), scheduler=MagicMock())
+        seen = []
+        manager.add_quote_listener(lambda s, t, p: seen.append(p))
+        manager.add_quote_listener(self.engine.submit_quote)
+
+        with patch.object(manager, '_get_price', return_value=101.0) as fetch:
+            for _ in range(3):
+                self.assertEqual(manager.get_price('BTC', 'crypto'), 101.0)
+        fetch.assert_called_once()
+        # Önbellek isabetleri aynı fiyatı tekrar bildirmez; başka işçinin yazdığı yeni fiyat bildirilir
+        self.assertEqual(seen, [101.0])
+        manager._quotes.set(('BTC', 'crypto'), 102.0)
+        manager.get_price('BTC', 'crypto')
+        self.assertEqual(seen, [101.0, 102.0])
+
+        self.engine.flush()
+        self.assertEqual([p['alert_id'] for p in self.engine.pending_notifications('u1')], [alert['id']])
+        self.assertEqual(self.engine._dispatcher.name, 'alert-dispatch')
+
+    def test_probability_alerts_share_one_prediction(self):
+        self.engine.create_alert('u1', 'BTC-USD', 'crypto', 'probability', 0.6,
+                                 target_price=120000, horizon_days=10)
+        self.engine.create_alert('u2', 'BTC-USD', 'crypto', 'probability', 0.8,
+                                 target_price=120000, horizon_days=10)
+        calls = []
+
+        def predict(symbol, target, days):
+            calls.append((symbol, target, days))
+            return {'success': True, 'probability': 0.7}
+
+        fired = self.engine.evaluate_probability_alerts(predict)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(fired), 1)
+        self.assertEqual(len(self.engine.pending_notifications('u1')), 1)
+        self.assertEqual(self.engine.pending_notifications('u2'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from api import handlers
+from api.handlers import APIError
+
+PORTFOLIO = {'BTC': {'type': 'crypto', 'value': 100}, 'USDT': {'type': 'cash', 'value': 50}}
+
+class TestAPIHandlers(unittest.TestCase):
+    def assertAPIError(self, status, fn, *args):
+        with self.assertRaises(APIError) as ctx:
+            fn(*args)
+        self.assertEqual(ctx.exception.status, status)
+        return ctx.exception.msg
+
+    def test_history_validation(self):
+        self.assertEqual(self.assertAPIError(400, handlers.parse_history, {}), "Missing symbol")
+        self.assertAPIError(400, handlers.parse_history, {'symbol': 'BTC', 'interval': '2h'})
+        self.assertAPIError(400, handlers.parse_history, {'symbol': 'BTC', 'interval': '1m', 'days': 30})
+        self.assertEqual(handlers.parse_history({'symbol': 'BTC', 'interval': '1wk', 'days': 900}),
+                         ('BTC', 'crypto', 900, '1wk', None))
+
+    def test_query_parameters(self):
+        self.assertAPIError(400, handlers.parse_nav_query, {'days': 'abc'})
+        portfolio_id, start, max_points = handlers.parse_nav_query({'max_points': '1'})
+        self.assertEqual((portfolio_id, start, max_points), ('wallet', None, 10))
+        # Bozuk limit varsayılana düşer
+        self.assertEqual(handlers.parse_search({'q': ' bt ', 'limit': 'x'}), ('bt', None, 10))
+        self.assertAPIError(400, handlers.parse_search, {'q': ''})
+
+    def test_sensitivity_keeps_cash_and_lists_values(self):
+        positions, axes, extremes = handlers.parse_sensitivity(
+            {'portfolio': PORTFOLIO, 'axes': [{'target': 'BTC', 'min': -0.5, 'max': 0.5, 'steps': 3}]})
+        result = handlers.run_sensitivity(positions, axes, extremes)
+        self.assertEqual(result['values'], [100.0, 150.0, 200.0])
+        self.assertAPIError(400, handlers.run_sensitivity, positions, [{'target': 'DOGE', 'min': 0, 'max': 1}], 1)
+        self.assertAPIError(400, handlers.parse_sensitivity, {'portfolio': {'BTC': {'value': 1}}, 'axes': [{}]})
+
+    def test_alert_and_job_errors(self):
+        alert = handlers.parse_alert({'symbol': ' btc ', 'kind': 'pct_move', 'threshold': 5})
+        self.assertTrue(handlers.needs_reference_price(alert))
+        self.assertAPIError(404, handlers.set_reference_price, alert, None)
+        self.assertEqual(handlers.set_reference_price(alert, 64000.0)['reference_price'], 64000.0)
+        self.assertAPIError(400, handlers.parse_alert, {'symbol': 'BTC', 'kind': 'sideways'})
+
+        engine = MagicMock()
+        engine.delete_alert.return_value = False
+        self.assertAPIError(404, handlers.delete_alert, engine, 'u', 7)
+
+        with patch.object(handlers, 'get_background_jobs', return_value=None):
+            self.assertAPIError(404, handlers.run_job, 'nav_snapshot')
+
+    def test_batch_validation(self):
+        self.assertAPIError(400, handlers.parse_batch, {})
+        self.assertAPIError(400, handlers.parse_batch, {'queries': ['bad']})
+        self.assertAPIError(400, handlers.parse_batch, {'queries': [{'symbol': 'X', 'interval': '2h'}]})
+        self.assertAPIError(503, handlers.require_ai, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import os
+import asyncio
+import threading
+import unittest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from werkzeug.serving import make_server
+
+from loadtest.fake_upstream import create_app, UpstreamBehavior
+from multi_asset_manager import AssetManager
+from services.async_market import AsyncMarketData
+from services.source_router import SourceRouter
+from services.upstream_scheduler import UpstreamScheduler
+
+class TestAsyncMarketData(unittest.TestCase):
+    def setUp(self):
+        self.behaviors = {
+            'binance': UpstreamBehavior(latency_ms=50),
+            'yahoo': UpstreamBehavior(latency_ms=0),
+            'gemini': UpstreamBehavior(latency_ms=0),
+        }
+        self.server = make_server('127.0.0.1', 0, create_app(self.behaviors), threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{self.server.server_port}"
+        manager = AssetManager(binance_url=url, yahoo_url=url, router=SourceRouter(),
+                               scheduler=UpstreamScheduler(limits={}, pool_size=1))
+        self.market = AsyncMarketData(manager)
+
+    def tearDown(self):
+        self.server.shutdown()
+
+    def run_async(self, coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await self.market.close()
+        return asyncio.run(main())
+
+    def test_concurrent_quotes_share_one_upstream_call(self):
+        seen = []
+        self.market.manager.add_quote_listener(lambda s, t, p: seen.append(s))
+
+        async def burst():
+            await self.market.get_price('ETH', 'crypto')  # markets yüklenir
+            before = self.behaviors['binance'].stats['requests']
+            self.market.manager._quotes.clear()
+            prices = await asyncio.gather(*(self.market.get_price('BTC', 'crypto') for _ in range(50)))
+            return prices, self.behaviors['binance'].stats['requests'] - before
+
+        prices, requests = self.run_async(burst())
+        self.assertEqual(len(set(prices)), 1)
+        self.assertGreater(prices[0], 0)
+        self.assertEqual(requests, 1)
+        self.assertEqual(len(seen), 51)
+
+    def test_daily_history_and_prices(self):
+        async def fetch():
+            history = await self.market.get_historical_data('THYAO', 'stock_tr', days=30)
+            prices = await self.market.get_prices({'THYAO': {'type': 'stock_tr', 'amount': 10},
+                                                   'GC=F': {'type': 'commodity', 'amount': 1}})
+            return history, prices
+
+        history, prices = self.run_async(fetch())
+        self.assertIn('Close', history.columns)
+        self.assertGreater(len(history), 10)
+        self.assertTrue(all(p > 0 for p in prices.values()))
+
+        result = self.market.manager.value_holdings({'THYAO': {'type': 'stock_tr', 'amount': 10}},
+                                                    {'THYAO': 2.0}, currency='TRY')
+        self.assertEqual(result['assets']['THYAO']['value'], 20.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,192 @@
+import sys
+import os
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.bar_aggregator import BarStore, aggregate_bars, check_history_window, observed_bars_per_day
+from multi_asset_manager import AssetManager
+
+def minute_bars(start, count):
+    index = pd.date_range(start, periods=count, freq='min')
+    close = np.arange(count, dtype=float)
+    return pd.DataFrame({'Open': close, 'High': close + 1, 'Low': close - 1,
+                         'Close': close, 'Volume': 1.0}, index=index)
+
+class TestBarAggregator(unittest.TestCase):
+    def test_aggregate_minutes_to_five_minutes(self):
+        bars = aggregate_bars(minute_bars('2025-01-01 00:00', 10), '5m')
+
+        self.assertEqual(len(bars), 2)
+        second = bars.iloc[1]
+        self.assertEqual(bars.index[1], pd.Timestamp('2025-01-01 00:05'))
+        self.assertEqual((second['Open'], second['High'], second['Low'], second['Close'], second['Volume']),
+                         (5.0, 10.0, 4.0, 9.0, 5.0))
+
+    def test_observed_bars_per_day_follows_trading_sessions(self):
+        # 7/24 kripto saatlik barlar
+        crypto = pd.date_range('2025-01-01', periods=24 * 60, freq='h')
+        self.assertAlmostEqual(observed_bars_per_day(crypto, '1h'), 24.0)
+        # Hafta içi 10:00-17:00 seansı (7 saatlik bar), hafta sonu kapalı
+        hours = pd.date_range('2025-01-01', periods=24 * 60, freq='h')
+        stock = hours[(hours.dayofweek < 5) & (hours.hour >= 10) & (hours.hour < 17)]
+        self.assertAlmostEqual(observed_bars_per_day(stock, '1h'), 7 * 5 / 7, delta=0.3)
+        days = pd.bdate_range('2024-01-01', periods=300)
+        self.assertAlmostEqual(observed_bars_per_day(days, '1d'), 5 / 7, delta=0.05)
+        # Veri yetersizse 7/24 varsayımı
+        self.assertEqual(observed_bars_per_day(days[:1], '1d'), 1.0)
+
+    def test_bar_store_fetches_only_delta(self):
+        store = BarStore(max_days=1)
+        now = datetime(2025, 1, 2, 0, 0)
+        requested = []
+
+        def fetch(since):
+            requested.append(since)
+            count = int((now - since).total_seconds() // 60)
+            return minute_bars(since, count)
+
+        first = store.get('BTC', 'crypto', 1, fetch, now=now)
+        now = now + timedelta(minutes=10)
+        second = store.get('BTC', 'crypto', 1, fetch, now=now)
+
+        self.assertEqual(len(first), 1440)
+        self.assertEqual(requested[1], datetime(2025, 1, 1, 23, 59))
+        self.assertEqual(second.index[-1], pd.Timestamp('2025-01-02 00:09'))
+
+    def test_bar_store_refreshes_open_last_bar(self):
+        store = BarStore(max_days=1)
+        now = datetime(2025, 1, 2, 0, 0, 30)
+        closes = {'value': 10.0}
+
+        def fetch(since):
+            # Son bar (00:00) henüz açık: her çekişte güncel kapanışla döner
+            index = pd.date_range(since.replace(second=0), datetime(2025, 1, 2, 0, 0), freq='min')
+            close = np.full(len(index), 5.0)
+            close[-1] = closes['value']
+            return pd.DataFrame({'Open': 5.0, 'High': np.maximum(close, 5.0), 'Low': 5.0,
+                                 'Close': close, 'Volume': 1.0}, index=index)
+
+        store.get('BTC', 'crypto', 1, fetch, now=now)
+        closes['value'] = 12.0
+        bars = store.get('BTC', 'crypto', 1, fetch, now=now + timedelta(seconds=20))
+
+        self.assertEqual(bars.index[-1], pd.Timestamp('2025-01-02 00:00'))
+        self.assertEqual((bars['Close'].iloc[-1], bars['High'].iloc[-1]), (12.0, 12.0))
+        self.assertFalse(bars.index.duplicated().any())
+
+    def test_bar_store_delta_when_first_bar_is_after_window_start(self):
+        # Seans dışı / hafta sonu: pencerenin ilk 20 saatinde bar yok
+        store = BarStore(max_days=1)
+        now = datetime(2025, 1, 6, 0, 0)
+        open_at = now - timedelta(hours=4)
+        requested = []
+
+        def fetch(since):
+            requested.append(since)
+            since = max(since, open_at)
+            return minute_bars(since, int((now - since).total_seconds() // 60))
+
+        first = store.get('THYAO', 'stock_tr', 1, fetch, now=now)
+        now = now + timedelta(minutes=5)
+        second = store.get('THYAO', 'stock_tr', 1, fetch, now=now)
+        now = now + timedelta(hours=2)
+        store.get('THYAO', 'stock_tr', 1, fetch, now=now)
+
+        self.assertEqual(len(first), 240)
+        self.assertEqual(requested[1:], [datetime(2025, 1, 5, 23, 59), datetime(2025, 1, 6, 0, 4)])
+        self.assertEqual(second.index[-1], pd.Timestamp('2025-01-06 00:04'))
+
+        # Daha uzun pencere istenirse eksik baş kısım indirilir
+        store_short = BarStore(max_days=2)
+        store_short.get('THYAO', 'stock_tr', 1, fetch, now=now)
+        store_short.get('THYAO', 'stock_tr', 2, fetch, now=now)
+        self.assertEqual(requested[-1], now - timedelta(days=2))
+
+    def test_bar_store_uses_utc_regardless_of_local_timezone(self):
+        original = os.environ.get('TZ')
+        try:
+            for tz in ('America/New_York', 'Europe/Istanbul'):
+                os.environ['TZ'] = tz
+                time.tzset()
+                store = BarStore(max_days=1)
+                requested = []
+
+                def fetch(since):
+                    requested.append(since)
+                    utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+                    count = int((utc_now - since).total_seconds() // 60)
+                    return minute_bars(since.replace(second=0, microsecond=0), count)
+
+                utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+                first = store.get('BTC', 'crypto', 1, fetch)
+                self.assertLess(abs((requested[0] - (utc_now - timedelta(days=1))).total_seconds()), 5)
+                self.assertGreaterEqual(len(first), 1439)
+
+                # İkinci istek (son bardan itibaren) delta olarak çekilir
+                store.get('BTC', 'crypto', 1, fetch)
+                self.assertEqual(len(requested), 2, tz)
+                self.assertEqual(requested[1], first.index[-1].to_pydatetime())
+        finally:
+            if original is None:
+                os.environ.pop('TZ', None)
+            else:
+                os.environ['TZ'] = original
+            time.tzset()
+
+    def test_ccxt_history_paginates_past_limit(self):
+        manager = AssetManager(router=MagicMock(), scheduler=MagicMock())
+        manager.CCXT_PAGE_LIMIT = 3
+        step = 60_000
+        since = datetime.now(timezone.utc) - timedelta(minutes=7)
+        start_ms = int(since.timestamp() * 1000)
+
+        def fetch_ohlcv(symbol, timeframe, since, limit):
+            first = (since - start_ms) // step
+            return [[start_ms + i * step, 1, 2, 0, 1, 1] for i in range(first, min(first + limit, 7))]
+
+        manager.exchange = MagicMock()
+        manager.exchange.fetch_ohlcv.side_effect = fetch_ohlcv
+        df = manager._fetch_ccxt_ohlcv('BTC', '1m', since)
+
+        self.assertEqual(len(df), 7)
+        self.assertEqual(manager.exchange.fetch_ohlcv.call_count, 3)
+
+    def test_ccxt_history_stops_at_page_cap(self):
+        manager = AssetManager(router=MagicMock(), scheduler=MagicMock())
+        manager.CCXT_PAGE_LIMIT = 2
+        manager.CCXT_MAX_PAGES = 3
+        step = 60_000
+        since = datetime.now(timezone.utc) - timedelta(minutes=100)
+
+        def fetch_ohlcv(symbol, timeframe, since, limit):
+            return [[since + i * step, 1, 2, 0, 1, 1] for i in range(limit)]
+
+        manager.exchange = MagicMock()
+        manager.exchange.fetch_ohlcv.side_effect = fetch_ohlcv
+        df = manager._fetch_ccxt_ohlcv('BTC', '1m', since)
+
+        self.assertEqual(manager.exchange.fetch_ohlcv.call_count, 3)
+        self.assertEqual(len(df), 6)
+
+    def test_history_window_capped_per_interval(self):
+        self.assertEqual(check_history_window('1m', 7), 7)
+        self.assertEqual(check_history_window('1h', '30'), 30)
+        for interval, days in (('1m', 365), ('5m', 8), ('1h', 731), ('1m', 0), ('1h', 'x')):
+            with self.assertRaises(ValueError):
+                check_history_window(interval, days)
+
+        manager = AssetManager(router=MagicMock(), scheduler=MagicMock())
+        with self.assertRaises(ValueError):
+            manager.get_historical_data('BTC', 'crypto', days=365, interval='1m')
+        manager.router.call.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services import batch_prediction
+
+class TestBatchPrediction(unittest.TestCase):
+    def test_plan_groups_by_symbol_and_dedupes(self):
+        plan, keys = batch_prediction.plan_batch([
+            {'symbol': 'BTC-USD', 'target_price': 100000, 'days': 30},
+            {'symbol': 'BTC-USD', 'target_price': 100000, 'days': 30},
+            {'symbol': 'BTC-USD', 'target_price': 120000, 'days': 30},
+            {'symbol': 'AAPL', 'target_price': 300, 'days': 10, 'interval': '1h'},
+        ])
+
+        self.assertEqual(plan, {
+            ('BTC-USD', '1d'): [(100000.0, 30.0), (120000.0, 30.0)],
+            ('AAPL', '1h'): [(300.0, 10.0)],
+        })
+        self.assertEqual(len(keys), 4)
+
+    def test_results_fan_out_to_every_duplicate(self):
+        calls = []
+
+        def fake_group(symbol, interval, items):
+            calls.append(symbol)
+            if symbol == 'BAD':
+                raise RuntimeError('boom')
+            return [{'success': True, 'symbol': symbol, 'target': t} for t, _ in items]
+
+        queries = [
+            {'symbol': 'ETH-USD', 'target_price': 5000},
+            {'symbol': 'BAD', 'target_price': 1},
+            {'symbol': 'ETH-USD', 'target_price': 5000},
+        ]
+        with patch.object(batch_prediction, '_predict_group', fake_group), \
+                ThreadPoolExecutor(max_workers=2) as pool:
+            results = dict(batch_prediction.iter_batch_predictions(queries, executor=pool))
+
+        self.assertEqual(sorted(calls), ['BAD', 'ETH-USD'])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(results[0]['target'], 5000.0)
+        self.assertFalse(results[1]['success'])
+
+if __name__ == '__main__':
+    unittest.main()
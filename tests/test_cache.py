@@ -0,0 +1,87 @@
+import sys
+import os
+import multiprocessing
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from config import Config
+from services.cache import CacheBackend, SQLiteCache, TTLCache, TieredCache, get_cache
+
+
+def _write_from_child(path, key, value):
+    SQLiteCache(path, 'quotes').set(key, value)
+
+
+class TestCacheBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cache.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sqlite_cache_is_shared_across_processes(self):
+        process = multiprocessing.get_context('spawn').Process(
+            target=_write_from_child, args=(self.path, ('BTC', 'crypto'), 65000.5))
+        process.start()
+        process.join(30)
+        cache = SQLiteCache(self.path, 'quotes')
+        self.assertEqual(cache.get(('BTC', 'crypto')), 65000.5)
+        # Ad alanları birbirinden ayrıdır
+        self.assertIsNone(SQLiteCache(self.path, 'ml_models').get(('BTC', 'crypto')))
+
+    def test_sqlite_cache_expiry_and_values(self):
+        cache = SQLiteCache(self.path, 'frames', ttl=60)
+        frame = pd.DataFrame({'Close': [1.0, 2.0]}, index=pd.date_range('2025-01-01', periods=2))
+        cache.set('frame', frame)
+        pd.testing.assert_frame_equal(cache.get('frame'), frame)
+        cache.set('old', 1, ttl=-1)
+        self.assertEqual(cache.get('old', 'missing'), 'missing')
+        cache.delete('frame')
+        self.assertIsNone(cache.get('frame'))
+
+    def test_sqlite_cache_prunes_to_maxsize(self):
+        cache = SQLiteCache(self.path, 'small', maxsize=3)
+        for i in range(5):
+            cache.set(i, i, ttl=100 + i)
+        cache.prune()
+        self.assertEqual([cache.get(i) for i in range(5)], [None, None, 2, 3, 4])
+
+    def test_tiered_cache_fills_local_from_shared(self):
+        shared = SQLiteCache(self.path, 'tiered')
+        writer = TieredCache(TTLCache(ttl=30), shared)
+        reader = TieredCache(TTLCache(ttl=30), SQLiteCache(self.path, 'tiered'))
+        writer.set('k', {'v': 1})
+        self.assertEqual(reader.get('k'), {'v': 1})
+        self.assertEqual(reader.local.get('k'), {'v': 1})
+
+    def test_promoted_copy_does_not_outlive_shared_entry(self):
+        writer = TieredCache(TTLCache(ttl=30), SQLiteCache(self.path, 'short'))
+        reader = TieredCache(TTLCache(ttl=30), SQLiteCache(self.path, 'short'))
+        writer.set('k', 'v', ttl=0.2)
+        self.assertEqual(reader.get('k'), 'v')
+        time.sleep(0.3)
+        # Paylaşılan kayıt doldu; yerel kopya 30 sn değil kalan ömür kadar yaşar
+        self.assertIsNone(reader.get('k'))
+
+    def test_backend_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            CacheBackend()
+
+    def test_factory_uses_shared_tier_only_when_configured(self):
+        with patch.object(Config, 'SHARED_CACHE_PATH', ''):
+            self.assertIsInstance(get_cache('x'), TTLCache)
+        with patch.object(Config, 'SHARED_CACHE_PATH', self.path):
+            self.assertIsInstance(get_cache('x'), TieredCache)
+            self.assertIsInstance(get_cache('x', shared=False), TTLCache)
+            self.assertEqual(get_cache('x', maxsize=8).shared.maxsize, 8)
+
+if __name__ == '__main__':
+    unittest.main()
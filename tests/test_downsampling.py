@@ -0,0 +1,51 @@
+import sys
+import os
+import unittest
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.downsampling import lttb_indices, downsample_frame, rollup_ohlc
+
+class TestDownsampling(unittest.TestCase):
+    def test_lttb_keeps_endpoints_and_extremes(self):
+        y = np.zeros(1000)
+        y[500] = 100.0  # Tek bir tepe noktası
+        idx = lttb_indices(np.arange(1000), y, 50)
+
+        self.assertEqual(len(idx), 50)
+        self.assertEqual(idx[0], 0)
+        self.assertEqual(idx[-1], 999)
+        self.assertIn(500, idx)
+        self.assertTrue(np.all(np.diff(idx) > 0))
+
+    def test_downsample_frame_is_bounded(self):
+        index = pd.date_range('2015-01-01', periods=5000, freq='D')
+        df = pd.DataFrame({
+            'Bitcoin': np.cumsum(np.random.randn(5000)),
+            'Cüzdanım': np.cumsum(np.random.randn(5000)),
+        }, index=index)
+        df.iloc[:100, 1] = np.nan
+
+        small = downsample_frame(df, 400)
+        self.assertLessEqual(len(small), 400)
+        self.assertEqual(small.index[0], index[0])
+        self.assertEqual(small.index[-1], index[-1])
+        self.assertIs(downsample_frame(df, None), df)
+
+    def test_rollup_weekly_ohlc(self):
+        index = pd.date_range('2025-01-06', periods=14, freq='D')  # Pazartesi'den başlar
+        close = np.arange(14, dtype=float)
+        df = pd.DataFrame({'open': close, 'high': close + 1, 'low': close - 1,
+                           'Close': close, 'volume': 1.0}, index=index)
+
+        weekly = rollup_ohlc(df, '1wk')
+        self.assertEqual(len(weekly), 2)
+        first = weekly.iloc[0]
+        self.assertEqual((first['open'], first['high'], first['low'], first['Close'], first['volume']),
+                         (0.0, 7.0, -1.0, 6.0, 7.0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import sys
+import os
+import csv
+import io
+import json
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet isteğe bağlı
+    pq = None
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db
+from services.export import export_stream
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'export.db')
+        self.patch = mock.patch.object(db, 'DB_NAME', self.path)
+        self.patch.start()
+        db.init_db()
+        conn = sqlite3.connect(self.path)
+        # 10 gün x 25 analiz; 3 Ocak'ın son saniyesi bitiş filtresinde dahil olmalı
+        conn.executemany('INSERT INTO analyses (analysis_type, input_summary, ai_response, created_at) VALUES (?, ?, ?, ?)',
+                         [('risk', f'{d}-{i}', 'yanıt, "tırnaklı"', f'2025-01-{d:02d} {i % 24:02d}:00:00.000000')
+                          for d in range(1, 11) for i in range(25)])
+        conn.execute("INSERT INTO analyses (analysis_type, created_at) VALUES ('risk', '2025-01-03 23:59:59.999999')")
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def test_csv_is_streamed_in_batches_with_date_filter(self):
+        chunks, meta = export_stream('analyses', 'csv', start='2025-01-02', end='2025-01-03', batch_size=10)
+        self.assertEqual(meta['filename'], 'analyses.csv')
+        first = next(chunks)
+        self.assertEqual(first.count(b'\n'), 11)  # başlık + ilk parti, geri kalanı okunmadan
+        parts = [first] + list(chunks)
+        self.assertEqual(len(parts), 6)
+
+        rows = list(csv.DictReader(io.StringIO(b''.join(parts).decode('utf-8'))))
+        self.assertEqual(len(rows), 51)
+        self.assertEqual(rows[0]['ai_response'], 'yanıt, "tırnaklı"')
+        dates = [r['created_at'] for r in rows]
+        self.assertEqual(dates, sorted(dates))
+        self.assertTrue(dates[0].startswith('2025-01-02') and dates[-1].startswith('2025-01-03 23:59'))
+
+    def test_ndjson(self):
+        chunks, meta = export_stream('analyses', 'ndjson', start='2025-01-10')
+        lines = b''.join(chunks).decode('utf-8').splitlines()
+        self.assertEqual(meta['mimetype'], 'application/x-ndjson')
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[0])['input_summary'], '10-0')
+
+    @unittest.skipIf(pq is None, "pyarrow yüklü değil")
+    def test_parquet_row_group_per_batch(self):
+        chunks, _ = export_stream('analyses', 'parquet', batch_size=100)
+        parts = list(chunks)
+        self.assertGreater(len(parts), 3)
+        parquet = pq.ParquetFile(io.BytesIO(b''.join(parts)))
+        self.assertEqual(parquet.metadata.num_rows, 251)
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        self.assertEqual(str(parquet.schema_arrow.field('id').type), 'int64')
+
+    def test_invalid_requests_fail_before_streaming(self):
+        with self.assertRaises(ValueError):
+            export_stream('users')
+        with self.assertRaises(ValueError):
+            export_stream('analyses', 'xlsx')
+        with self.assertRaises(ValueError):
+            export_stream('analyses', start='2025-02-01', end='2025-01-01')
+
+        # İstemci koparsa (üreteç kapatılır) bağlantı kapanır ve veritabanı kilitli kalmaz
+        chunks, _ = export_stream('analyses', 'csv', batch_size=10)
+        next(chunks)
+        chunks.close()
+        db.delete_analysis(1)
+
+if __name__ == '__main__':
+    unittest.main()
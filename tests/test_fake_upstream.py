@@ -0,0 +1,51 @@
+import sys
+import os
+import unittest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from loadtest.fake_upstream import create_app, UpstreamBehavior
+from loadtest.load_generator import percentile
+from multi_asset_manager import AssetManager
+
+class TestFakeUpstream(unittest.TestCase):
+    def setUp(self):
+        self.behaviors = {
+            'binance': UpstreamBehavior(latency_ms=0),
+            'yahoo': UpstreamBehavior(latency_ms=0),
+            'gemini': UpstreamBehavior(latency_ms=0),
+        }
+        self.client = create_app(self.behaviors).test_client()
+
+    def test_yahoo_chart_parses_like_yfinance(self):
+        resp = self.client.get('/v8/finance/chart/THYAO.IS?range=1mo&interval=1d')
+        self.assertEqual(resp.status_code, 200)
+
+        df = AssetManager._parse_yahoo_chart(resp.get_json())
+        self.assertEqual(len(df), 30)
+        self.assertIn('Close', df.columns)
+        self.assertTrue(df.index.is_monotonic_increasing)
+
+    def test_binance_klines_limit(self):
+        resp = self.client.get('/api/v3/klines?symbol=BTCUSDT&interval=1h&limit=24')
+        rows = resp.get_json()
+        self.assertEqual(len(rows), 24)
+        self.assertEqual(rows[1][0] - rows[0][0], 3_600_000)
+
+    def test_rate_limit_and_errors(self):
+        self.behaviors['binance'].update(rate_limit=1, burst=1)
+        self.assertEqual(self.client.get('/api/v3/ping').status_code, 200)
+        self.assertEqual(self.client.get('/api/v3/ping').status_code, 429)
+
+        self.behaviors['gemini'].update(error_rate=1.0)
+        resp = self.client.post('/v1beta/models/gemini-1.5-flash:generateContent', json={})
+        self.assertEqual(resp.status_code, 503)
+
+    def test_percentile(self):
+        values = sorted(float(v) for v in range(1, 101))
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+import os
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import future_price as fp
+
+def synthetic_history(bars=1200, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.001, 0.03, bars)))
+    index = pd.date_range('2020-01-01', periods=bars, freq='D')
+    return pd.DataFrame({'Open': close, 'High': close * 1.01, 'Low': close * 0.99, 'Close': close}, index=index)
+
+class TestFuturePrice(unittest.TestCase):
+    def test_build_dataset_is_contiguous_float32(self):
+        frame = fp.base_features(synthetic_history())
+        X, y, x_latest = fp.build_dataset(frame, float(frame['Close'].iloc[-1]) * 1.1, horizon=30)
+
+        self.assertEqual(X.dtype, np.float32)
+        self.assertTrue(X.flags['C_CONTIGUOUS'])
+        self.assertEqual(X.shape[1], len(fp.FEATURES))
+        self.assertEqual(len(X), len(y))
+        # Son 29 barın etiketi belli değil; tahmin yine de en güncel bar için yapılır
+        self.assertEqual(len(X), len(frame) - 49 - 29)
+        self.assertEqual(x_latest.shape, (1, len(fp.FEATURES)))
+
+    def test_predict_reuses_cached_history(self):
+        fp._frame_cache.clear()
+        fp._dmatrix_cache.clear()
+        fp._model_cache.clear()
+        history = synthetic_history()
+        target = float(history['Close'].iloc[-1]) * 1.1
+
+        with patch.object(fp, '_load_history', return_value=history) as load, \
+                patch.object(fp, 'train_model', wraps=fp.train_model) as train:
+            first = fp.predict_probability('TEST', target, days=30, nthread=1)
+            second = fp.predict_probability('TEST', target, days=30, nthread=1)
+
+        self.assertTrue(first['success'], first['message'])
+        self.assertEqual(load.call_count, 1)
+        # İkinci çağrı önbellekteki modeli yükler, yeniden eğitmez
+        self.assertEqual(train.call_count, 1)
+        self.assertAlmostEqual(first['probability'], second['probability'])
+        self.assertAlmostEqual(sum(first['feature_importances'].values()), 1.0, places=5)
+
+    def test_horizon_counts_trading_days_only(self):
+        fp._frame_cache.clear()
+        history = synthetic_history()
+        history = history[history.index.dayofweek < 5]
+        target = float(history['Close'].iloc[-1]) * 1.1
+
+        with patch.object(fp, '_load_history', return_value=history):
+            _, job = fp.prepare_prediction('STOCK', target, days=28, interval='1d')
+
+        # 28 takvim günü = 20 işlem günü (7/24 varsayımıyla 28 olurdu)
+        self.assertEqual(job['key'][-1], 20)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from multi_asset_manager import AssetManager
+from services.fx_service import FXService, quote_currency
+from services.source_router import NoSourceAvailable
+
+class TestFXService(unittest.TestCase):
+    def setUp(self):
+        self.manager = MagicMock()
+        self.fx = FXService(self.manager)
+
+    def test_quote_currency(self):
+        self.assertEqual(quote_currency('THYAO', 'stock_tr'), 'TRY')
+        self.assertEqual(quote_currency('USDTRY', 'forex'), 'TRY')
+        self.assertEqual(quote_currency('EURUSD', 'forex'), 'USD')
+        self.assertEqual(quote_currency('VOD.L', 'stock_us'), 'GBp')
+        self.assertEqual(quote_currency('BTC', 'crypto'), 'USD')
+
+    def test_usd_only_makes_no_requests(self):
+        values = self.fx.convert([100.0, 50.0], ['USD', 'USDT'], to='USD')
+
+        np.testing.assert_allclose(values, [100.0, 50.0])
+        self.manager.get_closes.assert_not_called()
+
+    def test_convert_fetches_missing_rates_in_one_batch(self):
+        self.manager.get_closes.return_value = pd.DataFrame({
+            'TRYUSD=X': [0.03, 0.025], 'EURUSD=X': [1.1, 1.2],
+        })
+
+        values = self.fx.convert([400.0, 10.0, 5.0], ['TRY', 'EUR', 'USD'], to='EUR')
+        np.testing.assert_allclose(values, [400 * 0.025 / 1.2, 10.0, 5.0 / 1.2])
+        self.fx.convert([1.0], ['TRY'], to='USD')  # Önbellekten
+
+        self.manager.get_closes.assert_called_once()
+        self.assertEqual(sorted(self.manager.get_closes.call_args[0][0]), ['EURUSD=X', 'TRYUSD=X'])
+
+    def test_pence_quotes_are_divided_into_pounds(self):
+        self.manager.get_closes.return_value = pd.DataFrame({'GBPUSD=X': [1.25]})
+
+        # VOD.L 80 peni x 1000 adet = 800 GBP = 1000 USD
+        values = self.fx.convert([80.0 * 1000, 100.0], [quote_currency('VOD.L', 'stock_us'), 'GBP'], to='USD')
+        np.testing.assert_allclose(values, [1000.0, 125.0])
+        np.testing.assert_allclose(self.fx.convert([250.0], ['GBp'], to='GBP'), [2.5])
+
+        series = pd.Series(200.0, index=pd.date_range('2025-01-03', periods=2))
+        self.manager.get_closes.return_value = pd.DataFrame({'GBPUSD=X': [1.25]}, index=series.index[:1])
+        self.assertEqual(self.fx.convert_series(series, 'GBp', to='USD').tolist(), [2.5, 2.5])
+
+    def test_convert_series_uses_point_in_time_rates(self):
+        fx_index = pd.to_datetime(['2025-01-03', '2025-01-06'])  # Cuma, Pazartesi
+        self.manager.get_closes.return_value = pd.DataFrame({'TRYUSD=X': [0.03, 0.02]}, index=fx_index)
+        series = pd.Series(100.0, index=pd.date_range('2025-01-03', '2025-01-06'))
+
+        converted = self.fx.convert_series(series, 'TRY', to='USD')
+        self.assertEqual(converted.round(6).tolist(), [3.0, 3.0, 3.0, 2.0])
+
+    def test_failing_router_leaves_missing_rates_unavailable(self):
+        router = MagicMock()
+        router.call.side_effect = NoSourceAvailable("Tüm kaynaklar devre dışı: yahoo")
+        manager = AssetManager(router=router, scheduler=MagicMock())
+        holdings = {'BTC': {'type': 'crypto', 'amount': 1.0}, 'THYAO': {'type': 'stock_tr', 'amount': 10}}
+
+        result = manager.value_holdings(holdings, {'BTC': 50000.0, 'THYAO': 300.0}, currency='USD')
+        self.assertEqual(result['total'], 50000.0)
+        self.assertEqual(result['assets']['BTC']['value'], 50000.0)
+        self.assertEqual(result['assets']['THYAO']['value'], 0)
+        self.assertEqual(result['assets']['THYAO']['error'], 'FX rate unavailable')
+
+        # Başarısız kur önbelleğe yazılmaz; sonraki çağrı yeniden dener
+        manager.value_holdings(holdings, {'BTC': 50000.0, 'THYAO': 300.0}, currency='USD')
+        self.assertEqual(router.call.call_count, 2)
+
+        series = pd.Series(100.0, index=pd.date_range('2025-01-03', periods=2))
+        self.assertTrue(manager.fx.convert_series(series, 'TRY', to='USD').isna().all())
+
+if __name__ == '__main__':
+    unittest.main()
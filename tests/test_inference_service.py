@@ -0,0 +1,107 @@
+import sys
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import future_price as fp
+from services import inference_service
+from services.inference_service import InferenceClient, InferenceServer
+from tests.test_future_price import synthetic_history
+
+class TestInferenceService(unittest.TestCase):
+    def setUp(self):
+        fp._frame_cache.clear()
+        fp._model_cache.clear()
+        self.history = synthetic_history()
+        patcher = patch.object(fp, '_load_history', return_value=self.history)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.address = os.path.join(self.tmp.name, 'inference.sock')
+        self.server = InferenceServer(self.address, authkey=b'test', max_wait=0.2, nthread=1)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.assertTrue(self.server.ready.wait(5))
+        self.addCleanup(self.server.stop)
+        self.client = InferenceClient(self.address, authkey=b'test', timeout=60)
+
+    def test_concurrent_requests_share_one_model_and_predict_call(self):
+        target = float(self.history['Close'].iloc[-1]) * 1.1
+        with ThreadPoolExecutor(4) as pool:
+            results = list(pool.map(
+                lambda _: self.client.predict_probability('TEST', target, 30), range(4)))
+
+        self.assertTrue(all(r['success'] for r in results), results[0]['message'])
+        self.assertEqual(len({r['probability'] for r in results}), 1)
+        expected = fp.predict_probability('TEST', target, days=30, nthread=1)
+        self.assertAlmostEqual(results[0]['probability'], expected['probability'], places=6)
+
+        stats = self.client.stats()
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['models_loaded'], 1)
+        self.assertEqual(stats['predict_calls'], stats['batches'])
+        self.assertLess(stats['batches'], 4)
+
+    def test_cold_model_does_not_block_ready_requests(self):
+        target = float(self.history['Close'].iloc[-1]) * 1.1
+        self.assertTrue(self.client.predict_probability('TEST', target, 30)['success'])
+
+        gate = threading.Event()
+        training = threading.Event()
+        get_booster = fp.get_booster
+
+        def slow_booster(job, nthread=None):
+            if job['key'][0] == 'COLD':
+                training.set()
+                gate.wait(10)
+            return get_booster(job, nthread)
+
+        with patch.object(fp, 'get_booster', side_effect=slow_booster):
+            with ThreadPoolExecutor(1) as pool:
+                cold = pool.submit(self.client.predict_probability, 'COLD', target, 30)
+                self.assertTrue(training.wait(10))
+                # COLD eğitimde beklerken hazır model yanıt verir
+                warm = InferenceClient(self.address, authkey=b'test', timeout=5)
+                self.assertTrue(warm.predict_probability('TEST', target, 30)['success'])
+                self.assertFalse(cold.done())
+                gate.set()
+                self.assertTrue(cold.result(30)['success'])
+
+    def test_early_exit_results_pass_through(self):
+        result = self.client.predict_probability('TEST', 1.0, 30)
+        self.assertTrue(result['success'])
+        self.assertEqual(result['probability'], 1.0)
+        self.assertEqual(self.client.stats()['models_loaded'], 0)
+
+    def test_unresponsive_process_falls_back_in_process(self):
+        client = MagicMock()
+        client.predict_probability.side_effect = TimeoutError("yanıt yok")
+        fallback = {'success': False, 'message': 'in-process'}
+        with patch.object(inference_service, 'get_inference_client', return_value=client), \
+                patch.object(fp, 'predict_probability', return_value=fallback) as local:
+            result = inference_service.predict_probability('TEST', 123.0, 30)
+
+        self.assertEqual(result['message'], 'in-process')
+        local.assert_called_once()
+
+    def test_missing_authkey_refuses_to_start(self):
+        with patch.object(inference_service.Config, 'INFERENCE_AUTHKEY', ''), \
+                patch.object(inference_service.Config, 'INFERENCE_SOCKET', self.address), \
+                patch.object(inference_service, '_client', None):
+            with self.assertRaises(RuntimeError):
+                InferenceServer(self.address + '.other')
+            with self.assertRaises(RuntimeError):
+                InferenceClient(self.address)
+            with self.assertRaises(RuntimeError):
+                inference_service.get_inference_client()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import sys
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.job_scheduler import CronSchedule, Job, JobScheduler
+
+class TestCronSchedule(unittest.TestCase):
+    def test_next_after(self):
+        start = datetime(2025, 1, 31, 23, 58)  # Cuma
+        self.assertEqual(CronSchedule('*/15 * * * *').next_after(start), datetime(2025, 2, 1, 0, 0))
+        self.assertEqual(CronSchedule('30 2 * * *').next_after(start), datetime(2025, 2, 1, 2, 30))
+        # Hafta içi 09:00 -> pazartesi
+        self.assertEqual(CronSchedule('0 9 * * 1-5').next_after(start), datetime(2025, 2, 3, 9, 0))
+        self.assertEqual(CronSchedule('@monthly').next_after(start), datetime(2025, 2, 1, 0, 0))
+        self.assertEqual(CronSchedule('0 0 29 2 *').next_after(start), datetime(2028, 2, 29, 0, 0))
+
+    def test_invalid_expressions(self):
+        for expr in ('* * * *', '60 * * * *', '0 0 31 2 *', '*/0 * * * *'):
+            with self.assertRaises(ValueError):
+                CronSchedule(expr).next_after(datetime(2025, 1, 1))
+
+class TestJobScheduler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'jobs.db')
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make(self, schedule='0 3 * * *', fn=None, **kwargs):
+        scheduler = JobScheduler(self.path, max_workers=0)
+        scheduler._created = datetime(2025, 1, 1, 12, 0)
+        scheduler.add_job(Job('nightly', schedule, fn or (lambda: self.calls.append(1)), **kwargs))
+        return scheduler
+
+    def test_single_run_per_slot_across_workers(self):
+        first, second = self.make(), self.make()
+        before = datetime(2025, 1, 2, 2, 59)
+        at = datetime(2025, 1, 2, 3, 1)
+        self.assertEqual(first.run_pending(before), [])
+        self.assertEqual(first.run_pending(at), ['nightly'])
+        self.assertEqual(second.run_pending(at), [])
+        self.assertEqual(self.calls, [1])
+        status = first.status()[0]
+        self.assertEqual(status['last_status'], 'ok')
+        self.assertEqual(status['run_count'], 1)
+        self.assertIsNone(status['locked_by'])
+
+    def test_jitter_delays_run(self):
+        scheduler = self.make(jitter=600)
+        due = datetime(2025, 1, 2, 3, 0)
+        offset = timedelta(seconds=scheduler._jittered(scheduler.jobs['nightly'], due).timestamp()
+                           - due.timestamp())
+        if offset > timedelta(seconds=1):
+            self.assertEqual(scheduler.run_pending(due), [])
+        self.assertEqual(scheduler.run_pending(due + timedelta(minutes=11)), ['nightly'])
+
+    def test_error_is_recorded_and_lease_released(self):
+        def boom():
+            raise RuntimeError("upstream down")
+        scheduler = self.make(fn=boom)
+        scheduler.run_pending(datetime(2025, 1, 2, 3, 0))
+        status = scheduler.status()[0]
+        self.assertEqual(status['last_status'], 'error')
+        self.assertIn('upstream down', status['last_error'])
+        self.assertTrue(scheduler.run_now('nightly'))
+
+    def test_reboot_job_runs_once_per_process(self):
+        scheduler = self.make(schedule='@reboot')
+        now = datetime(2025, 1, 1, 12, 1)
+        self.assertEqual(scheduler.run_pending(now), ['nightly'])
+        self.assertEqual(scheduler.run_pending(now), [])
+        self.assertEqual(self.make(schedule='@reboot').run_pending(now), ['nightly'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import sys
+import os
+import io
+import tempfile
+import unittest
+
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ledger import Ledger, trades_from_frame
+
+class TestLedger(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ledger.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fifo_realized_pnl_and_snapshots(self):
+        ledger = Ledger(self.path)
+        ledger.record_trade('2025-01-01', 'BTC', 'crypto', 'buy', 1, 100)
+        ledger.record_trade('2025-01-02', 'BTC', 'crypto', 'buy', 1, 200)
+        pos = ledger.record_trade('2025-01-03', 'BTC', 'crypto', 'sell', 1.5, 300, fee=10)
+
+        # FIFO: 1 x 100 + 0.5 x 200 = 200 maliyet; 450 - 10 - 200 = 240
+        self.assertAlmostEqual(pos['quantity'], 0.5)
+        self.assertAlmostEqual(pos['cost_basis'], 100.0)
+        self.assertAlmostEqual(pos['realized_pnl'], 240.0)
+
+        past = ledger.pnl(as_of='2025-01-02')
+        self.assertAlmostEqual(past['quantity'].iloc[0], 2.0)
+        self.assertAlmostEqual(past['realized_pnl'].iloc[0], 0.0)
+
+        live = ledger.pnl(prices={('BTC', 'crypto'): 400.0})
+        self.assertAlmostEqual(live['unrealized_pnl'].iloc[0], 100.0)
+
+        history = ledger.pnl_history('2025-01-01', '2025-01-04')
+        self.assertEqual(list(history['realized_pnl']), [0.0, 0.0, 240.0, 240.0])
+
+    def test_average_cost(self):
+        ledger = Ledger(self.path, method='average')
+        ledger.record_trade('2025-01-01', 'AAPL', 'stock_us', 'buy', 1, 100)
+        ledger.record_trade('2025-01-02', 'AAPL', 'stock_us', 'buy', 1, 200)
+        pos = ledger.record_trade('2025-01-03', 'AAPL', 'stock_us', 'sell', 1, 300)
+        self.assertAlmostEqual(pos['realized_pnl'], 150.0)
+        self.assertAlmostEqual(pos['cost_basis'], 150.0)
+
+    def test_backdated_trade_rebuilds_asset(self):
+        ledger = Ledger(self.path)
+        ledger.record_trade('2025-01-02', 'BTC', 'crypto', 'buy', 1, 200)
+        ledger.record_trade('2025-01-03', 'BTC', 'crypto', 'sell', 1, 300)
+        # Daha eski ve ucuz lot eklenince FIFO satış onu kapatır
+        pos = ledger.record_trade('2025-01-01', 'BTC', 'crypto', 'buy', 1, 100)
+        self.assertAlmostEqual(pos['realized_pnl'], 200.0)
+        self.assertAlmostEqual(pos['cost_basis'], 200.0)
+
+    def test_oversell_rolls_back_whole_import(self):
+        ledger = Ledger(self.path)
+        trades = [
+            {'date': '2025-01-01', 'symbol': 'ETH', 'type': 'crypto', 'side': 'buy',
+             'quantity': 1.0, 'price': 10.0, 'fee': 0.0},
+            {'date': '2025-01-02', 'symbol': 'ETH', 'type': 'crypto', 'side': 'sell',
+             'quantity': 2.0, 'price': 10.0, 'fee': 0.0},
+        ]
+        with self.assertRaises(ValueError):
+            ledger.import_trades(trades)
+        self.assertTrue(ledger.pnl().empty)
+
+    def test_import_frame(self):
+        df = pd.DataFrame({
+            'Date(UTC)': ['2025-01-02 10:00', '2025-01-01 09:00'],
+            'Pair': ['BTCUSDT', 'BTC/USDT'],
+            'Side': ['SELL', 'BUY'],
+            'Executed': [0.5, 1.0],
+            'Price': [120.0, 100.0],
+            'Fee': [1.0, 0.0],
+        })
+        self.assertEqual(trades_from_frame(df)[0]['side'], 'buy')
+
+        ledger = Ledger(self.path)
+        self.assertEqual(ledger.import_frame(df), 2)
+        self.assertAlmostEqual(ledger.position('BTC', 'crypto')['realized_pnl'], 9.0)
+
+    def test_blank_fee_cell_counts_as_zero(self):
+        df = pd.read_csv(io.StringIO("date,symbol,side,quantity,price,fee\n"
+                                     "2025-01-01,ETH,buy,2,100,\n"
+                                     "2025-01-02,ETH,sell,1,150,1.5\n"))
+        self.assertEqual([t['fee'] for t in trades_from_frame(df)], [0.0, 1.5])
+
+        ledger = Ledger(self.path)
+        ledger.import_frame(df)
+        pos = ledger.position('ETH', 'crypto')
+        self.assertAlmostEqual(pos['cost_basis'], 100.0)
+        self.assertAlmostEqual(pos['realized_pnl'], 48.5)
+
+if __name__ == '__main__':
+    unittest.main()
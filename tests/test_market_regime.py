@@ -0,0 +1,88 @@
+import sys
+import os
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ai_service import DecisionSupportAI
+from services.market_regime import MarketRegimeService, regime_indicators, summarize_regime
+
+ASSETS = [{'symbol': 'UP', 'type': 'crypto', 'name': 'Yükselen'},
+          {'symbol': 'DOWN', 'type': 'stock_us', 'name': 'Düşen'},
+          {'symbol': 'WILD', 'type': 'stock_tr', 'name': 'Oynak'}]
+
+def synthetic_closes(days=320):
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=days)
+    rng = np.random.default_rng(1)
+    calm = rng.normal(0, 0.002, size=days)
+    calm[-20:] = rng.normal(0, 0.05, size=20)  # son 20 gün çok oynak
+    return pd.DataFrame({
+        'UP': 100 * 1.002 ** np.arange(days) * (1 + rng.normal(0, 0.0005, size=days)),
+        'DOWN': 100 * 0.998 ** np.arange(days) * (1 + rng.normal(0, 0.0005, size=days)),
+        'WILD': 100 * np.exp(np.cumsum(calm)),
+    }, index=index)
+
+class FakeManager:
+    def __init__(self, closes):
+        self.closes = closes
+        self.calls = 0
+
+    def get_historical_data(self, symbol, asset_type, days=365, **kwargs):
+        self.calls += 1
+        return pd.DataFrame({'Close': self.closes[symbol]})
+
+class TestRegimeIndicators(unittest.TestCase):
+    def test_trend_volatility_and_drawdown(self):
+        indicators = regime_indicators(synthetic_closes())
+        self.assertEqual(indicators.loc['UP', 'trend'], 'yükseliş')
+        self.assertEqual(indicators.loc['DOWN', 'trend'], 'düşüş')
+        self.assertEqual(indicators.loc['WILD', 'vol_regime'], 'yüksek')
+        self.assertAlmostEqual(indicators.loc['UP', 'drawdown'], 0.0, delta=0.003)
+        self.assertAlmostEqual(indicators.loc['DOWN', 'drawdown'], 0.998 ** 251 - 1, delta=0.003)
+        self.assertAlmostEqual(indicators.loc['UP', 'return_1m'], 1.002 ** 21 - 1, delta=0.003)
+
+        summary = summarize_regime(indicators)
+        self.assertEqual(summary['uptrend'], 1)
+        self.assertEqual(summary['high_volatility'], 1)
+
+    def test_short_history_is_undetermined(self):
+        indicators = regime_indicators(synthetic_closes(days=60))
+        self.assertTrue((indicators['trend'] == 'belirsiz').all())
+        self.assertEqual(summarize_regime(indicators)['regime'], 'belirsiz')
+
+class TestMarketRegimeService(unittest.TestCase):
+    def test_refresh_once_then_serve_from_cache(self):
+        manager = FakeManager(synthetic_closes())
+        service = MarketRegimeService(manager, assets=ASSETS)
+        self.assertIsNone(service.latest())
+
+        snapshot = service.current()
+        self.assertEqual([a['symbol'] for a in snapshot['assets']], ['UP', 'DOWN', 'WILD'])
+        self.assertIn(snapshot['regime'], ('risk-on', 'risk-off', 'karışık'))
+        self.assertEqual(manager.calls, 3)
+
+        for _ in range(100):
+            self.assertIs(service.current(), snapshot)
+        service.refresh()  # aynı gün: geçmiş önbellekten
+        self.assertEqual(manager.calls, 3)
+
+    def test_recommendation_prompt_uses_latest_regime(self):
+        import services.market_regime as market_regime
+        service = MarketRegimeService(FakeManager(synthetic_closes()), assets=ASSETS)
+        service.refresh()
+        original, market_regime._service = market_regime._service, service
+        try:
+            prompt = DecisionSupportAI._recommendation_prompt({'portfolio': 'test'})
+            explicit = DecisionSupportAI._recommendation_prompt({'portfolio': 'test', 'market_condition': 'ayı'})
+        finally:
+            market_regime._service = original
+        self.assertIn('Rejim:', prompt)
+        self.assertIn('Yükselen|yükseliş', prompt)
+        self.assertNotIn('Rejim:', explicit)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock
+
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nav_engine import NavEngine
+
+class TestNavEngine(unittest.TestCase):
+    def setUp(self):
+        closes = {
+            # Kripto her gün, hisse yalnızca hafta içi (2025-01-04/05 hafta sonu)
+            'BTC': pd.Series([100.0, 110.0, 120.0, 130.0, 140.0],
+                             index=pd.date_range('2025-01-02', periods=5, freq='D')),
+            'AAPL': pd.Series([10.0, 11.0, 12.0],
+                              index=pd.to_datetime(['2025-01-02', '2025-01-03', '2025-01-06'])),
+        }
+        self.manager = MagicMock()
+        self.manager.get_historical_data.side_effect = \
+            lambda symbol, asset_type, days: pd.DataFrame({'Close': closes[symbol]})
+        self.engine = NavEngine(self.manager)
+
+    def test_nav_applies_transactions_and_fills_closed_days(self):
+        transactions = [
+            {'date': '2025-01-02', 'symbol': 'BTC', 'type': 'crypto', 'amount': 1},
+            {'date': '2025-01-02', 'symbol': 'USDT', 'type': 'cash', 'amount': 50},
+            {'date': '2025-01-04', 'symbol': 'AAPL', 'type': 'stock_us', 'amount': 10},
+            {'date': '2025-01-05', 'symbol': 'BTC', 'type': 'crypto', 'amount': -0.5},
+        ]
+        nav = self.engine.compute(transactions, '2025-01-02', '2025-01-06')
+
+        # 01-04 ve 01-05'te AAPL cuma kapanışıyla (11) değerlenir
+        self.assertEqual(nav['NAV'].tolist(), [150.0, 160.0, 280.0, 225.0, 240.0])
+        self.assertEqual(nav['AAPL|stock_us'].tolist(), [0.0, 0.0, 110.0, 110.0, 120.0])
+
+    def test_result_is_cached_per_portfolio_version(self):
+        transactions = [{'date': '2025-01-02', 'symbol': 'BTC', 'type': 'crypto', 'amount': 1}]
+        self.engine.compute(transactions, '2025-01-02', '2025-01-06')
+        self.engine.compute(list(transactions), '2025-01-02', '2025-01-06')
+        self.assertEqual(self.manager.get_historical_data.call_count, 1)
+
+        transactions.append({'date': '2025-01-03', 'symbol': 'BTC', 'type': 'crypto', 'amount': 1})
+        nav = self.engine.compute(transactions, '2025-01-02', '2025-01-06')
+        self.assertEqual(nav['NAV'].iloc[-1], 280.0)
+        self.assertEqual(self.manager.get_historical_data.call_count, 2)
+
+    def test_cash_is_converted_to_reporting_currency(self):
+        fx_index = pd.date_range('2025-01-01', periods=6, freq='D')
+        self.manager.get_closes.return_value = pd.DataFrame({'TRYUSD=X': 0.025}, index=fx_index)
+        transactions = [
+            {'date': '2025-01-02', 'symbol': 'BTC', 'type': 'crypto', 'amount': 1},
+            {'date': '2025-01-02', 'symbol': 'USDT', 'type': 'cash', 'amount': 50},
+        ]
+        nav = self.engine.compute(transactions, '2025-01-02', '2025-01-06', currency='TRY')
+
+        # 1 USD = 40 TRY: nakit de kripto gibi çevrilir
+        self.assertEqual(nav['USDT|cash'].round(6).tolist(), [2000.0] * 5)
+        self.assertEqual(nav['NAV'].round(6).tolist(), [6000.0, 6400.0, 6800.0, 7200.0, 7600.0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import sys
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+import numpy as np
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.nav_snapshots import DAY, HOUR, WEEK, NavSnapshotter, bucket_start
+
+class TestNavSnapshotter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'nav.db')
+        self.snapshotter = NavSnapshotter(self.path)
+        self.now = int(time.time())
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def insert(self, timestamps, values, portfolio_id='wallet'):
+        conn = sqlite3.connect(self.path)
+        conn.executemany('INSERT INTO nav_snapshots (portfolio_id, ts, value, currency) VALUES (?, ?, ?, ?)',
+                         [(portfolio_id, int(t), float(v), 'USD') for t, v in zip(timestamps, values)])
+        conn.commit()
+        conn.close()
+
+    def raw_values(self, start, end):
+        conn = sqlite3.connect(self.path)
+        rows = conn.execute('SELECT value FROM nav_snapshots WHERE ts >= ? AND ts < ? ORDER BY ts',
+                            (start, end)).fetchall()
+        conn.close()
+        return [r[0] for r in rows]
+
+    def test_rollups_match_raw_and_old_points_expire(self):
+        timestamps = np.arange(self.now - 10 * DAY, self.now, 300)
+        values = 1000 + np.sin(timestamps / 7200) * 50 + (timestamps - timestamps[0]) / 1000
+        self.insert(timestamps, values)
+
+        hour = bucket_start(self.now, HOUR) - 3 * HOUR
+        expected = self.raw_values(hour, hour + HOUR)
+        stats = self.snapshotter.compact(now=self.now)
+        self.assertGreater(stats['1h'], 230)
+        self.assertGreater(stats['deleted'], 0)
+
+        conn = sqlite3.connect(self.path)
+        o, h, l, c, mean, n = conn.execute('''SELECT open, high, low, close, mean, samples FROM nav_rollups
+                                              WHERE resolution='1h' AND bucket=?''', (hour,)).fetchone()
+        conn.close()
+        self.assertEqual((o, h, l, c, n), (expected[0], max(expected), min(expected), expected[-1], 12))
+        self.assertAlmostEqual(mean, np.mean(expected))
+
+        # Ham satırlar yalnızca son 2 gün; daha eskiler saatlik özetlerde
+        counts = self.snapshotter.row_counts('wallet')
+        self.assertLessEqual(counts['raw'], 2 * DAY // 300 + 1)
+        self.assertGreaterEqual(counts['1d'], 9)
+
+        # İkinci sıkıştırma bir şey eklemez
+        self.assertEqual(self.snapshotter.compact(now=self.now)['1h'], 0)
+
+        # Günlük ortalama, ham değerlerin ortalamasına eşit (ağırlıklı özet)
+        day = bucket_start(self.now, DAY) - 5 * DAY
+        full = values[(timestamps >= day) & (timestamps < day + DAY)]
+        week = self.snapshotter.series('wallet', start=day, end=day + DAY - 1, max_points=5)
+        self.assertEqual(week.attrs['resolution'], '1d')
+        self.assertAlmostEqual(week['mean'].iloc[0], full.mean())
+
+    def test_series_picks_bounded_tier_and_includes_unrolled_tail(self):
+        timestamps = np.arange(self.now - 10 * DAY, self.now, 300)
+        self.insert(timestamps, np.full(len(timestamps), 500.0))
+        self.snapshotter.compact(now=self.now)
+        self.insert([self.now], [900.0])  # henüz özetlenmemiş son nokta
+
+        day = self.snapshotter.series('wallet', start=self.now - DAY)
+        self.assertEqual(day.attrs['resolution'], 'raw')
+        self.assertEqual(day['close'].iloc[-1], 900.0)
+
+        ten_days = self.snapshotter.series('wallet', start=self.now - 10 * DAY, max_points=500)
+        self.assertEqual(ten_days.attrs['resolution'], '1h')
+        self.assertLessEqual(len(ten_days), 500)
+        self.assertEqual(ten_days['close'].iloc[-1], 900.0)
+
+        full = self.snapshotter.series('wallet', max_points=20)
+        self.assertEqual(full.attrs['resolution'], '1d')
+        self.assertLessEqual(len(full), 20)
+
+    def test_storage_grows_sublinearly_with_age(self):
+        # 4 yıl saatlik kayıt: ~35k ham nokta -> yalnızca kademe sınırları kadar satır kalır
+        timestamps = np.arange(self.now - 4 * 365 * DAY, self.now, HOUR)
+        self.insert(timestamps, np.linspace(100, 200, len(timestamps)))
+        self.snapshotter.compact(now=self.now)
+        counts = self.snapshotter.row_counts('wallet')
+        self.assertLessEqual(counts['1h'], 90 * 24 + 2)
+        self.assertLessEqual(counts['1d'], 3 * 365 + 2)
+        self.assertLessEqual(counts['1w'], 4 * 53 + 1)
+        self.assertLess(sum(counts.values()), len(timestamps) / 8)
+
+        weekly = self.snapshotter.series('wallet', max_points=500)
+        self.assertEqual(weekly.attrs['resolution'], '1w')
+        self.assertTrue(all(ts.dayofweek == 0 for ts in weekly.index[1:]))
+
+    def test_storage_is_bounded_by_final_tier_retention(self):
+        # 12 yıl 6 saatlik kayıt; 10 yıldan eskisi haftalık kademeden de silinir
+        timestamps = np.arange(self.now - 12 * 365 * DAY, self.now, 6 * HOUR)
+        self.insert(timestamps, np.linspace(100, 200, len(timestamps)))
+        self.snapshotter.compact(now=self.now)
+        counts = self.snapshotter.row_counts('wallet')
+        self.assertLessEqual(counts['1w'], 10 * 53 + 1)
+
+        later = self.now + 2 * 365 * DAY
+        self.insert(np.arange(self.now, later, 6 * HOUR), np.full(2 * 365 * 4, 300.0))
+        self.snapshotter.compact(now=later)
+        self.assertAlmostEqual(self.snapshotter.row_counts('wallet')['1w'], counts['1w'], delta=1)
+
+        full = self.snapshotter.series('wallet', max_points=1000)
+        self.assertGreaterEqual(full.index[0].timestamp(), later - 10 * 365 * DAY - WEEK)
+
+if __name__ == '__main__':
+    unittest.main()
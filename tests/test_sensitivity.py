@@ -0,0 +1,81 @@
+import sys
+import os
+import itertools
+import time
+import unittest
+
+import numpy as np
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.sensitivity import membership_matrix, sensitivity_grid
+
+POSITIONS = [
+    {'symbol': 'BTC', 'type': 'crypto', 'value': 1000},
+    {'symbol': 'ETH', 'type': 'crypto', 'value': 500},
+    {'symbol': 'GC=F', 'type': 'commodity', 'value': 400},
+    {'symbol': 'THYAO', 'type': 'stock_tr', 'value': 300},
+    {'symbol': 'USDT', 'type': 'cash', 'value': 200},
+]
+
+class TestSensitivityGrid(unittest.TestCase):
+    def test_grid_matches_per_cell_revaluation(self):
+        axes = [{'target': 'BTC', 'min': -0.5, 'max': 1.0, 'steps': 7},
+                {'target': 'crypto', 'min': -0.3, 'max': 0.3, 'steps': 5},
+                {'target': 'stock_tr', 'min': -0.3, 'max': 0.3, 'steps': 3}]
+        result = sensitivity_grid(POSITIONS, axes, extremes=3)
+        grid = result['values']
+        self.assertEqual(grid.shape, (7, 5, 3))
+        self.assertEqual(result['base_value'], 2400)
+        # Sembol ekseni önceliklidir: 'crypto' ekseninde yalnızca ETH kalır
+        self.assertEqual([a['exposure'] for a in result['axes']], [1000, 500, 300])
+
+        shocks = [np.array(a['shocks']) for a in result['axes']]
+        for i, j, k in itertools.product(*(range(len(s)) for s in shocks)):
+            expected = (1000 * (1 + shocks[0][i]) + 500 * (1 + shocks[1][j])
+                        + 400 + 300 * (1 + shocks[2][k]) + 200)
+            self.assertAlmostEqual(grid[i, j, k], expected)
+
+        worst, best = result['worst'][0], result['best'][0]
+        self.assertAlmostEqual(worst['value'], grid.min())
+        self.assertAlmostEqual(best['value'], grid.max())
+        self.assertEqual(worst['shocks'], {'BTC': -0.5, 'crypto': -0.3, 'stock_tr': -0.3})
+        self.assertAlmostEqual(sum(worst['assets'].values()), worst['value'])
+        self.assertEqual(len(result['worst']), 3)
+
+    def test_invalid_axes(self):
+        with self.assertRaises(ValueError):
+            membership_matrix(POSITIONS, ['DOGE'])
+        with self.assertRaises(ValueError):
+            sensitivity_grid(POSITIONS, [{'target': 'BTC', 'min': -1.5, 'max': 0}])
+        with self.assertRaises(ValueError):
+            sensitivity_grid(POSITIONS, [{'target': 'BTC', 'min': 0, 'max': 1},
+                                         {'target': 'BTC', 'min': 0, 'max': 1}])
+
+    def test_zero_extremes_returns_empty_lists(self):
+        axes = [{'target': 'BTC', 'min': -0.5, 'max': 0.5, 'steps': 3}]
+        result = sensitivity_grid(POSITIONS, axes, extremes=0)
+        self.assertEqual(result['worst'], [])
+        self.assertEqual(result['best'], [])
+        # Nakit şoklanmaz ama taban değere dahildir
+        self.assertEqual(result['base_value'], 2400)
+        self.assertAlmostEqual(result['values'][0], 1900)
+
+    def test_hundred_by_hundred_grid_for_fifty_assets_is_fast(self):
+        rng = np.random.default_rng(0)
+        types = ['crypto', 'commodity', 'stock_tr', 'stock_us', 'forex']
+        positions = [{'symbol': f"A{i}", 'type': types[i % 5], 'value': float(v)}
+                     for i, v in enumerate(rng.uniform(100, 1000, size=50))]
+        axes = [{'target': 'crypto', 'min': -0.5, 'max': 1.0, 'steps': 100},
+                {'target': 'stock_tr', 'min': -0.3, 'max': 0.3, 'steps': 100}]
+
+        begin = time.perf_counter()
+        result = sensitivity_grid(positions, axes)
+        elapsed = time.perf_counter() - begin
+
+        self.assertEqual(result['values'].shape, (100, 100))
+        self.assertLess(elapsed, 0.05)
+
+if __name__ == '__main__':
+    unittest.main()
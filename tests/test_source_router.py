@@ -0,0 +1,153 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+import unittest
+from concurrent.futures import Future
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.source_router import SourceRouter, CircuitBreaker, NoSourceAvailable
+
+def failing():
+    raise ConnectionError("blocked")
+
+def slow(value, delay):
+    def fn():
+        time.sleep(delay)
+        return value
+    return fn
+
+class SaturatedExecutor:
+    """İlk işi çalıştırır, sonrakiler boş işçi yokmuş gibi kuyrukta bekler"""
+
+    def __init__(self):
+        self.started = False
+        self.queued = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        if self.started:
+            self.queued.append(future)
+            return future
+        self.started = True
+
+        def run():
+            future.set_running_or_notify_cancel()
+            future.set_result(fn(*args))
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+class TestSourceRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = SourceRouter(hedge_percentile=95, default_hedge_delay=0.05,
+                                   min_hedge_delay=0.01, failure_threshold=2, cooldown=60)
+
+    def test_falls_back_when_primary_fails(self):
+        result = self.router.call([('binance', failing), ('yahoo', lambda: 42.0)])
+        self.assertEqual(result, 42.0)
+
+    def test_breaker_skips_failing_source(self):
+        calls = []
+        def primary():
+            calls.append(1)
+            raise ConnectionError("blocked")
+
+        for _ in range(4):
+            self.router.call([('binance', primary), ('yahoo', lambda: 1.0)])
+
+        # Two failures open the breaker; later calls go straight to yahoo
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(self.router.breakers['binance'].state, CircuitBreaker.OPEN)
+        with self.assertRaises(NoSourceAvailable):
+            self.router.call([('binance', primary)])
+
+    def test_hedged_request_caps_latency(self):
+        start = time.monotonic()
+        result = self.router.call([('binance', slow('slow', 1.0)), ('yahoo', slow('fast', 0.01))])
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(result, 'fast')
+        self.assertLess(elapsed, 0.5)
+
+    def test_losing_hedge_is_cancelled_before_it_starts(self):
+        router = SourceRouter(default_hedge_delay=0.05, min_hedge_delay=0.01)
+        router._executor = SaturatedExecutor()
+        calls = []
+        result = router.call([('binance', slow('primary', 0.2)), ('yahoo', lambda: calls.append(1) or 'hedge')])
+
+        self.assertEqual(result, 'primary')
+        hedge = router._executor.queued[0]
+        self.assertTrue(hedge.cancelled())
+        self.assertEqual(calls, [])
+        self.assertEqual(router.hedge_stats['cancelled'], 1)
+        self.assertTrue(router._hedges.acquire(blocking=False))  # Yedek hakkı geri verildi
+
+    def test_cancelled_half_open_trial_is_released(self):
+        router = SourceRouter(default_hedge_delay=0.05, min_hedge_delay=0.01, failure_threshold=1, cooldown=0)
+        router._executor = SaturatedExecutor()
+        router._source('yahoo')[1].record_failure()
+        sources = [('binance', slow('primary', 0.2)), ('yahoo', lambda: 'hedge')]
+
+        self.assertEqual(router.call(sources), 'primary')
+        breaker = router.breakers['yahoo']
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.available())
+
+    def test_cancelled_async_half_open_trial_is_released(self):
+        router = SourceRouter(default_hedge_delay=0.05, min_hedge_delay=0.01, failure_threshold=1, cooldown=0)
+        router._source('yahoo')[1].record_failure()
+
+        async def value(result, delay):
+            await asyncio.sleep(delay)
+            return result
+
+        result = asyncio.run(router.acall([('binance', lambda: value('primary', 0.2)),
+                                           ('yahoo', lambda: value('hedge', 5.0))]))
+        self.assertEqual(result, 'primary')
+        self.assertTrue(router.breakers['yahoo'].available())
+
+    def test_hedges_are_bounded_under_bursts(self):
+        router = SourceRouter(default_hedge_delay=0.05, min_hedge_delay=0.01, max_hedges=1)
+        release = threading.Event()
+        hedges = []
+
+        def hedge():
+            hedges.append(1)
+            release.wait(5)
+            return 'hedge'
+
+        def request():
+            return router.call([('binance', slow('primary', 0.3)), ('yahoo', hedge)])
+
+        threads = [threading.Thread(target=request) for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(2)
+        release.set()
+
+        # Yalnızca bir yedek uçuşta olabilir; diğer istekler birincili bekler
+        self.assertEqual(len(hedges), 1)
+        self.assertEqual(router.hedge_stats['launched'], 1)
+        self.assertEqual(router.hedge_stats['skipped'], 2)
+
+    def test_invalid_result_is_not_a_source_failure(self):
+        for _ in range(3):
+            result = self.router.call([('yahoo', lambda: None)])
+            self.assertIsNone(result)
+        self.assertEqual(self.router.breakers['yahoo'].state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_single_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, cooldown=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.available())
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import sys
+import os
+import time
+import unittest
+
+import numpy as np
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.fx_service import FXService
+from services.stress_test import StressTester, evaluate_scenarios, scenario_tensor
+
+class FakeManager:
+    """Sabit günlük getirili sentetik geçmiş döndürür"""
+
+    def __init__(self, series):
+        self.series = series
+        self.calls = 0
+        self.fx = FXService(self)
+
+    def get_historical_data(self, symbol, asset_type, days=365, **kwargs):
+        self.calls += 1
+        return pd.DataFrame({'Close': self.series[symbol]})
+
+def price_path(start, end, daily_return):
+    index = pd.date_range(start, end, freq='D')
+    return pd.Series(100 * (1 + daily_return) ** np.arange(len(index)), index=index)
+
+class TestStressMath(unittest.TestCase):
+    def test_drawdown_recovery_and_worst_day(self):
+        returns = np.array([[-0.1], [-0.1], [0.1], [0.2], [0.0]])
+        dates = pd.date_range('2020-01-01', periods=5).to_numpy()
+        tensor, valid, starts = scenario_tensor(
+            returns, dates, [{'start': '2020-01-01', 'end': '2020-01-05'},
+                             {'start': '2020-01-03', 'end': '2020-01-04'}])
+        self.assertEqual(tensor.shape, (2, 5, 1))
+        self.assertEqual(valid.sum(axis=1).tolist(), [5, 2])
+
+        m = evaluate_scenarios(tensor, valid, np.array([1.0]))
+        self.assertAlmostEqual(m['max_drawdown'][0], -0.19)
+        self.assertEqual(m['trough'][0], 1)
+        self.assertEqual(m['recovery'][0], 3)
+        self.assertAlmostEqual(m['worst_day'][0], -0.1)
+        self.assertAlmostEqual(m['total_return'][0], 0.9 * 0.9 * 1.1 * 1.2 - 1)
+        # Yalnızca yükselen pencere: düşüş yok, en kötü gün dolgu değil gerçek gün
+        self.assertAlmostEqual(m['max_drawdown'][1], 0.0)
+        self.assertAlmostEqual(m['worst_day'][1], 0.1)
+
+    def test_fifty_scenarios_hundred_assets_is_fast(self):
+        rng = np.random.default_rng(0)
+        dates = pd.date_range('2005-01-01', '2025-01-01', freq='B').to_numpy()
+        returns = rng.normal(0, 0.02, size=(len(dates), 100))
+        starts = pd.date_range('2006-01-01', periods=50, freq='90D')
+        scenarios = [{'start': str(s.date()), 'end': str((s + pd.Timedelta(days=365)).date())} for s in starts]
+        weights = np.full(100, 0.01)
+
+        begin = time.perf_counter()
+        tensor, valid, _ = scenario_tensor(returns, dates, scenarios)
+        metrics = evaluate_scenarios(tensor, valid, weights)
+        elapsed = time.perf_counter() - begin
+
+        self.assertEqual(tensor.shape[0], 50)
+        self.assertEqual(len(metrics['max_drawdown']), 50)
+        self.assertLess(elapsed, 0.25)
+
+class TestStressTester(unittest.TestCase):
+    def test_assets_without_history_are_flat_and_reduce_coverage(self):
+        manager = FakeManager({
+            'OLD': price_path('2007-01-01', '2024-12-31', -0.001),
+            'NEW': price_path('2019-01-01', '2024-12-31', -0.01),
+        })
+        tester = StressTester(manager, scenarios=[
+            {'name': 'gfc', 'start': '2008-09-01', 'end': '2008-12-31'},
+            {'name': 'covid', 'start': '2020-02-19', 'end': '2020-03-31'},
+        ])
+        positions = [{'symbol': 'OLD', 'type': 'stock_us', 'value': 500},
+                     {'symbol': 'NEW', 'type': 'stock_us', 'value': 300},
+                     {'symbol': 'USDT', 'type': 'cash', 'value': 200}]
+        results = {r['scenario']: r for r in tester.run(positions, currency='USD')}
+
+        self.assertAlmostEqual(results['gfc']['coverage'], 0.7)
+        self.assertAlmostEqual(results['covid']['coverage'], 1.0)
+        # 2008'de NEW verisi yok: düşüş yalnızca OLD'un %50 ağırlığından gelir
+        gfc_days = results['gfc']['days']
+        self.assertAlmostEqual(results['gfc']['total_return'], (1 - 0.0005) ** gfc_days - 1)
+        self.assertLess(results['covid']['max_drawdown'], results['gfc']['max_drawdown'])
+        self.assertEqual(list(results), ['covid', 'gfc'])
+
+        tester.run(positions, currency='USD')
+        self.assertEqual(manager.calls, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.symbol_catalog import SymbolCatalog, curated_entries
+from services.portfolio_service import PortfolioService
+
+class TestSymbolCatalog(unittest.TestCase):
+    def setUp(self):
+        self.catalog = SymbolCatalog(curated_entries())
+
+    def test_prefix_search_is_sorted_and_filtered(self):
+        results = self.catalog.search('t', limit=5)
+        symbols = [r['symbol'] for r in results]
+        self.assertEqual(symbols, sorted(symbols))
+        self.assertTrue(all(s.startswith('T') for s in symbols))
+
+        bist = self.catalog.search('TH', asset_type='stock_tr')
+        self.assertEqual(bist[0], {'symbol': 'THYAO', 'type': 'stock_tr', 'name': 'Türk Hava Yolları'})
+        self.assertEqual(self.catalog.search('ZZZ'), [])
+
+    def test_validation_uses_catalog_and_negative_cache(self):
+        manager = MagicMock()
+        manager.get_price.return_value = None
+        service = PortfolioService(asset_manager=manager, catalog=self.catalog)
+
+        known = service.validate_and_add_asset('thyao', 'stock_tr', 10)
+        self.assertEqual(known['symbol'], 'THYAO')
+        manager.get_price.assert_not_called()
+
+        self.assertIsNone(service.validate_and_add_asset('THYOA', 'stock_tr', 10))
+        self.assertIsNone(service.validate_and_add_asset('THYOA', 'stock_tr', 10))
+        self.assertEqual(manager.get_price.call_count, 1)
+
+        # Katalogda olmayan ama geçerli sembol öğrenilir
+        manager.get_price.return_value = 12.5
+        self.assertEqual(service.validate_and_add_asset('ISMEN', 'stock_tr', 1)['price'], 12.5)
+        self.catalog.replace(curated_entries())
+        self.assertTrue(self.catalog.contains('ISMEN', 'stock_tr'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import sys
+import os
+import gzip
+import json
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import db
+from services.ledger import Ledger
+from services.nav_snapshots import NavSnapshotter
+from services.sync import SyncService, changed_quotes, encode_sync
+
+class TestSyncService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'sync.db')
+        self.patch = mock.patch.object(db, 'DB_NAME', self.path)
+        self.patch.start()
+        db.init_db()
+        self.sync = SyncService(self.path)
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmp.cleanup()
+
+    def test_cursor_returns_only_changes_since_last_sync(self):
+        first = self.sync.changes(0)
+        self.assertEqual(len(first['changes']['portfolio']['rows']), 1)
+        self.assertFalse(first['has_more'])
+
+        for i in range(3):
+            db.save_analysis('risk', f'girdi {i}', 'yanıt')
+        Ledger(self.path).record_trade('2025-01-01', 'BTC', 'crypto', 'buy', 1, 100)
+        db.update_portfolio(0.5, 100.0, 1000.0, '2025-01-01')
+        db.delete_analysis(2)
+
+        delta = self.sync.changes(first['cursor'])
+        analyses = delta['changes']['analyses']
+        ids = [row[analyses['columns'].index('id')] for row in analyses['rows']]
+        self.assertEqual(sorted(ids), [1, 3])
+        self.assertEqual(analyses['deleted'], ['2'])
+        positions = delta['changes']['positions']
+        self.assertEqual(positions['rows'][0][positions['columns'].index('symbol')], 'BTC')
+        portfolio = delta['changes']['portfolio']
+        self.assertEqual(portfolio['rows'][0][portfolio['columns'].index('btc_amount')], 0.5)
+
+        # Aynı kayda yapılan çok sayıda değişiklik günlükte tek satır
+        for _ in range(50):
+            db.update_portfolio(0.6, 100.0, 1000.0, '2025-01-01')
+        again = self.sync.changes(delta['cursor'])
+        self.assertEqual(list(again['changes']), ['portfolio'])
+        self.assertEqual(again['cursor'] - delta['cursor'], 50)
+        self.assertEqual(self.sync.changes(again['cursor'])['changes'], {})
+
+    def test_batches_and_reset(self):
+        for i in range(12):
+            db.save_analysis('risk', str(i), 'yanıt')
+        cursor, pages, rows = 0, 0, 0
+        while True:
+            page = self.sync.changes(cursor, limit=5)
+            rows += sum(len(e['rows']) for e in page['changes'].values())
+            cursor, pages = page['cursor'], pages + 1
+            if not page['has_more']:
+                break
+        self.assertEqual((pages, rows), (3, 13))
+
+        stale = self.sync.changes(cursor + 100)
+        self.assertTrue(stale['reset'])
+        self.assertEqual(stale['cursor'], cursor)
+
+    def test_rows_written_before_triggers_are_backfilled(self):
+        path = os.path.join(self.tmp.name, 'old.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE analyses (id INTEGER PRIMARY KEY, analysis_type TEXT)')
+        conn.executemany('INSERT INTO analyses (analysis_type) VALUES (?)', [('a',), ('b',)])
+        conn.commit()
+        conn.close()
+        result = SyncService(path).changes(0)
+        self.assertEqual(len(result['changes']['analyses']['rows']), 2)
+
+    def test_series_resends_last_bar_and_appends_new_ones(self):
+        snapshotter = NavSnapshotter(self.path)
+        now = int(time.time())
+        for k in range(5):
+            snapshotter.record('wallet', 100 + k, 'USD', ts=now - 600 + k * 60)
+        full = self.sync.series({'wallet': {'resolution': 'raw'}})['wallet']
+        self.assertEqual(len(full['rows']), 5)
+
+        last_ts = full['rows'][-1][0]
+        snapshotter.record('wallet', 200, 'USD', ts=now - 10)
+        delta = self.sync.series({'wallet': {'resolution': 'raw', 'since': last_ts}})['wallet']
+        self.assertEqual([r[0] for r in delta['rows']], [last_ts, now - 10])
+        self.assertFalse(delta['truncated'])
+
+        with self.assertRaises(ValueError):
+            self.sync.series({'wallet': {'resolution': '5m'}})
+
+    def test_quotes_and_compact_encoding(self):
+        known = {'BTC': {'type': 'crypto', 'price': 100.0}, 'ETH': {'type': 'crypto', 'price': 5.0},
+                 'SOL': {'type': 'crypto', 'price': None}}
+        self.assertEqual(changed_quotes(known, {'BTC': 100.0, 'ETH': 6.0, 'SOL': 1.0, 'XRP': None}),
+                         {'ETH': 6.0, 'SOL': 1.0})
+
+        for i in range(200):
+            db.save_analysis('risk', f'girdi {i}', 'Portföy riski orta seviyede. ' * 10)
+        full = self.sync.sync({'cursor': 0, 'limit': 5000})
+        body, headers = encode_sync(full, 'gzip, deflate')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(body)), full)
+
+        db.save_analysis('risk', 'yeni', 'kısa yanıt')
+        delta = self.sync.sync({'cursor': full['cursor']})
+        small, small_headers = encode_sync(delta, 'gzip')
+        self.assertNotIn('Content-Encoding', small_headers)
+        self.assertLess(len(small), 1024)
+        self.assertLess(len(small) * 10, len(json.dumps(full)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import sys
+import os
+import threading
+import time
+import unittest
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.upstream_scheduler import (
+    UpstreamScheduler, TokenBucket, PRIORITY_QUOTE, PRIORITY_BACKFILL
+)
+
+class TestUpstreamScheduler(unittest.TestCase):
+    def test_coalesces_identical_requests(self):
+        scheduler = UpstreamScheduler(limits={'yahoo': (0, 0)}, pool_size=2)
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(1)
+            return 123.0
+
+        futures = [scheduler.submit('yahoo', ('quote', 'AAPL'), fetch) for _ in range(5)]
+        release.set()
+
+        self.assertEqual([f.result(1) for f in futures], [123.0] * 5)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(scheduler.stats['coalesced'], 4)
+
+    def test_priority_order_within_source(self):
+        # Tek işçi + boş kova: iş sırası yalnızca önceliğe bağlı
+        scheduler = UpstreamScheduler(limits={'binance': (50, 1)}, pool_size=1)
+        blocker = threading.Event()
+        order = []
+        scheduler.submit('binance', 'block', lambda: blocker.wait(1))
+        time.sleep(0.05)
+
+        low = scheduler.submit('binance', 'backfill', lambda: order.append('backfill'), PRIORITY_BACKFILL)
+        high = scheduler.submit('binance', 'quote', lambda: order.append('quote'), PRIORITY_QUOTE)
+        blocker.set()
+        low.result(1)
+        high.result(1)
+
+        self.assertEqual(order, ['quote', 'backfill'])
+
+    def test_token_bucket_rate(self):
+        bucket = TokenBucket(rate=10, burst=2)
+        bucket.consume()
+        bucket.consume()
+        self.assertGreater(bucket.wait_time(), 0.05)
+        bucket.penalize(5)
+        self.assertGreaterEqual(bucket.wait_time(), 4.9)
+
+if __name__ == '__main__':
+    unittest.main()
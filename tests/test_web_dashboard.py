@@ -0,0 +1,49 @@
+import sys
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+import pandas as pd
+
+# Add root directory to path so we can import modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from web_app import create_app
+from web_app.routes import main
+
+class TestWebDashboard(unittest.TestCase):
+    def setUp(self):
+        main._chart_cache.clear()
+        main._snapshot_cache.clear()
+        self.service = MagicMock()
+        self.service.get_benchmark_chart_data.return_value = pd.DataFrame(
+            {'Bitcoin': [0.0, 5.123], 'Cüzdanım': [0.0, float('nan')]},
+            index=pd.to_datetime(['2025-01-01', '2025-01-02'])
+        )
+        self.service.get_portfolio_snapshot.return_value = {
+            'portfolio': {}, 'total_value': 1500.0, 'btc_price': 60000.0
+        }
+        patcher = patch.object(main, 'portfolio_service', self.service)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = create_app().test_client()
+
+    def test_dashboard_does_not_inline_chart(self):
+        resp = self.client.get('/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(b'/api/chart-data', resp.data)
+        self.service.get_benchmark_chart_data.assert_not_called()
+
+    def test_chart_data_is_cached_and_conditional(self):
+        url = '/api/chart-data?initial_investment=1000&btc_amount=0.1&usdt_amount=5'
+        first = self.client.get(url)
+        data = first.get_json()
+        self.assertEqual(data['x'], ['2025-01-01', '2025-01-02'])
+        self.assertEqual(data['series'][0]['y'], [0.0, 5.12])
+        self.assertIsNone(data['series'][1]['y'][1])
+
+        second = self.client.get(url, headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.service.get_benchmark_chart_data.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,27 +1,38 @@
 import streamlit as st
-import pandas as pd
 import db
+from services.ai_service import ContextBuilder
+from services.ledger import trades_from_frame
+from views.data_providers import load_transactions, get_ledger
 
+@st.fragment
 def render_analysis_view():
     st.subheader("📁 İşlem Geçmişi Analizi")
     uploaded_file = st.file_uploader("CSV/Excel Yükle", type=['csv', 'xlsx', 'xls'])
 
     if uploaded_file is not None:
         try:
-            if uploaded_file.name.endswith('.csv'):
-                df_tx = pd.read_csv(uploaded_file)
-            else:
-                df_tx = pd.read_excel(uploaded_file)
+            df_tx = load_transactions(uploaded_file.name, uploaded_file.getvalue())
 
             st.dataframe(df_tx.head(), use_container_width=True)
 
+            # Aynı dosya ikinci kez deftere yazılmasın
+            imported = st.session_state.get('ledger_imported_file') == uploaded_file.file_id
+            if st.button("Deftere Aktar 📒", disabled=imported):
+                count = get_ledger().import_frame(df_tx)
+                st.session_state.ledger_imported_file = uploaded_file.file_id
+                st.success(f"{count} işlem deftere aktarıldı.")
+
             if st.button("İşlemleri Analiz Et 🧠"):
                  if 'decision_ai' in st.session_state:
                     ai = st.session_state.decision_ai
-                    csv_sample = df_tx.to_csv(index=False)
-                    # Limit sample size
+                    # Tüm dosya sembol bazında özetlenir; bütçe kalırsa dönem boyunca örnek işlemler eklenir
+                    builder = ContextBuilder()
+                    try:
+                        tx_context = builder.trades(trades_from_frame(df_tx))
+                    except (KeyError, TypeError, ValueError):
+                        tx_context = builder.frame(df_tx)
                     context = {
-                        'portfolio': f"İşlem Geçmişi Verisi (İlk 50 satır): {csv_sample[:2000]}...",
+                        'portfolio': f"İşlem Geçmişi Verisi:\n{tx_context}",
                         'user_question': "Bu yatırımcının işlem stratejisini analiz et. Hataları ve doğruları neler? Puanla."
                     }
                     with st.spinner("İşlemler inceleniyor..."):
@@ -30,3 +41,10 @@ def render_analysis_view():
                         db.save_analysis("İşlem Dosyası Analizi", uploaded_file.name, resp)
         except Exception as e:
             st.error(f"Dosya okuma hatası: {e}")
+
+    # Defterdeki pozisyonlar ve gerçekleşen K/Z (anlık görüntülerden, dosya yeniden okunmaz)
+    ledger_pnl = get_ledger().pnl()
+    if not ledger_pnl.empty:
+        st.markdown("#### İşlem Defteri")
+        st.dataframe(ledger_pnl, use_container_width=True)
+        st.metric("Gerçekleşen K/Z", f"${ledger_pnl['realized_pnl'].sum():,.2f}")
@@ -0,0 +1,149 @@
+"""
+Streamlit Data Providers
+Görünümlerin kullandığı, girdilere göre anahtarlanmış önbellekli veri kaynakları.
+
+Servis nesneleri (AssetManager, PortfolioService) tüm oturumlar arasında paylaşılır;
+veri çağrıları girdileriyle birlikte TTL'li olarak önbelleğe alınır. Böylece bir widget
+etkileşimi, ilgili olmayan fiyat/geçmiş indirmelerini tekrar tetiklemez.
+"""
+import io
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+import streamlit as st
+
+from multi_asset_manager import AssetManager
+from services.portfolio_service import PortfolioService
+from services.ai_service import get_gemini_models
+from services.symbol_catalog import get_symbol_catalog
+from services.ledger import Ledger
+from services.stress_test import StressTester
+from services.market_regime import get_market_regime
+from services.nav_snapshots import NavSnapshotter
+from services.alert_engine import get_alert_engine
+from services.precompute_jobs import start_background_jobs
+from services import inference_service
+
+QUOTE_TTL = 30          # Anlık fiyatlar (sn)
+SNAPSHOT_TTL = 60       # Portföy değerlemesi
+HISTORY_TTL = 15 * 60   # Benchmark geçmişi (günlük bar)
+MAX_CHART_POINTS = 500  # Grafik başına nokta üst sınırı (dönem uzasa da sabit)
+MODEL_TTL = 60 * 60     # XGBoost olasılık sonucu
+REGIME_TTL = 5 * 60     # Piyasa rejimi (zamanlanmış iş saatlik yeniler)
+NAV_TTL = 60            # Kayıtlı portföy değeri serisi (iş 5 dakikada bir yazar)
+
+
+@st.cache_resource
+def get_asset_manager() -> AssetManager:
+    manager = AssetManager()
+    # Panelde çekilen fiyatlar da alarm eşiklerine karşı değerlendirilir
+    manager.add_quote_listener(get_alert_engine().on_quote)
+    return manager
+
+
+@st.cache_resource
+def get_portfolio_service() -> PortfolioService:
+    return PortfolioService(get_asset_manager())
+
+
+@st.cache_resource
+def start_jobs():
+    """Ön hesaplama zamanlayıcısı (SCHEDULER_ENABLED ise); süreç başına bir kez başlar"""
+    return start_background_jobs(get_portfolio_service())
+
+
+@st.cache_resource
+def get_ledger() -> Ledger:
+    return Ledger()
+
+
+@st.cache_resource
+def get_nav_snapshotter() -> NavSnapshotter:
+    return NavSnapshotter()
+
+
+@st.cache_resource
+def get_stress_tester() -> StressTester:
+    return StressTester(get_asset_manager())
+
+
+def get_symbol_options(asset_type: str) -> List[str]:
+    """Sembol seçim listesi; yerel katalogdan gelir (ağ isteği yok, önbellek gerekmez)"""
+    return get_symbol_catalog().symbols(asset_type)
+
+
+def assets_key(extra_assets: List[Dict]) -> Tuple:
+    """Ek varlık listesini önbellek anahtarı olarak kullanılabilir hale getirir"""
+    return tuple((a['symbol'], a['type'], float(a['amount'])) for a in extra_assets)
+
+
+@st.cache_data(ttl=QUOTE_TTL, show_spinner=False)
+def _cached_price(symbol: str, asset_type: str) -> float:
+    price = get_asset_manager().get_price(symbol, asset_type)
+    if price is None:
+        # Hata önbelleğe alınmaz; bir sonraki çalıştırmada tekrar denenir
+        raise LookupError(f"{symbol} fiyatı alınamadı")
+    return price
+
+
+def get_live_price(symbol: str, asset_type: str) -> float:
+    try:
+        return _cached_price(symbol, asset_type)
+    except Exception:
+        return 0.0
+
+
+@st.cache_data(ttl=SNAPSHOT_TTL, show_spinner=False)
+def get_portfolio_snapshot(saved_btc: float, saved_usdt: float, extra_assets: Tuple) -> Dict:
+    assets = [{'symbol': s, 'type': t, 'amount': a} for s, t, a in extra_assets]
+    return get_portfolio_service().get_portfolio_snapshot(saved_btc, saved_usdt, assets)
+
+
+@st.cache_data(ttl=HISTORY_TTL, show_spinner=False)
+def get_benchmark_chart_data(saved_btc: float, saved_usdt: float, saved_initial: float,
+                             start_date_str: str, days: int = 365,
+                             max_points: int = MAX_CHART_POINTS,
+                             extra_assets: Tuple = ()) -> pd.DataFrame:
+    assets = [{'symbol': s, 'type': t, 'amount': a} for s, t, a in extra_assets]
+    return get_portfolio_service().get_benchmark_chart_data(
+        saved_btc, saved_usdt, saved_initial, start_date_str, days=days, max_points=max_points,
+        extra_assets=assets
+    )
+
+
+@st.cache_data(ttl=HISTORY_TTL, show_spinner=False)
+def get_stress_results(positions: Tuple) -> List[Dict]:
+    """positions: ((sembol, tür, değer), ...) - değerler değişmedikçe önbellekten"""
+    return get_stress_tester().run([{'symbol': s, 'type': t, 'value': v} for s, t, v in positions])
+
+
+@st.cache_data(ttl=NAV_TTL, show_spinner=False)
+def get_nav_series(portfolio_id: str, days: int, max_points: int = MAX_CHART_POINTS) -> pd.DataFrame:
+    """Kayıtlı değerler; aralığı karşılayan özet kademesinden en fazla max_points satır"""
+    start = pd.Timestamp.now(tz='UTC').timestamp() - days * 86400
+    return get_nav_snapshotter().series(portfolio_id, start=start, max_points=max_points)
+
+
+@st.cache_data(ttl=REGIME_TTL, show_spinner=False)
+def get_market_regime_snapshot() -> Optional[Dict]:
+    """Son piyasa rejimi; zamanlayıcı kapalıysa süreçte bir kez hesaplanır"""
+    return get_market_regime().current(get_asset_manager())
+
+
+@st.cache_data(ttl=MODEL_TTL, show_spinner=False)
+def get_probability(symbol: str, target_price: float, days: float, interval: str = '1d') -> Dict:
+    # INFERENCE_SOCKET tanımlıysa eğitim/tahmin ayrı süreçte (Streamlit thread'i GIL için yarışmaz)
+    return inference_service.predict_probability(symbol, target_price, days, interval=interval)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def get_available_models(api_key: str) -> List[str]:
+    return get_gemini_models(api_key)
+
+
+@st.cache_data(show_spinner=False)
+def load_transactions(file_name: str, content: bytes) -> pd.DataFrame:
+    """Yüklenen CSV/Excel dosyasını bir kez ayrıştırır (içerik aynı kaldıkça önbellekten)"""
+    if file_name.endswith('.csv'):
+        return pd.read_csv(io.BytesIO(content))
+    return pd.read_excel(io.BytesIO(content))
@@ -1,11 +1,102 @@
+import pandas as pd
+import plotly.graph_objects as go
 import streamlit as st
-import importlib
 import db
-import pandas as pd
+from services.ai_service import ContextBuilder
+from services.sensitivity import ASSET_CLASSES, sensitivity_grid
+from views.data_providers import get_probability, get_portfolio_snapshot, assets_key
+
+# Eksen başına varsayılan şok aralıkları (%)
+DEFAULT_SHOCK_RANGES = {'crypto': (-50, 100), 'commodity': (-20, 20), 'stock_tr': (-30, 30),
+                        'stock_us': (-30, 30), 'forex': (-20, 20)}
+
 
+def _shock_axis(column, label, options, default, position_types, key):
+    """Hedef seçimi + şok aralığı kaydırıcısı; {'target', 'min', 'max'} döner"""
+    with column:
+        target = st.selectbox(label, options, index=options.index(default), key=f"{key}_target",
+                              format_func=lambda t: ASSET_CLASSES.get(t, t))
+        low, high = DEFAULT_SHOCK_RANGES.get(position_types.get(target, target), (-30, 30))
+        shock = st.slider("Şok Aralığı (%)", -100, 200, (low, high), step=5, key=f"{key}_range_{target}")
+    return {'target': target, 'min': shock[0] / 100, 'max': shock[1] / 100}
+
+
+@st.fragment
+def _render_sensitivity_grid(saved_btc, saved_usdt):
+    """
+    Çoklu varlık duyarlılık ızgarası. Ayrı fragment: kaydırıcılar yalnızca bu bölümü yeniden çalıştırır,
+    ızgara yayınlanmış numpy işlemiyle milisaniyeler içinde hesaplanır.
+    """
+    st.subheader("🧮 Çoklu Varlık Duyarlılık Izgarası")
+    st.caption("İki varlık ya da varlık sınıfına aynı anda şok uygulayın; her kombinasyon için portföy değeri hesaplanır.")
+
+    snapshot = get_portfolio_snapshot(saved_btc, saved_usdt, assets_key(st.session_state.get('extra_assets', [])))
+    # Nakit dahil tüm pozisyonlar ızgaraya girer (taban değer ve % değişim için);
+    # eksen olarak yalnızca şoklanabilir sınıflardaki varlıklar seçilebilir
+    positions = [{'symbol': v.get('symbol', k), 'type': v['type'], 'value': v['value']}
+                 for k, v in snapshot['portfolio'].items() if v['value'] > 0]
+    shockable = [p for p in positions if p['type'] in ASSET_CLASSES]
+    if not shockable:
+        st.info("Şoklanabilir varlık bulunamadı.")
+        return
+
+    position_types = {p['symbol']: p['type'] for p in shockable}
+    classes = [t for t in ASSET_CLASSES if t in position_types.values()]
+    options = list(dict.fromkeys([p['symbol'] for p in shockable] + classes))
+
+    col_x, col_y, col_res = st.columns([2, 2, 1])
+    x_axis = _shock_axis(col_x, "Yatay Eksen", options, 'BTC' if 'BTC' in options else options[0],
+                         position_types, "sens_x")
+    y_options = [o for o in options if o != x_axis['target']]
+    if not y_options:
+        st.info("İkinci eksen için portföye farklı bir varlık ekleyin.")
+        return
+    y_default = next((c for c in classes if c != position_types.get(x_axis['target'], x_axis['target'])),
+                     y_options[0])
+    y_axis = _shock_axis(col_y, "Dikey Eksen", y_options, y_default, position_types, "sens_y")
+    with col_res:
+        steps = st.select_slider("Çözünürlük", options=[11, 21, 51, 101], value=101, key="sens_steps")
+
+    try:
+        result = sensitivity_grid(positions, [dict(x_axis, steps=steps), dict(y_axis, steps=steps)], extremes=1)
+    except ValueError as e:
+        st.warning(str(e))
+        return
+
+    # AI yorumu için ızgara hariç özet (en kötü/en iyi hücreler)
+    st.session_state.sens_result = {k: v for k, v in result.items() if k != 'values'}
+
+    ax_x, ax_y = result['axes']
+    base = result['base_value']
+    fig = go.Figure(go.Heatmap(
+        z=result['values'].T,
+        x=[s * 100 for s in ax_x['shocks']], y=[s * 100 for s in ax_y['shocks']],
+        colorscale='RdYlGn', zmid=base,
+        hovertemplate=f"{ax_x['label']}: %{{x:+.0f}}%<br>{ax_y['label']}: %{{y:+.0f}}%<br>Değer: %{{z:,.0f}}<extra></extra>",
+    ))
+    fig.update_layout(xaxis_title=f"{ax_x['label']} şoku (%)", yaxis_title=f"{ax_y['label']} şoku (%)",
+                      height=420, margin=dict(l=10, r=10, t=10, b=10))
+    st.plotly_chart(fig, use_container_width=True)
+
+    currency = snapshot['currency']
+    current = {'shocks': {ax_x['target']: 0.0, ax_y['target']: 0.0}, 'value': base, 'change': 0.0, 'change_pct': 0.0}
+    rows = [{
+        'Durum': label,
+        ax_x['label']: f"{cell['shocks'][ax_x['target']]:+.0%}",
+        ax_y['label']: f"{cell['shocks'][ax_y['target']]:+.0%}",
+        f'Portföy ({currency})': f"{cell['value']:,.0f}",
+        'Değişim': f"{cell['change']:+,.0f} ({cell['change_pct']:+.1%})",
+    } for label, cell in (("En Kötü", result['worst'][0]), ("Mevcut", current), ("En İyi", result['best'][0]))]
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    st.caption(f"Maruziyet: {ax_x['label']} {ax_x['exposure']:,.0f} {currency} · "
+               f"{ax_y['label']} {ax_y['exposure']:,.0f} {currency} · Mevcut: {base:,.0f} {currency}")
+
+
+@st.fragment
 def render_future_simulation_view(current_btc_price, saved_btc, saved_usdt, real_value):
     """
     Renders the unified Future Simulation and Probability Calculation view.
+    Runs as a fragment: moving the target price only reruns this view.
     """
     st.header("🔮 Gelecek Simülasyonu ve Olasılıklar")
     st.markdown("Bu alanda hem manuel fiyat senaryolarını test edebilir hem de yapay zeka destekli olasılık hesaplamaları yapabilirsiniz.")
@@ -55,12 +146,9 @@ def render_future_simulation_view(current_btc_price, saved_btc, saved_usdt, real
         prob_result = None
         if st.button("Olasılık Hesapla 🚀"):
             try:
-                # Dynamic import to avoid top-level issues and allow hot-reloading logic if needed
-                future_price = importlib.import_module("future_price")
-                importlib.reload(future_price)
-
+                # Aynı (hedef, vade) için model bir saat boyunca önbellekten döner
                 with st.spinner("Model geçmiş verileri analiz ediyor..."):
-                    prob_result = future_price.predict_probability("BTC-USD", target_price, days_pred)
+                    prob_result = dict(get_probability("BTC-USD", target_price, days_pred))
 
                 if prob_result and prob_result["success"]:
                     st.metric("Gerçekleşme İhtimali", f"%{prob_result['probability']*100:.1f}")
@@ -82,7 +170,12 @@ def render_future_simulation_view(current_btc_price, saved_btc, saved_usdt, real
 
     st.divider()
 
-    # --- PART 3: COMBINED AI INTERPRETATION ---
+    # --- PART 3: MULTI-ASSET SENSITIVITY GRID ---
+    _render_sensitivity_grid(saved_btc, saved_usdt)
+
+    st.divider()
+
+    # --- PART 4: COMBINED AI INTERPRETATION ---
     st.subheader("🧠 Yapay Zeka Yorumu")
     st.markdown("Simülasyon sonuçlarını ve olasılık verilerini birleştirerek yapay zekadan yorum alın.")
 
@@ -94,29 +187,16 @@ def render_future_simulation_view(current_btc_price, saved_btc, saved_usdt, real
             sim_data = st.session_state.get('sim_result', {})
             prob_data = st.session_state.get('prob_result', None)
 
-            context_str = f"""
-            KULLANICI SENARYOSU:
-            - Mevcut BTC Fiyatı: ${current_btc_price:,.2f}
-            - Simüle Edilen BTC Fiyatı (Hedef): ${sim_data.get('sim_price', 0):,.2f}
-            - Bu senaryoda Portföy Değeri: ${sim_data.get('sim_total', 0):,.2f} (Fark: ${sim_data.get('sim_diff', 0):,.2f})
-            """
+            # Senaryo, duyarlılık ızgarası ve olasılık sonucu kompakt, bütçeli tablo olarak gönderilir
+            builder = ContextBuilder()
+            context_str = f"KULLANICI SENARYOSU:\nMevcut BTC fiyatı: {current_btc_price:.0f}\n"
+            context_str += builder.simulation(sim_data, st.session_state.get('sens_result'))
 
             if prob_data:
-                # Check if the probability calculation matches the current simulation price.
-                # If the user changed the slider but didn't click "Calculate Probability" again, the data might be stale.
-                # We can add a note about this or just display what was calculated.
+                context_str += "\nMAKİNE ÖĞRENMESİ (XGBoost) ANALİZİ:\n" + builder.probability(prob_data)
+                # Kaydırıcı değişip olasılık yeniden hesaplanmadıysa sonuç eski hedefe aittir
                 calc_target = prob_data.get('target_price', 0)
                 current_target = sim_data.get('sim_price', 0)
-
-                context_str += f"""
-
-                MAKİNE ÖĞRENMESİ (XGBoost) ANALİZİ:
-                - Analiz Edilen Hedef Fiyat: ${calc_target:,.2f}
-                - Vade: {prob_data.get('days', 0)} gün
-                - Gerçekleşme Olasılığı: %{prob_data.get('probability', 0)*100:.1f}
-                - Model Doğruluğu: {prob_data.get('accuracy', 0):.2f}
-                """
-
                 if calc_target != current_target:
                     context_str += f"\n(UYARI: Kullanıcı şu an simülasyonu ${current_target} için yapıyor ancak olasılık hesabı önceki ${calc_target} değeri için yapılmış.)"
             else:
@@ -0,0 +1,17 @@
+import streamlit as st
+from views.data_providers import get_live_price
+
+@st.fragment(run_every=60)
+def render_header_view(saved_btc, saved_usdt, saved_initial):
+    """Üst bilgi paneli; canlı fiyatı kendi başına (dakikada bir) yeniler."""
+    current_btc_price = get_live_price('BTC', 'crypto')
+
+    real_value = (saved_btc * current_btc_price) + saved_usdt
+    profit = real_value - saved_initial
+    roi = (profit / saved_initial) * 100 if saved_initial > 0 else 0
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Mevcut Toplam Varlık", f"${real_value:,.0f}")
+    col2.metric("Toplam Kar/Zarar", f"${profit:,.0f}", delta=f"%{roi:.1f}")
+    col3.metric("Ana Para", f"${saved_initial:,.0f}")
+    col4.metric("Canlı BTC Fiyatı", f"${current_btc_price:,.0f}")
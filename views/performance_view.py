@@ -1,7 +1,9 @@
 import streamlit as st
 import db
-from services.portfolio_service import PortfolioService
+from services.ai_service import ContextBuilder
+from views.data_providers import get_benchmark_chart_data, get_nav_series, assets_key
 
+@st.fragment
 def render_performance_view():
     st.subheader("Yatırımınız vs Piyasa")
 
@@ -11,14 +13,15 @@ def render_performance_view():
     start_date_obj = st.session_state.get('start_date_obj')
 
     if saved_initial > 0:
-        if 'portfolio_service' not in st.session_state:
-            st.session_state.portfolio_service = PortfolioService(st.session_state.asset_manager)
-
-        portfolio_service = st.session_state.portfolio_service
+        days = st.select_slider("Dönem:", options=[90, 365, 730, 1825], value=365,
+                                format_func=lambda d: f"{d // 365} Yıl" if d >= 365 else f"{d} Gün")
 
         with st.spinner("Veriler güncelleniyor..."):
-            chart_data = portfolio_service.get_benchmark_chart_data(
-                saved_btc, saved_usdt, saved_initial, str(start_date_obj)
+            # Nokta sayısı dönemden bağımsız olarak MAX_CHART_POINTS ile sınırlı;
+            # "Cüzdanım" eklenen varlıkları da içerir
+            chart_data = get_benchmark_chart_data(
+                saved_btc, saved_usdt, saved_initial, str(start_date_obj), days=days,
+                extra_assets=assets_key(st.session_state.get('extra_assets', []))
             )
 
         if not chart_data.empty:
@@ -32,14 +35,23 @@ def render_performance_view():
             if st.button("Grafiği Yorumla 🧠", key="btn_chart_ai"):
                 if 'decision_ai' in st.session_state:
                     ai = st.session_state.decision_ai
-                    last_vals = chart_data.iloc[-1].to_dict()
+                    # Dönem sonu getiriler yuvarlanmış, sıralı tablo olarak gönderilir
+                    returns_context = ContextBuilder().series(chart_data.iloc[-1].to_dict(), "Dönem sonu getiriler")
                     context = {
-                        'portfolio': f"Getiriler (%): {last_vals}",
+                        'portfolio': returns_context,
                         'user_question': "Cüzdanım diğer varlıklara göre nasıl performans göstermiş? Enflasyonu yenebilmiş mi?"
                     }
                     with st.spinner("Analiz ediliyor..."):
                         resp = ai.get_ai_recommendation(context)
                         st.info(resp)
-                        db.save_analysis("Grafik Yorumu", str(last_vals), resp)
+                        db.save_analysis("Grafik Yorumu", returns_context, resp)
         else:
             st.warning("Veri çekilemedi.")
+
+        # Zamanlanmış işin kaydettiği gerçek değerler (piyasa geçmişinden yeniden kurulmaz)
+        nav = get_nav_series('wallet', days)
+        if not nav.empty:
+            st.markdown("#### 📈 Kayıtlı Portföy Değeri")
+            st.caption(f"Çözünürlük: {nav.attrs.get('resolution', '-')} · {len(nav)} nokta")
+            st.line_chart(nav[['close']].rename(columns={'close': 'Portföy Değeri'}), height=250,
+                          use_container_width=True)
@@ -1,8 +1,13 @@
+import pandas as pd
 import streamlit as st
 import db
-from services.portfolio_service import PortfolioService
-from services.ai_service import DecisionSupportAI
+from services.ai_service import ContextBuilder
+from views.data_providers import (
+    get_portfolio_service, get_portfolio_snapshot, assets_key, get_symbol_options, get_stress_results,
+    get_market_regime_snapshot
+)
 
+@st.fragment
 def render_portfolio_view(api_key: str):
     st.subheader("Bütünleşik Portföy Yönetimi (BIST, Kripto, Emtia)")
 
@@ -10,51 +15,55 @@ def render_portfolio_view(api_key: str):
     saved_btc = st.session_state.get('saved_btc', 0.0)
     saved_usdt = st.session_state.get('saved_usdt', 0.0)
 
-    # Initialize PortfolioService if needed (though app.py should handle high level init)
-    # Ideally, we pass the service instance, but for now we can instantiate or use session state
-    if 'portfolio_service' not in st.session_state:
-        st.session_state.portfolio_service = PortfolioService(st.session_state.asset_manager)
-
-    portfolio_service = st.session_state.portfolio_service
+    # Paylaşılan servis (st.cache_resource) - oturum başına yeniden oluşturulmaz
+    portfolio_service = get_portfolio_service()
 
     if 'extra_assets' not in st.session_state:
         st.session_state.extra_assets = []
 
-    # Get Snapshot
-    snapshot = portfolio_service.get_portfolio_snapshot(saved_btc, saved_usdt, st.session_state.extra_assets)
+    # Get Snapshot (girdilere göre önbellekli; risk kaydırıcısı vb. yeni fiyat isteği tetiklemez)
+    snapshot = get_portfolio_snapshot(saved_btc, saved_usdt, assets_key(st.session_state.extra_assets))
     full_portfolio = snapshot['portfolio']
     total_port_val = snapshot['total_value']
+    currency = snapshot['currency']
 
     col_assets, col_ai_advice = st.columns([1, 1])
 
     with col_assets:
         st.markdown("#### Varlık Ekle")
 
+        # Tür form dışında: seçildiğinde sembol listesi hemen o türe göre yenilenir
+        asset_type = st.selectbox("Tür", ["stock_tr", "stock_us", "crypto", "commodity", "forex"],
+                                  format_func=lambda x: {
+                                      'stock_tr': 'BIST Hisse (TR)',
+                                      'stock_us': 'ABD Hisse',
+                                      'crypto': 'Kripto Para',
+                                      'commodity': 'Emtia (Altın vb.)',
+                                      'forex': 'Döviz'
+                                  }[x])
+
         with st.form("add_asset"):
-            c1, c2, c3 = st.columns(3)
+            c1, c2 = st.columns(2)
             with c1:
-                asset_type = st.selectbox("Tür", ["stock_tr", "stock_us", "crypto", "commodity", "forex"],
-                                          format_func=lambda x: {
-                                              'stock_tr': 'BIST Hisse (TR)',
-                                              'stock_us': 'ABD Hisse',
-                                              'crypto': 'Kripto Para',
-                                              'commodity': 'Emtia (Altın vb.)',
-                                              'forex': 'Döviz'
-                                          }[x])
+                # Yazdıkça yerel katalogda filtrelenir; katalogda olmayan sembol de girilebilir
+                symbol_input = st.selectbox("Sembol (Örn: THYAO, AAPL, ETH)", get_symbol_options(asset_type),
+                                            index=None, accept_new_options=True,
+                                            placeholder="Sembol yazın...")
             with c2:
-                symbol_input = st.text_input("Sembol (Örn: THYAO, AAPL, ETH)", value="THYAO").upper()
-            with c3:
                 amount_input = st.number_input("Adet/Miktar", min_value=0.0, step=1.0)
 
             if st.form_submit_button("Ekle"):
-                result = portfolio_service.validate_and_add_asset(symbol_input, asset_type, amount_input)
+                symbol_input = (symbol_input or "").strip().upper()
+                result = portfolio_service.validate_and_add_asset(symbol_input, asset_type, amount_input) \
+                    if symbol_input else None
                 if result:
                     st.session_state.extra_assets.append({
                         'symbol': result['symbol'],
                         'type': result['type'],
                         'amount': result['amount']
                     })
-                    st.success(f"{result['symbol']} eklendi. Fiyat: {result['price']}")
+                    detail = f"Fiyat: {result['price']}" if result['price'] else result.get('name', '')
+                    st.success(f"{result['symbol']} eklendi. {detail}")
                     st.rerun()
                 else:
                     st.error(f"{symbol_input} fiyatı bulunamadı.")
@@ -69,17 +78,41 @@ def render_portfolio_view(api_key: str):
                 'Varlık': k,
                 'Tip': v['type'],
                 'Miktar': v['amount'],
-                'Değer ($)': f"${v['value']:,.2f}"
+                f'Değer ({currency})': f"{v['value']:,.2f} {currency}"
             })
 
         st.table(disp_data)
-        st.metric("Toplam Portföy Değeri", f"${total_port_val:,.2f}")
+        st.metric("Toplam Portföy Değeri", f"{total_port_val:,.2f} {currency}")
 
         if st.session_state.extra_assets:
             if st.button("Listeyi Temizle"):
                 st.session_state.extra_assets = []
                 st.rerun()
 
+        with st.expander("🧪 Tarihsel Stres Testi"):
+            st.caption("Mevcut ağırlıklar geçmiş kriz dönemlerinde yeniden oynatılır.")
+            if st.button("Senaryoları Çalıştır"):
+                positions = tuple((v.get('symbol', k), v['type'], round(v['value'], 2))
+                                  for k, v in full_portfolio.items() if v['value'] > 0)
+                with st.spinner("Geçmiş veriler hizalanıyor..."):
+                    results = get_stress_results(positions)
+                if not results:
+                    st.info("Senaryo penceresi için yeterli geçmiş veri bulunamadı.")
+                else:
+                    st.dataframe(pd.DataFrame([{
+                        'Senaryo': r['scenario'],
+                        'Toplam Getiri': f"{r['total_return']:+.1%}",
+                        'En Derin Düşüş': f"{r['max_drawdown']:.1%}",
+                        f"Kayıp ({r['currency']})": f"{r['max_loss']:,.0f} {r['currency']}",
+                        'En Kötü Gün': f"{r['worst_day']:+.1%} ({r['worst_day_date']})",
+                        'Toparlanma': f"{r['recovery_days']} gün" if r['recovery_days'] is not None else "-",
+                        'Kapsam': f"{r['coverage']:.0%}",
+                    } for r in results]), hide_index=True, use_container_width=True)
+                    if 'decision_ai' in st.session_state:
+                        report = st.session_state.decision_ai.analyze_portfolio_risk(full_portfolio, results)
+                        for warning in report['warnings']:
+                            st.warning(warning)
+
     with col_ai_advice:
         st.markdown("#### 🧠 AI Karar Destek")
 
@@ -92,13 +125,16 @@ def render_portfolio_view(api_key: str):
                 if 'decision_ai' in st.session_state:
                     ai = st.session_state.decision_ai
 
+                    builder = ContextBuilder()
+                    portfolio_context = builder.portfolio(full_portfolio, snapshot['currency'])
+                    regime = get_market_regime_snapshot()
                     context = {
-                        'portfolio': full_portfolio,
-                        'market_condition': 'Belirsiz (Veri akışı bekleniyor)',
+                        'portfolio': portfolio_context,
+                        'market_condition': builder.regime(regime) if regime else 'Belirsiz (Veri akışı bekleniyor)',
                         'user_question': f"Risk profilim {risk_choice}. Bu portföy uygun mu? Ne yapmalıyım?"
                     }
 
                     with st.spinner("AI Portföy Yöneticisi Düşünüyor..."):
                         rec = ai.get_ai_recommendation(context)
                         st.markdown(rec)
-                        db.save_analysis("Portföy Analizi", str(full_portfolio), rec)
+                        db.save_analysis("Portföy Analizi", portfolio_context, rec)
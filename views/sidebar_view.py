@@ -2,7 +2,8 @@ import streamlit as st
 import os
 import db
 from datetime import datetime, timedelta
-from services.ai_service import get_gemini_models, DecisionSupportAI
+from services.ai_service import DecisionSupportAI
+from views.data_providers import get_available_models
 
 def render_sidebar():
     with st.sidebar:
@@ -19,15 +20,7 @@ def render_sidebar():
 
         default_models = ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-pro"]
         if api_key:
-            # Note: Caching is good, but calling service directly here.
-            # In a real app we might want to wrap this in app.py or here with st.cache_data
-            # But the service function itself is pure.
-            # We can use a local wrapper for caching.
-            @st.cache_data(ttl=300)
-            def cached_get_models(key):
-                return get_gemini_models(key)
-
-            fetched_models = cached_get_models(api_key)
+            fetched_models = get_available_models(api_key)
             available_models = fetched_models if fetched_models else default_models
             selected_model_name = st.selectbox("Yapay Zeka Modeli:", available_models, index=0)
 
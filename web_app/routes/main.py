@@ -1,54 +1,104 @@
-from flask import Blueprint, render_template, request
-import plotly.express as px
-import plotly.io as pio
+from flask import Blueprint, render_template, request, Response
 from services.portfolio_service import PortfolioService
+from services.cache import get_cache
+import hashlib
+import json
+import math
 import pandas as pd
 
 main_bp = Blueprint('main', __name__)
 portfolio_service = PortfolioService()
 
-@main_bp.route('/', methods=['GET', 'POST'])
-def dashboard():
-    # Default values (simulating what was in Streamlit session state or defaults)
-    initial_investment = 1000.0
-    btc_amount = 0.015
-    usdt_amount = 500.0
+DEFAULT_INPUTS = {'initial_investment': 1000.0, 'btc_amount': 0.015, 'usdt_amount': 500.0}
+MAX_CHART_POINTS = 500
 
-    # In a real app, these would come from a database or user session
-    # For now, we'll allow basic inputs via a simple form on top or defaults
+# Hazır JSON gövdeleri: (girdiler, gün) anahtarıyla saklanır; gün değişince anahtar da değişir
+_chart_cache = get_cache('web_chart', maxsize=512, ttl=6 * 3600)
+_snapshot_cache = get_cache('web_snapshot', maxsize=512, ttl=60)
 
-    if request.method == 'POST':
+
+def _read_inputs(source):
+    """Form veya query string'den girdileri okur; hatalı değerde varsayılanları korur"""
+    values = dict(DEFAULT_INPUTS)
+    for name, default in DEFAULT_INPUTS.items():
         try:
-            initial_investment = float(request.form.get('initial_investment', 1000.0))
-            btc_amount = float(request.form.get('btc_amount', 0.015))
-            usdt_amount = float(request.form.get('usdt_amount', 500.0))
-        except ValueError:
+            values[name] = float(source.get(name, default))
+        except (TypeError, ValueError):
             pass # Keep defaults on error
+    return values
+
 
-    # Fetch Data
-    # Note: Using hardcoded start date for now as per original app logic usually defaulting to 1 year
-    start_date = (pd.Timestamp.now() - pd.Timedelta(days=365)).strftime('%Y-%m-%d')
+def _chart_payload(initial_investment, btc_amount, usdt_amount, as_of):
+    """Benchmark grafiği için (JSON gövdesi, ETag) üretir; aynı gün içinde önbellekten döner"""
+    key = ('benchmark', initial_investment, btc_amount, usdt_amount, as_of)
+    cached = _chart_cache.get(key)
+    if cached is not None:
+        return cached
 
+    start_date = (pd.Timestamp(as_of) - pd.Timedelta(days=365)).strftime('%Y-%m-%d')
     df = portfolio_service.get_benchmark_chart_data(
         btc_amount=btc_amount,
         usdt_amount=usdt_amount,
         initial_usd=initial_investment,
         start_date_str=start_date,
-        days=365
+        days=365,
+        max_points=MAX_CHART_POINTS
+    )
+
+    # Plotly.js'in doğrudan kullanabileceği kolon bazlı, yuvarlanmış veri
+    payload = {
+        'as_of': as_of,
+        'title': 'Portföy Performansı vs Benchmarklar',
+        'x': [ts.strftime('%Y-%m-%d') for ts in df.index],
+        'series': [
+            {
+                'name': str(col),
+                'y': [None if (v is None or math.isnan(v)) else round(float(v), 2) for v in df[col].tolist()]
+            }
+            for col in df.columns
+        ],
+    }
+    body = json.dumps(payload, separators=(',', ':'), ensure_ascii=False)
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+    # Boş sonuç (upstream hatası) kısa süre saklanır
+    _chart_cache.set(key, (body, etag), ttl=None if payload['series'] else 60)
+    return body, etag
+
+
+def _snapshot(btc_amount, usdt_amount):
+    key = (btc_amount, usdt_amount)
+    return _snapshot_cache.get_or_set(
+        key, lambda: portfolio_service.get_portfolio_snapshot(btc_amount, usdt_amount, [])
     )
 
-    # Generate Chart
-    fig = px.line(df, x=df.index, y=df.columns, title='Portföy Performansı vs Benchmarklar')
-    fig.update_layout(yaxis_title='Değişim (%)', xaxis_title='Tarih', template='plotly_white')
 
-    chart_html = pio.to_html(fig, full_html=False)
+@main_bp.route('/', methods=['GET', 'POST'])
+def dashboard():
+    # Default values (simulating what was in Streamlit session state or defaults)
+    # In a real app, these would come from a database or user session
+    # For now, we'll allow basic inputs via a simple form on top or defaults
+    inputs = _read_inputs(request.form if request.method == 'POST' else request.args)
 
-    # Get Snapshot
-    snapshot = portfolio_service.get_portfolio_snapshot(btc_amount, usdt_amount, [])
+    # Grafik sunucuda çizilmez; tarayıcı /api/chart-data uç noktasından veriyi alıp render eder
+    snapshot = _snapshot(inputs['btc_amount'], inputs['usdt_amount'])
 
     return render_template('dashboard.html',
-                           chart_html=chart_html,
                            snapshot=snapshot,
-                           initial_investment=initial_investment,
-                           btc_amount=btc_amount,
-                           usdt_amount=usdt_amount)
+                           initial_investment=inputs['initial_investment'],
+                           btc_amount=inputs['btc_amount'],
+                           usdt_amount=inputs['usdt_amount'])
+
+
+@main_bp.route('/api/chart-data')
+def chart_data():
+    """Benchmark grafiği verisi (JSON). Girdi + gün bazında önbelleklenir, ETag destekler."""
+    inputs = _read_inputs(request.args)
+    as_of = pd.Timestamp.now().strftime('%Y-%m-%d')
+
+    body, etag = _chart_payload(inputs['initial_investment'], inputs['btc_amount'],
+                                inputs['usdt_amount'], as_of)
+
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'private, max-age=300'
+    return resp.make_conditional(request)